@@ -0,0 +1,348 @@
+# ====================================================================
+# ARQUIVO: api.py
+# API JSON local sobre utils/database.py (PDV, planilhas, integrações)
+# ====================================================================
+#
+#   python api.py [--host 127.0.0.1] [--porta 8502] [--workers 8]
+#
+# Somente biblioteca padrão: http.server com um pool fixo de threads
+# atendendo as conexões (HTTP/1.1 keep-alive). Respostas GET levam um
+# ETag derivado da versão dos dados (meta.versao_dados, mantida por
+# triggers), então um If-None-Match válido devolve 304 sem consultar os
+# produtos. Corpos maiores que 1 KB são comprimidos com gzip quando o
+# cliente aceita.
+#
+# Se a variável ESTOQUE_API_TOKEN estiver definida, toda requisição
+# precisa do cabeçalho "Authorization: Bearer <token>".
+#
+# O cabeçalho "X-Loja: <código>" escolhe a loja (utils/lojas.py); sem
+# ele, as rotas usam a loja principal.
+#
+# Rotas:
+#   GET  /saude
+#   GET  /produtos?limit=50&after=<id>&marca=&estilo=&tipo=&q=&em_estoque=1
+#   GET  /produtos/<id>
+#   GET  /produtos/sku/<código>
+#   GET  /validade?dias=30
+#   POST /vendas        {"itens": [{"id": 12, "quantidade": 3}, {"sku": "789...", "quantidade": 1}]}
+#   GET  /exportar.csv
+#   POST /importar      corpo CSV (;), mesmo formato da exportação, ou planilha .xlsx
+#                       (Content-Type: application/vnd.openxmlformats-officedocument.spreadsheetml.sheet)
+
+import argparse
+import gzip
+import hashlib
+import hmac
+import io
+import json
+import logging
+import os
+import re
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import urlsplit, parse_qs, unquote
+
+from utils.database import (
+    get_data_version, get_produtos_page, get_produto_by_id, get_produto_by_sku,
+    get_expiring, mark_produtos_as_sold_batch, export_produtos_to_csv_content,
+    import_produtos_from_csv_buffer, import_produtos_from_xlsx_buffer, safe_int, caminho_banco,
+)
+from utils.lojas import get_loja, usar_loja
+
+logger = logging.getLogger("api")
+
+LIMITE_PADRAO = 50
+LIMITE_MAXIMO = 500
+TAMANHO_MINIMO_GZIP = 1024
+CORPO_MAXIMO = 10 * 1024 * 1024
+USUARIO_API = "api"  # autor das escritas na auditoria
+
+
+class ErroApi(Exception):
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+
+
+class Resposta:
+    __slots__ = ("status", "corpo", "tipo", "cacheavel")
+
+    def __init__(self, corpo, status=200, tipo="application/json; charset=utf-8", cacheavel=False):
+        self.status = status
+        self.corpo = corpo
+        self.tipo = tipo
+        self.cacheavel = cacheavel
+
+
+def _json(obj, status=200, cacheavel=False):
+    corpo = json.dumps(obj, ensure_ascii=False, default=str).encode("utf-8")
+    return Resposta(corpo, status, cacheavel=cacheavel)
+
+
+# --------------------------------------------------------------------
+# Handlers
+# --------------------------------------------------------------------
+
+def rota_saude(handler, match, query):
+    return _json({"ok": True, "versao": get_data_version()})
+
+
+def rota_produtos(handler, match, query):
+    limite = min(max(safe_int(query.get("limit"), LIMITE_PADRAO), 1), LIMITE_MAXIMO)
+    after = query.get("after")
+    itens = get_produtos_page(
+        after_id=safe_int(after) if after else None,
+        limit=limite,
+        marca=query.get("marca"),
+        estilo=query.get("estilo"),
+        tipo=query.get("tipo"),
+        busca=query.get("q"),
+        em_estoque=query.get("em_estoque") in ("1", "true", "sim"),
+    )
+    proximo = itens[-1]["id"] if len(itens) == limite else None
+    return _json({"itens": itens, "proximo": proximo}, cacheavel=True)
+
+
+def rota_produto(handler, match, query):
+    produto = get_produto_by_id(int(match.group(1)))
+    if not produto:
+        raise ErroApi(404, "Produto não encontrado")
+    return _json(produto, cacheavel=True)
+
+
+def rota_produto_sku(handler, match, query):
+    produto = get_produto_by_sku(unquote(match.group(1)))
+    if not produto:
+        raise ErroApi(404, "Código de barras não cadastrado")
+    return _json(produto, cacheavel=True)
+
+
+def rota_validade(handler, match, query):
+    dias = safe_int(query.get("dias"), 30)
+    return _json({"dias": dias, "itens": get_expiring(dias, query.get("marca"))}, cacheavel=True)
+
+
+def rota_vendas(handler, match, query):
+    dados = handler.ler_json()
+    itens = dados.get("itens") if isinstance(dados, dict) else None
+    if not isinstance(itens, list) or not itens:
+        raise ErroApi(400, "Informe {\"itens\": [{\"id\" ou \"sku\", \"quantidade\"}, ...]}")
+    lote = []
+    sem_cadastro = []
+    for item in itens:
+        if not isinstance(item, dict):
+            raise ErroApi(400, "Cada item deve ser um objeto {\"id\" ou \"sku\", \"quantidade\"}")
+        if not all(isinstance(item.get(k), (int, str, type(None))) for k in ("id", "sku")):
+            raise ErroApi(400, "\"id\" e \"sku\" devem ser número ou texto")
+        qtd = safe_int(item.get("quantidade", 1))
+        if item.get("id") is not None:
+            lote.append((safe_int(item["id"]), qtd))
+        elif item.get("sku"):
+            produto = get_produto_by_sku(str(item["sku"]))
+            if produto:
+                lote.append((produto["id"], qtd))
+            else:
+                sem_cadastro.append({"sku": item["sku"], "quantidade": qtd, "ok": False,
+                                     "erro": "Código de barras não cadastrado"})
+        else:
+            raise ErroApi(400, "Cada item precisa de \"id\" ou \"sku\"")
+    resultados = mark_produtos_as_sold_batch(lote, usuario=USUARIO_API) if lote else []
+    resultados += sem_cadastro
+    return _json({
+        "ok": all(r["ok"] for r in resultados),
+        "vendidos": sum(1 for r in resultados if r["ok"]),
+        "resultados": resultados,
+    })
+
+
+def rota_exportar(handler, match, query):
+    corpo = export_produtos_to_csv_content().encode("utf-8")
+    return Resposta(corpo, tipo="text/csv; charset=utf-8", cacheavel=True)
+
+
+def rota_importar(handler, match, query):
+    corpo = handler.ler_corpo()
+    if not corpo:
+        raise ErroApi(400, "Corpo CSV vazio")
+    try:
+        if "spreadsheetml" in handler.headers.get("Content-Type", ""):
+            return _json(import_produtos_from_xlsx_buffer(io.BytesIO(corpo), usuario=USUARIO_API))
+        count = import_produtos_from_csv_buffer(io.BytesIO(corpo), usuario=USUARIO_API)
+    except Exception as e:
+        raise ErroApi(400, f"Erro ao importar: {e}")
+    return _json({"importados": count})
+
+
+ROTAS = [
+    ("GET", re.compile(r"^/saude$"), rota_saude),
+    ("GET", re.compile(r"^/produtos$"), rota_produtos),
+    ("GET", re.compile(r"^/produtos/(\d+)$"), rota_produto),
+    ("GET", re.compile(r"^/produtos/sku/([^/]+)$"), rota_produto_sku),
+    ("GET", re.compile(r"^/validade$"), rota_validade),
+    ("POST", re.compile(r"^/vendas$"), rota_vendas),
+    ("GET", re.compile(r"^/exportar\.csv$"), rota_exportar),
+    ("POST", re.compile(r"^/importar$"), rota_importar),
+]
+
+# rotas cujo resultado depende da data de hoje, além dos dados
+ROTAS_POR_DATA = {rota_validade}
+
+
+# --------------------------------------------------------------------
+# HTTP
+# --------------------------------------------------------------------
+
+class ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "EstoqueAPI/1.0"
+    timeout = 15  # libera o worker de conexões keep-alive ociosas
+    # cabeçalhos e corpo saem em writes separados; sem isso o Nagle +
+    # ACK atrasado adiciona ~40 ms a cada resposta keep-alive
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def ler_corpo(self):
+        tamanho = safe_int(self.headers.get("Content-Length"), 0)
+        if tamanho > CORPO_MAXIMO:
+            raise ErroApi(413, "Corpo muito grande")
+        return self.rfile.read(tamanho) if tamanho > 0 else b""
+
+    def ler_json(self):
+        try:
+            return json.loads(self.ler_corpo() or b"{}")
+        except ValueError:
+            raise ErroApi(400, "JSON inválido")
+
+    def _autorizado(self):
+        token = os.environ.get("ESTOQUE_API_TOKEN")
+        if not token:
+            return True
+        enviado = self.headers.get("Authorization", "")
+        return hmac.compare_digest(enviado, f"Bearer {token}")
+
+    def _enviar(self, resposta, etag=None):
+        corpo = resposta.corpo
+        self.send_response(resposta.status)
+        if (len(corpo) >= TAMANHO_MINIMO_GZIP
+                and "gzip" in self.headers.get("Accept-Encoding", "")):
+            corpo = gzip.compress(corpo, compresslevel=5)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Content-Type", resposta.tipo)
+        self.send_header("Content-Length", str(len(corpo)))
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(corpo)
+
+    def _despachar(self, metodo):
+        partes = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(partes.query).items()}
+        try:
+            if not self._autorizado():
+                raise ErroApi(401, "Token inválido")
+            # sempre definida: as threads do pool são reaproveitadas entre requisições
+            codigo_loja = self.headers.get("X-Loja")
+            if codigo_loja and not get_loja(codigo_loja):
+                raise ErroApi(404, f"Loja não encontrada: {codigo_loja}")
+            usar_loja(codigo_loja)
+            for metodo_rota, regex, rota in ROTAS:
+                match = regex.match(partes.path)
+                if match and metodo_rota == metodo:
+                    break
+            else:
+                raise ErroApi(404, "Rota não encontrada")
+
+            etag = None
+            if metodo == "GET":
+                # validação barata: só a versão dos dados é consultada; a
+                # query string faz parte de self.path e as rotas que dependem
+                # de hoje (vencidos x a vencer) mudam de ETag na virada do dia
+                chave = f"{caminho_banco()}:{get_data_version()}:{self.path}"
+                if rota in ROTAS_POR_DATA:
+                    chave += f":{date.today().isoformat()}"
+                chave = chave.encode("utf-8")
+                etag = '"' + hashlib.sha1(chave).hexdigest()[:20] + '"'
+                enviados = self.headers.get("If-None-Match", "")
+                if etag in (t.strip() for t in enviados.split(",")):
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+            resposta = rota(self, match, query)
+            self._enviar(resposta, etag if resposta.cacheavel else None)
+        except ErroApi as e:
+            self._enviar(_json({"erro": str(e)}, e.status))
+        except Exception as e:
+            logger.exception("Erro em %s %s", metodo, self.path)
+            self._enviar(_json({"erro": f"Erro interno: {e}"}, 500))
+
+    def do_GET(self):
+        self._despachar("GET")
+
+    def do_HEAD(self):
+        self._despachar("GET")
+
+    def do_POST(self):
+        self._despachar("POST")
+
+
+class ServidorApi(HTTPServer):
+    """
+    HTTPServer com um pool fixo de threads: cada conexão aceita é
+    entregue a um worker, limitando a concorrência a `workers`.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, endereco, handler=ApiHandler, workers=8):
+        super().__init__(endereco, handler)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api")
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._atender, request, client_address)
+
+    def _atender(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def criar_servidor(host="127.0.0.1", porta=8502, workers=8):
+    return ServidorApi((host, porta), ApiHandler, workers)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="API JSON local do estoque")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8502)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+
+    servidor = criar_servidor(args.host, args.porta, args.workers)
+    logger.info("API do estoque em http://%s:%s (%s workers)", args.host, args.porta, args.workers)
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,11 @@
 import streamlit as st
 import os
 from utils.database import create_tables, check_user_login
+from utils.lojas import usar_loja
+from utils.historico import iniciar_foto_diaria
+from utils.limpeza_imagens import iniciar_limpeza_imagens
+from utils.aquecimento import iniciar_aquecimento
+from utils.sessoes import sessao_valida, encerrar_sessao
 
 # Configurações Iniciais
 st.set_page_config(
@@ -9,8 +14,13 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
+loja = usar_loja(st.session_state.get("loja"))
+st.sidebar.caption(f"🏬 Loja: **{loja['nome']}**")
+
 # Inicializa as tabelas do DB (garante que existem)
 create_tables()
+iniciar_foto_diaria()
+iniciar_limpeza_imagens()
 
 # Inicialização do estado de sessão para Login
 if "logged_in" not in st.session_state: st.session_state["logged_in"] = False
@@ -37,6 +47,9 @@ Use o menu lateral (ícone das páginas do Streamlit) para acessar as diferentes
 * **Gerenciar Produtos:** Cadastro, Edição, Remoção, Venda e Relatórios (Requer Login).
 * **Estoque Completo:** Visualização geral do estoque.
 * **Produtos Vendidos:** Histórico de itens vendidos.
+* **Venda por Código de Barras:** Venda rápida com leitor USB (Requer Login).
+* **Relatórios:** Valor por categoria, idade do estoque, giro e faixas de preço (Requer Login).
+* **Lojas:** Escolha da loja da sessão, estoque consolidado e busca entre lojas (Requer Login).
 * **Área Administrativa:** Login e Cadastro de novos usuários.
 """)
 
@@ -50,10 +63,12 @@ except Exception:
      pass
 
 # Botão de Logout (mostrado no sidebar se estiver logado)
-if st.session_state["logged_in"]:
+if sessao_valida(st.session_state):
     st.sidebar.success(f"Logado como: **{st.session_state['username']}** ({st.session_state['role']})")
     if st.sidebar.button("Sair"):
-        st.session_state["logged_in"] = False
-        st.session_state["username"] = ""
-        st.session_state["role"] = "guest"
+        encerrar_sessao(st.session_state)
         st.rerun()
+
+# Aquecimento dos caches em segundo plano (uma vez por processo), depois
+# que a página já foi montada
+iniciar_aquecimento()
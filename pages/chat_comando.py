@@ -1,9 +1,15 @@
+import re
 import streamlit as st
 from datetime import datetime
 from utils.database import (
-    add_produto, get_all_produtos, mark_produto_as_sold,
-    MARCAS, ESTILOS, TIPOS, safe_int, safe_float
+    add_produto, add_produtos_batch, get_all_produtos, mark_produto_as_sold,
+    mark_produtos_as_sold_batch, MARCAS, safe_int, safe_float
 )
+from utils.comandos import ErroComando, parse_itens_venda, parse_lote_produtos
+from utils.categorias import resolver, sugestoes
+from utils.chat_historico import HistoricoChat
+from utils.lojas import usar_loja
+from utils.sessoes import sessao_valida
 
 st.set_page_config(page_title="Chatbot Estoque", page_icon="🤖", layout="wide")
 
@@ -18,20 +24,89 @@ def load_css(file_name="style.css"):
 
 load_css("style.css")
 
-if not st.session_state.get("logged_in"):
+loja = usar_loja(st.session_state.get("loja"))
+st.sidebar.caption(f"🏬 Loja: **{loja['nome']}**")
+
+if not sessao_valida(st.session_state):
     st.error("Acesso negado. Faça login na Área Administrativa.")
     st.stop()
 
 if "chat_history" not in st.session_state:
-    st.session_state["chat_history"] = [
-        {"role": "assistant", "content": "Olá! Sou o assistente de estoque. Digite `ajuda` para ver comandos."}
-    ]
+    st.session_state["chat_history"] = HistoricoChat(username=st.session_state.get("username"))
+    st.session_state["chat_history"].append(
+        "assistant", "Olá! Sou o assistente de estoque. Digite `ajuda` para ver comandos."
+    )
 if "chat_state" not in st.session_state:
     st.session_state["chat_state"] = {"step": "idle", "data": {}}
 
 st.title("🤖 Chatbot Operacional")
 st.caption("Gerencie estoque por comandos de texto.")
 
+def formatar_resumo(titulo, resultados, descrever):
+    ok = sum(1 for r in resultados if r["ok"])
+    linhas = [f"{titulo} ({len(resultados)} itens, 1 transação): ✅ {ok} • ❌ {len(resultados) - ok}"]
+    for r in resultados:
+        linhas.append(f"- {'✅' if r['ok'] else '❌'} {descrever(r)}" + ("" if r["ok"] else f": {r['erro']}"))
+    return "\n".join(linhas)
+
+def cmd_ajuda(match, user_input, state):
+    return (
+        "Comandos:\n"
+        "- `adicionar produto` (passo a passo)\n"
+        "- `adicionar \"Nome\"; 59,90; 10; Natura; Perfumaria; Colônias` "
+        "(um produto por linha; opcionais ao final: `; validade; código`)\n"
+        "- `estoque`\n"
+        "- `vender [ID]` ou em lote: `vender 12x3, 15x1, 18`\n"
+        "- `cancelar`"
+    )
+
+def cmd_adicionar_passo_a_passo(match, user_input, state):
+    state["step"] = "add_nome"
+    return "Qual o nome do novo produto?"
+
+def cmd_adicionar_lote(match, user_input, state):
+    produtos = parse_lote_produtos(match.group(1))
+    resultados = add_produtos_batch(produtos, usuario=st.session_state.get("username"))
+    return formatar_resumo(
+        "Cadastro em lote", resultados,
+        lambda r: f"{r['nome']}" + (f" (ID {r['id']})" if r["id"] else "")
+    )
+
+def cmd_vender_lote(match, user_input, state):
+    itens = parse_itens_venda(match.group(1))
+    resultados = mark_produtos_as_sold_batch(itens, usuario=st.session_state.get("username"))
+    return formatar_resumo(
+        "Venda em lote", resultados,
+        lambda r: f"ID {r['id']}" + (f" {r['nome']}" if r["nome"] else "") + f" x{r['quantidade']}"
+        + (f" (restam {r['estoque_restante']})" if r["ok"] else "")
+    )
+
+def cmd_vender(match, user_input, state):
+    state["step"] = "vender_id"
+    return "Informe o ID do produto para vender 1 unidade."
+
+def cmd_estoque(match, user_input, state):
+    prods = get_all_produtos(include_sold=False)
+    if not prods:
+        return "Nenhum produto em estoque."
+    resp = "Itens em estoque:\n"
+    for p in prods[:10]:
+        resp += f"- ID {p['id']}: {p['nome']} ({p['quantidade']} un)\n"
+    return resp
+
+# Tabela de despacho dos comandos do estado "idle": a primeira regex que
+# casar com a mensagem (texto original, sem lower) decide o handler.
+# os comandos ancorados no início vêm antes das palavras-chave soltas:
+# `adicionar "Kit Ajuda"; ...` é um cadastro, não um pedido de ajuda
+COMANDOS = [
+    (re.compile(r"^\s*adicionar\s+(.+;.+)$", re.IGNORECASE | re.DOTALL), cmd_adicionar_lote),
+    (re.compile(r"^\s*vender\s+(.+)$", re.IGNORECASE | re.DOTALL), cmd_vender_lote),
+    (re.compile(r"^\s*vender\s*$", re.IGNORECASE), cmd_vender),
+    (re.compile(r"\bajuda\b", re.IGNORECASE), cmd_ajuda),
+    (re.compile(r"\badicionar produto\b", re.IGNORECASE), cmd_adicionar_passo_a_passo),
+    (re.compile(r"\bestoque\b", re.IGNORECASE), cmd_estoque),
+]
+
 def process_command(user_input: str) -> str:
     text = user_input.strip().lower()
     state = st.session_state["chat_state"]
@@ -41,41 +116,20 @@ def process_command(user_input: str) -> str:
         return "Operação cancelada. Digite `ajuda` para ver o que posso fazer."
 
     if state["step"] == "idle":
-        if "ajuda" in text:
-            return (
-                "Comandos:\n"
-                "- `adicionar produto`\n"
-                "- `estoque`\n"
-                "- `vender [ID]`\n"
-                "- `cancelar`"
-            )
-        if "adicionar produto" in text:
-            state["step"] = "add_nome"
-            return "Qual o nome do novo produto?"
-        if text.startswith("vender"):
-            partes = text.split()
-            if len(partes) > 1 and partes[1].isdigit():
+        for regex, handler in COMANDOS:
+            match = regex.search(user_input)
+            if match:
                 try:
-                    mark_produto_as_sold(int(partes[1]), 1)
-                    return f"Venda registrada para ID {partes[1]}."
+                    return handler(match, user_input, state)
+                except ErroComando as e:
+                    return str(e)
                 except Exception as e:
-                    return f"Erro na venda: {e}"
-            else:
-                state["step"] = "vender_id"
-                return "Informe o ID do produto para vender 1 unidade."
-        if "estoque" in text:
-            prods = get_all_produtos(include_sold=False)
-            if not prods:
-                return "Nenhum produto em estoque."
-            resp = "Itens em estoque:\n"
-            for p in prods[:10]:
-                resp += f"- ID {p['id']}: {p['nome']} ({p['quantidade']} un)\n"
-            return resp
+                    return f"Erro ao executar comando: {e}"
 
     if state["step"] == "vender_id":
         if text.isdigit():
             try:
-                mark_produto_as_sold(int(text), 1)
+                mark_produto_as_sold(int(text), 1, usuario=st.session_state.get("username"))
                 st.session_state["chat_state"] = {"step": "idle", "data": {}}
                 return f"Venda registrada para ID {text}."
             except Exception as e:
@@ -110,31 +164,39 @@ def process_command(user_input: str) -> str:
             return "Quantidade inválida. Digite um número inteiro."
 
     if state["step"] == "add_marca":
-        if user_input.strip() in MARCAS:
-            state["data"]["marca"] = user_input.strip()
+        marca = resolver("marca", user_input)
+        if marca:
+            state["data"]["marca"] = marca
             state["step"] = "add_estilo"
-            return "Estilo? (ex: Perfumaria, Skincare)"
-        return "Marca não reconhecida. Use uma das cadastradas ou `cancelar`."
+            return f"Marca: **{marca}**. Estilo? (ex: Perfumaria, Skincare)"
+        dica = sugestoes("marca", user_input)
+        return (f"Marca não reconhecida. Você quis dizer: {dica}?" if dica
+                else "Marca não reconhecida. Use uma das cadastradas ou `cancelar`.")
 
     if state["step"] == "add_estilo":
-        if user_input.strip() in ESTILOS:
-            state["data"]["estilo"] = user_input.strip()
+        estilo = resolver("estilo", user_input)
+        if estilo:
+            state["data"]["estilo"] = estilo
             state["step"] = "add_tipo"
-            return "Tipo? (ex: Perfumaria feminina)"
-        return "Estilo inválido. Tente novamente."
+            return f"Estilo: **{estilo}**. Tipo? (ex: Perfumaria feminina)"
+        dica = sugestoes("estilo", user_input)
+        return f"Estilo inválido. Você quis dizer: {dica}?" if dica else "Estilo inválido. Tente novamente."
 
     if state["step"] == "add_tipo":
-        if user_input.strip() in TIPOS:
-            state["data"]["tipo"] = user_input.strip()
+        tipo = resolver("tipo", user_input)
+        if tipo:
+            state["data"]["tipo"] = tipo
             state["step"] = "add_finaliza"
-            return "Cadastro quase pronto. Confirme com `ok` ou `cancelar`."
-        return "Tipo inválido. Tente novamente."
+            return f"Tipo: **{tipo}**. Cadastro quase pronto. Confirme com `ok` ou `cancelar`."
+        dica = sugestoes("tipo", user_input)
+        return f"Tipo inválido. Você quis dizer: {dica}?" if dica else "Tipo inválido. Tente novamente."
 
     if state["step"] == "add_finaliza":
         if text == "ok":
             d = state["data"]
             try:
-                add_produto(d["nome"], d["preco"], d["quantidade"], d["marca"], d["estilo"], d["tipo"], None, None)
+                add_produto(d["nome"], d["preco"], d["quantidade"], d["marca"], d["estilo"], d["tipo"], None, None,
+                            usuario=st.session_state.get("username"))
                 st.session_state["chat_state"] = {"step": "idle", "data": {}}
                 return f"Produto '{d['nome']}' cadastrado com sucesso."
             except Exception as e:
@@ -143,15 +205,28 @@ def process_command(user_input: str) -> str:
 
     return "Não entendi. Digite `ajuda` para ver os comandos."
 
-for msg in st.session_state["chat_history"]:
+historico = st.session_state["chat_history"]
+
+if historico.tem_anteriores() or historico.antigas:
+    colh1, colh2 = st.columns([1, 1])
+    if not historico.tem_anteriores():
+        colh1.caption(f"Mostrando as {len(historico.antigas)} mensagens anteriores mais recentes.")
+    elif colh1.button("⬆️ Carregar mensagens anteriores"):
+        historico.carregar_anteriores()
+        st.rerun()
+    if historico.antigas and colh2.button("Ocultar anteriores"):
+        historico.ocultar_anteriores()
+        st.rerun()
+
+for msg in historico:
     with st.chat_message(msg["role"]):
         st.markdown(msg["content"])
 
 if prompt := st.chat_input("Digite um comando..."):
-    st.session_state["chat_history"].append({"role": "user", "content": prompt})
+    historico.append("user", prompt)
     with st.chat_message("user"):
         st.markdown(prompt)
     resposta = process_command(prompt)
-    st.session_state["chat_history"].append({"role": "assistant", "content": resposta})
+    historico.append("assistant", resposta)
     with st.chat_message("assistant"):
         st.markdown(resposta)
@@ -1,7 +1,11 @@
 import streamlit as st
 import os
 from datetime import datetime
-from utils.database import get_all_produtos, ASSETS_DIR, MARCAS, ESTILOS, TIPOS, safe_int, safe_float
+from utils.database import get_all_produtos, MARCAS, ESTILOS, TIPOS, safe_float
+from utils.paineis import show_validade_panel
+from utils.arquivamento import iniciar_arquivamento_automatico
+from utils.lojas import usar_loja
+from utils.imagens import foto_para_exibir
 
 st.set_page_config(page_title="Estoque Completo", page_icon="📦", layout="wide")
 
@@ -23,16 +27,23 @@ def load_css(file_name="style.css"):
 
 load_css("style.css")
 
+loja = usar_loja(st.session_state.get("loja"))
+st.sidebar.caption(f"🏬 Loja: **{loja['nome']}**")
+
 st.title("📦 Estoque Completo - Cores e Fragrâncias")
 st.markdown("---")
 
-produtos = get_all_produtos(include_sold=True)
+show_validade_panel(format_to_brl)
+iniciar_arquivamento_automatico()
+
+incluir_arquivados = st.checkbox("Incluir produtos arquivados (zerados e sem venda há muito tempo)")
+produtos = get_all_produtos(include_sold=True, include_archived=incluir_arquivados)
 if not produtos:
     st.info("Nenhum produto cadastrado.")
     st.stop()
 
 def get_unique(field):
-    return sorted(list(set(p.get(field, "") for p in produtos if p.get(field))))
+    return sorted({p[field] for p in produtos if p[field]})
 
 marcas = get_unique("marca") or MARCAS
 estilos = get_unique("estilo") or ESTILOS
@@ -54,23 +65,23 @@ with col5:
 
 produtos_filtrados = produtos[:]
 if marca_f != "Todas":
-    produtos_filtrados = [p for p in produtos_filtrados if p.get("marca") == marca_f]
+    produtos_filtrados = [p for p in produtos_filtrados if p.marca == marca_f]
 if estilo_f != "Todos":
-    produtos_filtrados = [p for p in produtos_filtrados if p.get("estilo") == estilo_f]
+    produtos_filtrados = [p for p in produtos_filtrados if p.estilo == estilo_f]
 if tipo_f != "Todos":
-    produtos_filtrados = [p for p in produtos_filtrados if p.get("tipo") == tipo_f]
+    produtos_filtrados = [p for p in produtos_filtrados if p.tipo == tipo_f]
 if qtd_min > 0:
-    produtos_filtrados = [p for p in produtos_filtrados if safe_int(p.get("quantidade", 0)) >= qtd_min]
+    produtos_filtrados = [p for p in produtos_filtrados if p.quantidade >= qtd_min]
 if busca:
-    produtos_filtrados = [p for p in produtos_filtrados if busca.lower() in p.get("nome", "").lower()]
+    termo = busca.lower()
+    produtos_filtrados = [p for p in produtos_filtrados if termo in (p.nome or "").lower()]
 
 if not produtos_filtrados:
     st.warning("Nenhum produto encontrado com esses filtros.")
     st.stop()
 
-total = 0.0
-for p in produtos_filtrados:
-    total += safe_float(p.get("preco", 0)) * safe_int(p.get("quantidade", 0))
+# preco/quantidade já vêm convertidos em Produto
+total = sum(p.preco * p.quantidade for p in produtos_filtrados)
 
 colm1, colm2 = st.columns(2)
 with colm1:
@@ -86,18 +97,18 @@ for p in produtos_filtrados:
         with col_img:
             foto = p.get("foto")
             if foto:
-                path = os.path.join(ASSETS_DIR, foto)
-                if os.path.exists(path):
+                path = foto_para_exibir(foto)
+                if path:
                     st.image(path, width=120, use_container_width=True)
                 else:
                     st.caption("Sem foto")
             else:
                 st.caption("Sem foto")
         with col_info:
-            st.markdown(f"**{p.get('nome', 'N/A')}**")
+            st.markdown(f"**{p.get('nome', 'N/A')}**" + (" 🗄️ *arquivado*" if p.get("arquivado") else ""))
             st.caption(f"{p.get('marca', 'N/A')} • {p.get('estilo', 'N/A')} • {p.get('tipo', 'N/A')}")
-            qtd = safe_int(p.get("quantidade", 0))
-            preco = safe_float(p.get("preco", 0))
+            qtd = p.quantidade
+            preco = p.preco
             st.write(f"Preço: {format_to_brl(preco)} | Quantidade: {qtd} | Total: {format_to_brl(preco * qtd)}")
 
 st.markdown("---")
@@ -6,16 +6,32 @@ from utils.database import (
     create_tables,
     get_all_produtos,
     add_user,
-    get_user,
-    get_all_users,
-    hash_password,
+    check_user_login,
+    get_users_page,
+    count_users,
     update_user_role,
     delete_user,
+    get_auditoria,
+    get_auditoria_usuarios,
+    ASSETS_DIR,
 )
+from utils.lojas import usar_loja
+from utils.sessoes import sessao_valida, iniciar_sessao, encerrar_sessao
+from utils.limpeza_imagens import (
+    iniciar_limpeza_imagens, limpar_agora, relatorio_limpeza, get_quarentena, restaurar_da_quarentena,
+    DIAS_QUARENTENA,
+)
+from utils.aquecimento import relatorio_aquecimento
+from utils.duplicatas import indexar_assets, encontrar_duplicatas, mesclar_duplicatas, LIMIAR_PADRAO
 
 # Configuração da página
 st.set_page_config(page_title="Cores e Fragrâncias", page_icon="🌸", layout="wide")
 
+USUARIOS_POR_PAGINA = 20
+
+loja = usar_loja(st.session_state.get("loja"))
+st.sidebar.caption(f"🏬 Loja: **{loja['nome']}**")
+
 # Cria tabelas se não existirem
 create_tables()
 
@@ -54,19 +70,30 @@ with col1:
 with col2:
     st.metric("Status", "Online ✅")
 
+if sessao_valida(st.session_state, papel="admin"):
+    aquec = relatorio_aquecimento()
+    if aquec["etapas"]:
+        with st.expander("⏱️ Aquecimento na inicialização"):
+            situacao = "concluído" if aquec["concluido_em"] else "em andamento"
+            st.caption(f"Iniciado em {aquec['iniciado_em'].strftime('%d/%m/%Y %H:%M:%S')} ({situacao})")
+            st.dataframe(
+                [{"Etapa": e["etapa"], "Tempo (ms)": round(e["ms"], 1),
+                  "Detalhes": e["erro"] or ", ".join(f"{k}: {v}" for k, v in (e["detalhes"] or {}).items())}
+                 for e in aquec["etapas"]],
+                hide_index=True, use_container_width=True,
+            )
+
 st.caption(f"© {datetime.now().year} Cores e Fragrâncias")
 st.markdown("---")
 
 # --- SIDEBAR: STATUS E LOGOUT ---
-if st.session_state.get("logged_in"):
+if sessao_valida(st.session_state):
     st.sidebar.success(
         f"👤 Logado como: **{st.session_state['username']}** "
         f"({st.session_state['role'].title()})"
     )
     if st.sidebar.button("🚪 Logout"):
-        st.session_state["logged_in"] = False
-        st.session_state["username"] = None
-        st.session_state["role"] = "guest"
+        encerrar_sessao(st.session_state)
         st.success("Sessão encerrada com sucesso!")
         st.rerun()
 
@@ -77,7 +104,8 @@ st.markdown("**Faça login ou cadastre um novo usuário normal ou administrador
 # Menu principal
 option = st.selectbox(
     "Escolha uma ação",
-    ["Login", "Cadastrar Novo Usuário", "Gerenciar Contas (Admins)"]
+    ["Login", "Cadastrar Novo Usuário", "Gerenciar Contas (Admins)", "Auditoria (Admins)",
+     "Limpeza de Imagens (Admins)", "Fotos Duplicadas (Admins)"]
 )
 
 # ---------- 1. LOGIN ----------
@@ -90,14 +118,10 @@ if option == "Login":
         if not username or not password:
             st.error("Preencha usuário e senha.")
         else:
-            user = get_user(username)
-            if not user:
-                st.error("❌ Usuário não encontrado.")
-            elif hash_password(password) == user.get("password"):
+            user = check_user_login(username, password)
+            if user:
                 st.success(f"✅ Bem-vindo(a), **{username}** ({user.get('role').title()})!")
-                st.session_state["logged_in"] = True
-                st.session_state["username"] = username
-                st.session_state["role"] = user.get('role')
+                iniciar_sessao(st.session_state, user)
                 st.rerun()
             else:
                 st.error("❌ Usuário ou senha incorretos.")
@@ -129,33 +153,36 @@ elif option == "Cadastrar Novo Usuário":
             st.error("❌ Preencha todos os campos.")
         elif new_password != confirm_password:
             st.error("❌ As senhas não coincidem.")
-        elif get_user(new_username):
-            st.error("❌ Nome de usuário já existe.")
+        elif add_user(new_username, new_password, role=role,
+                      usuario=st.session_state.get("username") or new_username):
+            role_name = {"user": "Usuário Normal", "staff": "Funcionário", "admin": "Administrador"}[role]
+            st.success(f"✅ Usuário **'{new_username}'** criado como **{role_name}**! Faça login agora.")
+            st.rerun()
         else:
-            if add_user(new_username, new_password, role=role):
-                role_name = {"user": "Usuário Normal", "staff": "Funcionário", "admin": "Administrador"}[role]
-                st.success(f"✅ Usuário **'{new_username}'** criado como **{role_name}**! Faça login agora.")
-                st.rerun()
-            else:
-                st.error("❌ Erro ao criar usuário.")
+            st.error("❌ Nome de usuário já existe.")
 
 # ---------- 3. GERENCIAR CONTAS (APENAS ADMIN) ----------
 elif option == "Gerenciar Contas (Admins)":
     st.subheader("👥 Gerenciar Usuários")
     
-    if not st.session_state.get("logged_in") or st.session_state.get("role") != "admin":
+    if not sessao_valida(st.session_state, papel="admin"):
         st.error(
             "🚫 **Apenas administradores** podem gerenciar contas. "
             "Faça login como `admin` (senha: `123`)"
         )
     else:
-        # Lista de usuários
-        users = get_all_users()
+        # Lista de usuários, uma página por vez: "contas_paginas" guarda o
+        # início de cada página já visitada, para poder voltar
+        paginas = st.session_state.setdefault("contas_paginas", [None])
+        users, proximo = get_users_page(apos=paginas[-1], limite=USUARIOS_POR_PAGINA)
+        if not users and len(paginas) > 1:
+            paginas.pop()
+            st.rerun()
         if not users:
             st.info("Nenhum usuário cadastrado ainda.")
             st.stop()
         
-        st.subheader(f"📋 Usuários cadastrados ({len(users)})")
+        st.subheader(f"📋 Usuários cadastrados ({count_users()})")
         
         for user in users:
             col1, col2, col3, col4 = st.columns([3, 1, 1.5, 1])
@@ -166,14 +193,14 @@ elif option == "Gerenciar Contas (Admins)":
             
             with col2:
                 if st.button("✏️ Editar", key=f"edit_{user['id']}"):
-                    st.session_state["editing_user"] = user["id"]
+                    st.session_state["editing_user"] = user
                     st.rerun()
             
             with col3:
                 if st.button("🔄 Role", key=f"role_{user['id']}"):
                     current_role = user["role"]
                     new_role = "admin" if current_role != "admin" else "user"
-                    if update_user_role(user["id"], new_role):
+                    if update_user_role(user["id"], new_role, usuario=st.session_state.get("username")):
                         st.success(f"✅ Role de **{user['username']}** alterado para **{new_role.title()}**")
                         st.rerun()
             
@@ -181,31 +208,199 @@ elif option == "Gerenciar Contas (Admins)":
                 if st.button("🗑️ Del", key=f"del_{user['id']}"):
                     st.warning(f"Tem certeza que quer excluir **{user['username']}**?")
                     if st.button("CONFIRMAR EXCLUSÃO", key=f"confirm_del_{user['id']}"):
-                        if delete_user(user["id"]):
+                        if delete_user(user["id"], usuario=st.session_state.get("username")):
                             st.success(f"✅ Usuário **{user['username']}** excluído!")
                             st.rerun()
                         else:
                             st.error("❌ Erro ao excluir usuário.")
         
+        col_ant, col_pag, col_prox = st.columns([1, 2, 1])
+        with col_ant:
+            if len(paginas) > 1 and st.button("⬅️ Anteriores", key="contas_anteriores"):
+                paginas.pop()
+                st.rerun()
+        with col_pag:
+            st.caption(f"Página {len(paginas)}")
+        with col_prox:
+            if proximo is not None and st.button("Próximos ➡️", key="contas_proximos"):
+                paginas.append(proximo)
+                st.rerun()
+        
         # Edição avançada (se clicou em editar)
         if st.session_state.get("editing_user"):
-            editing_id = st.session_state["editing_user"]
-            user_to_edit = next((u for u in users if u["id"] == editing_id), None)
-            if user_to_edit:
-                st.subheader(f"✏️ Editando: {user_to_edit['username']}")
-                new_role = st.selectbox(
-                    "Novo papel",
-                    ["user", "staff", "admin"],
-                    index=["user", "staff", "admin"].index(user_to_edit["role"]),
-                    key=f"edit_role_{editing_id}"
-                )
-                if st.button("Salvar Alterações", key=f"save_edit_{editing_id}"):
-                    if update_user_role(editing_id, new_role):
-                        st.success("✅ Alterações salvas!")
-                        del st.session_state["editing_user"]
-                        st.rerun()
-                    else:
-                        st.error("❌ Erro ao salvar.")
+            user_to_edit = st.session_state["editing_user"]
+            editing_id = user_to_edit["id"]
+            st.subheader(f"✏️ Editando: {user_to_edit['username']}")
+            new_role = st.selectbox(
+                "Novo papel",
+                ["user", "staff", "admin"],
+                index=["user", "staff", "admin"].index(user_to_edit["role"]),
+                key=f"edit_role_{editing_id}"
+            )
+            if st.button("Salvar Alterações", key=f"save_edit_{editing_id}"):
+                if update_user_role(editing_id, new_role, usuario=st.session_state.get("username")):
+                    st.success("✅ Alterações salvas!")
+                    del st.session_state["editing_user"]
+                    st.rerun()
+                else:
+                    st.error("❌ Erro ao salvar.")
         
         st.info("💡 **Dica:** Use '🔄 Role' para alternar rapidamente entre Admin/Usuário Normal")
 
+# ---------- 4. AUDITORIA (APENAS ADMIN) ----------
+elif option == "Auditoria (Admins)":
+    st.subheader("📜 Auditoria")
+
+    if not sessao_valida(st.session_state, papel="admin"):
+        st.error("🚫 **Apenas administradores** podem consultar a auditoria.")
+    else:
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            filtro_usuario = st.selectbox("Usuário", ["Todos"] + get_auditoria_usuarios())
+        with col2:
+            filtro_produto = st.number_input("ID do produto (0 = todos)", min_value=0, step=1, value=0)
+        with col3:
+            periodo = st.date_input("Período", value=())
+        with col4:
+            limite = st.selectbox("Mostrar", [50, 200, 1000], index=1)
+
+        desde = periodo[0] if len(periodo) >= 1 else None
+        ate = periodo[1] if len(periodo) == 2 else desde
+        registros = get_auditoria(
+            usuario=None if filtro_usuario == "Todos" else filtro_usuario,
+            produto_id=int(filtro_produto) or None,
+            desde=desde,
+            ate=ate,
+            limite=limite,
+        )
+
+        def descrever(detalhes):
+            partes = [f"{campo}: {a} → {d}" for campo, (a, d) in detalhes.get("diff", {}).items()]
+            partes += [f"{k}: {v}" for k, v in detalhes.items() if k not in ("diff", "antes", "depois")]
+            if "antes" in detalhes:
+                partes.append(f"removido: {detalhes['antes'].get('nome', '')}")
+            if "depois" in detalhes:
+                partes.append(f"criado: {detalhes['depois'].get('nome', '')}")
+            return "; ".join(partes)
+
+        if not registros:
+            st.info("Nenhum registro encontrado.")
+        else:
+            st.caption(f"{len(registros)} registro(s), mais recentes primeiro.")
+            st.dataframe(
+                [
+                    {
+                        "Quando": r["criado_em"][:19].replace("T", " "),
+                        "Usuário": r["usuario"] or "sistema",
+                        "Ação": r["acao"],
+                        "Produto": r["produto_id"],
+                        "Detalhes": descrever(r["detalhes"]),
+                    }
+                    for r in registros
+                ],
+                use_container_width=True,
+                hide_index=True,
+            )
+
+# ---------- 5. LIMPEZA DE IMAGENS (APENAS ADMIN) ----------
+elif option == "Limpeza de Imagens (Admins)":
+    st.subheader("🧹 Limpeza de Imagens")
+
+    if not sessao_valida(st.session_state, papel="admin"):
+        st.error("🚫 **Apenas administradores** podem gerenciar a limpeza de imagens.")
+    else:
+        iniciar_limpeza_imagens()
+        st.caption(f"Fotos que nenhum produto (de nenhuma loja) usa vão para a quarentena e são apagadas "
+                   f"depois de {DIAS_QUARENTENA} dias. A varredura roda aos poucos em segundo plano.")
+
+        def mb(n):
+            return f"{n / 1024 / 1024:.1f} MB"
+
+        if st.button("Varrer agora"):
+            with st.spinner("Varrendo assets/..."):
+                limpar_agora()
+        rel = relatorio_limpeza()
+        quarentena = get_quarentena()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Na quarentena", f"{len(quarentena)} arquivo(s)", mb(sum(q["bytes"] for q in quarentena)),
+                    delta_color="off")
+        col2.metric("Espaço recuperado", mb(rel["bytes_recuperados"]), f"{rel['removidos']} arquivo(s) apagados",
+                    delta_color="off")
+        col3.metric("Passadas completas", rel["passadas"], "em andamento" if rel["em_andamento"] else None,
+                    delta_color="off")
+        if rel["ultima_passada"]:
+            st.caption(f"Última passada completa: {rel['ultima_passada']:%d/%m/%Y %H:%M} • "
+                       f"{rel['verificados']} arquivo(s) verificados desde o início do processo.")
+
+        if quarentena:
+            st.dataframe(
+                [{"Arquivo": q["nome"], "Tamanho": mb(q["bytes"]), "Na quarentena desde": f"{q['desde']:%d/%m/%Y %H:%M}"}
+                 for q in quarentena],
+                use_container_width=True,
+                hide_index=True,
+            )
+            escolhido = st.selectbox("Devolver arquivo para assets/", [q["nome"] for q in quarentena])
+            if st.button("Restaurar"):
+                try:
+                    restaurar_da_quarentena(escolhido)
+                    st.success(f"'{escolhido}' devolvido para assets/.")
+                    st.rerun()
+                except ValueError as e:
+                    st.error(str(e))
+
+# ---------- 6. FOTOS DUPLICADAS (APENAS ADMIN) ----------
+elif option == "Fotos Duplicadas (Admins)":
+    st.subheader("🖼️ Fotos Duplicadas")
+
+    if not sessao_valida(st.session_state, papel="admin"):
+        st.error("🚫 **Apenas administradores** podem mesclar fotos.")
+    else:
+        st.caption("Compara as fotos de assets/ por hash perceptual (dHash + pHash). Ao mesclar um grupo, "
+                   "todos os produtos (de todas as lojas) passam a usar a foto escolhida e as outras vão "
+                   "para a quarentena da limpeza de imagens.")
+        col1, col2 = st.columns([1, 2])
+        with col1:
+            if st.button("Atualizar índice de fotos"):
+                with st.spinner("Calculando hashes das fotos novas..."):
+                    r = indexar_assets()
+                st.success(f"{r['arquivos']} foto(s) no índice • {r['calculados']} calculada(s) agora • "
+                           f"{r['removidos']} removida(s) • {r['invalidos']} ilegível(is)")
+        with col2:
+            limiar = st.slider("Tolerância (bits diferentes de 64)", 0, 16, LIMIAR_PADRAO,
+                               help="Quanto maior, mais fotos parecidas (mas não iguais) entram nos grupos.")
+
+        if "dup_mensagem" in st.session_state:
+            st.success(st.session_state.pop("dup_mensagem"))
+        grupos = encontrar_duplicatas(limiar)
+        if not grupos:
+            st.info("Nenhuma foto repetida no índice. Atualize o índice se houver fotos novas.")
+        else:
+            economia = sum(i["tamanho"] for g in grupos for i in g[1:])
+            st.write(f"**{len(grupos)} grupo(s)** de fotos repetidas • até {economia / 1024 / 1024:.1f} MB "
+                     "liberados mesclando todos.")
+            for n, grupo in enumerate(grupos[:30]):
+                with st.container(border=True):
+                    colunas = st.columns(len(grupo))
+                    for col, item in zip(colunas, grupo):
+                        with col:
+                            st.image(os.path.join(ASSETS_DIR, item["arquivo"]), use_container_width=True)
+                            st.caption(f"{item['arquivo']} • {item['tamanho'] / 1024:.0f} KB")
+                            for p in item["produtos"]:
+                                st.caption(f"🛒 {p['nome']} (ID {p['id']}, {p['nome_loja']})"
+                                           + (" 🗄️" if p["arquivado"] else ""))
+                            if not item["produtos"]:
+                                st.caption("Sem produto")
+                    manter = st.radio("Manter", [i["arquivo"] for i in grupo], key=f"dup_manter_{n}",
+                                      horizontal=True)
+                    if st.button("Mesclar grupo", key=f"dup_mesclar_{n}"):
+                        try:
+                            r = mesclar_duplicatas(manter, [i["arquivo"] for i in grupo],
+                                                   usuario=st.session_state.get("username"))
+                            st.session_state["dup_mensagem"] = (f"{r['produtos']} produto(s) atualizados; "
+                                                                f"{len(r['quarentena'])} foto(s) na quarentena.")
+                            indexar_assets()
+                            st.rerun()
+                        except ValueError as e:
+                            st.error(str(e))
+            if len(grupos) > 30:
+                st.caption(f"Mostrando 30 de {len(grupos)} grupos; mescle estes para ver os próximos.")
@@ -1,12 +1,26 @@
 import streamlit as st
 import os
-from datetime import datetime, date
+import uuid
+from datetime import date
 from utils.database import (
     add_produto, get_all_produtos, update_produto, delete_produto, get_produto_by_id,
-    export_produtos_to_csv_content, import_produtos_from_csv_buffer, generate_stock_pdf_bytes,
-    mark_produto_as_sold,
-    MARCAS, ESTILOS, TIPOS, ASSETS_DIR, safe_int, safe_float
+    export_produtos_to_csv_content, import_produtos_from_csv_buffer, import_produtos_from_xlsx_buffer,
+    generate_stock_pdf_bytes,
+    mark_produto_as_sold, get_produtos_arquivados, restaurar_produto,
+    preview_ajuste_em_massa, aplicar_ajuste_em_massa, get_ajustes_em_massa, desfazer_ajuste_em_massa,
+    aplicar_inventario, get_inventarios, get_inventario_itens,
+    MARCAS, ESTILOS, TIPOS, safe_int, safe_float
 )
+from utils.paineis import show_validade_panel
+from utils.categorias import resolver
+from utils.uploads import enviar_foto, produtos_em_processamento, consumir_concluidas
+from utils.arquivamento import iniciar_arquivamento_automatico, arquivar_agora, DIAS_SEM_VENDA
+from utils.limpeza_imagens import descartar_foto
+from utils.imagens import foto_para_exibir
+from utils.inventario import calcular_diferencas, resumo_diferencas, ler_arquivo_contagem, estoque_atual
+from utils.pdv import get_catalogo_sku, parse_leitura
+from utils.lojas import usar_loja
+from utils.sessoes import sessao_valida
 
 st.set_page_config(page_title="Gerenciar Produtos", page_icon="🛠️", layout="wide")
 
@@ -28,7 +42,10 @@ def format_to_brl(value):
 
 load_css("style.css")
 
-if not st.session_state.get("logged_in"):
+loja = usar_loja(st.session_state.get("loja"))
+st.sidebar.caption(f"🏬 Loja: **{loja['nome']}**")
+
+if not sessao_valida(st.session_state):
     st.error("Acesso restrito. Faça login na Área Administrativa.")
     st.stop()
 
@@ -38,14 +55,39 @@ if "edit_product_id" not in st.session_state:
     st.session_state["edit_product_id"] = None
 if "role" not in st.session_state:
     st.session_state["role"] = "staff"
+if "upload_sessao" not in st.session_state:
+    st.session_state["upload_sessao"] = uuid.uuid4().hex
+if "inv_contagens" not in st.session_state:
+    st.session_state["inv_contagens"] = {}  # produto_id -> contado
+    st.session_state["inv_esperados"] = {}  # produto_id -> estoque do sistema na 1ª contagem
+    st.session_state["inv_msg"] = None
+    st.session_state["inv_rev"] = 0  # muda quando a planilha muda fora do editor
 
 st.title("🛠️ Gerenciar Produtos")
 st.markdown("---")
 
+def show_upload_status():
+    sessao = st.session_state["upload_sessao"]
+    for t in consumir_concluidas(sessao):
+        if t["status"] == "ok":
+            st.toast(f"Foto do produto ID {t['produto_id']} processada.")
+        else:
+            st.error(f"Falha ao processar a foto '{t['arquivo']}' do produto ID {t['produto_id']}: {t['erro']}")
+    pendentes = produtos_em_processamento(sessao)
+    if pendentes:
+        colu1, colu2 = st.columns([4, 1])
+        colu1.info(f"⏳ Processando {len(pendentes)} foto(s) em segundo plano...")
+        if colu2.button("Atualizar", key="refresh_uploads"):
+            st.rerun()
+    return pendentes
+
+em_processamento = show_upload_status()
+
 def add_product_form():
     st.subheader("➕ Adicionar Novo Produto")
     with st.form("add_product_form", clear_on_submit=True):
         nome = st.text_input("Nome do Produto", max_chars=150)
+        sku = st.text_input("Código de barras / SKU (opcional)", max_chars=64)
         col1, col2 = st.columns([2, 1])
         with col1:
             marca = st.selectbox("Marca", ["Selecionar"] + MARCAS)
@@ -55,7 +97,7 @@ def add_product_form():
             quantidade = st.number_input("Quantidade", min_value=0, step=1, value=1)
             data_validade = st.date_input("Validade (opcional)", value=None, min_value=date.today())
         with col2:
-            foto = st.file_uploader("Foto do Produto", type=["png", "jpg", "jpeg"])
+            foto = st.file_uploader("Foto do Produto", type=["png", "jpg", "jpeg", "webp"])
             if foto:
                 st.image(foto, use_container_width=True)
         submitted = st.form_submit_button("Salvar Produto")
@@ -63,19 +105,25 @@ def add_product_form():
             if not nome or preco <= 0 or marca == "Selecionar" or tipo == "Selecionar":
                 st.error("Preencha Nome, Preço > 0, Marca e Tipo.")
                 return
-            photo_name = None
-            if foto:
-                photo_name = f"{int(datetime.now().timestamp())}_{foto.name}"
-                with open(os.path.join(ASSETS_DIR, photo_name), "wb") as f:
-                    f.write(foto.getbuffer())
             validade_iso = data_validade.isoformat() if data_validade else None
             try:
-                add_produto(nome, preco, quantidade, marca, estilo, tipo, photo_name, validade_iso)
+                produto_id = add_produto(nome, preco, quantidade, marca, estilo, tipo, None, validade_iso, sku,
+                                         usuario=st.session_state.get("username"))
+                if foto:
+                    # a foto é processada em segundo plano e ligada ao produto depois
+                    enviar_foto(st.session_state["upload_sessao"], produto_id, foto.getvalue(), foto.name,
+                                usuario=st.session_state.get("username"))
                 st.success(f"Produto '{nome}' cadastrado com sucesso!")
                 st.rerun()
             except Exception as e:
                 st.error(f"Erro ao salvar produto: {e}")
 
+def category_index(field, value, options):
+    if value in options:
+        return options.index(value)
+    resolved = resolver(field, value) if value else None
+    return options.index(resolved) if resolved else 0
+
 def show_edit_form():
     produto_id = st.session_state.get("edit_product_id")
     p = get_produto_by_id(produto_id)
@@ -88,37 +136,36 @@ def show_edit_form():
         col1, col2 = st.columns([2, 1])
         with col1:
             novo_nome = st.text_input("Nome", value=p["nome"])
+            novo_sku = st.text_input("Código de barras / SKU", value=p.get("sku") or "")
             novo_preco = st.number_input("Preço", value=safe_float(p["preco"]), format="%.2f")
             nova_qtd = st.number_input("Quantidade", value=safe_int(p["quantidade"]), min_value=0)
-            marca_idx = MARCAS.index(p["marca"]) if p.get("marca") in MARCAS else 0
-            estilo_idx = ESTILOS.index(p["estilo"]) if p.get("estilo") in ESTILOS else 0
-            tipo_idx = TIPOS.index(p["tipo"]) if p.get("tipo") in TIPOS else 0
+            # valores antigos/digitados fora da lista ("boticario") são
+            # pré-selecionados pela opção mais próxima do índice de categorias
+            marca_idx = category_index("marca", p.get("marca"), MARCAS)
+            estilo_idx = category_index("estilo", p.get("estilo"), ESTILOS)
+            tipo_idx = category_index("tipo", p.get("tipo"), TIPOS)
             nova_marca = st.selectbox("Marca", MARCAS, index=marca_idx)
             novo_estilo = st.selectbox("Estilo", ESTILOS, index=estilo_idx)
             novo_tipo = st.selectbox("Tipo", TIPOS, index=tipo_idx)
         with col2:
             st.info(f"Foto atual: {p.get('foto') or 'Sem foto'}")
-            nova_foto = st.file_uploader("Nova foto (opcional)", type=["jpg", "png", "jpeg"])
+            nova_foto = st.file_uploader("Nova foto (opcional)", type=["jpg", "png", "jpeg", "webp"])
             if nova_foto:
                 st.image(nova_foto, use_container_width=True)
         colb1, colb2 = st.columns(2)
         salvar = colb1.form_submit_button("Salvar Alterações")
         cancelar = colb2.form_submit_button("Cancelar")
         if salvar:
-            foto_final = p.get("foto")
-            if nova_foto:
-                if foto_final:
-                    try:
-                        os.remove(os.path.join(ASSETS_DIR, foto_final))
-                    except Exception:
-                        pass
-                foto_final = f"{int(datetime.now().timestamp())}_{nova_foto.name}"
-                with open(os.path.join(ASSETS_DIR, foto_final), "wb") as f:
-                    f.write(nova_foto.getbuffer())
             validade_iso = p.get("data_validade")
             try:
                 update_produto(produto_id, novo_nome, novo_preco, nova_qtd,
-                               nova_marca, novo_estilo, novo_tipo, foto_final, validade_iso)
+                               nova_marca, novo_estilo, novo_tipo, p.get("foto"), validade_iso, novo_sku,
+                               usuario=st.session_state.get("username"))
+                if nova_foto:
+                    # a foto antiga só é removida depois que a nova for ligada ao produto
+                    enviar_foto(st.session_state["upload_sessao"], produto_id, nova_foto.getvalue(),
+                                nova_foto.name, foto_anterior=p.get("foto"),
+                                usuario=st.session_state.get("username"))
                 st.success("Produto atualizado.")
                 st.session_state["edit_mode"] = False
                 st.rerun()
@@ -129,6 +176,7 @@ def show_edit_form():
             st.rerun()
 
 def manage_products_list_actions():
+    show_validade_panel(format_to_brl, atualizar=True)
     st.subheader("📋 Lista de Produtos")
     colr1, colr2, colr3 = st.columns(3)
     with colr1:
@@ -144,12 +192,21 @@ def manage_products_list_actions():
             except Exception as e:
                 st.error(f"Erro ao gerar PDF: {e}")
     with colr3:
-        csv_file = st.file_uploader("Importar CSV", type=["csv"])
-        if csv_file and st.button("Processar CSV"):
+        csv_file = st.file_uploader("Importar CSV ou planilha (XLSX)", type=["csv", "xlsx"])
+        if csv_file and st.button("Processar arquivo"):
             try:
-                count = import_produtos_from_csv_buffer(csv_file)
-                st.success(f"{count} produtos importados.")
-                st.rerun()
+                if csv_file.name.lower().endswith(".xlsx"):
+                    with st.spinner("Importando planilha..."):
+                        res = import_produtos_from_xlsx_buffer(csv_file, usuario=st.session_state.get("username"))
+                    st.success(f"{res['importados']} de {res['linhas']} produtos importados "
+                               f"(colunas: {', '.join(res['colunas'])}).")
+                    if res["recusados"]:
+                        st.warning(f"{res['recusados']} linha(s) recusada(s): " +
+                                   "; ".join(f"linha {n}: {msg}" for n, msg in res["erros"][:5]))
+                else:
+                    count = import_produtos_from_csv_buffer(csv_file, usuario=st.session_state.get("username"))
+                    st.success(f"{count} produtos importados.")
+                    st.rerun()
             except Exception as e:
                 st.error(f"Erro ao importar: {e}")
 
@@ -160,17 +217,19 @@ def manage_products_list_actions():
         return
     total = 0.0
     for p in produtos:
-        pid = p["id"]
-        preco = safe_float(p["preco"])
-        qtd = safe_int(p["quantidade"])
+        pid = p.id
+        preco = p.preco
+        qtd = p.quantidade
         subtotal = preco * qtd
         total += subtotal
         with st.container(border=True):
             col1, col2, col3 = st.columns([1, 3, 1])
             with col1:
-                if p.get("foto"):
-                    path = os.path.join(ASSETS_DIR, p["foto"])
-                    if os.path.exists(path):
+                if pid in em_processamento:
+                    st.caption("⏳ Processando foto...")
+                elif p.get("foto"):
+                    path = foto_para_exibir(p["foto"])
+                    if path:
                         st.image(path, use_container_width=True)
                     else:
                         st.caption("Sem foto")
@@ -179,12 +238,13 @@ def manage_products_list_actions():
             with col2:
                 st.markdown(f"**{p['nome']}** (ID {pid})")
                 st.write(f"{format_to_brl(preco)} | Qtd: {qtd} | Total: {format_to_brl(subtotal)}")
-                st.caption(f"{p.get('marca', '')} • {p.get('tipo', '')} • Validade: {p.get('data_validade') or '-'}")
+                st.caption(f"{p.get('marca', '')} • {p.get('tipo', '')} • Validade: {p.get('data_validade') or '-'}"
+                           f" • SKU: {p.get('sku') or '-'}")
             with col3:
                 if qtd > 0:
                     if st.button("Vender 1", key=f"sell_{pid}"):
                         try:
-                            mark_produto_as_sold(pid, 1)
+                            mark_produto_as_sold(pid, 1, usuario=st.session_state.get("username"))
                             st.rerun()
                         except Exception as e:
                             st.error(f"Erro na venda: {e}")
@@ -195,17 +255,282 @@ def manage_products_list_actions():
                 if st.session_state["role"] == "admin":
                     if st.button("Excluir", key=f"del_{pid}"):
                         try:
-                            delete_produto(pid)
+                            foto = delete_produto(pid, usuario=st.session_state.get("username"))
+                            descartar_foto(foto)
                             st.rerun()
                         except Exception as e:
                             st.error(f"Erro ao excluir: {e}")
     st.sidebar.metric("Valor Total em Estoque", format_to_brl(total))
 
+def show_archived_products():
+    st.subheader("🗄️ Produtos Arquivados")
+    st.caption(f"Produtos com estoque zero e sem venda há {DIAS_SEM_VENDA} dias saem da lista principal "
+               "automaticamente (uma vez por dia). O ID é mantido ao restaurar.")
+    if st.session_state["role"] == "admin" and st.button("Arquivar agora"):
+        movidos = arquivar_agora(usuario=st.session_state.get("username"))
+        st.success(f"{movidos} produto(s) arquivado(s).")
+    arquivados = get_produtos_arquivados()
+    if not arquivados:
+        st.info("Nenhum produto arquivado.")
+        return
+    for p in arquivados:
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            st.markdown(f"**{p['nome']}** (ID {p['id']})")
+            st.caption(f"{p.get('marca') or '-'} • Última venda: {p.get('data_ultima_venda') or '-'} • "
+                       f"Arquivado em: {p['arquivado_em'][:10]}")
+        with col2:
+            if st.button("Restaurar", key=f"restore_{p['id']}"):
+                try:
+                    restaurar_produto(p["id"], usuario=st.session_state.get("username"))
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"Erro ao restaurar: {e}")
+
+OPERACOES_MASSA = {
+    "Preço: variação percentual (%)": ("preco", "percentual"),
+    "Preço: somar valor (R$)": ("preco", "somar"),
+    "Preço: definir valor (R$)": ("preco", "definir"),
+    "Estoque: somar unidades": ("quantidade", "somar"),
+    "Estoque: definir quantidade": ("quantidade", "definir"),
+}
+
+def show_bulk_adjustments():
+    st.subheader("📐 Ajustes em Massa")
+    st.caption("O ajuste é aplicado a todos os produtos do filtro de uma só vez e pode ser desfeito pelo histórico abaixo.")
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        marca = st.selectbox("Marca", ["Todas"] + MARCAS, key="massa_marca")
+    with col2:
+        estilo = st.selectbox("Estilo", ["Todos"] + ESTILOS, key="massa_estilo")
+    with col3:
+        tipo = st.selectbox("Tipo", ["Todos"] + TIPOS, key="massa_tipo")
+    with col4:
+        busca = st.text_input("Nome contém", key="massa_busca")
+    filtros = {
+        "marca": None if marca == "Todas" else marca,
+        "estilo": None if estilo == "Todos" else estilo,
+        "tipo": None if tipo == "Todos" else tipo,
+        "busca": busca.strip() or None,
+    }
+
+    col1, col2 = st.columns(2)
+    with col1:
+        rotulo = st.selectbox("Operação", list(OPERACOES_MASSA), key="massa_operacao")
+    campo, operacao = OPERACOES_MASSA[rotulo]
+    with col2:
+        if campo == "quantidade":
+            valor = st.number_input("Valor", step=1, value=0, key="massa_valor_qtd")
+        else:
+            valor = st.number_input("Valor", step=0.5, value=0.0, format="%.2f", key="massa_valor_preco")
+
+    previa = preview_ajuste_em_massa(campo, operacao, valor, **filtros)
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Produtos afetados", previa["afetados"])
+    c2.metric("Valor em estoque (antes)", format_to_brl(previa["valor_antes"]))
+    c3.metric("Valor em estoque (depois)", format_to_brl(previa["valor_depois"]))
+    if previa["amostra"]:
+        st.table([
+            {"ID": r["id"], "Produto": r["nome"],
+             "Antes": format_to_brl(r["antes"]) if campo == "preco" else r["antes"],
+             "Depois": format_to_brl(r["depois"]) if campo == "preco" else r["depois"]}
+            for r in previa["amostra"]
+        ])
+
+    confirmar = st.checkbox(f"Confirmo o ajuste em {previa['afetados']} produto(s)", key="massa_confirmar")
+    if st.button("Aplicar ajuste", type="primary", disabled=not (confirmar and previa["afetados"])):
+        try:
+            ajuste_id, afetados = aplicar_ajuste_em_massa(
+                campo, operacao, valor, usuario=st.session_state.get("username"), **filtros
+            )
+            st.success(f"Ajuste #{ajuste_id} aplicado em {afetados} produto(s).")
+        except Exception as e:
+            st.error(f"Erro ao aplicar ajuste: {e}")
+
+    st.markdown("---")
+    st.markdown("#### Histórico")
+    nomes_operacao = {v: k for k, v in OPERACOES_MASSA.items()}
+    for a in get_ajustes_em_massa():
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            st.markdown(f"**#{a['id']}** {nomes_operacao.get((a['campo'], a['operacao']), a['operacao'])}: "
+                        f"{a['valor']:g} • {a['afetados']} produto(s) • {a['filtros']}")
+            st.caption(f"{a['criado_em'][:16].replace('T', ' ')} por {a['usuario'] or '-'}"
+                       + (f" • desfeito em {a['desfeito_em'][:16].replace('T', ' ')}" if a["desfeito_em"] else ""))
+        with col2:
+            if not a["desfeito_em"] and st.button("Desfazer", key=f"desfazer_massa_{a['id']}"):
+                try:
+                    revertidos = desfazer_ajuste_em_massa(a["id"], usuario=st.session_state.get("username"))
+                    st.success(f"{revertidos} produto(s) revertido(s).")
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"Erro ao desfazer: {e}")
+
+def _inv_registrar(contagens, somar):
+    """Junta contagens {id: qtd} na planilha, guardando o esperado dos produtos novos."""
+    planilha = st.session_state["inv_contagens"]
+    novos = [pid for pid in contagens if pid not in st.session_state["inv_esperados"]]
+    if novos:
+        st.session_state["inv_esperados"].update(estoque_atual(novos))
+    for pid, qtd in contagens.items():
+        planilha[pid] = planilha.get(pid, 0) + qtd if somar else qtd
+    st.session_state["inv_rev"] += 1
+
+def _inv_limpar():
+    st.session_state["inv_contagens"] = {}
+    st.session_state["inv_esperados"] = {}
+    st.session_state["inv_rev"] += 1
+
+def _inv_on_scan():
+    # roda antes do corpo da página: seleciona a loja da sessão (ver venda_codigo_barras.on_scan)
+    usar_loja(st.session_state.get("loja"))
+    leitura = st.session_state.get("inv_leitura", "")
+    st.session_state["inv_leitura"] = ""
+    sku, qtd = parse_leitura(leitura)
+    if not sku:
+        return
+    produto = get_catalogo_sku().buscar(sku)
+    if not produto:
+        st.session_state["inv_msg"] = ("error", f"Código não cadastrado: {sku}")
+        return
+    _inv_registrar({produto["id"]: qtd}, somar=True)
+    st.session_state["inv_msg"] = ("success", f"+{qtd} {produto['nome']} "
+                                   f"(contado: {st.session_state['inv_contagens'][produto['id']]})")
+
+def show_inventory():
+    st.subheader("📋 Inventário (Contagem de Estoque)")
+    st.caption("Conte pelo leitor, digitando ou por arquivo. As diferenças são calculadas contra o estoque de "
+               "quando cada produto foi contado e aplicadas todas juntas, numa única operação registrada.")
+    planilha = st.session_state["inv_contagens"]
+
+    aba_leitor, aba_manual, aba_arquivo = st.tabs(["Leitor", "Digitar", "Arquivo CSV/XLSX"])
+    with aba_leitor:
+        st.text_input("Código de barras", key="inv_leitura", on_change=_inv_on_scan,
+                      placeholder="Aponte o leitor aqui... (3*código soma 3 unidades)")
+        msg = st.session_state["inv_msg"]
+        if msg:
+            getattr(st, msg[0])(msg[1])
+    with aba_manual:
+        produtos = get_all_produtos()
+        nomes = {p.id: f"{p.nome} (ID {p.id})" for p in produtos}
+        col1, col2, col3 = st.columns([3, 1, 1])
+        with col1:
+            pid = st.selectbox("Produto", list(nomes), format_func=nomes.get, key="inv_produto")
+        with col2:
+            qtd = st.number_input("Contado", min_value=0, step=1, value=0, key="inv_qtd")
+        with col3:
+            st.write("")
+            if st.button("Definir contagem") and pid is not None:
+                _inv_registrar({pid: int(qtd)}, somar=False)
+                st.session_state["inv_msg"] = ("success", f"{nomes[pid]}: {int(qtd)}")
+    with aba_arquivo:
+        st.caption("Colunas: código de barras (sku) ou id, e a quantidade contada. "
+                   "Produtos do arquivo substituem a contagem que já estiver na planilha.")
+        arquivo = st.file_uploader("Arquivo de contagem", type=["csv", "xlsx"], key="inv_arquivo")
+        if arquivo and st.button("Carregar contagem"):
+            try:
+                contagens, nao_encontrados = ler_arquivo_contagem(arquivo, arquivo.name)
+                _inv_registrar(contagens, somar=False)
+                st.success(f"{len(contagens)} produto(s) carregados.")
+                if nao_encontrados:
+                    st.warning(f"{len(nao_encontrados)} código(s) não cadastrados: "
+                               + ", ".join(nao_encontrados[:20]))
+            except ValueError as e:
+                st.error(str(e))
+
+    if not planilha:
+        st.info("Nenhum produto contado ainda.")
+    else:
+        with st.expander(f"Planilha de contagem ({len(planilha)} produto(s))"):
+            # o editor recebe sempre a mesma base até a planilha mudar por fora (leitor/arquivo),
+            # senão as edições guardadas pelo Streamlit seriam reaplicadas sobre outras linhas
+            rev = st.session_state["inv_rev"]
+            if st.session_state.get("inv_base_rev") != rev:
+                st.session_state["inv_base"] = dict(planilha)
+                st.session_state["inv_base_rev"] = rev
+            editada = st.data_editor(
+                [{"ID": pid, "Produto": nomes.get(pid, pid), "Contado": q}
+                 for pid, q in st.session_state["inv_base"].items()],
+                disabled=["ID", "Produto"], hide_index=True, num_rows="dynamic", key=f"inv_editor_{rev}",
+                column_config={"Contado": st.column_config.NumberColumn(min_value=0, step=1)},
+            )
+            novas = {int(r["ID"]): int(r["Contado"] or 0) for r in editada if r.get("ID") is not None}
+            if novas != planilha:
+                st.session_state["inv_contagens"] = planilha = novas
+            if st.button("Descartar contagem"):
+                _inv_limpar()
+                st.session_state["inv_msg"] = None
+                st.rerun()
+
+    _inv_diferencas(planilha)
+
+    st.markdown("---")
+    st.markdown("#### Inventários anteriores")
+    for inv in get_inventarios():
+        with st.expander(f"#{inv['id']} • {inv['criado_em'][:16].replace('T', ' ')} • {inv['usuario'] or '-'} • "
+                         f"{inv['itens']} item(ns) • {inv['diferenca_unidades']:+d} un • "
+                         f"{format_to_brl(inv['diferenca_valor'])}"):
+            if inv["observacao"]:
+                st.caption(inv["observacao"])
+            st.dataframe(get_inventario_itens(inv["id"]), hide_index=True, use_container_width=True)
+
+def _inv_diferencas(planilha):
+    col1, col2 = st.columns(2)
+    with col1:
+        completa = st.checkbox("Contagem completa: produtos não contados ficam com 0", key="inv_completa")
+    with col2:
+        marca = st.selectbox("Só da marca", ["Todas"] + MARCAS, key="inv_marca", disabled=not completa)
+    if not planilha and not completa:
+        return
+
+    df = calcular_diferencas(planilha, st.session_state["inv_esperados"], completa=completa,
+                             marca=None if marca == "Todas" else marca)
+    resumo = resumo_diferencas(df)
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Produtos com diferença", resumo["itens"])
+    c2.metric("Sobras (un)", resumo["sobras"])
+    c3.metric("Faltas (un)", resumo["faltas"])
+    c4.metric("Impacto em valor", format_to_brl(resumo["impacto"]))
+    if df.empty:
+        st.success("Contagem confere com o estoque do sistema.")
+        return
+    st.dataframe(
+        df[["id", "nome", "sku", "esperado", "contado", "diferenca", "preco", "impacto"]],
+        hide_index=True, use_container_width=True,
+        column_config={
+            "preco": st.column_config.NumberColumn("Preço (R$)", format="%.2f"),
+            "impacto": st.column_config.NumberColumn("Impacto (R$)", format="%.2f"),
+        },
+    )
+    observacao = st.text_input("Observação (ex.: inventário mensal, prateleira A)", key="inv_obs")
+    confirmar = st.checkbox(f"Confirmo o ajuste de {resumo['itens']} produto(s)", key="inv_confirmar")
+    if st.button("Aplicar inventário", type="primary", disabled=not confirmar):
+        try:
+            inventario_id, ajustados = aplicar_inventario(
+                zip(df["id"], df["esperado"], df["contado"]),
+                usuario=st.session_state.get("username"), observacao=observacao.strip() or None,
+            )
+            _inv_limpar()
+            st.session_state["inv_msg"] = ("success", f"Inventário #{inventario_id} aplicado: "
+                                           f"{ajustados} produto(s) ajustado(s).")
+            st.rerun()
+        except Exception as e:
+            st.error(f"Erro ao aplicar inventário: {e}")
+
+iniciar_arquivamento_automatico()
+
 if st.session_state["edit_mode"]:
     show_edit_form()
 else:
-    menu = st.sidebar.radio("Navegação", ["Listar e Ações", "Cadastrar Novo"])
+    menu = st.sidebar.radio("Navegação", ["Listar e Ações", "Cadastrar Novo", "Ajustes em Massa", "Inventário",
+                                          "Arquivados"])
     if menu == "Cadastrar Novo":
         add_product_form()
+    elif menu == "Ajustes em Massa":
+        show_bulk_adjustments()
+    elif menu == "Inventário":
+        show_inventory()
+    elif menu == "Arquivados":
+        show_archived_products()
     else:
         manage_products_list_actions()
@@ -0,0 +1,103 @@
+import streamlit as st
+import os
+from utils.database import safe_float
+from utils.lojas import (
+    usar_loja, listar_lojas, criar_loja, estoque_consolidado, valor_consolidado, onde_tem,
+)
+from utils.sincronizacao import situacao
+from utils.sessoes import sessao_valida
+
+st.set_page_config(page_title="Lojas", page_icon="🏬", layout="wide")
+
+def load_css(file_name="style.css"):
+    if os.path.exists(file_name):
+        try:
+            with open(file_name, encoding="utf-8") as f:
+                st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+        except Exception:
+            pass
+
+def format_to_brl(value):
+    try:
+        num = safe_float(value)
+        formatted = f"{num:_.2f}".replace(".", "X").replace("_", ".").replace("X", ",")
+        return "R$ " + formatted
+    except Exception:
+        return "R$ N/A"
+
+load_css("style.css")
+
+if not sessao_valida(st.session_state):
+    st.error("Acesso restrito. Faça login na Área Administrativa.")
+    st.stop()
+
+st.title("🏬 Lojas")
+st.markdown("---")
+
+lojas = listar_lojas()
+codigos = [l["codigo"] for l in lojas]
+nomes = {l["codigo"]: l["nome"] for l in lojas}
+atual = st.session_state.get("loja") if st.session_state.get("loja") in codigos else codigos[0]
+
+st.subheader("Loja desta sessão")
+escolhida = st.selectbox("Trabalhar na loja", codigos, index=codigos.index(atual), format_func=nomes.get)
+if escolhida != st.session_state.get("loja"):
+    st.session_state["loja"] = escolhida
+usar_loja(escolhida)
+st.caption("Todas as páginas (estoque, vendas, relatórios) passam a usar o banco desta loja.")
+
+if st.session_state.get("role") == "admin":
+    with st.expander("➕ Cadastrar nova loja"):
+        with st.form("nova_loja"):
+            codigo = st.text_input("Código (ex.: centro, shopping)")
+            nome = st.text_input("Nome da loja")
+            if st.form_submit_button("Criar loja"):
+                try:
+                    loja = criar_loja(codigo, nome)
+                    st.success(f"Loja '{loja['nome']}' criada.")
+                    st.rerun()
+                except ValueError as e:
+                    st.error(str(e))
+
+    with st.expander("🔄 Terminais offline (sincronização)"):
+        sinc = situacao()
+        st.caption(f"Este banco é o nó '{sinc['no']}' (seq {sinc['seq']}). Terminais são criados e sincronizados "
+                   "com `python -m scripts.sincronizar`.")
+        if sinc["pares"]:
+            st.dataframe(
+                [{"Nó": p["no"], "Recebido até": p["recebido_ate"], "Confirmado até": p["confirmado_ate"],
+                  "Pendentes": p["pendentes"], "Última troca": (p["atualizado_em"] or "-")[:16].replace("T", " ")}
+                 for p in sinc["pares"]],
+                hide_index=True, use_container_width=True,
+            )
+        else:
+            st.info("Nenhum terminal clonado desta loja.")
+
+st.markdown("---")
+st.subheader("📦 Estoque consolidado")
+linhas = estoque_consolidado()
+st.dataframe(
+    [{"Loja": r["nome"], "Produtos": r["produtos"], "Com estoque": r["com_estoque"],
+      "Unidades": r["unidades"], "Valor": format_to_brl(r["valor"])} for r in linhas],
+    hide_index=True, use_container_width=True,
+)
+
+st.subheader("💰 Valor por categoria (todas as lojas)")
+dimensao = st.radio("Agrupar por", ["marca", "estilo", "tipo"], horizontal=True,
+                    format_func=lambda d: d.title())
+st.dataframe(
+    [{dimensao.title(): r["chave"], "Unidades": r["unidades"], "Valor total": format_to_brl(r["valor"]),
+      **{nomes[c]: format_to_brl(r["por_loja"].get(c, 0)) for c in codigos}}
+     for r in valor_consolidado(dimensao)],
+    hide_index=True, use_container_width=True,
+)
+
+st.subheader("🔎 Onde tem?")
+termo = st.text_input("Código de barras ou parte do nome")
+if termo:
+    achados = onde_tem(termo)
+    if not achados:
+        st.info("Nenhuma loja tem esse produto em estoque.")
+    for r in achados:
+        st.write(f"**{r['nome_loja']}** • {r['nome']} (ID {r['id']}) • {r['quantidade']} un • "
+                 f"{format_to_brl(r['preco'])}")
@@ -3,10 +3,10 @@ import os
 from datetime import datetime
 from utils.database import (
     get_all_produtos,
-    ASSETS_DIR,
-    safe_int,
     safe_float
 )
+from utils.lojas import usar_loja
+from utils.imagens import foto_para_exibir
 
 # =========================
 # CONFIGURAÇÃO DA PÁGINA
@@ -38,6 +38,9 @@ def load_css(file_name="style.css"):
 
 load_css("style.css")
 
+loja = usar_loja(st.session_state.get("loja"))
+st.sidebar.caption(f"🏬 Loja: **{loja['nome']}**")
+
 # =========================
 # CABEÇALHO
 # =========================
@@ -47,10 +50,11 @@ st.markdown("---")
 # =========================
 # DADOS
 # =========================
-produtos = get_all_produtos(include_sold=True)
+incluir_arquivados = st.checkbox("Incluir produtos arquivados")
+produtos = get_all_produtos(include_sold=True, include_archived=incluir_arquivados)
 
 # Apenas produtos que tiveram venda
-vendidos = [p for p in produtos if p.get("data_ultima_venda")]
+vendidos = [p for p in produtos if p.data_ultima_venda]
 
 if not vendidos:
     st.success("Nenhum produto vendido até o momento.")
@@ -60,11 +64,7 @@ if not vendidos:
 # CÁLCULO DO VALOR TOTAL
 # (SOMA DO PREÇO UNITÁRIO)
 # =========================
-valor_total_produtos_vendidos = 0.0
-
-for p in vendidos:
-    preco_unitario = safe_float(p.get("preco", 0))
-    valor_total_produtos_vendidos += preco_unitario
+valor_total_produtos_vendidos = sum(p.preco for p in vendidos)
 
 # =========================
 # MÉTRICA PRINCIPAL
@@ -85,13 +85,13 @@ st.markdown("---")
 # LISTAGEM DOS PRODUTOS
 # =========================
 for p in vendidos:
-    preco_unitario = safe_float(p.get("preco", 0))
+    preco_unitario = p.preco
 
     with st.container(border=True):
         col_info, col_img = st.columns([3, 1])
 
         with col_info:
-            st.markdown(f"### 🛒 {p.get('nome', 'Produto')}")
+            st.markdown(f"### 🛒 {p.get('nome', 'Produto')}" + (" 🗄️" if p.get("arquivado") else ""))
             st.write(f"💲 **Preço unitário:** {format_to_brl(preco_unitario)}")
 
             st.caption(
@@ -105,8 +105,8 @@ for p in vendidos:
         with col_img:
             foto = p.get("foto")
             if foto:
-                caminho = os.path.join(ASSETS_DIR, foto)
-                if os.path.exists(caminho):
+                caminho = foto_para_exibir(foto)
+                if caminho:
                     st.image(caminho, use_container_width=True)
                 else:
                     st.caption("Imagem não encontrada")
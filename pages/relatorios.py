@@ -0,0 +1,127 @@
+import streamlit as st
+import os
+from utils.database import safe_float
+from utils.analises import valor_por_categoria, idade_estoque, giro, distribuicao_precos, historico_estoque, DIMENSOES
+from utils.historico import iniciar_foto_diaria
+from utils.lojas import usar_loja
+from utils.sessoes import sessao_valida
+
+st.set_page_config(page_title="Relatórios", page_icon="📊", layout="wide")
+
+def load_css(file_name="style.css"):
+    if os.path.exists(file_name):
+        try:
+            with open(file_name, encoding="utf-8") as f:
+                st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+        except Exception:
+            pass
+
+def format_to_brl(value):
+    try:
+        num = safe_float(value)
+        formatted = f"{num:_.2f}".replace(".", "X").replace("_", ".").replace("X", ",")
+        return "R$ " + formatted
+    except Exception:
+        return "R$ N/A"
+
+load_css("style.css")
+
+loja = usar_loja(st.session_state.get("loja"))
+st.sidebar.caption(f"🏬 Loja: **{loja['nome']}**")
+
+if not sessao_valida(st.session_state):
+    st.error("Acesso restrito. Faça login na Área Administrativa.")
+    st.stop()
+
+iniciar_foto_diaria()
+
+st.title("📊 Relatórios")
+st.caption("Calculados numa conexão somente leitura e guardados em cache até o estoque mudar.")
+st.markdown("---")
+
+NOMES_DIMENSAO = {"marca": "Marca", "estilo": "Estilo", "tipo": "Tipo"}
+COLUNA_VALOR = st.column_config.NumberColumn("Valor (R$)", format="%.2f")
+
+aba_valor, aba_idade, aba_giro, aba_precos, aba_historico = st.tabs(
+    ["Valor por categoria", "Idade do estoque", "Giro", "Faixas de preço", "Histórico"]
+)
+
+with aba_valor:
+    dimensao = st.radio("Agrupar por", DIMENSOES, format_func=NOMES_DIMENSAO.get, horizontal=True,
+                        key="rel_valor_dim")
+    df = valor_por_categoria(dimensao)
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Valor em estoque", format_to_brl(df["valor"].sum()))
+    col2.metric("Unidades", int(df["unidades"].sum()))
+    col3.metric(f"{NOMES_DIMENSAO[dimensao]}s com estoque", len(df))
+    st.bar_chart(df.head(15), x=dimensao, y="valor")
+    st.dataframe(df, hide_index=True, use_container_width=True, column_config={
+        "valor": COLUNA_VALOR,
+        "preco_medio": st.column_config.NumberColumn("Preço médio (R$)", format="%.2f"),
+        "participacao": st.column_config.NumberColumn("Participação (%)", format="%.1f"),
+    })
+
+with aba_idade:
+    st.caption("Tempo desde a última venda de cada produto com estoque.")
+    df = idade_estoque()
+    st.bar_chart(df, x="faixa", y="valor")
+    st.dataframe(df, hide_index=True, use_container_width=True, column_config={"valor": COLUNA_VALOR})
+
+with aba_giro:
+    col1, col2 = st.columns(2)
+    with col1:
+        dias = st.selectbox("Período", [7, 30, 90, 180], index=1, format_func=lambda d: f"Últimos {d} dias")
+    with col2:
+        agrupar = st.selectbox("Agrupar por", [None, *DIMENSOES],
+                               format_func=lambda d: "Produto" if d is None else NOMES_DIMENSAO[d])
+    df = giro(dias, agrupar)
+    st.caption("Giro = unidades vendidas ÷ estoque médio no período. Vendas vêm do registro de auditoria.")
+    colunas = {
+        "valor": COLUNA_VALOR,
+        "giro": st.column_config.NumberColumn("Giro", format="%.2f"),
+        "dias_cobertura": st.column_config.NumberColumn("Cobertura (dias)", format="%.0f"),
+    }
+    if agrupar is None:
+        st.markdown("**Maior giro**")
+        st.dataframe(df[df["vendidas"] > 0].head(20), hide_index=True, use_container_width=True,
+                     column_config=colunas)
+        parados = df[(df["vendidas"] == 0) & (df["quantidade"] > 0)].sort_values("valor", ascending=False)
+        st.markdown(f"**Sem venda no período** ({len(parados)} produtos, {format_to_brl(parados['valor'].sum())})")
+        st.dataframe(parados.head(20), hide_index=True, use_container_width=True, column_config=colunas)
+    else:
+        st.bar_chart(df.head(15), x=agrupar, y="giro")
+        st.dataframe(df, hide_index=True, use_container_width=True, column_config=colunas)
+
+with aba_precos:
+    faixas, estatisticas = distribuicao_precos()
+    st.bar_chart(faixas, x="faixa", y="produtos")
+    st.dataframe(faixas, hide_index=True, use_container_width=True, column_config={"valor": COLUNA_VALOR})
+    st.markdown("**Preços por tipo**")
+    st.dataframe(estatisticas, hide_index=True, use_container_width=True)
+
+with aba_historico:
+    st.caption("Fotografia diária do estoque, gravada uma vez por hora enquanto o app está aberto "
+               "(ou pelo cron com `python -m scripts.foto_estoque`).")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        dim_hist = st.selectbox("Dimensão", ["total", *DIMENSOES],
+                                format_func=lambda d: "Total" if d == "total" else NOMES_DIMENSAO[d])
+    with col2:
+        dias_hist = st.selectbox("Período", [30, 90, 180, 365], index=1, format_func=lambda d: f"Últimos {d} dias",
+                                 key="rel_hist_dias")
+    with col3:
+        metrica = st.selectbox("Métrica", ["valor", "unidades", "skus"],
+                               format_func={"valor": "Valor (R$)", "unidades": "Unidades", "skus": "SKUs com estoque"}.get)
+    serie = historico_estoque(dim_hist, dias_hist, metrica)
+    if serie.empty:
+        st.info("Ainda não há fotografias do estoque para este período.")
+    else:
+        if dim_hist == "total":
+            atual, inicial = serie["Total"].iloc[-1], serie["Total"].iloc[0]
+            valor_fmt = format_to_brl if metrica == "valor" else (lambda v: f"{int(v)}")
+            st.metric(f"Em {serie.index[-1]:%d/%m/%Y}", valor_fmt(atual),
+                      delta=f"{(atual - inicial) / inicial * 100:+.1f}% desde {serie.index[0]:%d/%m/%Y}" if inicial else None)
+        else:
+            st.caption(f"As {len(serie.columns)} categorias de maior valor no último dia.")
+        st.line_chart(serie)
+        st.dataframe(serie.sort_index(ascending=False), use_container_width=True)
@@ -0,0 +1,136 @@
+import streamlit as st
+import os
+import uuid
+from datetime import datetime
+from utils.database import safe_float, reservar, liberar_reservas, RESERVA_TTL_SEGUNDOS
+from utils.pdv import get_catalogo_sku, parse_leitura, finalizar_venda, sincronizar_reservas
+from utils.reservas import iniciar_expiracao_reservas
+from utils.lojas import usar_loja
+from utils.sessoes import sessao_valida
+
+st.set_page_config(page_title="Venda por Código de Barras", page_icon="🔎", layout="wide")
+
+def load_css(file_name="style.css"):
+    if os.path.exists(file_name):
+        try:
+            with open(file_name, encoding="utf-8") as f:
+                st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+        except Exception:
+            pass
+
+def format_to_brl(value):
+    try:
+        num = safe_float(value)
+        formatted = f"{num:_.2f}".replace(".", "X").replace("_", ".").replace("X", ",")
+        return "R$ " + formatted
+    except Exception:
+        return "R$ N/A"
+
+load_css("style.css")
+
+loja = usar_loja(st.session_state.get("loja"))
+st.sidebar.caption(f"🏬 Loja: **{loja['nome']}**")
+
+if not sessao_valida(st.session_state):
+    st.error("Acesso restrito. Faça login na Área Administrativa.")
+    st.stop()
+
+if "pdv_carrinho" not in st.session_state:
+    st.session_state["pdv_carrinho"] = {}
+if "pdv_itens" not in st.session_state:
+    st.session_state["pdv_itens"] = {}
+if "pdv_msg" not in st.session_state:
+    st.session_state["pdv_msg"] = None
+if "pdv_sessao" not in st.session_state:
+    st.session_state["pdv_sessao"] = uuid.uuid4().hex
+
+iniciar_expiracao_reservas()
+sessao = st.session_state["pdv_sessao"]
+
+st.title("🔎 Venda por Código de Barras")
+st.caption("Modo leitura: o leitor digita o código e o Enter; cada leitura soma 1 unidade. "
+           "Para várias unidades digite `3*código`.")
+st.markdown("---")
+
+def on_scan():
+    """Callback do campo de leitura: resolve o código em memória e limpa o campo."""
+    # callbacks rodam antes do corpo da página, sem a loja da sessão
+    # selecionada: sem isto, catálogo e reservas iriam para a loja principal
+    usar_loja(st.session_state.get("loja"))
+    leitura = st.session_state.get("pdv_leitura", "")
+    st.session_state["pdv_leitura"] = ""
+    sku, qtd = parse_leitura(leitura)
+    if not sku:
+        return
+    produto = get_catalogo_sku().buscar(sku)
+    if not produto:
+        st.session_state["pdv_msg"] = ("error", f"Código não cadastrado: {sku}")
+        return
+    carrinho = st.session_state["pdv_carrinho"]
+    try:
+        # a reserva segura as unidades contra vendas em outros caixas
+        reservar(st.session_state["pdv_sessao"], produto["id"], qtd)
+    except ValueError as e:
+        st.session_state["pdv_msg"] = ("warning", f"{e}.")
+        return
+    carrinho[produto["id"]] = carrinho.get(produto["id"], 0) + qtd
+    st.session_state["pdv_itens"][produto["id"]] = produto
+    st.session_state["pdv_msg"] = ("success", f"+{qtd} {produto['nome']}")
+
+st.text_input("Código de barras", key="pdv_leitura", on_change=on_scan,
+              placeholder="Aponte o leitor aqui...")
+
+msg = st.session_state["pdv_msg"]
+if msg:
+    getattr(st, msg[0])(msg[1])
+
+carrinho = st.session_state["pdv_carrinho"]
+itens = st.session_state["pdv_itens"]
+
+if not carrinho:
+    st.info("Nenhum item lido ainda.")
+    st.stop()
+
+for pid, erro in sincronizar_reservas(sessao, carrinho).items():
+    st.warning(f"Reserva de {itens[pid]['nome']} venceu e não pôde ser refeita: {erro}. Item removido.")
+    del carrinho[pid]
+
+total = 0.0
+st.subheader(f"🛒 Itens ({sum(carrinho.values())} un)")
+for pid, qtd in list(carrinho.items()):
+    produto = itens[pid]
+    subtotal = safe_float(produto["preco"]) * qtd
+    total += subtotal
+    col1, col2, col3 = st.columns([4, 2, 1])
+    col1.write(f"**{produto['nome']}** • `{produto['sku']}`")
+    col2.write(f"{qtd} x {format_to_brl(produto['preco'])} = {format_to_brl(subtotal)}")
+    if col3.button("Remover", key=f"pdv_rm_{pid}"):
+        liberar_reservas(sessao, pid)
+        del carrinho[pid]
+        st.rerun()
+
+st.metric("Total da venda", format_to_brl(total))
+st.caption(f"Os itens ficam reservados para este caixa por {RESERVA_TTL_SEGUNDOS // 60} min; "
+           "o prazo é renovado a cada interação.")
+
+colf1, colf2 = st.columns(2)
+with colf1:
+    if st.button("✅ Finalizar venda", type="primary"):
+        resultados = finalizar_venda(sessao, carrinho, usuario=st.session_state.get("username"))
+        falhas = [r for r in resultados if not r["ok"]]
+        for r in falhas:
+            st.error(f"ID {r['id']} ({r['nome'] or '-'}): {r['erro']}")
+        vendidos = len(resultados) - len(falhas)
+        st.session_state["pdv_carrinho"] = {}
+        st.session_state["pdv_itens"] = {}
+        st.session_state["pdv_msg"] = ("success", f"Venda finalizada: {vendidos} item(ns) em "
+                                       f"{datetime.now().strftime('%H:%M:%S')}.")
+        if not falhas:
+            st.rerun()
+with colf2:
+    if st.button("🗑️ Limpar carrinho"):
+        liberar_reservas(sessao)
+        st.session_state["pdv_carrinho"] = {}
+        st.session_state["pdv_itens"] = {}
+        st.session_state["pdv_msg"] = None
+        st.rerun()
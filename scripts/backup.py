@@ -0,0 +1,67 @@
+"""
+Backups online do estoque (utils/backup.py).
+
+Uso (na raiz do projeto):
+    python -m scripts.backup criar
+    python -m scripts.backup listar
+    python -m scripts.backup verificar <snapshot>
+    python -m scripts.backup restaurar <snapshot>
+"""
+
+import argparse
+import sys
+
+from utils.backup import criar_backup, listar_backups, ler_manifest, verificar_backup, restaurar_backup
+
+
+def _formatar_bytes(n):
+    for unidade in ("B", "KB", "MB", "GB"):
+        if n < 1024:
+            return f"{n:.1f} {unidade}"
+        n /= 1024
+    return f"{n:.1f} TB"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backups do banco de estoque e das imagens")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("criar")
+    sub.add_parser("listar")
+    for nome in ("verificar", "restaurar"):
+        sub.add_parser(nome).add_argument("snapshot")
+    args = parser.parse_args(argv)
+
+    if args.comando == "criar":
+        m = criar_backup()
+        print(f"Snapshot {m['nome']}")
+        for codigo, banco in m["bancos"].items():
+            print(f"  banco {codigo}: {_formatar_bytes(banco['tamanho'])} -> "
+                  f"{_formatar_bytes(banco['tamanho_comprimido'])} ({banco['passos_backup']} passos)")
+        print(f"  imagens: {len(m['assets'])} referenciadas, {m['assets_novos']} novas "
+              f"({_formatar_bytes(m['assets_bytes_copiados'])}), {m['assets_faltando']} ausentes em assets/")
+        if m["snapshots_removidos"]:
+            print(f"  rotação: removidos {', '.join(m['snapshots_removidos'])}")
+        print("  tempos: " + ", ".join(f"{k}={v:.3f}s" for k, v in m["tempos"].items()))
+    elif args.comando == "listar":
+        for nome in listar_backups():
+            m = ler_manifest(nome)
+            bancos = m.get("bancos") or {"principal": m["banco"]}
+            print(f"{nome}  lojas={len(bancos)}  "
+                  f"bancos={_formatar_bytes(sum(b['tamanho_comprimido'] for b in bancos.values()))}  "
+                  f"imagens={len(m['assets'])}  total={m.get('tempos', {}).get('total', 0):.2f}s")
+    elif args.comando == "verificar":
+        ok, problemas = verificar_backup(args.snapshot)
+        print("OK" if ok else "FALHOU")
+        for p in problemas:
+            print(f"  - {p}")
+        return 0 if ok else 1
+    elif args.comando == "restaurar":
+        r = restaurar_backup(args.snapshot)
+        print(f"Restaurado {args.snapshot} (lojas: {', '.join(r['lojas'])}): "
+              f"{r['imagens_restauradas']} imagens devolvidas a assets/; "
+              + ", ".join(f"{k}={v:.3f}s" for k, v in r["tempos"].items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""
+Benchmark de vazão da API local (api.py).
+
+Sobe o servidor numa porta livre, dispara requisições de vários clientes
+keep-alive e mede requisições/segundo por cenário.
+
+Uso (na raiz do projeto):
+    python -m scripts.bench_api [--clientes 8] [--requisicoes 500] [--workers 8]
+"""
+
+import argparse
+import http.client
+import threading
+import time
+
+from api import criar_servidor
+
+CENARIOS = [
+    ("lista 50 (200)", "/produtos?limit=50", {}),
+    ("lista 50 gzip (200)", "/produtos?limit=50", {"Accept-Encoding": "gzip"}),
+    ("lista 50 If-None-Match (304)", "/produtos?limit=50", "etag"),
+    ("produto por id", "/produtos/2", {}),
+    ("saúde", "/saude", {}),
+]
+
+
+def _cliente(porta, caminho, headers, n, erros):
+    conn = http.client.HTTPConnection("127.0.0.1", porta)
+    for _ in range(n):
+        conn.request("GET", caminho, headers=headers)
+        resp = conn.getresponse()
+        resp.read()
+        if resp.status not in (200, 304):
+            erros.append(resp.status)
+    conn.close()
+
+
+def medir(porta, caminho, headers, clientes, requisicoes):
+    erros = []
+    threads = [
+        threading.Thread(target=_cliente, args=(porta, caminho, headers, requisicoes, erros))
+        for _ in range(clientes)
+    ]
+    inicio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duracao = time.perf_counter() - inicio
+    return clientes * requisicoes / duracao, erros
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clientes", type=int, default=8)
+    parser.add_argument("--requisicoes", type=int, default=300)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    servidor = criar_servidor(porta=0, workers=args.workers)
+    porta = servidor.server_address[1]
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", porta)
+        conn.request("GET", "/produtos?limit=50")
+        resp = conn.getresponse()
+        tamanho = len(resp.read())
+        etag = resp.getheader("ETag")
+        conn.close()
+        print(f"{args.clientes} clientes x {args.requisicoes} req, {args.workers} workers "
+              f"(página de 50 = {tamanho} bytes)")
+        for nome, caminho, headers in CENARIOS:
+            if headers == "etag":
+                headers = {"If-None-Match": etag}
+            rps, erros = medir(porta, caminho, headers, args.clientes, args.requisicoes)
+            print(f"  {nome:32} {rps:9.0f} req/s" + (f"  erros={len(erros)}" if erros else ""))
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()
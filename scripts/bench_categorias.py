@@ -0,0 +1,37 @@
+"""
+Micro-benchmark do índice de categorias (utils/categorias.py).
+
+Uso (na raiz do projeto):
+    python -m scripts.bench_categorias
+"""
+
+import time
+
+from utils.categorias import best_matches, resolver
+
+CONSULTAS = [
+    ("marca", "boticario"), ("marca", "o boticario"), ("marca", "mary"),
+    ("marca", "natur"), ("marca", "oui"), ("tipo", "perfume feminino"),
+    ("tipo", "hidratante maos"), ("tipo", "colonia"), ("tipo", "body"),
+    ("estilo", "maquiagem"), ("estilo", "corpo"),
+]
+
+
+def medir(func, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        for campo, texto in CONSULTAS:
+            func(campo, texto)
+    return (time.perf_counter() - inicio) / (repeticoes * len(CONSULTAS)) * 1e6
+
+
+def main(repeticoes=2000):
+    for campo, texto in CONSULTAS:
+        print(f"{campo:6} {texto!r:22} -> {resolver(campo, texto)!s:32} {best_matches(campo, texto)}")
+    print()
+    print(f"best_matches: {medir(best_matches, repeticoes):8.2f} µs/consulta")
+    print(f"resolver:     {medir(resolver, repeticoes):8.2f} µs/consulta")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark do índice de fotos repetidas (utils/duplicatas.py).
+
+Mede o cálculo dos hashes de todas as fotos de assets/ com 1 processo e
+com o pool (nada é gravado no banco), e a busca vetorizada de pares
+próximos no conjunto real e em conjuntos sintéticos maiores.
+
+Uso (na raiz do projeto):
+    python -m scripts.bench_duplicatas [--workers N] [--sinteticos 10000 50000]
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from utils.database import ASSETS_DIR
+from utils.duplicatas import _arquivos_assets, _hash_arquivo, pares_proximos, LIMIAR_PADRAO
+
+
+def _hashes_em_paralelo(nomes, workers):
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_hash_arquivo, nomes, chunksize=8))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos hashes perceptuais das fotos")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--sinteticos", type=int, nargs="*", default=[10_000, 50_000])
+    args = parser.parse_args()
+
+    nomes = sorted(_arquivos_assets())
+    tamanho = sum(os.path.getsize(os.path.join(ASSETS_DIR, n)) for n in nomes)
+    print(f"{len(nomes)} fotos em assets/ ({tamanho / 1024 / 1024:.1f} MB)")
+
+    inicio = time.perf_counter()
+    serial = [_hash_arquivo(n) for n in nomes]
+    t_serial = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    paralelo = _hashes_em_paralelo(nomes, args.workers)
+    t_paralelo = time.perf_counter() - inicio
+    if serial != paralelo:
+        raise SystemExit("hashes divergentes entre serial e paralelo")
+    print(f"hashes, 1 processo:   {t_serial:6.2f}s ({t_serial / len(nomes) * 1000:.1f} ms/foto)")
+    print(f"hashes, {args.workers} processos: {t_paralelo:6.2f}s ({t_serial / t_paralelo:.1f}x)")
+
+    validos = [(d, p) for _, d, p in serial if d is not None]
+    d = np.array([v[0] for v in validos], dtype=np.int64).view(np.uint64)
+    p = np.array([v[1] for v in validos], dtype=np.int64).view(np.uint64)
+    inicio = time.perf_counter()
+    i, _ = pares_proximos(d, p, LIMIAR_PADRAO)
+    print(f"busca, {len(d)} fotos: {(time.perf_counter() - inicio) * 1000:8.1f} ms ({len(i)} pares)")
+
+    rnd = np.random.default_rng(42)
+    for n in args.sinteticos:
+        d = rnd.integers(0, 2**63, size=n, dtype=np.int64).view(np.uint64) * np.uint64(2)
+        p = rnd.integers(0, 2**63, size=n, dtype=np.int64).view(np.uint64) * np.uint64(2)
+        inicio = time.perf_counter()
+        i, _ = pares_proximos(d, p, LIMIAR_PADRAO)
+        print(f"busca, {n} sintéticos: {(time.perf_counter() - inicio) * 1000:8.1f} ms ({len(i)} pares)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark dos registros de produto: dict por linha (sqlite3.Row -> dict,
+como get_all_produtos fazia) contra Produto (__slots__, tipos convertidos
+na leitura pela row factory).
+
+Cria um banco temporário com N produtos e mede carga, memória e o custo
+de uma passada típica das páginas (filtro por marca, quantidade mínima
+e total em estoque).
+
+Uso (na raiz do projeto):
+    python -m scripts.bench_produtos [--produtos 100000]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+
+from utils.database import _fabrica_produtos, safe_float, safe_int
+
+MARCAS = ["Natura", "O Boticário", "Avon", "Eudora", "Mary Kay", "Jequiti"]
+
+
+def _criar_banco(caminho, n):
+    conn = sqlite3.connect(caminho)
+    conn.execute("""
+        CREATE TABLE produtos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, nome TEXT NOT NULL, preco REAL NOT NULL,
+            quantidade INTEGER NOT NULL, marca TEXT, estilo TEXT, tipo TEXT, foto TEXT,
+            data_validade TEXT, vendido INTEGER DEFAULT 0, data_ultima_venda TEXT, sku TEXT
+        )
+    """)
+    rnd = random.Random(42)
+    conn.executemany(
+        "INSERT INTO produtos (nome, preco, quantidade, marca, estilo, tipo, foto, data_validade, sku) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        ((f"Produto {i}", round(rnd.uniform(5, 300), 2), rnd.randint(0, 20), rnd.choice(MARCAS),
+          "Perfumaria", "Perfume", f"{i}_foto.webp", "2027-01-01", f"789{i:010d}") for i in range(n)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def carregar_dicts(caminho):
+    conn = sqlite3.connect(caminho)
+    conn.row_factory = sqlite3.Row
+    data = [dict(r) for r in conn.execute("SELECT * FROM produtos ORDER BY nome").fetchall()]
+    conn.close()
+    return data
+
+
+def carregar_produtos(caminho):
+    conn = sqlite3.connect(caminho)
+    cur = conn.execute("SELECT * FROM produtos ORDER BY nome")
+    cur.row_factory = _fabrica_produtos(cur.description)
+    data = cur.fetchall()
+    conn.close()
+    return data
+
+
+def passada_dicts(produtos):
+    filtrados = [p for p in produtos if p.get("marca") == "Natura"]
+    filtrados = [p for p in filtrados if safe_int(p.get("quantidade", 0)) >= 2]
+    return sum(safe_float(p.get("preco", 0)) * safe_int(p.get("quantidade", 0)) for p in produtos), len(filtrados)
+
+
+def passada_produtos(produtos):
+    filtrados = [p for p in produtos if p.marca == "Natura"]
+    filtrados = [p for p in filtrados if p.quantidade >= 2]
+    return sum(p.preco * p.quantidade for p in produtos), len(filtrados)
+
+
+def medir(carregar, passada, caminho, repeticoes):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    produtos = carregar(caminho)
+    t_carga = time.perf_counter() - inicio
+    memoria = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # a carga medida sem tracemalloc (que distorce o tempo)
+    inicio = time.perf_counter()
+    produtos = carregar(caminho)
+    t_carga = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        resultado = passada(produtos)
+    t_passada = (time.perf_counter() - inicio) / repeticoes
+    return t_carga, memoria, t_passada, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="dict por linha x Produto (__slots__)")
+    parser.add_argument("--produtos", type=int, default=100_000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        caminho = os.path.join(tmp, "bench.db")
+        _criar_banco(caminho, args.produtos)
+        print(f"{args.produtos} produtos")
+        print(f"{'':10} {'carga':>9} {'memória':>10} {'passada':>9}")
+        resultados = {}
+        for nome, carregar, passada in (("dict", carregar_dicts, passada_dicts),
+                                        ("Produto", carregar_produtos, passada_produtos)):
+            t_carga, memoria, t_passada, resultados[nome] = medir(carregar, passada, caminho, args.repeticoes)
+            print(f"{nome:10} {t_carga * 1000:7.0f}ms {memoria / 1024 / 1024:8.1f}MB {t_passada * 1000:7.1f}ms")
+        if resultados["dict"][1] != resultados["Produto"][1] or abs(resultados["dict"][0] - resultados["Produto"][0]) > 1e-6:
+            raise SystemExit(f"resultados divergentes: {resultados}")
+
+
+if __name__ == "__main__":
+    main()
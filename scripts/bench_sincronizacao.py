@@ -0,0 +1,80 @@
+"""
+Benchmark da sincronização por lotes (utils/sincronizacao.py).
+
+Para cada tamanho de catálogo, cria um banco de loja temporário, clona
+um terminal, registra N vendas no terminal e mede a troca de lotes
+(exportar + aplicar nos dois sentidos) e o tamanho do lote comprimido,
+comparando com copiar o arquivo inteiro. O tempo deve acompanhar o
+número de mudanças, não o número de produtos.
+
+Uso (na raiz do projeto):
+    python -m scripts.bench_sincronizacao [--produtos 10000 100000] [--mudancas 100 1000 10000]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from utils.database import banco, create_tables, flush_auditoria
+from utils.sincronizacao import clonar, sincronizar
+
+
+def _criar_loja(caminho, n):
+    with banco(caminho):
+        create_tables()
+    conn = sqlite3.connect(caminho)
+    conn.executemany(
+        "INSERT INTO produtos (nome, preco, quantidade, marca, estilo, tipo, sku) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        ((f"Produto {i}", 10.0 + i % 90, 1_000, "Natura", "Perfumaria", "Perfume", f"789{i:010d}") for i in range(n)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def _vender(caminho, n, total_produtos, rnd):
+    conn = sqlite3.connect(caminho)
+    agora = time.strftime("%Y-%m-%dT%H:%M:%S")
+    for _ in range(n):
+        conn.execute("UPDATE produtos SET quantidade = quantidade - 1, vendido = 1, data_ultima_venda = ? "
+                     "WHERE id = ?", (agora, rnd.randint(1, total_produtos)))
+    conn.commit()
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo de sincronização x mudanças x catálogo")
+    parser.add_argument("--produtos", type=int, nargs="*", default=[10_000, 100_000])
+    parser.add_argument("--mudancas", type=int, nargs="*", default=[100, 1_000, 10_000])
+    args = parser.parse_args()
+
+    rnd = random.Random(42)
+    print(f"{'produtos':>9} {'mudanças':>9} {'sincronizar':>12} {'lote':>10} {'cópia do arquivo':>17} {'arquivo':>9}")
+    for n in args.produtos:
+        with tempfile.TemporaryDirectory() as tmp:
+            loja = os.path.join(tmp, "loja.db")
+            terminal = os.path.join(tmp, "terminal.db")
+            _criar_loja(loja, n)
+            clonar(terminal, "terminal", loja)
+            for m in args.mudancas:
+                _vender(terminal, m, n, rnd)
+                _vender(loja, m // 10, n, rnd)  # vendas na loja no mesmo período
+                r = sincronizar(terminal, loja)
+                inicio = time.perf_counter()
+                shutil.copyfile(loja, os.path.join(tmp, "copia.db"))
+                t_copia = time.perf_counter() - inicio
+                print(f"{n:9} {m:9} {r['tempos']['total'] * 1000:10.1f}ms "
+                      f"{r['bytes']['a_para_b'] / 1024:8.1f}KB {t_copia * 1000:15.1f}ms "
+                      f"{os.path.getsize(loja) / 1024 / 1024:7.1f}MB")
+            a = sqlite3.connect(loja).execute("SELECT SUM(quantidade) FROM produtos").fetchone()[0]
+            b = sqlite3.connect(terminal).execute("SELECT SUM(quantidade) FROM produtos").fetchone()[0]
+            flush_auditoria()  # antes de apagar a pasta temporária
+            if a != b:
+                raise SystemExit(f"bancos divergentes após sincronizar: {a} x {b}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""
+Grava a fotografia diária do estoque (utils/historico.py) de todas as lojas.
+
+Pensado para o cron, para não depender do app estar aberto; rodar mais de
+uma vez no mesmo dia só atualiza a fotografia do dia.
+
+Uso (na raiz do projeto):
+    python -m scripts.foto_estoque
+"""
+
+import sys
+import time
+
+from utils.database import registrar_estoque_diario
+from utils.lojas import em_todas_as_lojas
+
+
+def main():
+    inicio = time.perf_counter()
+    for loja, linhas in em_todas_as_lojas(registrar_estoque_diario):
+        print(f"{loja['nome']}: {linhas} linhas")
+    print(f"tempo: {time.perf_counter() - inicio:.3f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""
+Sincronização entre o banco da loja e cópias em terminais (utils/sincronizacao.py).
+
+Uso (na raiz do projeto):
+    python -m scripts.sincronizar clonar <arquivo> <nome> [--origem data/estoque.db]
+    python -m scripts.sincronizar sincronizar <banco_a> <banco_b>
+    python -m scripts.sincronizar exportar <banco> <destino> <lote.json.gz> [--desde SEQ]
+    python -m scripts.sincronizar aplicar <banco> <lote.json.gz>
+    python -m scripts.sincronizar situacao <banco>
+
+`sincronizar` serve quando os dois arquivos estão acessíveis (rede de
+volta); `exportar`/`aplicar` levam o lote por pendrive ou e-mail.
+"""
+
+import argparse
+import sys
+
+from utils.database import DATABASE
+from utils.sincronizacao import aplicar_lote, clonar, exportar_lote, situacao, sincronizar
+
+
+def _imprimir_aplicacao(rotulo, r):
+    print(f"{rotulo}: {r['aplicadas']} aplicadas, {r['repetidas']} repetidas de {r['mudancas']} "
+          f"(recebido até {r['recebido_ate']})")
+    for c in r["conflitos"]:
+        print(f"  ! {c}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sincronização por lotes de mudanças entre bancos")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p = sub.add_parser("clonar")
+    p.add_argument("arquivo")
+    p.add_argument("nome")
+    p.add_argument("--origem", default=DATABASE)
+    p = sub.add_parser("sincronizar")
+    p.add_argument("banco_a")
+    p.add_argument("banco_b")
+    p = sub.add_parser("exportar")
+    p.add_argument("banco")
+    p.add_argument("destino")
+    p.add_argument("lote")
+    p.add_argument("--desde", type=int)
+    p = sub.add_parser("aplicar")
+    p.add_argument("banco")
+    p.add_argument("lote")
+    sub.add_parser("situacao").add_argument("banco")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.comando == "clonar":
+            c = clonar(args.arquivo, args.nome, args.origem)
+            print(f"{args.arquivo}: nó '{c['no']}' clonado de '{c['origem']}' no seq {c['seq']}; "
+                  f"novos produtos a partir do id {c['primeiro_id']}")
+        elif args.comando == "sincronizar":
+            r = sincronizar(args.banco_a, args.banco_b)
+            _imprimir_aplicacao(f"{args.banco_a} -> {args.banco_b} ({r['bytes']['a_para_b']} bytes)", r["a_para_b"])
+            _imprimir_aplicacao(f"{args.banco_b} -> {args.banco_a} ({r['bytes']['b_para_a']} bytes)", r["b_para_a"])
+            print("tempos: " + ", ".join(f"{k}={v * 1000:.1f}ms" for k, v in r["tempos"].items()))
+        elif args.comando == "exportar":
+            dados = exportar_lote(args.destino, args.banco, args.desde)
+            with open(args.lote, "wb") as f:
+                f.write(dados)
+            print(f"{args.lote}: {len(dados)} bytes")
+        elif args.comando == "aplicar":
+            with open(args.lote, "rb") as f:
+                _imprimir_aplicacao(args.lote, aplicar_lote(f.read(), args.banco))
+        elif args.comando == "situacao":
+            s = situacao(args.banco)
+            print(f"nó '{s['no']}', seq {s['seq']}")
+            for par in s["pares"]:
+                print(f"  {par['no']}: recebido até {par['recebido_ate']}, confirmado até {par['confirmado_ate']}, "
+                      f"{par['pendentes']} pendente(s), última troca {par['atualizado_em'] or '-'}")
+    except ValueError as e:
+        print(f"erro: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
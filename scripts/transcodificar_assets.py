@@ -0,0 +1,49 @@
+"""
+Converte as fotos existentes em assets/ para WebP compacto (utils/imagens.py).
+
+Uso (na raiz do projeto):
+    python -m scripts.transcodificar_assets                 # só relatório (dry-run)
+    python -m scripts.transcodificar_assets --aplicar       # grava e atualiza produtos.foto
+    python -m scripts.transcodificar_assets --aplicar --remover-originais
+"""
+
+import argparse
+import time
+
+from utils.imagens import migrar_assets, LADO_MAXIMO, QUALIDADE
+
+
+def _mb(n):
+    return f"{n / 1024 / 1024:.1f} MB"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Transcodifica as fotos de produtos para WebP")
+    parser.add_argument("--aplicar", action="store_true", help="grava os arquivos e reescreve as referências")
+    parser.add_argument("--remover-originais", action="store_true")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--lado", type=int, default=LADO_MAXIMO)
+    parser.add_argument("--qualidade", type=int, default=QUALIDADE)
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    r = migrar_assets(aplicar=args.aplicar, workers=args.workers, remover_originais=args.remover_originais,
+                      lado_maximo=args.lado, qualidade=args.qualidade)
+    duracao = time.perf_counter() - inicio
+
+    economia = r["bytes_antes"] - r["bytes_depois"]
+    pct = 100 * economia / r["bytes_antes"] if r["bytes_antes"] else 0
+    print("APLICADO" if args.aplicar else "DRY-RUN (nada foi gravado)")
+    print(f"  arquivos referenciados: {r['arquivos']}")
+    print(f"  convertíveis:           {r['convertidos']}")
+    print(f"  tamanho:                {_mb(r['bytes_antes'])} -> {_mb(r['bytes_depois'])} "
+          f"(-{_mb(economia)}, {pct:.0f}%)")
+    if args.aplicar:
+        print(f"  referências atualizadas: {r['referencias_atualizadas']}")
+    for nome, motivo in r["ignorados"]:
+        print(f"  ignorado: {nome} ({motivo})")
+    print(f"  tempo: {duracao:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+# ====================================================================
+# ARQUIVO: tests/conftest.py
+# Ambiente isolado para os testes
+# ====================================================================
+#
+# utils.database cria data/, assets/ e o banco principal relativos ao
+# diretório atual já no import; por isso os testes rodam numa pasta
+# temporária, antes de qualquer import do projeto, e nunca tocam o
+# data/estoque.db de verdade.
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+os.chdir(tempfile.mkdtemp(prefix="estoque-testes-"))
+os.environ.setdefault("ESTOQUE_SESSAO_CHAVE", "chave-dos-testes")
+
+from utils import database as db  # noqa: E402
+
+
+@pytest.fixture
+def loja(tmp_path):
+    """Banco vazio, em uso durante o teste; devolve o caminho."""
+    caminho = str(tmp_path / "loja.db")
+    with db.banco(caminho):
+        db.create_tables()
+        yield caminho
+        db.flush_auditoria()
+
+
+@pytest.fixture
+def novo_produto(loja):
+    """Fábrica: cadastra um produto no banco do teste e devolve o id."""
+    contador = iter(range(1, 10_000))
+
+    def criar(nome=None, preco=10.0, quantidade=5, marca="Natura", estilo="Perfumaria", tipo="Perfume",
+              data_validade=None, sku=None):
+        n = next(contador)
+        return db.add_produto(nome or f"Produto {n}", preco, quantidade, marca, estilo, tipo,
+                              data_validade=data_validade, sku=sku)
+
+    return criar
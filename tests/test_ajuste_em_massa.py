@@ -0,0 +1,59 @@
+import pytest
+
+from utils import database as db
+
+
+def _campo(pid, campo):
+    return db.get_produto_by_id(pid)[campo]
+
+
+def test_ajuste_percentual_so_nos_filtrados(novo_produto):
+    natura = novo_produto(preco=10.0, marca="Natura")
+    outra = novo_produto(preco=10.0, marca="Eudora")
+
+    ajuste_id, afetados = db.aplicar_ajuste_em_massa("preco", "percentual", 10, marca="Natura")
+
+    assert afetados == 1
+    assert (_campo(natura, "preco"), _campo(outra, "preco")) == (11.0, 10.0)
+    assert db.get_ajustes_em_massa()[0]["id"] == ajuste_id
+
+
+def test_operacao_invalida():
+    with pytest.raises(ValueError):
+        db.aplicar_ajuste_em_massa("quantidade", "percentual", 10)
+
+
+def test_estoque_nao_fica_negativo(novo_produto):
+    pid = novo_produto(quantidade=2)
+    db.aplicar_ajuste_em_massa("quantidade", "somar", -5)
+    assert _campo(pid, "quantidade") == 0
+
+
+def test_desfazer_preco_preserva_edicoes_posteriores(novo_produto):
+    intocado = novo_produto(preco=10.0)
+    editado = novo_produto(preco=20.0)
+    ajuste_id, _ = db.aplicar_ajuste_em_massa("preco", "somar", 5)
+    p = db.get_produto_by_id(editado)
+    db.update_produto(editado, p["nome"], 99.0, p["quantidade"], p["marca"], p["estilo"], p["tipo"],
+                      p["foto"], p["data_validade"])
+
+    assert db.desfazer_ajuste_em_massa(ajuste_id) == 1
+    assert (_campo(intocado, "preco"), _campo(editado, "preco")) == (10.0, 99.0)
+
+
+def test_desfazer_estoque_devolve_o_delta_e_mantem_vendas(novo_produto):
+    pid = novo_produto(quantidade=5)
+    ajuste_id, _ = db.aplicar_ajuste_em_massa("quantidade", "somar", 10)
+    db.mark_produto_as_sold(pid, 3)
+
+    db.desfazer_ajuste_em_massa(ajuste_id)
+
+    assert _campo(pid, "quantidade") == 2
+
+
+def test_desfazer_duas_vezes(novo_produto):
+    novo_produto()
+    ajuste_id, _ = db.aplicar_ajuste_em_massa("preco", "definir", 1)
+    db.desfazer_ajuste_em_massa(ajuste_id)
+    with pytest.raises(ValueError):
+        db.desfazer_ajuste_em_massa(ajuste_id)
@@ -0,0 +1,69 @@
+import pytest
+
+from utils import analises
+from utils import database as db
+
+
+@pytest.fixture(autouse=True)
+def cache_limpo():
+    analises.limpar_cache()
+    yield
+    analises.limpar_cache()
+
+
+def test_valor_por_categoria_ordena_pelo_valor(novo_produto):
+    novo_produto(preco=10.0, quantidade=2, marca="Natura")
+    novo_produto(preco=50.0, quantidade=3, marca="Boticário")
+    novo_produto(preco=20.0, quantidade=0, marca="Eudora")
+    r = analises.valor_por_categoria("marca")
+    assert list(r["marca"]) == ["Boticário", "Natura"]
+    assert list(r["valor"]) == [150.0, 20.0]
+    assert r["participacao"].sum() == pytest.approx(100.0)
+    assert r.iloc[0]["preco_medio"] == 50.0
+    with pytest.raises(ValueError):
+        analises.valor_por_categoria("cor")
+
+
+def test_idade_separa_nunca_vendidos(novo_produto):
+    vendido = novo_produto(quantidade=3)
+    novo_produto(quantidade=4)
+    db.mark_produto_as_sold(vendido, 1)
+    r = analises.idade_estoque().set_index("faixa")
+    assert r.loc["até 30 dias", "unidades"] == 2
+    assert r.loc["nunca vendido", "unidades"] == 4
+    assert r.loc["mais de 180 dias", "produtos"] == 0
+
+
+def test_giro_usa_as_vendas_da_auditoria(novo_produto):
+    pid = novo_produto(nome="Kaiak", quantidade=6, marca="Natura")
+    novo_produto(nome="Parado", quantidade=6, marca="Eudora")
+    db.mark_produto_as_sold(pid, 2)
+    r = analises.giro(dias=30).set_index("nome")
+    assert r.loc["Kaiak", "vendidas"] == 2
+    assert r.loc["Kaiak", "giro"] == pytest.approx(2 / (4 + 1))
+    assert r.loc["Kaiak", "dias_cobertura"] == pytest.approx(4 / (2 / 30))
+    assert r.loc["Parado", "giro"] == 0
+    por_marca = analises.giro(dias=30, dimensao="marca").set_index("marca")
+    assert por_marca.loc["Natura", "vendidas"] == 2
+
+
+def test_distribuicao_de_precos_por_faixa(novo_produto):
+    novo_produto(preco=10.0, quantidade=1, tipo="Perfume")
+    novo_produto(preco=30.0, quantidade=2, tipo="Perfume")
+    novo_produto(preco=300.0, quantidade=1, tipo="Creme")
+    faixas, estat = analises.distribuicao_precos([0, 25, 100, float("inf")])
+    assert list(faixas["faixa"]) == ["R$ 0–25", "R$ 25–100", "acima de R$ 100"]
+    assert list(faixas["produtos"]) == [1, 1, 1]
+    assert list(faixas["valor"]) == [10.0, 60.0, 300.0]
+    estat = estat.set_index("tipo")
+    assert estat.loc["Perfume", "mediana"] == 20.0
+
+
+def test_cache_acompanha_a_versao_dos_dados(novo_produto):
+    novo_produto(preco=10.0, quantidade=1, marca="Natura")
+    primeiro = analises.valor_por_categoria("marca")
+    assert analises.valor_por_categoria("marca") is primeiro
+    novo_produto(preco=10.0, quantidade=1, marca="Natura")
+    depois = analises.valor_por_categoria("marca")
+    assert depois is not primeiro
+    assert depois.iloc[0]["unidades"] == 2
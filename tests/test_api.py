@@ -0,0 +1,104 @@
+import http.client
+import json
+import sqlite3
+import threading
+from datetime import date, timedelta
+
+import pytest
+
+import api
+from utils import database as db
+
+
+@pytest.fixture
+def servidor():
+    """API numa porta livre, sobre o banco principal (da pasta temporária) sem produtos."""
+    conn = sqlite3.connect(db.DATABASE)
+    conn.execute("DELETE FROM produtos")
+    conn.commit()
+    conn.close()
+    srv = api.criar_servidor("127.0.0.1", 0, workers=2)
+    threading.Thread(target=srv.serve_forever, args=(0.05,), daemon=True).start()
+    yield srv.server_address[1]
+    srv.shutdown()
+    srv.server_close()
+    db.flush_auditoria()
+
+
+def _pedir(porta, metodo, caminho, corpo=None, **cabecalhos):
+    conn = http.client.HTTPConnection("127.0.0.1", porta, timeout=5)
+    dados = json.dumps(corpo).encode() if corpo is not None else None
+    if dados is not None:
+        cabecalhos["Content-Length"] = str(len(dados))
+    conn.request(metodo, caminho, body=dados, headers=cabecalhos)
+    resp = conn.getresponse()
+    texto = resp.read()
+    conn.close()
+    return resp.status, resp.getheader("ETag"), json.loads(texto) if texto else None
+
+
+def _produto(nome, **kw):
+    return db.add_produto(nome, kw.get("preco", 10.0), kw.get("quantidade", 5), "Natura", "Perfumaria", "Perfume",
+                          data_validade=kw.get("data_validade"), sku=kw.get("sku"))
+
+
+def test_paginacao_por_chave_percorre_tudo(servidor):
+    ids = [_produto(f"P{n}") for n in range(5)]
+
+    vistos, apos = [], ""
+    while True:
+        status, _, dados = _pedir(servidor, "GET", f"/produtos?limit=2{apos}")
+        assert status == 200
+        vistos += [p["id"] for p in dados["itens"]]
+        if dados["proximo"] is None:
+            break
+        apos = f"&after={dados['proximo']}"
+
+    assert vistos == ids
+
+
+def test_etag_devolve_304_ate_os_dados_mudarem(servidor):
+    pid = _produto("P")
+    _, etag, _ = _pedir(servidor, "GET", f"/produtos/{pid}")
+
+    assert _pedir(servidor, "GET", f"/produtos/{pid}", **{"If-None-Match": etag})[0] == 304
+    db.mark_produto_as_sold(pid, 1)
+    assert _pedir(servidor, "GET", f"/produtos/{pid}", **{"If-None-Match": etag})[0] == 200
+
+
+def test_etag_de_validade_muda_na_virada_do_dia(servidor, monkeypatch):
+    _produto("P", data_validade=(date.today() + timedelta(days=1)).isoformat())
+    _, etag, _ = _pedir(servidor, "GET", "/validade")
+    assert _pedir(servidor, "GET", "/validade", **{"If-None-Match": etag})[0] == 304
+
+    class Amanha(date):
+        @classmethod
+        def today(cls):
+            return date.today() + timedelta(days=1)
+
+    monkeypatch.setattr(api, "date", Amanha)
+    status, novo_etag, _ = _pedir(servidor, "GET", "/validade", **{"If-None-Match": etag})
+    assert status == 200 and novo_etag != etag
+
+
+def test_vendas_por_id_e_sku(servidor):
+    a = _produto("A", quantidade=2)
+    _produto("B", quantidade=1, sku="789100")
+
+    status, _, dados = _pedir(servidor, "POST", "/vendas", {"itens": [
+        {"id": a, "quantidade": 2}, {"sku": "789100"}, {"sku": "000"},
+    ]})
+
+    assert status == 200
+    assert dados["vendidos"] == 2 and not dados["ok"]
+    assert dados["resultados"][-1]["erro"] == "Código de barras não cadastrado"
+
+
+@pytest.mark.parametrize("itens", [[], ["12"], [None], [{"id": [1]}], [{"sku": {"x": 1}}], [{"quantidade": 1}]])
+def test_vendas_com_item_malformado_e_400(servidor, itens):
+    status, _, dados = _pedir(servidor, "POST", "/vendas", {"itens": itens})
+    assert status == 400 and dados["erro"]
+
+
+def test_loja_inexistente_e_404(servidor):
+    assert _pedir(servidor, "GET", "/saude", **{"X-Loja": "nao-existe"})[0] == 404
@@ -0,0 +1,88 @@
+import os
+import sqlite3
+
+import pytest
+from PIL import Image
+
+from utils import aquecimento
+from utils import database as db
+from utils.imagens import caminho_miniatura
+
+
+@pytest.fixture
+def relatorio_novo(monkeypatch):
+    """Relatório e thread do processo zerados (o aquecimento roda uma vez por processo)."""
+    monkeypatch.setattr(aquecimento, "_relatorio", {"iniciado_em": None, "concluido_em": None, "etapas": []})
+    monkeypatch.setattr(aquecimento, "_thread", None)
+
+
+@pytest.fixture
+def com_fotos():
+    """Produtos do banco principal com fotos reais em assets/ (None: sem foto); apagados no fim."""
+    ids = []
+
+    def cadastrar(*fotos):
+        for foto in fotos:
+            if foto:
+                Image.new("RGB", (800, 600), "purple").save(os.path.join(db.ASSETS_DIR, foto))
+            ids.append(db.add_produto(f"Aq {foto}", 10.0, 5, "Natura", "Perfumaria", "Perfume", foto=foto))
+        return ids
+
+    yield cadastrar
+    conn = sqlite3.connect(db.DATABASE)
+    conn.executemany("DELETE FROM produtos WHERE id=?", [(i,) for i in ids])
+    conn.commit()
+    conn.close()
+    db.flush_auditoria()
+
+
+def test_mais_vendidos_primeiro_sem_repetir(com_fotos):
+    _, vendido, _, sem_foto = com_fotos("aq-a.png", "aq-z.png", "aq-m.png", None)
+    db.mark_produto_as_sold(vendido, 1)
+    for _ in range(3):  # o mais vendido não tem foto: não pode tomar a vaga
+        db.mark_produto_as_sold(sem_foto, 1)
+    db.flush_auditoria()
+
+    fotos = aquecimento.mais_vistos()
+
+    assert fotos[0] == "aq-z.png"
+    assert {"aq-a.png", "aq-m.png"} <= set(fotos)
+    assert len(fotos) == len(set(fotos))
+    assert aquecimento.mais_vistos(limite=1) == ["aq-z.png"]
+
+
+def test_etapas_cronometradas_e_erros_registrados(relatorio_novo, monkeypatch):
+    def quebra():
+        raise RuntimeError("disco sumiu")
+
+    monkeypatch.setattr(aquecimento, "_ETAPAS", (("ok", lambda: {"n": 1}), ("quebra", quebra)))
+
+    aquecimento._executar()
+
+    rel = aquecimento.relatorio_aquecimento()
+    assert [(e["etapa"], e["detalhes"], e["erro"]) for e in rel["etapas"]] == [
+        ("ok", {"n": 1}, None), ("quebra", None, "disco sumiu")]
+    assert rel["concluido_em"] >= rel["iniciado_em"]
+
+
+def test_dispara_uma_vez_por_processo(relatorio_novo, monkeypatch):
+    monkeypatch.setattr(aquecimento, "_ETAPAS", (("ok", lambda: None),))
+
+    assert aquecimento.iniciar_aquecimento()
+    assert not aquecimento.iniciar_aquecimento()
+    aquecimento._thread.join(timeout=10)
+
+    assert [e["etapa"] for e in aquecimento.relatorio_aquecimento()["etapas"]] == ["ok"]
+
+
+def test_aquecimento_completo(relatorio_novo, com_fotos):
+    com_fotos("aq-completo.png")
+
+    aquecimento._executar()
+
+    etapas = {e["etapa"]: e for e in aquecimento.relatorio_aquecimento()["etapas"]}
+    assert list(etapas) == ["arquivos", "banco", "consultas", "miniaturas"]
+    assert all(e["erro"] is None for e in etapas.values())
+    assert etapas["banco"]["detalhes"]["bytes"] > 0
+    assert etapas["consultas"]["detalhes"]["principal"] >= 1
+    assert os.path.exists(caminho_miniatura("aq-completo.png"))
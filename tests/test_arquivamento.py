@@ -0,0 +1,52 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+from utils import database as db
+
+
+def _envelhecer(caminho, pid, coluna, dias):
+    conn = sqlite3.connect(caminho)
+    conn.execute(f"UPDATE produtos SET {coluna}=? WHERE id=?", ((datetime.now() - timedelta(days=dias)).isoformat(), pid))
+    conn.commit()
+    conn.close()
+
+
+def _ids_ativos():
+    return {p["id"] for p in db.get_all_produtos()}
+
+
+def test_recem_cadastrado_sem_estoque_nao_e_arquivado(novo_produto):
+    pid = novo_produto(quantidade=0)
+    assert db.arquivar_produtos(90) == 0
+    assert pid in _ids_ativos()
+
+
+def test_nunca_vendido_conta_da_data_de_cadastro(loja, novo_produto):
+    pid = novo_produto(quantidade=0)
+    _envelhecer(loja, pid, "cadastrado_em", 100)
+    assert db.arquivar_produtos(90) == 1
+    assert pid not in _ids_ativos()
+
+
+def test_vendido_recentemente_fica(loja, novo_produto):
+    pid = novo_produto(quantidade=0)
+    _envelhecer(loja, pid, "cadastrado_em", 400)
+    _envelhecer(loja, pid, "data_ultima_venda", 10)
+    assert db.arquivar_produtos(90) == 0
+
+
+def test_com_estoque_nunca_e_arquivado(loja, novo_produto):
+    pid = novo_produto(quantidade=1)
+    _envelhecer(loja, pid, "cadastrado_em", 400)
+    assert db.arquivar_produtos(90) == 0
+
+
+def test_restaurar_mantem_id_e_recomeca_o_prazo(loja, novo_produto):
+    pid = novo_produto(quantidade=0)
+    _envelhecer(loja, pid, "cadastrado_em", 100)
+    db.arquivar_produtos(90)
+
+    db.restaurar_produto(pid)
+
+    assert pid in _ids_ativos()
+    assert db.arquivar_produtos(90) == 0
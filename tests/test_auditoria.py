@@ -0,0 +1,69 @@
+import sqlite3
+
+import pytest
+
+from utils import database as db
+
+
+def _linhas(caminho):
+    conn = sqlite3.connect(caminho)
+    try:
+        return conn.execute("SELECT acao, usuario FROM auditoria ORDER BY id").fetchall()
+    finally:
+        conn.close()
+
+
+def test_registros_ficam_no_buffer_ate_o_flush(loja, novo_produto):
+    db.flush_auditoria()
+    novo_produto()
+    assert _linhas(loja) == []
+
+    db.flush_auditoria()
+
+    assert _linhas(loja) == [("criar", None)]
+
+
+def test_edicao_guarda_so_os_campos_alterados(loja, novo_produto):
+    pid = novo_produto(preco=10.0)
+    p = db.get_produto_by_id(pid)
+    db.update_produto(pid, p["nome"], 12.5, p["quantidade"], p["marca"], p["estilo"], p["tipo"], p["foto"],
+                      p["data_validade"], usuario="ana")
+
+    registro = db.get_auditoria(usuario="ana", acao="editar")[0]
+
+    assert registro["produto_id"] == pid
+    assert registro["detalhes"] == {"diff": {"preco": [10.0, 12.5]}}
+
+
+def test_filtros_por_produto(loja, novo_produto):
+    a = novo_produto()
+    novo_produto()
+    db.mark_produto_as_sold(a, 1, usuario="bia")
+
+    assert [r["acao"] for r in db.get_auditoria(produto_id=a)] == ["venda", "criar"]
+    assert db.get_auditoria_usuarios() == ["bia"]
+
+
+@pytest.mark.parametrize("sql", ["UPDATE auditoria SET acao = 'x'", "DELETE FROM auditoria"])
+def test_auditoria_e_somente_insercao(loja, novo_produto, sql):
+    novo_produto()
+    db.flush_auditoria()
+    conn = sqlite3.connect(loja)
+    with pytest.raises(sqlite3.DatabaseError, match="somente inserção"):
+        conn.execute(sql)
+    conn.close()
+    assert len(_linhas(loja)) == 1
+
+
+def test_registro_vai_para_o_banco_onde_a_escrita_aconteceu(loja, tmp_path, monkeypatch):
+    (tmp_path / "outra").mkdir()
+    monkeypatch.chdir(tmp_path / "outra")
+    with db.banco("relativo.db"):  # como o DATABASE padrão
+        db.create_tables()
+        db.add_produto("Na outra", 10.0, 1, "Natura", "Perfumaria", "Perfume")
+    monkeypatch.chdir(tmp_path)  # o flush da saída do processo pode vir de outro diretório
+
+    db.flush_auditoria()
+
+    assert _linhas(str(tmp_path / "outra" / "relativo.db")) == [("criar", None)]
+    assert _linhas(loja) == []
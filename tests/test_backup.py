@@ -0,0 +1,79 @@
+import gzip
+import os
+import sqlite3
+
+import pytest
+
+from utils import backup
+from utils import database as db
+
+
+@pytest.fixture
+def foto():
+    """Foto em assets/ referenciada por um produto do banco principal."""
+    nome = "teste-backup.jpg"
+    caminho = os.path.join(db.ASSETS_DIR, nome)
+    with open(caminho, "wb") as f:
+        f.write(b"A" * 100)
+    pid = db.add_produto("Com foto", 10.0, 1, "Natura", "Perfumaria", "Perfume", foto=nome)
+    yield caminho
+    conn = sqlite3.connect(db.DATABASE)
+    conn.execute("DELETE FROM produtos WHERE id=?", (pid,))
+    conn.commit()
+    conn.close()
+    db.flush_auditoria()
+
+
+def test_copia_pausa_entre_os_passos(tmp_path, monkeypatch):
+    origem = str(tmp_path / "origem.db")
+    conn = sqlite3.connect(origem)
+    conn.execute("CREATE TABLE t (x BLOB)")
+    conn.executemany("INSERT INTO t VALUES (?)", [(os.urandom(4000),) for _ in range(50)])
+    conn.commit()
+    conn.close()
+    pausas = []
+    monkeypatch.setattr(backup.time, "sleep", pausas.append)
+
+    passos = backup._copiar_banco_online(origem, str(tmp_path / "copia.db"), 5, 0.01)
+
+    assert passos > 1
+    assert pausas == [0.01] * (passos - 1)  # nenhuma depois do último
+
+
+def test_verificar_acusa_banco_corrompido():
+    nome = backup.criar_backup(pausa=0)["nome"]
+    with gzip.open(os.path.join(backup.BACKUP_DIR, nome, "estoque.db.gz"), "wb") as f:
+        f.write(b"lixo")
+
+    ok, problemas = backup.verificar_backup(nome)
+
+    assert not ok
+    with pytest.raises(ValueError):
+        backup.restaurar_backup(nome)
+
+
+def test_foto_do_mesmo_tamanho_trocada_e_copiada_de_novo(foto):
+    primeiro = backup.criar_backup(pausa=0)
+    assert primeiro["assets_novos"] >= 1
+    assert backup.criar_backup(pausa=0)["assets_novos"] == 0
+
+    with open(foto, "wb") as f:
+        f.write(b"B" * 100)
+    os.utime(foto, ns=(os.stat(foto).st_atime_ns, os.stat(foto).st_mtime_ns + 10**9))
+    segundo = backup.criar_backup(pausa=0)
+
+    assert segundo["assets_novos"] == 1
+    with open(os.path.join(backup.ASSETS_BACKUP_DIR, os.path.basename(foto)), "rb") as f:
+        assert f.read() == b"B" * 100
+
+
+def test_restaurar_devolve_banco_e_fotos_apagadas(foto):
+    pid = db.add_produto("Antes do backup", 10.0, 7, "Natura", "Perfumaria", "Perfume")
+    nome = backup.criar_backup(pausa=0)["nome"]
+    db.mark_produto_as_sold(pid, 7)
+    os.remove(foto)
+
+    resultado = backup.restaurar_backup(nome)
+
+    assert resultado["imagens_restauradas"] == 1 and os.path.exists(foto)
+    assert db.get_produto_by_id(pid)["quantidade"] == 7
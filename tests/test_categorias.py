@@ -0,0 +1,46 @@
+import pytest
+
+from utils import categorias
+from utils.categorias import IndiceCategorias, normalizar
+
+
+def test_normalizar_tira_acento_pontuacao_e_caixa():
+    assert normalizar("  O Boticário!! ") == "o boticario"
+    assert normalizar(None) == ""
+
+
+@pytest.mark.parametrize("campo, texto, esperado", [
+    ("marca", "boticario", "O Boticário"),
+    ("marca", "o  BOTICÁRIO", "O Boticário"),
+    ("marca", "oui", "Oui-Original-Unique-Individuel"),
+    ("marca", "mary", "Mary Kay"),
+    ("marca", "eudra", "Eudora"),
+    ("tipo", "perfumaria masc", "Perfumaria masculina"),
+])
+def test_resolver_aproximado(campo, texto, esperado):
+    assert categorias.resolver(campo, texto) == esperado
+
+
+@pytest.mark.parametrize("campo, texto", [
+    ("estilo", "corpo"),  # "Corpo e Banho" x "Cuidados com o Corpo"
+    ("tipo", "body"),  # "Body spray" x "Body splash"
+    ("marca", "xyz"),
+    ("marca", ""),
+])
+def test_ambiguo_ou_desconhecido_nao_resolve(campo, texto):
+    assert categorias.resolver(campo, texto) is None
+
+
+def test_sugestoes_listam_os_mais_parecidos():
+    assert categorias.sugestoes("tipo", "body", k=2) == "Body spray, Body splash"
+
+
+def test_indice_acha_token_identico_sem_trigrama_em_comum():
+    indice = IndiceCategorias(["Kits e Presentes", "Casa"])
+    assert indice.best_matches("kits", k=1)[0][0] == "Kits e Presentes"
+
+
+def test_empate_exige_margem():
+    indice = IndiceCategorias(["Creme Facial", "Creme Corporal"])
+    assert indice.resolver("creme") is None
+    assert indice.resolver("creme fac") == "Creme Facial"
@@ -0,0 +1,67 @@
+import gc
+import sqlite3
+
+from utils import chat_historico as ch
+from utils import database as db
+
+
+def _gravadas(caminho, sessao):
+    conn = sqlite3.connect(caminho)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM chat_log WHERE sessao=?", (sessao,)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_grava_em_lotes(loja):
+    h = ch.HistoricoChat("ana")
+    for i in range(ch.TAMANHO_LOTE - 1):
+        h.append("user", f"m{i}")
+    assert _gravadas(loja, h.sessao) == 0
+    h.append("user", "fecha o lote")
+    assert _gravadas(loja, h.sessao) == ch.TAMANHO_LOTE
+
+
+def test_pendentes_gravadas_quando_a_sessao_termina(loja):
+    h = ch.HistoricoChat("ana")
+    sessao = h.sessao
+    for i in range(3):
+        h.append("user", f"m{i}")
+    del h
+    gc.collect()
+    assert _gravadas(loja, sessao) == 3
+
+
+def test_descarregar_paradas_grava_fila_ociosa(loja):
+    h = ch.HistoricoChat("ana")
+    h.append("user", "sozinha")
+    assert ch.descarregar_paradas(idade=60) == 0
+    assert ch.descarregar_paradas(idade=0) == 1
+    assert _gravadas(loja, h.sessao) == 1
+
+
+def test_anteriores_em_ordem_e_com_limite(loja):
+    h = ch.HistoricoChat("ana", max_em_memoria=ch.MAX_EM_MEMORIA)
+    total = ch.MAX_ANTIGAS + ch.MAX_EM_MEMORIA + 50
+    for i in range(total):
+        h.append("user", str(i))
+    while h.tem_anteriores():
+        h.carregar_anteriores()
+
+    seqs = [m["seq"] for m in h]
+    assert len(h.antigas) == ch.MAX_ANTIGAS
+    assert seqs == list(range(total - len(seqs) + 1, total + 1))
+
+
+def test_fila_grava_no_banco_certo_mesmo_mudando_de_diretorio(tmp_path, monkeypatch):
+    (tmp_path / "loja").mkdir()
+    monkeypatch.chdir(tmp_path / "loja")
+    with db.banco("relativo.db"):  # como o DATABASE padrão, "data/estoque.db"
+        db.create_tables()
+        h = ch.HistoricoChat("ana")
+    h.append("user", "oi")
+    monkeypatch.chdir(tmp_path)  # a saída do processo pode acontecer em outro diretório
+
+    h.flush()
+
+    assert _gravadas(str(tmp_path / "loja" / "relativo.db"), h.sessao) == 1
@@ -0,0 +1,72 @@
+import os
+import sqlite3
+
+import pytest
+
+from utils import database as db
+from utils.comandos import ErroComando, parse_itens_venda, parse_lote_produtos, parse_produto
+from utils.sessoes import emitir_token
+
+PAGINAS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "pages")
+
+
+def test_itens_de_venda_somam_ids_repetidos():
+    assert parse_itens_venda("12x3, 15*1, #18\n12") == [(12, 4), (15, 1), (18, 1)]
+
+
+@pytest.mark.parametrize("texto", ["", "12x0", "abc", "12x"])
+def test_itens_de_venda_invalidos(texto):
+    with pytest.raises(ErroComando):
+        parse_itens_venda(texto)
+
+
+def test_produto_completo_com_categorias_aproximadas():
+    produto = parse_produto('"Kaiak"; 59,90; 10; o boticario; perfumaria; perfumaria masculina; 31/12/2030; 789100')
+
+    assert produto == {
+        "nome": "Kaiak", "preco": 59.9, "quantidade": 10, "marca": "O Boticário", "estilo": "Perfumaria",
+        "tipo": "Perfumaria masculina", "data_validade": "2030-12-31", "sku": "789100",
+    }
+
+
+def test_nome_entre_aspas_pode_ter_ponto_e_virgula():
+    produto = parse_produto('"Kit; Dia dos Pais"; 99,90; 2; Natura; Kits e Presentes; Kits e looks')
+    assert produto["nome"] == "Kit; Dia dos Pais"
+    assert produto["preco"] == 99.9
+
+
+@pytest.mark.parametrize("linha, trecho", [
+    ('"A"; 10; 1; Natura; Perfumaria', "Formato"),
+    ('"A"; 0; 1; Natura; Perfumaria; Body splash', "Preço inválido"),
+    ('"A"; 10; -1; Natura; Perfumaria; Body splash', "Quantidade inválida"),
+    ('"A"; 10; 1; Marca Nenhuma; Perfumaria; Body splash', "Marca não reconhecido"),
+    ('"A"; 10; 1; Natura; Perfumaria; Body splash; 99/99/2030', "Validade inválida"),
+])
+def test_produto_invalido_explica_o_erro(linha, trecho):
+    with pytest.raises(ErroComando, match=trecho):
+        parse_produto(linha)
+
+
+def test_lote_um_produto_por_linha_ou_barra():
+    texto = ('adicionar "A"; 10; 1; Natura; Perfumaria; Body splash\n'
+             '"B"; 20; 2; Avon; Perfumaria; Body splash | adicionar "C"; 30; 3; Eudora; Perfumaria; Body splash')
+    assert [p["nome"] for p in parse_lote_produtos(texto)] == ["A", "B", "C"]
+
+
+def test_chat_cadastra_produto_com_ajuda_no_nome():
+    from streamlit.testing.v1 import AppTest
+
+    db.add_user("chat", "senha", "admin")
+    at = AppTest.from_file(os.path.join(PAGINAS, "chat_comando.py"), default_timeout=30)
+    at.session_state["logged_in"] = True
+    at.session_state["username"] = "chat"
+    at.session_state["role"] = "admin"
+    at.session_state["sessao"] = emitir_token("chat")
+    at.run()
+    at.chat_input[0].set_value('adicionar "Kit Ajuda"; 10; 1; Natura; Perfumaria; Body splash').run()
+
+    assert not at.exception
+    conn = sqlite3.connect(db.DATABASE)
+    assert conn.execute("SELECT COUNT(*) FROM produtos WHERE nome = 'Kit Ajuda'").fetchone()[0] == 1
+    conn.close()
+    db.flush_auditoria()
@@ -0,0 +1,111 @@
+import os
+import sqlite3
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from utils import database as db
+from utils import duplicatas
+from utils.limpeza_imagens import QUARENTENA_DIR
+
+
+def _foto(semente, tamanho=256):
+    """Imagem de blocos grandes: os hashes sobrevivem a redimensionar e recomprimir."""
+    blocos = np.random.default_rng(semente).integers(0, 256, (8, 8, 3), dtype=np.uint8)
+    return Image.fromarray(blocos).resize((tamanho, tamanho), Image.NEAREST)
+
+
+def _gravar(nome, imagem, **opcoes):
+    imagem.save(os.path.join(db.ASSETS_DIR, nome), **opcoes)
+
+
+def _distancia(a, b):
+    """Maior distância de Hamming entre os hashes (dhash, phash) de duas fotos."""
+    return max(bin(x ^ y).count("1") for x, y in zip(a, b))
+
+
+def _grupo_com(grupos, arquivo):
+    return next((g for g in grupos if arquivo in {i["arquivo"] for i in g}), None)
+
+
+@pytest.fixture
+def usadas():
+    """Produtos do banco principal usando as fotos dadas; apagados no fim."""
+    ids = []
+
+    def cadastrar(*fotos):
+        for foto in fotos:
+            ids.append(db.add_produto(f"Com {foto}", 10.0, 1, "Natura", "Perfumaria", "Perfume", foto=foto))
+        return ids
+
+    yield cadastrar
+    conn = sqlite3.connect(db.DATABASE)
+    conn.executemany("DELETE FROM produtos WHERE id=?", [(i,) for i in ids])
+    conn.commit()
+    conn.close()
+    db.flush_auditoria()
+
+
+def test_mesma_foto_recomprimida_tem_hashes_proximos(tmp_path):
+    _foto(1).save(tmp_path / "original.png")
+    _foto(1, 600).save(tmp_path / "maior.jpg", quality=70)
+    _foto(2).save(tmp_path / "outra.png")
+
+    original, maior, outra = (duplicatas.calcular_hashes(tmp_path / n)
+                              for n in ("original.png", "maior.jpg", "outra.png"))
+
+    assert _distancia(original, maior) <= duplicatas.LIMIAR_PADRAO
+    assert _distancia(original, outra) > duplicatas.LIMIAR_PADRAO
+
+
+def test_pares_encadeados_viram_um_grupo(monkeypatch):
+    # 0~1 e 1~2 (3 bits), 0 e 2 a 6 bits, 3 longe de todos
+    dhashes = np.array([0b0, 0b111, 0b111111, (1 << 64) - 1], dtype=np.uint64)
+    phashes = dhashes.copy()
+    i, j = duplicatas.pares_proximos(dhashes, phashes, limiar=3)
+    assert sorted(zip(i.tolist(), j.tolist())) == [(0, 1), (1, 2)]
+    assert duplicatas._agrupar(4, i, j) == [[0, 1, 2]]
+
+    # blocos pequenos dão o mesmo resultado que um bloco só
+    monkeypatch.setattr(duplicatas, "ELEMENTOS_POR_BLOCO", 1)
+    i2, j2 = duplicatas.pares_proximos(dhashes, phashes, limiar=3)
+    assert sorted(zip(i2.tolist(), j2.tolist())) == [(0, 1), (1, 2)]
+
+
+def test_pares_exigem_os_dois_hashes_proximos():
+    dhashes = np.array([0, 1], dtype=np.uint64)
+    phashes = np.array([0, (1 << 64) - 1], dtype=np.uint64)
+    i, _ = duplicatas.pares_proximos(dhashes, phashes)
+    assert len(i) == 0
+
+
+def test_indice_so_recalcula_o_que_mudou():
+    _gravar("dup-indice.png", _foto(10))
+    duplicatas.indexar_assets(workers=1)
+
+    assert duplicatas.indexar_assets(workers=1)["calculados"] == 0
+    os.remove(os.path.join(db.ASSETS_DIR, "dup-indice.png"))
+    assert duplicatas.indexar_assets(workers=1)["removidos"] >= 1
+
+
+def test_encontrar_e_mesclar(usadas):
+    _gravar("dup-a.png", _foto(20))
+    _gravar("dup-a.jpg", _foto(20, 400), quality=80)
+    _gravar("dup-diferente.png", _foto(21))
+    manter, trocar = usadas("dup-a.png", "dup-a.png", "dup-a.jpg")[1:]
+    duplicatas.indexar_assets(workers=1)
+
+    grupos = duplicatas.encontrar_duplicatas()
+    grupo = _grupo_com(grupos, "dup-a.png")
+    assert [i["arquivo"] for i in grupo] == ["dup-a.png", "dup-a.jpg"]
+    assert len(grupo[0]["produtos"]) == 2 and grupo[1]["produtos"][0]["id"] == trocar
+    assert _grupo_com(grupos, "dup-diferente.png") is None
+
+    resultado = duplicatas.mesclar_duplicatas("dup-a.png", ["dup-a.png", "dup-a.jpg"], usuario="ana")
+
+    assert resultado == {"produtos": 1, "quarentena": ["dup-a.jpg"]}
+    assert db.get_produto_by_id(trocar)["foto"] == db.get_produto_by_id(manter)["foto"] == "dup-a.png"
+    assert os.path.exists(os.path.join(QUARENTENA_DIR, "dup-a.jpg"))
+    with pytest.raises(ValueError):
+        duplicatas.mesclar_duplicatas("dup-sumiu.png", ["dup-a.png"])
@@ -0,0 +1,62 @@
+from datetime import date, timedelta
+
+import pytest
+
+from utils import analises
+from utils import database as db
+
+ONTEM = date.today() - timedelta(days=1)
+
+
+def _por_chave(dimensao, dia=None):
+    dia = dia or date.today()
+    return {r["chave"]: r for r in db.get_estoque_diario(dimensao, desde=dia, ate=dia)}
+
+
+def test_fotografia_do_dia_por_dimensao(novo_produto):
+    novo_produto(preco=10.0, quantidade=2, marca="Natura")
+    novo_produto(preco=5.0, quantidade=4, marca="Eudora")
+    novo_produto(preco=99.0, quantidade=0, marca="Avon")
+    db.registrar_estoque_diario()
+    total = _por_chave("total")[""]
+    assert (total["skus"], total["unidades"], total["valor"]) == (2, 6, 40.0)
+    assert set(_por_chave("marca")) == {"Natura", "Eudora"}
+    assert _por_chave("marca")["Eudora"]["valor"] == 20.0
+
+
+def test_rodar_de_novo_no_mesmo_dia_atualiza_e_remove_quem_zerou(novo_produto):
+    natura = novo_produto(quantidade=2, marca="Natura")
+    novo_produto(quantidade=1, marca="Eudora")
+    linhas = db.registrar_estoque_diario()
+    assert db.registrar_estoque_diario() == linhas
+    db.mark_produto_as_sold(natura, 2)
+    db.registrar_estoque_diario()
+    assert set(_por_chave("marca")) == {"Eudora"}
+    assert _por_chave("total")[""]["unidades"] == 1
+    assert len(db.get_estoque_diario("total")) == 1
+
+
+def test_dias_anteriores_ficam_intactos(novo_produto):
+    pid = novo_produto(quantidade=3)
+    db.registrar_estoque_diario(ONTEM)
+    db.mark_produto_as_sold(pid, 1)
+    db.registrar_estoque_diario()
+    serie = [(r["dia"], r["unidades"]) for r in db.get_estoque_diario("total")]
+    assert serie == [(ONTEM.isoformat(), 3), (date.today().isoformat(), 2)]
+    assert db.get_estoque_diario("total", desde=date.today())[0]["unidades"] == 2
+    with pytest.raises(ValueError):
+        db.get_estoque_diario("cor")
+
+
+def test_historico_limita_as_maiores_chaves(novo_produto):
+    for i, valor in enumerate([50.0, 40.0, 30.0, 20.0]):
+        novo_produto(preco=valor, quantidade=1, marca=f"Marca {i}")
+    db.registrar_estoque_diario(ONTEM)
+    db.registrar_estoque_diario()
+    serie = analises.historico_estoque("marca", dias=7, top=2)
+    assert list(serie.columns) == ["Marca 0", "Marca 1"]
+    assert len(serie) == 2
+    total = analises.historico_estoque("total", dias=7, metrica="unidades")
+    assert list(total["Total"]) == [4, 4]
+    with pytest.raises(ValueError):
+        analises.historico_estoque(metrica="lucro")
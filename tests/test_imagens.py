@@ -0,0 +1,96 @@
+import io
+import os
+import sqlite3
+
+import pytest
+from PIL import Image
+
+from utils import database as db
+from utils.imagens import ImagemInvalida, migrar_assets, normalizar_imagem, transcodificar_arquivo
+
+
+def _imagem(formato="PNG", tamanho=(200, 150), **opcoes):
+    """Ruído: sem compressão possível no formato de origem."""
+    saida = io.BytesIO()
+    Image.frombytes("RGB", tamanho, os.urandom(tamanho[0] * tamanho[1] * 3)).save(saida, formato, **opcoes)
+    return saida.getvalue()
+
+
+def _opaco(largura, altura):
+    saida = io.BytesIO()
+    Image.new("RGBA", (largura, altura), (10, 20, 30, 255)).save(saida, "PNG")
+    return saida.getvalue()
+
+
+def _gravar(nome, dados):
+    with open(os.path.join(db.ASSETS_DIR, nome), "wb") as f:
+        f.write(dados)
+
+
+@pytest.fixture
+def com_fotos():
+    """Produtos do banco principal com as fotos dadas; apagados no fim."""
+    ids = []
+
+    def cadastrar(*fotos):
+        for foto in fotos:
+            ids.append(db.add_produto(f"Com {foto}", 10.0, 1, "Natura", "Perfumaria", "Perfume", foto=foto))
+        return ids
+
+    yield cadastrar
+    conn = sqlite3.connect(db.DATABASE)
+    conn.executemany("DELETE FROM produtos WHERE id=?", [(i,) for i in ids])
+    conn.commit()
+    conn.close()
+    db.flush_auditoria()
+
+
+def test_normalizar_reduz_e_tira_alfa_opaco():
+    webp, tamanho = normalizar_imagem(_opaco(2400, 600))
+    assert tamanho == (1200, 300)
+    with Image.open(io.BytesIO(webp)) as im:
+        assert (im.format, im.mode) == ("WEBP", "RGB")
+
+
+@pytest.mark.parametrize("dados", [b"", b"texto qualquer", _imagem()[:100]])
+def test_normalizar_recusa_arquivo_invalido(dados):
+    with pytest.raises(ImagemInvalida):
+        normalizar_imagem(dados)
+
+
+def test_transcodificar_so_mede_sem_destino():
+    _gravar("medir.png", _imagem())
+    res = transcodificar_arquivo("medir.png")
+    assert res["ok"] and res["novo"] is None and 0 < res["bytes_depois"] < res["bytes_antes"]
+    assert not os.path.exists(os.path.join(db.ASSETS_DIR, "medir.webp"))
+
+
+def test_transcodificar_ignora_o_que_nao_fica_menor():
+    _gravar("comprimida.jpg", _imagem("JPEG", (300, 300), quality=5))
+    res = transcodificar_arquivo("comprimida.jpg", "comprimida.webp")
+    assert not res["ok"] and res["erro"] == "resultado não ficou menor"
+    assert not os.path.exists(os.path.join(db.ASSETS_DIR, "comprimida.webp"))
+
+
+def test_migrar_troca_as_referencias_sem_colidir_nomes(com_fotos):
+    _gravar("colisao.png", _imagem())
+    _gravar("colisao.bmp", _imagem("BMP"))
+    a, b = com_fotos("colisao.png", "colisao.bmp")
+
+    relatorio = migrar_assets(aplicar=True, workers=2)
+
+    novas = {db.get_produto_by_id(a)["foto"], db.get_produto_by_id(b)["foto"]}
+    assert novas == {"colisao.webp", "colisao_1.webp"}
+    assert relatorio["referencias_atualizadas"] >= 2
+    assert all(os.path.exists(os.path.join(db.ASSETS_DIR, f)) for f in ("colisao.png", "colisao.bmp"))
+
+
+def test_simulacao_nao_grava_nada(com_fotos):
+    _gravar("simulada.png", _imagem())
+    [pid] = com_fotos("simulada.png")
+
+    relatorio = migrar_assets(aplicar=False, workers=1)
+
+    assert relatorio["referencias_atualizadas"] == 0
+    assert db.get_produto_by_id(pid)["foto"] == "simulada.png"
+    assert not os.path.exists(os.path.join(db.ASSETS_DIR, "simulada.webp"))
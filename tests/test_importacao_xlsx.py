@@ -0,0 +1,64 @@
+import io
+from datetime import datetime
+
+import pytest
+from openpyxl import Workbook
+
+from utils import database as db
+
+
+def _planilha(*linhas):
+    wb = Workbook()
+    for linha in linhas:
+        wb.active.append(list(linha))
+    saida = io.BytesIO()
+    wb.save(saida)
+    saida.seek(0)
+    return saida
+
+
+def test_cabecalho_depois_de_titulo_e_com_aliases(loja):
+    arquivo = _planilha(
+        ["Pedido do fornecedor"],
+        [],
+        ["Descrição do Produto", "Preço Unitário", "Qtde", "Fabricante", "EAN", "Vencimento"],
+        ["Kaiak", "59,90", 3, "Natura", 7891000000001.0, datetime(2030, 12, 31)],
+    )
+
+    resultado = db.import_produtos_from_xlsx_buffer(arquivo)
+
+    assert (resultado["importados"], resultado["recusados"]) == (1, 0)
+    assert resultado["colunas"] == ["data_validade", "marca", "nome", "preco", "quantidade", "sku"]
+    p = db.get_produto_by_sku("7891000000001")
+    assert (p["nome"], p["preco"], p["quantidade"], p["data_validade"]) == ("Kaiak", 59.9, 3, "2030-12-31")
+
+
+def test_linhas_sem_nome_sao_puladas_e_sku_repetido_recusado(loja, novo_produto):
+    novo_produto(sku="789")
+    arquivo = _planilha(
+        ["nome", "preco", "quantidade", "sku"],
+        ["A", 10, 1, "111"],
+        [None, 10, 1, "222"],
+        ["B", 10, 1, "789"],  # já cadastrado
+        ["C", 10, 1, "111"],  # repetido na própria planilha
+        ["D", "abc", "x", None],
+    )
+
+    resultado = db.import_produtos_from_xlsx_buffer(arquivo, tamanho_lote=10)
+
+    assert (resultado["linhas"], resultado["importados"], resultado["recusados"]) == (4, 2, 2)
+    assert [num for num, _ in resultado["erros"]] == [4, 5]
+    assert {p["nome"] for p in db.get_all_produtos()} >= {"A", "D"}
+    assert db.get_produto_by_sku("111")["nome"] == "A"
+
+
+def test_aliases_extras(loja):
+    arquivo = _planilha(["Referência", "Saldo"], ["Perfume X", 4])
+    resultado = db.import_produtos_from_xlsx_buffer(arquivo, aliases={"nome": ["referencia"],
+                                                                      "quantidade": ["saldo"]})
+    assert resultado["importados"] == 1
+
+
+def test_sem_coluna_de_nome(loja):
+    with pytest.raises(ValueError, match="Cabeçalho não encontrado"):
+        db.import_produtos_from_xlsx_buffer(_planilha(["preco", "quantidade"], [10, 1]))
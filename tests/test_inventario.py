@@ -0,0 +1,66 @@
+import io
+
+import pytest
+
+from utils import database as db
+from utils.inventario import calcular_diferencas, ler_arquivo_contagem, resumo_diferencas
+
+
+def test_so_divergencias_ordenadas_pelo_impacto(novo_produto):
+    barato = novo_produto(preco=1.0, quantidade=10)
+    caro = novo_produto(preco=50.0, quantidade=2)
+    certo = novo_produto(quantidade=3)
+
+    df = calcular_diferencas({barato: 4, caro: 3, certo: 3})
+
+    assert df["id"].tolist() == [caro, barato]
+    assert df["diferenca"].tolist() == [1, -6]
+    assert resumo_diferencas(df) == {"itens": 2, "sobras": 1, "faltas": 6, "impacto": 44.0}
+
+
+def test_esperado_da_hora_da_contagem(novo_produto):
+    pid = novo_produto(quantidade=5)
+    db.mark_produto_as_sold(pid, 2)  # vendido depois de contar 5
+    assert calcular_diferencas({pid: 5}, esperados={pid: 5}).empty
+
+
+def test_contagem_completa_zera_nao_contados_da_marca(novo_produto):
+    contado = novo_produto(quantidade=1, marca="Natura")
+    esquecido = novo_produto(quantidade=2, marca="Natura")
+    novo_produto(quantidade=3, marca="Eudora")
+
+    df = calcular_diferencas({contado: 1}, completa=True, marca="Natura")
+
+    assert df[["id", "contado", "diferenca"]].values.tolist() == [[esquecido, 0, -2]]
+
+
+def test_arquivo_csv_soma_repetidos_e_lista_desconhecidos(novo_produto):
+    a = novo_produto(sku="789001")
+    b = novo_produto(sku="789002")
+    csv = "Código de barras;Qtd\n789001;2\n789002;1\n789001;3\n999;4\n789002;abc\n"
+
+    contagens, nao_encontrados = ler_arquivo_contagem(io.BytesIO(csv.encode()), "contagem.csv")
+
+    assert contagens == {a: 5, b: 1}
+    assert nao_encontrados == ["999"]
+
+
+def test_arquivo_por_id(novo_produto):
+    pid = novo_produto()
+    contagens, _ = ler_arquivo_contagem(io.BytesIO(f"id,contado\n{pid},7\n".encode()), "c.csv")
+    assert contagens == {pid: 7}
+
+
+def test_arquivo_sem_colunas_reconhecidas(novo_produto):
+    with pytest.raises(ValueError):
+        ler_arquivo_contagem(io.BytesIO(b"nome;total\nx;1\n"), "c.csv")
+
+
+def test_aplicar_inventario_preserva_vendas_posteriores(novo_produto):
+    pid = novo_produto(quantidade=5)
+    db.mark_produto_as_sold(pid, 1)
+
+    _, ajustados = db.aplicar_inventario([(pid, 5, 3)])
+
+    assert ajustados == 1
+    assert db.get_produto_by_id(pid)["quantidade"] == 2
@@ -0,0 +1,102 @@
+import os
+import sqlite3
+import time
+
+import pytest
+
+from utils import database as db
+from utils import limpeza_imagens as limpeza
+
+ANTIGO = time.time() - 2 * limpeza.IDADE_MINIMA
+VENCIDO = time.time() - (limpeza.DIAS_QUARENTENA + 1) * 24 * 60 * 60
+
+
+def _arquivo(pasta, nome, mtime=ANTIGO):
+    os.makedirs(pasta, exist_ok=True)
+    caminho = os.path.join(pasta, nome)
+    with open(caminho, "wb") as f:
+        f.write(b"foto")
+    os.utime(caminho, (mtime, mtime))
+    return caminho
+
+
+def _em_assets(nome):
+    return os.path.exists(os.path.join(db.ASSETS_DIR, nome))
+
+
+def _em_quarentena(nome):
+    return os.path.exists(os.path.join(limpeza.QUARENTENA_DIR, nome))
+
+
+@pytest.fixture
+def usadas():
+    """Produtos do banco principal (o que a coleta enxerga) usando as fotos dadas."""
+    ids = []
+
+    def cadastrar(*fotos):
+        for foto in fotos:
+            ids.append(db.add_produto(f"Com {foto}", 10.0, 1, "Natura", "Perfumaria", "Perfume", foto=foto))
+
+    yield cadastrar
+    conn = sqlite3.connect(db.DATABASE)
+    conn.executemany("DELETE FROM produtos WHERE id=?", [(i,) for i in ids])
+    conn.commit()
+    conn.close()
+    db.flush_auditoria()
+
+
+def test_descartar_so_move_foto_sem_referencia(usadas):
+    _arquivo(db.ASSETS_DIR, "gc-solta.png")
+    _arquivo(db.ASSETS_DIR, "gc-em-uso.png")
+    usadas("gc-em-uso.png")
+
+    assert limpeza.descartar_foto("gc-solta.png")
+    assert _em_quarentena("gc-solta.png") and not _em_assets("gc-solta.png")
+    assert not limpeza.descartar_foto("gc-em-uso.png")
+    assert _em_assets("gc-em-uso.png")
+    assert not limpeza.descartar_foto("logo.png")
+    assert not limpeza.descartar_foto("gc-inexistente.png")
+
+
+def test_passada_completa(usadas):
+    _arquivo(db.ASSETS_DIR, "gc-orfa.png")
+    _arquivo(db.ASSETS_DIR, "gc-referenciada.png")
+    _arquivo(db.ASSETS_DIR, "gc-recem-enviada.png", mtime=time.time())
+    _arquivo(limpeza.QUARENTENA_DIR, "gc-voltou.png")
+    _arquivo(limpeza.QUARENTENA_DIR, "gc-vencida.png", mtime=VENCIDO)
+    usadas("gc-referenciada.png", "gc-voltou.png")
+    antes = limpeza.relatorio_limpeza()
+
+    relatorio = limpeza.limpar_agora()
+
+    assert _em_quarentena("gc-orfa.png") and not _em_assets("gc-orfa.png")
+    assert _em_assets("gc-referenciada.png") and _em_assets("gc-recem-enviada.png")
+    assert _em_assets("gc-voltou.png") and not _em_quarentena("gc-voltou.png")
+    assert not _em_quarentena("gc-vencida.png")
+    assert relatorio["removidos"] >= antes["removidos"] + 1
+    assert relatorio["restaurados"] >= antes["restaurados"] + 1
+    assert not relatorio["em_andamento"]
+
+
+def test_fatias_continuam_de_onde_pararam():
+    _arquivo(db.ASSETS_DIR, "gc-fatiada.png")
+    passadas = limpeza.relatorio_limpeza()["passadas"]
+
+    assert limpeza.executar_fatia(0)["em_andamento"]
+    assert _em_assets("gc-fatiada.png")
+    while limpeza.executar_fatia(1)["em_andamento"]:
+        pass
+
+    assert _em_quarentena("gc-fatiada.png")
+    assert limpeza.relatorio_limpeza()["passadas"] > passadas
+
+
+def test_restaurar_da_quarentena():
+    _arquivo(limpeza.QUARENTENA_DIR, "gc-restaurar.png")
+    assert "gc-restaurar.png" in {i["nome"] for i in limpeza.get_quarentena()}
+
+    limpeza.restaurar_da_quarentena("gc-restaurar.png")
+
+    assert _em_assets("gc-restaurar.png") and not _em_quarentena("gc-restaurar.png")
+    with pytest.raises(ValueError):
+        limpeza.restaurar_da_quarentena("gc-restaurar.png")
@@ -0,0 +1,95 @@
+import json
+import os
+import secrets
+import sqlite3
+
+import pytest
+
+from utils import backup
+from utils import database as db
+from utils import lojas
+from utils.sessoes import emitir_token
+
+PAGINAS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "pages")
+
+
+@pytest.fixture
+def filial():
+    """Loja nova, com código único (o cadastro de lojas é do processo todo)."""
+    loja = lojas.criar_loja(f"filial-{secrets.token_hex(3)}", "Filial")
+    yield loja
+    db.flush_auditoria()
+
+
+def _produto(caminho, nome, quantidade, sku=None):
+    with db.banco(caminho):
+        return db.add_produto(nome, 10.0, quantidade, "Natura", "Perfumaria", "Perfume", sku=sku)
+
+
+def _quantidade(caminho, pid):
+    conn = sqlite3.connect(caminho)
+    row = conn.execute("SELECT quantidade FROM produtos WHERE id=?", (pid,)).fetchone()
+    conn.close()
+    return row[0] if row else None
+
+
+def test_usar_loja_desconhecida_cai_na_principal(filial):
+    assert lojas.usar_loja(filial["codigo"])["arquivo"] == filial["arquivo"]
+    assert db.caminho_banco() == filial["arquivo"]
+    assert lojas.usar_loja("nao-existe")["codigo"] == lojas.LOJA_PRINCIPAL
+    assert db.caminho_banco() == db.DATABASE
+
+
+def test_backup_inclui_todas_as_lojas_e_o_cadastro(filial):
+    na_principal = _produto(db.DATABASE, "Na principal", 3)
+    na_filial = _produto(filial["arquivo"], "Na filial", 4)
+
+    manifest = backup.criar_backup(pausa=0)
+
+    assert {lojas.LOJA_PRINCIPAL, filial["codigo"]} <= set(manifest["bancos"])
+    assert manifest["registro"]["arquivo"] == "lojas.json"
+    assert backup.verificar_backup(manifest["nome"]) == (True, [])
+
+    conn = sqlite3.connect(filial["arquivo"])
+    conn.execute("UPDATE produtos SET quantidade = 0")
+    conn.commit()
+    conn.close()
+    os.remove(lojas.REGISTRO)
+
+    resultado = backup.restaurar_backup(manifest["nome"])
+
+    assert filial["codigo"] in resultado["lojas"]
+    assert _quantidade(db.DATABASE, na_principal) == 3
+    assert _quantidade(filial["arquivo"], na_filial) == 4
+    with open(lojas.REGISTRO, encoding="utf-8") as f:
+        assert filial["codigo"] in {l["codigo"] for l in json.load(f)}
+
+
+def test_snapshots_seguidos_tem_nomes_distintos():
+    a = backup.criar_backup(pausa=0)
+    b = backup.criar_backup(pausa=0)
+    assert a["nome"] != b["nome"]
+
+
+def test_leitura_no_pdv_reserva_na_loja_da_sessao(filial):
+    from streamlit.testing.v1 import AppTest
+
+    db.add_user("caixa", "senha", "admin")
+    sku = f"789{secrets.randbelow(10 ** 9):09d}"
+    pid = _produto(filial["arquivo"], "Perfume", 2, sku=sku)
+
+    at = AppTest.from_file(os.path.join(PAGINAS, "venda_codigo_barras.py"), default_timeout=30)
+    at.session_state["logged_in"] = True
+    at.session_state["username"] = "caixa"
+    at.session_state["role"] = "admin"
+    at.session_state["sessao"] = emitir_token("caixa")
+    at.session_state["loja"] = filial["codigo"]
+    at.run()
+    at.text_input(key="pdv_leitura").input(sku).run()
+
+    assert not at.exception
+    with db.banco(filial["arquivo"]):
+        assert db.get_disponiveis([pid]) == {pid: 1}
+    conn = sqlite3.connect(db.DATABASE)
+    assert conn.execute("SELECT COUNT(*) FROM reservas WHERE produto_id=?", (pid,)).fetchone()[0] == 0
+    conn.close()
@@ -0,0 +1,65 @@
+import csv
+import io
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils import database as db
+
+
+def test_registro_funciona_como_o_dict_de_antes(novo_produto):
+    pid = novo_produto(nome="Kaiak", preco=49.9, quantidade=3, sku="789")
+    [p] = db.get_all_produtos()
+
+    assert isinstance(p, db.Produto)
+    assert p["nome"] == p.nome == "Kaiak"
+    assert dict(p) == db.get_produto_by_id(pid)
+    assert list(p) == list(db.get_produto_by_id(pid))
+    assert len(p) == len(p.keys()) and "arquivado" not in p
+    assert p.get("arquivado", "sem") == "sem" and p.get("cor") is None
+    with pytest.raises(KeyError):
+        p["arquivado"]
+    with pytest.raises(KeyError):
+        p["cor"]
+    with pytest.raises(AttributeError):
+        p.cor = "azul"
+
+
+def test_tipos_convertidos_na_leitura(loja, novo_produto):
+    pid = novo_produto()
+    conn = sqlite3.connect(loja)
+    conn.execute("UPDATE produtos SET preco='12,5', quantidade='7' WHERE id=?", (pid,))
+    conn.commit()
+    conn.close()
+
+    [p] = db.get_all_produtos()
+
+    assert (p.preco, p.quantidade, p.vendido) == (12.5, 7, 0)
+    assert type(p.preco) is float and type(p.quantidade) is int
+
+
+def test_filtros_e_arquivados(loja, novo_produto):
+    novo_produto(nome="B com estoque", quantidade=2)
+    zerado = novo_produto(nome="A zerado", quantidade=0)
+    assert [p.nome for p in db.get_all_produtos(include_sold=False)] == ["B com estoque"]
+
+    conn = sqlite3.connect(loja)
+    conn.execute("UPDATE produtos SET cadastrado_em=? WHERE id=?",
+                 ((datetime.now() - timedelta(days=100)).isoformat(), zerado))
+    conn.commit()
+    conn.close()
+    db.arquivar_produtos(90)
+
+    todos = {p.nome: p for p in db.get_all_produtos(include_archived=True)}
+    assert (todos["A zerado"]["arquivado"], todos["B com estoque"]["arquivado"]) == (1, 0)
+
+
+def test_exporta_com_dictwriter(novo_produto):
+    novo_produto(nome="Kaiak")
+    produtos = db.get_all_produtos()
+    saida = io.StringIO()
+    writer = csv.DictWriter(saida, fieldnames=list(produtos[0]))
+    writer.writeheader()
+    writer.writerows(produtos)
+    assert "Kaiak" in saida.getvalue()
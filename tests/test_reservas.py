@@ -0,0 +1,74 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils import database as db
+
+
+def test_reserva_bloqueia_outras_sessoes(novo_produto):
+    pid = novo_produto(quantidade=3)
+    assert db.reservar("caixa-1", pid, 2) == 2
+
+    assert db.get_disponiveis([pid]) == {pid: 1}
+    with pytest.raises(ValueError):
+        db.reservar("caixa-2", pid, 2)
+    with pytest.raises(ValueError):
+        db.mark_produto_as_sold(pid, 2, sessao="caixa-2")
+    db.mark_produto_as_sold(pid, 1, sessao="caixa-2")
+
+
+def test_caixa_vende_o_que_ele_mesmo_reservou(novo_produto):
+    pid = novo_produto(quantidade=2)
+    db.reservar("caixa-1", pid, 2)
+
+    with pytest.raises(ValueError):
+        db.mark_produto_as_sold(pid, 1)  # sem sessão: tudo reservado
+    db.mark_produto_as_sold(pid, 1, sessao="caixa-1")
+
+    assert db.get_reservas("caixa-1")[0]["quantidade"] == 1
+    assert db.get_produto_by_id(pid)["quantidade"] == 1
+
+
+def test_reserva_vencida_nao_bloqueia_e_e_expirada(novo_produto):
+    pid = novo_produto(quantidade=2)
+    db.reservar("caixa-1", pid, 2, ttl=-1)
+
+    assert db.get_disponiveis([pid]) == {pid: 2}
+    assert db.get_reservas("caixa-1") == []
+    assert db.reservar("caixa-2", pid, 2) == 2
+    assert db.expirar_reservas() == 1
+
+
+def test_reservar_de_novo_depois_de_vencer_nao_soma(novo_produto):
+    pid = novo_produto(quantidade=5)
+    db.reservar("caixa-1", pid, 3, ttl=-1)
+    assert db.reservar("caixa-1", pid, 1) == 1
+
+
+def test_confirmar_reservas_vende_e_libera(novo_produto):
+    a = novo_produto(quantidade=3)
+    b = novo_produto(quantidade=1)
+    db.reservar("caixa-1", a, 2)
+    db.reservar("caixa-1", b, 1)
+
+    resultados = db.confirmar_reservas("caixa-1")
+
+    assert all(r["ok"] for r in resultados)
+    assert db.get_disponiveis([a, b]) == {a: 1, b: 0}
+    assert db.get_reservas("caixa-1") == []
+
+
+def test_vendas_simultaneas_nao_perdem_baixa(loja, novo_produto):
+    pid = novo_produto(quantidade=5)
+
+    def vender(_):
+        try:
+            return db.executar_no_banco(loja, db.mark_produto_as_sold, pid, 1)
+        except ValueError:
+            return False
+
+    with ThreadPoolExecutor(8) as pool:
+        vendidas = sum(pool.map(vender, range(8)))
+
+    assert vendidas == 5
+    assert db.get_produto_by_id(pid)["quantidade"] == 0
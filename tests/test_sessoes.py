@@ -0,0 +1,111 @@
+import base64
+import sqlite3
+
+import pytest
+
+from utils import database as db
+from utils import sessoes
+
+
+@pytest.fixture
+def usuarios():
+    """Tabela users do banco principal (da pasta temporária) vazia."""
+    conn = sqlite3.connect(db.DATABASE)
+    conn.execute("DELETE FROM users")
+    conn.commit()
+    conn.close()
+    db.invalidar_papel()
+    yield
+    db.flush_auditoria()
+    db.invalidar_papel()
+
+
+def _id(username):
+    return db.get_user(username)["id"]
+
+
+def test_token_valido_devolve_o_usuario():
+    assert sessoes.validar_token(sessoes.emitir_token("ana")) == "ana"
+
+
+def test_token_vencido_e_recusado():
+    assert sessoes.validar_token(sessoes.emitir_token("ana", validade=-1)) is None
+
+
+def test_token_adulterado_e_recusado():
+    token = sessoes.emitir_token("ana")
+    carga, assinatura = token.rsplit(".", 1)
+    expira_em = base64.urlsafe_b64decode(carga).decode().split(":", 1)[0]
+    outra = base64.urlsafe_b64encode(f"{expira_em}:admin".encode()).decode()
+
+    assert sessoes.validar_token(f"{outra}.{assinatura}") is None
+    assert sessoes.validar_token(f"{carga}.{'0' * len(assinatura)}") is None
+
+
+@pytest.mark.parametrize("token", [None, "", "sem-ponto", "nao-e-base64!.abc", "a.b.c"])
+def test_token_invalido_e_recusado(token):
+    assert sessoes.validar_token(token) is None
+
+
+def test_sessao_valida_nao_consulta_o_banco_a_cada_rerun(usuarios, monkeypatch):
+    db.add_user("ana", "senha", "staff")
+    estado = {}
+    sessoes.iniciar_sessao(estado, {"username": "ana", "role": "staff"})
+    assert sessoes.sessao_valida(estado, "staff")
+
+    def sem_banco():
+        raise AssertionError("consultou a tabela users")
+
+    monkeypatch.setattr(db, "_conexao_usuarios", sem_banco)
+    for _ in range(3):
+        assert sessoes.sessao_valida(estado, "staff")
+
+
+def test_rebaixado_perde_o_papel_no_proximo_rerun(usuarios):
+    db.add_user("ana", "senha", "admin")
+    estado = {}
+    sessoes.iniciar_sessao(estado, {"username": "ana", "role": "admin"})
+    assert sessoes.sessao_valida(estado, "admin")
+
+    db.update_user_role(_id("ana"), "staff")
+
+    assert not sessoes.sessao_valida(estado, "admin")
+    assert estado["role"] == "staff" and estado["logged_in"]
+
+
+def test_excluido_tem_a_sessao_encerrada(usuarios):
+    db.add_user("ana", "senha", "staff")
+    estado = {}
+    sessoes.iniciar_sessao(estado, {"username": "ana", "role": "staff"})
+
+    db.delete_user(_id("ana"))
+
+    assert not sessoes.sessao_valida(estado)
+    assert not estado["logged_in"] and estado["role"] == "guest"
+
+
+def test_token_de_outro_usuario_nao_vale(usuarios):
+    db.add_user("ana", "senha", "staff")
+    estado = {"logged_in": True, "username": "bia", "sessao": sessoes.emitir_token("ana")}
+    assert not sessoes.sessao_valida(estado)
+
+
+def test_get_users_page_percorre_todos_sem_repetir(usuarios):
+    nomes = [f"u{n:02d}" for n in range(7)]
+    for nome in reversed(nomes):
+        db.add_user(nome, "senha")
+
+    vistos, apos = [], None
+    while True:
+        pagina, apos = db.get_users_page(apos=apos, limite=3)
+        vistos.append([u["username"] for u in pagina])
+        if apos is None:
+            break
+
+    assert vistos == [nomes[0:3], nomes[3:6], nomes[6:7]]
+
+
+def test_get_users_page_exata_nao_tem_proxima(usuarios):
+    for nome in ("a", "b", "c"):
+        db.add_user(nome, "senha")
+    assert db.get_users_page(limite=3)[1] is None
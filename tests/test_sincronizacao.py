@@ -0,0 +1,124 @@
+import time
+
+import pytest
+
+from utils import database as db
+from utils import sincronizacao as sinc
+
+
+@pytest.fixture
+def caixa(loja, tmp_path):
+    """Terminal clonado do banco da loja; devolve o caminho do clone."""
+    destino = str(tmp_path / "caixa.db")
+    sinc.clonar(destino, "caixa-1", loja)
+    return destino
+
+
+def _no(caminho, func, *args, **kw):
+    with db.banco(caminho):
+        return func(*args, **kw)
+
+
+def _quantidade(caminho, pid):
+    return _no(caminho, db.get_produto_by_id, pid)["quantidade"]
+
+
+def test_vendas_dos_dois_lados_somam(loja, novo_produto, tmp_path):
+    pid = novo_produto(quantidade=10)
+    caixa = str(tmp_path / "caixa.db")
+    sinc.clonar(caixa, "caixa-1", loja)
+
+    db.mark_produto_as_sold(pid, 2)
+    _no(caixa, db.mark_produto_as_sold, pid, 3)
+    sinc.sincronizar(caixa, loja)
+
+    assert _quantidade(loja, pid) == _quantidade(caixa, pid) == 5
+
+
+def test_estoque_negativo_vira_conflito(loja, novo_produto, tmp_path):
+    pid = novo_produto(quantidade=1)
+    caixa = str(tmp_path / "caixa.db")
+    sinc.clonar(caixa, "caixa-1", loja)
+
+    db.mark_produto_as_sold(pid, 1)
+    _no(caixa, db.mark_produto_as_sold, pid, 1)
+    res = sinc.sincronizar(caixa, loja)
+
+    assert _quantidade(loja, pid) == -1
+    assert any("estoque negativo" in c for c in res["a_para_b"]["conflitos"])
+
+
+def test_cadastro_vence_a_alteracao_mais_recente(loja, novo_produto, tmp_path):
+    pid = novo_produto(preco=10.0)
+    caixa = str(tmp_path / "caixa.db")
+    sinc.clonar(caixa, "caixa-1", loja)
+
+    _no(caixa, db.aplicar_ajuste_em_massa, "preco", "definir", 12)
+    time.sleep(0.01)
+    db.aplicar_ajuste_em_massa("preco", "definir", 15)
+    sinc.sincronizar(caixa, loja)
+
+    assert _no(loja, db.get_produto_by_id, pid)["preco"] == 15.0
+    assert _no(caixa, db.get_produto_by_id, pid)["preco"] == 15.0
+
+
+def test_produto_novo_no_terminal_chega_na_loja_com_id_proprio(loja, caixa):
+    pid = _no(caixa, db.add_produto, "Novo", 20.0, 4, "Natura", "Perfumaria", "Perfume")
+    assert pid >= sinc.BLOCO_IDS
+
+    sinc.sincronizar(caixa, loja)
+
+    assert _quantidade(loja, pid) == 4
+
+
+def test_cadastros_depois_de_sincronizar_nao_colidem(loja, tmp_path):
+    caixas = [str(tmp_path / f"caixa-{n}.db") for n in (1, 2)]
+    for n, caixa in enumerate(caixas, 1):
+        sinc.clonar(caixa, f"caixa-{n}", loja)
+    _no(caixas[0], db.add_produto, "Do caixa 1", 10.0, 1, "Natura", "Perfumaria", "Perfume")
+    for caixa in caixas:
+        sinc.sincronizar(caixa, loja)
+
+    da_loja = db.add_produto("Da loja", 10.0, 1, "Natura", "Perfumaria", "Perfume")
+    dos_caixas = [_no(caixa, db.add_produto, f"Do caixa {n}", 10.0, 2, "Natura", "Perfumaria", "Perfume")
+                  for n, caixa in enumerate(caixas, 1)]
+    assert da_loja < sinc.BLOCO_IDS and len({da_loja, *dos_caixas}) == 3
+
+    conflitos = []
+    for _ in range(2):  # a segunda volta leva a cada caixa o que o outro cadastrou
+        for caixa in caixas:
+            res = sinc.sincronizar(caixa, loja)
+            conflitos += res["a_para_b"]["conflitos"] + res["b_para_a"]["conflitos"]
+
+    assert conflitos == []
+    for caminho in [loja, *caixas]:
+        produtos = {p["id"]: p for p in _no(caminho, db.get_all_produtos)}
+        assert produtos[da_loja]["nome"] == "Da loja" and produtos[da_loja]["quantidade"] == 1
+        assert all(produtos[pid]["quantidade"] == 2 for pid in dos_caixas)
+        assert all(p["cadastrado_em"] for p in produtos.values())
+
+
+def test_reaplicar_lote_nao_repete(loja, novo_produto, caixa):
+    pid = novo_produto(quantidade=5)
+    sinc.sincronizar(caixa, loja)
+    _no(caixa, db.mark_produto_as_sold, pid, 1)
+
+    lote = sinc.exportar_lote(sinc.situacao(loja)["no"], caixa)
+    primeira = sinc.aplicar_lote(lote, loja)
+    segunda = sinc.aplicar_lote(lote, loja)
+
+    assert primeira["aplicadas"] == 1
+    assert (segunda["aplicadas"], segunda["repetidas"]) == (0, primeira["mudancas"])
+    assert _quantidade(loja, pid) == 4
+
+
+def test_lote_com_buraco_e_recusado(loja, novo_produto, caixa):
+    pid = novo_produto(quantidade=5)
+    sinc.sincronizar(caixa, loja)
+    no_loja = sinc.situacao(loja)["no"]
+    _no(caixa, db.mark_produto_as_sold, pid, 1)
+    recebido = sinc.situacao(caixa)["seq"]
+    _no(caixa, db.mark_produto_as_sold, pid, 1)
+
+    with pytest.raises(ValueError):
+        sinc.aplicar_lote(sinc.exportar_lote(no_loja, caixa, desde=recebido), loja)
@@ -0,0 +1,73 @@
+import pytest
+
+from utils import database as db
+from utils.pdv import CatalogoSku, parse_leitura
+
+
+def _editar(pid, **campos):
+    p = {**db.get_produto_by_id(pid), **campos}
+    db.update_produto(pid, p["nome"], p["preco"], p["quantidade"], p["marca"], p["estilo"], p["tipo"],
+                      p["foto"], p["data_validade"], sku=campos.get("sku"))
+
+
+def test_busca_pelo_codigo_normalizado(novo_produto):
+    pid = novo_produto(sku="  7891000  ")
+    assert db.get_produto_by_id(pid)["sku"] == "7891000"
+    assert db.get_produto_by_sku(" 7891000")["id"] == pid
+    assert db.get_produto_by_sku("") is None
+
+
+def test_codigo_e_unico_mas_varios_produtos_podem_nao_ter(novo_produto):
+    novo_produto(sku="789")
+    novo_produto()
+    novo_produto(sku="")
+    with pytest.raises(ValueError, match="já cadastrado"):
+        novo_produto(sku="789")
+
+
+def test_editar_sem_codigo_mantem_e_vazio_remove(novo_produto):
+    pid = novo_produto(sku="789")
+    _editar(pid, preco=12.0)
+    assert db.get_produto_by_id(pid)["sku"] == "789"
+    _editar(pid, sku="")
+    assert db.get_produto_by_id(pid)["sku"] is None
+
+
+def test_venda_pelo_codigo(novo_produto):
+    pid = novo_produto(quantidade=2, sku="789")
+    db.sell_by_sku("789", 2)
+    assert db.get_produto_by_id(pid)["quantidade"] == 0
+    with pytest.raises(ValueError):
+        db.sell_by_sku("789")
+    with pytest.raises(ValueError, match="não cadastrado"):
+        db.sell_by_sku("000")
+
+
+def test_venda_em_lote_recusa_so_o_item_sem_estoque(novo_produto):
+    a = novo_produto(quantidade=3)
+    b = novo_produto(quantidade=1)
+
+    resultados = db.mark_produtos_as_sold_batch([(a, 2), (b, 5), (999_999, 1)])
+
+    assert [r["ok"] for r in resultados] == [True, False, False]
+    assert db.get_disponiveis([a, b]) == {a: 1, b: 1}
+
+
+def test_catalogo_recarrega_quando_outra_conexao_grava(loja, novo_produto):
+    catalogo = CatalogoSku(loja)
+    assert len(catalogo) == 0
+
+    pid = novo_produto(sku="789")
+    assert catalogo.buscar(" 789 ")["id"] == pid
+    _editar(pid, sku="")
+    assert catalogo.buscar("789") is None
+
+
+@pytest.mark.parametrize("leitura, esperado", [
+    ("7891000", ("7891000", 1)),
+    (" 3*7891000 ", ("7891000", 3)),
+    ("x*7891000", ("x*7891000", 1)),
+    ("", (None, 1)),
+])
+def test_parse_leitura(leitura, esperado):
+    assert parse_leitura(leitura) == esperado
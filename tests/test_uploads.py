@@ -0,0 +1,76 @@
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from PIL import Image
+
+from utils import database as db
+from utils import uploads
+from utils.imagens import ImagemInvalida, salvar_foto
+
+
+def _png(cor="red", tamanho=(64, 48)):
+    saida = io.BytesIO()
+    Image.new("RGB", tamanho, cor).save(saida, "PNG")
+    return saida.getvalue()
+
+
+def _esperar(sessao, timeout=10):
+    fim = time.monotonic() + timeout
+    while uploads.produtos_em_processamento(sessao):
+        assert time.monotonic() < fim, "upload não terminou"
+        time.sleep(0.01)
+    return uploads.consumir_concluidas(sessao)
+
+
+def test_uploads_simultaneos_com_o_mesmo_nome_nao_se_sobrescrevem():
+    larguras = [10, 20, 30, 40, 50, 60]
+    with ThreadPoolExecutor(len(larguras)) as pool:
+        nomes = list(pool.map(lambda largura: salvar_foto(_png(tamanho=(largura, 8)), "foto.png"), larguras))
+
+    assert len(set(nomes)) == len(larguras)
+    for nome, largura in zip(nomes, larguras):
+        with Image.open(os.path.join(db.ASSETS_DIR, nome)) as im:
+            assert (im.format, im.width) == ("WEBP", largura)
+
+
+def test_arquivo_que_nao_e_imagem_e_recusado():
+    with pytest.raises(ImagemInvalida):
+        salvar_foto(b"nao sou imagem", "x.png")
+
+
+def test_foto_processada_em_segundo_plano_e_ligada_ao_produto(novo_produto):
+    pid = novo_produto()
+
+    uploads.enviar_foto("sessao-1", pid, _png(tamanho=(3000, 1500)), "grande.png", usuario="ana")
+    [tarefa] = _esperar("sessao-1")
+
+    assert tarefa["status"] == "ok"
+    assert db.get_produto_by_id(pid)["foto"] == tarefa["foto"]
+    with Image.open(os.path.join(db.ASSETS_DIR, tarefa["foto"])) as im:
+        assert max(im.size) == 1200
+
+
+def test_foto_anterior_so_sai_depois_da_nova(novo_produto):
+    pid = novo_produto()
+    anterior = salvar_foto(_png("green"), "antiga.png")
+    db.set_produto_foto(pid, anterior)
+
+    uploads.enviar_foto("sessao-2", pid, _png("blue"), "nova.png", foto_anterior=anterior)
+    [tarefa] = _esperar("sessao-2")
+
+    assert tarefa["status"] == "ok" and tarefa["foto"] != anterior
+    assert not os.path.exists(os.path.join(db.ASSETS_DIR, anterior))
+
+
+def test_upload_invalido_vira_erro_da_tarefa(novo_produto):
+    pid = novo_produto()
+
+    uploads.enviar_foto("sessao-3", pid, b"corrompido", "x.png")
+    [tarefa] = _esperar("sessao-3")
+
+    assert tarefa["status"] == "erro" and tarefa["erro"]
+    assert db.get_produto_by_id(pid)["foto"] is None
+    assert uploads.consumir_concluidas("sessao-3") == []
@@ -0,0 +1,41 @@
+from datetime import date, timedelta
+
+from utils import database as db
+from utils.validade import calcular_resumo_validade, get_resumo_validade
+
+
+def _dia(delta):
+    return (date.today() + timedelta(days=delta)).isoformat()
+
+
+def test_get_expiring_ordena_e_ignora_sem_estoque(novo_produto):
+    vencido = novo_produto(data_validade=_dia(-3))
+    a_vencer = novo_produto(data_validade=_dia(10))
+    novo_produto(data_validade=_dia(60))  # fora do prazo
+    novo_produto(data_validade=_dia(5), quantidade=0)  # sem estoque
+    novo_produto()  # sem validade
+
+    itens = db.get_expiring(30)
+
+    assert [p["id"] for p in itens] == [vencido, a_vencer]
+    assert [p["dias_restantes"] for p in itens] == [-3, 10]
+
+
+def test_resumo_separa_vencidos_de_a_vencer(novo_produto):
+    novo_produto(data_validade=_dia(-1), quantidade=2, preco=10.0)
+    novo_produto(data_validade=_dia(7), quantidade=3, preco=5.0)
+
+    resumo = calcular_resumo_validade(30)
+
+    assert (resumo["vencidos_produtos"], resumo["vencidos_unidades"], resumo["vencidos_valor"]) == (1, 2, 20.0)
+    assert (resumo["a_vencer_produtos"], resumo["a_vencer_unidades"], resumo["a_vencer_valor"]) == (1, 3, 15.0)
+
+
+def test_resumo_vazio_quando_a_varredura_falha(tmp_path):
+    # o banco não pode ser aberto: a tarefa falha e não há resultado anterior
+    with db.banco(str(tmp_path / "nao-existe" / "loja.db")):
+        resumo = get_resumo_validade()
+
+    assert resumo["calculado_em"] is None
+    assert resumo["erro"]
+    assert resumo["itens"] == [] and resumo["vencidos_produtos"] == 0
@@ -0,0 +1,137 @@
+# ====================================================================
+# ARQUIVO: utils/agendador.py
+# Agendador simples de tarefas periódicas em segundo plano
+# ====================================================================
+#
+# O Streamlit reexecuta as páginas a cada interação, mas os módulos
+# importados vivem enquanto o processo existir. As tarefas registradas
+# aqui rodam numa única thread daemon por processo e guardam o último
+# resultado, que as páginas leem sem refazer o cálculo a cada render.
+
+import threading
+import time
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_tarefas = {}
+_thread = None
+_TICK_SEGUNDOS = 1.0
+
+
+class _Tarefa:
+    __slots__ = ("nome", "func", "intervalo", "proxima", "resultado", "erro", "executada_em")
+
+    def __init__(self, nome, func, intervalo):
+        self.nome = nome
+        self.func = func
+        self.intervalo = intervalo
+        self.proxima = 0.0
+        self.resultado = None
+        self.erro = None
+        self.executada_em = None
+
+
+def _executar(tarefa):
+    try:
+        resultado = tarefa.func()
+        with _lock:
+            tarefa.resultado = resultado
+            tarefa.erro = None
+            tarefa.executada_em = datetime.now()
+    except Exception as e:
+        logger.exception("Falha na tarefa agendada '%s'", tarefa.nome)
+        with _lock:
+            tarefa.erro = e
+            tarefa.executada_em = datetime.now()
+    finally:
+        with _lock:
+            tarefa.proxima = time.monotonic() + tarefa.intervalo
+
+
+def _loop():
+    while True:
+        agora = time.monotonic()
+        with _lock:
+            pendentes = [t for t in _tarefas.values() if t.proxima <= agora]
+        for tarefa in pendentes:
+            _executar(tarefa)
+        time.sleep(_TICK_SEGUNDOS)
+
+
+def _garantir_thread():
+    global _thread
+    with _lock:
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(target=_loop, name="agendador", daemon=True)
+            _thread.start()
+
+
+def agendar(nome, func, intervalo_segundos, executar_agora=False):
+    """
+    Registra (uma única vez por processo) uma tarefa periódica.
+    Chamadas repetidas com o mesmo nome são ignoradas, então as páginas
+    podem chamar esta função em todo rerun.
+    Com executar_agora=True a primeira execução acontece na thread atual,
+    garantindo um resultado disponível já no primeiro render.
+    """
+    with _lock:
+        if nome in _tarefas:
+            tarefa = None
+        else:
+            tarefa = _Tarefa(nome, func, intervalo_segundos)
+            if executar_agora:
+                # evita que a thread execute em paralelo a primeira rodada
+                tarefa.proxima = float("inf")
+            _tarefas[nome] = tarefa
+    if tarefa is not None and executar_agora:
+        _executar(tarefa)
+    _garantir_thread()
+
+
+def executar_agora(nome):
+    """
+    Executa imediatamente a tarefa na thread atual e devolve o resultado.
+    """
+    with _lock:
+        tarefa = _tarefas.get(nome)
+    if tarefa is None:
+        raise KeyError(f"Tarefa não registrada: {nome}")
+    _executar(tarefa)
+    return ultimo_resultado(nome)
+
+
+def ultimo_resultado(nome):
+    """
+    Último resultado calculado pela tarefa (None se ainda não rodou).
+    """
+    with _lock:
+        tarefa = _tarefas.get(nome)
+        return tarefa.resultado if tarefa else None
+
+
+def ultimo_erro(nome):
+    """
+    Exceção da última execução da tarefa (None se ela terminou bem).
+    """
+    with _lock:
+        tarefa = _tarefas.get(nome)
+        return tarefa.erro if tarefa else None
+
+
+def status_tarefas():
+    """
+    Lista as tarefas registradas com data da última execução e erro.
+    """
+    with _lock:
+        return [
+            {
+                "nome": t.nome,
+                "intervalo": t.intervalo,
+                "executada_em": t.executada_em,
+                "erro": str(t.erro) if t.erro else None,
+            }
+            for t in _tarefas.values()
+        ]
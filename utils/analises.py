@@ -0,0 +1,225 @@
+# ====================================================================
+# ARQUIVO: utils/analises.py
+# Relatórios analíticos (valor por categoria, idade, giro, preços, histórico)
+# ====================================================================
+#
+# Os relatórios não passam por get_all_produtos nem pela conexão de
+# escrita: uma conexão SQLite somente leitura (mode=ro) carrega só as
+# colunas necessárias num DataFrame, e as agregações são vetorizadas no
+# pandas. Tanto o DataFrame base quanto cada relatório ficam em cache
+# por versão dos dados (meta.versao_dados, mantida pelos triggers de
+# produtos): enquanto nada mudar, abrir a página de relatórios não
+# consulta o banco de novo.
+
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+from utils.database import caminho_banco, get_data_version, flush_auditoria, DIMENSOES_HISTORICO
+
+DIMENSOES = ("marca", "estilo", "tipo")
+FAIXAS_IDADE = [(0, 30, "até 30 dias"), (31, 90, "31-90 dias"), (91, 180, "91-180 dias"),
+                (181, None, "mais de 180 dias")]
+FAIXAS_PRECO = [0, 25, 50, 100, 200, float("inf")]
+
+_lock = threading.Lock()
+_cache = {}  # chave -> (versao, DataFrame)
+
+
+def _conexao_leitura():
+    return sqlite3.connect(Path(caminho_banco()).resolve().as_uri() + "?mode=ro", uri=True)
+
+
+def _em_cache(chave, calcular):
+    """
+    Devolve o resultado de `calcular()` guardado para a versão atual dos
+    dados da loja em uso, recalculando só quando a versão mudou.
+    """
+    chave = (caminho_banco(),) + chave
+    versao = get_data_version()
+    with _lock:
+        item = _cache.get(chave)
+        if item and item[0] == versao:
+            return item[1]
+    resultado = calcular()
+    with _lock:
+        _cache[chave] = (versao, resultado)
+    return resultado
+
+
+def _base():
+    def carregar():
+        conn = _conexao_leitura()
+        try:
+            df = pd.read_sql_query(
+                "SELECT id, nome, preco, quantidade, marca, estilo, tipo, data_ultima_venda FROM produtos",
+                conn,
+            )
+        finally:
+            conn.close()
+        df["preco"] = pd.to_numeric(df["preco"], errors="coerce").fillna(0.0)
+        df["quantidade"] = pd.to_numeric(df["quantidade"], errors="coerce").fillna(0).astype("int64")
+        for col in DIMENSOES:
+            df[col] = df[col].fillna("").replace("", "(sem)").astype("category")
+        df["valor"] = df["preco"] * df["quantidade"]
+        df["data_ultima_venda"] = pd.to_datetime(df["data_ultima_venda"], errors="coerce", format="ISO8601")
+        return df
+    return _em_cache(("base",), carregar)
+
+
+def valor_por_categoria(dimensao="marca"):
+    """
+    Produtos, unidades, valor em estoque e preço médio por marca/estilo/tipo,
+    do maior para o menor valor, com a participação (%) de cada um.
+    """
+    if dimensao not in DIMENSOES:
+        raise ValueError(f"Dimensão inválida: {dimensao}")
+
+    def calcular():
+        df = _base()
+        emp = df[df["quantidade"] > 0]
+        r = emp.groupby(dimensao, observed=True).agg(
+            produtos=("id", "size"),
+            unidades=("quantidade", "sum"),
+            valor=("valor", "sum"),
+        )
+        r["preco_medio"] = r["valor"] / r["unidades"]
+        total = r["valor"].sum()
+        r["participacao"] = (r["valor"] / total * 100) if total else 0.0
+        return r.sort_values("valor", ascending=False).reset_index()
+    return _em_cache(("valor", dimensao), calcular)
+
+
+def idade_estoque():
+    """
+    Unidades e valor em estoque por tempo desde a última venda do produto
+    (o cadastro não guarda a data de entrada; nunca vendidos ficam à parte).
+    """
+    def calcular():
+        df = _base()
+        emp = df[df["quantidade"] > 0]
+        dias = (pd.Timestamp(datetime.now()) - emp["data_ultima_venda"]).dt.days
+        bins = [-1] + [fim if fim is not None else float("inf") for _, fim, _ in FAIXAS_IDADE]
+        faixa = pd.cut(dias, bins=bins, labels=[r for _, _, r in FAIXAS_IDADE])
+        faixa = faixa.cat.add_categories(["nunca vendido"]).fillna("nunca vendido")
+        r = emp.groupby(faixa, observed=False).agg(
+            produtos=("id", "size"),
+            unidades=("quantidade", "sum"),
+            valor=("valor", "sum"),
+        )
+        r.index.name = "faixa"
+        return r.reset_index()
+    return _em_cache(("idade",), calcular)
+
+
+def _vendas_periodo(dias):
+    """
+    Unidades vendidas por produto nos últimos `dias`, a partir da auditoria
+    (cada venda registra a quantidade antes/depois).
+    """
+    flush_auditoria()
+    desde = (datetime.now() - timedelta(days=dias)).isoformat()
+    conn = _conexao_leitura()
+    try:
+        return pd.read_sql_query("""
+            SELECT produto_id AS id,
+                   SUM(json_extract(detalhes, '$.diff.quantidade[0]')
+                       - json_extract(detalhes, '$.diff.quantidade[1]')) AS vendidas
+            FROM auditoria
+            WHERE criado_em >= ? AND acao = 'venda'
+            GROUP BY produto_id
+        """, conn, params=(desde,))
+    finally:
+        conn.close()
+
+
+def giro(dias=30, dimensao=None):
+    """
+    Giro no período: unidades vendidas / estoque médio (aproximado por
+    estoque atual + metade do vendido) e dias de cobertura do estoque atual
+    no ritmo de venda do período. Por produto, ou agregado por `dimensao`.
+    """
+    if dimensao is not None and dimensao not in DIMENSOES:
+        raise ValueError(f"Dimensão inválida: {dimensao}")
+
+    def calcular():
+        df = _base()[["id", "nome", "marca", "estilo", "tipo", "quantidade", "valor"]]
+        df = df.merge(_vendas_periodo(dias), on="id", how="left")
+        df["vendidas"] = df["vendidas"].fillna(0).astype("int64")
+        if dimensao:
+            df = df.groupby(dimensao, observed=True).agg(
+                quantidade=("quantidade", "sum"), vendidas=("vendidas", "sum"), valor=("valor", "sum"),
+            ).reset_index()
+        estoque_medio = df["quantidade"] + df["vendidas"] / 2
+        df["giro"] = (df["vendidas"] / estoque_medio.where(estoque_medio > 0)).fillna(0.0)
+        ritmo = df["vendidas"] / dias
+        df["dias_cobertura"] = df["quantidade"] / ritmo.where(ritmo > 0)
+        return df.sort_values(["giro", "vendidas"], ascending=False).reset_index(drop=True)
+    return _em_cache(("giro", dias, dimensao), calcular)
+
+
+def distribuicao_precos(faixas=None):
+    """
+    Quantidade de produtos, unidades e valor por faixa de preço
+    (produtos com estoque), com estatísticas de preço por tipo.
+    Retorna (faixas, estatisticas_por_tipo).
+    """
+    faixas = list(faixas or FAIXAS_PRECO)
+
+    def calcular():
+        df = _base()
+        emp = df[df["quantidade"] > 0]
+        rotulos = [
+            f"R$ {ini:g}–{fim:g}" if fim != float("inf") else f"acima de R$ {ini:g}"
+            for ini, fim in zip(faixas, faixas[1:])
+        ]
+        faixa = pd.cut(emp["preco"], bins=faixas, labels=rotulos, include_lowest=True)
+        por_faixa = emp.groupby(faixa, observed=False).agg(
+            produtos=("id", "size"), unidades=("quantidade", "sum"), valor=("valor", "sum"),
+        )
+        por_faixa.index.name = "faixa"
+        estat = emp.groupby("tipo", observed=True)["preco"].describe(percentiles=[0.25, 0.5, 0.75])
+        estat = estat.rename(columns={"count": "produtos", "mean": "media", "min": "minimo",
+                                      "25%": "p25", "50%": "mediana", "75%": "p75", "max": "maximo"})
+        return por_faixa.reset_index(), estat.drop(columns=["std"]).reset_index()
+    return _em_cache(("precos", tuple(faixas)), calcular)
+
+
+def historico_estoque(dimensao="total", dias=90, metrica="valor", top=8):
+    """
+    Série diária de `metrica` (valor, unidades ou skus) lida da fotografia
+    diária (estoque_diario): uma coluna por chave da dimensão, limitada às
+    `top` chaves de maior valor no último dia. São poucas centenas de
+    linhas, então não passa pelo cache por versão (a fotografia não muda
+    a versão dos produtos).
+    """
+    if dimensao not in DIMENSOES_HISTORICO:
+        raise ValueError(f"Dimensão inválida: {dimensao}")
+    if metrica not in ("valor", "unidades", "skus"):
+        raise ValueError(f"Métrica inválida: {metrica}")
+    desde = (datetime.now() - timedelta(days=dias)).date().isoformat()
+    conn = _conexao_leitura()
+    try:
+        df = pd.read_sql_query(
+            "SELECT dia, chave, skus, unidades, valor FROM estoque_diario WHERE dimensao=? AND dia >= ?",
+            conn, params=(dimensao, desde),
+        )
+    finally:
+        conn.close()
+    df["dia"] = pd.to_datetime(df["dia"])
+    if dimensao == "total":
+        df["chave"] = "Total"
+    serie = df.pivot_table(index="dia", columns="chave", values=metrica, aggfunc="sum")
+    serie = serie.fillna(0)  # dia fotografado sem a chave = categoria sem estoque
+    if len(serie.columns) > top:
+        ultimo = df[df["dia"] == df["dia"].max()].nlargest(top, "valor")["chave"]
+        serie = serie[[c for c in serie.columns if c in set(ultimo)]]
+    return serie.sort_index()
+
+
+def limpar_cache():
+    with _lock:
+        _cache.clear()
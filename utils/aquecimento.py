@@ -0,0 +1,180 @@
+# ====================================================================
+# ARQUIVO: utils/aquecimento.py
+# Aquecimento dos caches quando o processo sobe
+# ====================================================================
+#
+# Depois de reiniciar o `streamlit run app.py`, o primeiro acesso pagava
+# tudo a frio: importar o pandas, ler o banco do disco, montar os caches
+# dos relatórios e do leitor de código de barras e abrir fotos grandes.
+# iniciar_aquecimento() dispara, uma vez por processo, uma thread daemon
+# que faz esse trabalho em etapas cronometradas; os tempos vão para o log
+# e para relatorio_aquecimento(). Quem chama não espera nada: o app.py
+# chama no fim do script, depois de montar a página.
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from utils.database import ASSETS_DIR, get_all_produtos, get_db_connection
+from utils.lojas import em_todas_as_lojas, listar_lojas
+
+logger = logging.getLogger(__name__)
+
+ARQUIVOS = ("style.css", os.path.join(ASSETS_DIR, "logo.png"))
+LIMITE_BYTES_BANCO = 256 * 1024 * 1024  # por banco; acima disso só o começo do arquivo
+LIMITE_MINIATURAS = 200
+DIAS_VENDAS = 30
+_BLOCO = 1024 * 1024
+
+_lock = threading.Lock()
+_thread = None
+_relatorio = {"iniciado_em": None, "concluido_em": None, "etapas": []}
+
+
+def _ler(caminho, limite=None):
+    lidos = 0
+    with open(caminho, "rb") as f:
+        while limite is None or lidos < limite:
+            bloco = f.read(_BLOCO)
+            if not bloco:
+                break
+            lidos += len(bloco)
+    return lidos
+
+
+def _etapa_arquivos():
+    return {"bytes": sum(_ler(c) for c in ARQUIVOS if os.path.exists(c))}
+
+
+def _etapa_banco():
+    """
+    Lê os arquivos dos bancos para o cache de páginas do sistema: cada
+    conexão nova do SQLite começa vazia, mas as leituras passam a vir da
+    memória em vez do disco.
+    """
+    lidos = 0
+    for loja in listar_lojas():
+        for caminho in (loja["arquivo"], loja["arquivo"] + "-wal"):
+            if os.path.exists(caminho):
+                lidos += _ler(caminho, LIMITE_BYTES_BANCO)
+    return {"bytes": lidos}
+
+
+def _consultas_loja():
+    # importados aqui: o import do pandas também faz parte do aquecimento
+    from utils.analises import DIMENSOES, distribuicao_precos, giro, idade_estoque, valor_por_categoria
+    from utils.pdv import get_catalogo_sku
+
+    produtos = len(get_all_produtos())
+    for dimensao in DIMENSOES:
+        valor_por_categoria(dimensao)
+    idade_estoque()
+    giro()
+    distribuicao_precos()
+    len(get_catalogo_sku())
+    return produtos
+
+
+def _etapa_consultas():
+    """
+    Roda as consultas das páginas mais abertas em cada loja, preenchendo
+    os caches por versão dos dados (relatórios) e o catálogo por SKU.
+    """
+    return {loja["codigo"]: produtos for loja, produtos in em_todas_as_lojas(_consultas_loja, workers=1)}
+
+
+def _fotos_mais_vistas(limite):
+    desde = (datetime.now() - timedelta(days=DIAS_VENDAS)).isoformat()
+    conn = get_db_connection()
+    try:
+        # o LIMIT vem depois do JOIN: produtos removidos ou sem foto não
+        # podem ocupar as vagas dos mais vendidos
+        vendidas = conn.execute("""
+            SELECT p.foto FROM auditoria a JOIN produtos p ON p.id = a.produto_id
+            WHERE a.acao = 'venda' AND a.criado_em >= ? AND p.foto IS NOT NULL AND p.foto != ''
+            GROUP BY p.id ORDER BY COUNT(*) DESC LIMIT ?
+        """, (desde, limite)).fetchall()
+        primeiras = conn.execute(
+            "SELECT foto FROM produtos WHERE foto IS NOT NULL AND foto != '' ORDER BY nome LIMIT ?", (limite,)
+        ).fetchall()
+    finally:
+        conn.close()
+    return [r["foto"] for r in vendidas + primeiras]
+
+
+def mais_vistos(limite=LIMITE_MINIATURAS):
+    """
+    Fotos que as listas mostram primeiro: as dos produtos mais vendidos nos
+    últimos DIAS_VENDAS dias e as do começo das listagens (ordem por nome),
+    de todas as lojas, sem repetição.
+    """
+    fotos = {}
+    for _, nomes in em_todas_as_lojas(_fotos_mais_vistas, limite, workers=1):
+        fotos.update(dict.fromkeys(nomes))
+    return list(fotos)[:limite]
+
+
+def _etapa_miniaturas():
+    from utils.imagens import gerar_miniatura, limpar_miniaturas
+
+    fotos = mais_vistos()
+    geradas = 0
+    for foto in fotos:
+        try:
+            geradas += gerar_miniatura(foto)
+        except Exception:
+            logger.warning("Miniatura não gerada para %s", foto, exc_info=True)
+    return {"fotos": len(fotos), "geradas": geradas, "removidas": limpar_miniaturas()}
+
+
+_ETAPAS = (
+    ("arquivos", _etapa_arquivos),
+    ("banco", _etapa_banco),
+    ("consultas", _etapa_consultas),
+    ("miniaturas", _etapa_miniaturas),
+)
+
+
+def _executar():
+    with _lock:
+        _relatorio["iniciado_em"] = datetime.now()
+    inicio_total = time.perf_counter()
+    for nome, etapa in _ETAPAS:
+        inicio = time.perf_counter()
+        detalhes, erro = None, None
+        try:
+            detalhes = etapa()
+        except Exception as e:
+            logger.exception("Falha no aquecimento (%s)", nome)
+            erro = str(e)
+        ms = (time.perf_counter() - inicio) * 1000
+        logger.info("aquecimento: %s em %.1f ms %s", nome, ms, detalhes if erro is None else f"erro: {erro}")
+        with _lock:
+            _relatorio["etapas"].append({"etapa": nome, "ms": ms, "detalhes": detalhes, "erro": erro})
+    logger.info("aquecimento concluído em %.1f ms", (time.perf_counter() - inicio_total) * 1000)
+    with _lock:
+        _relatorio["concluido_em"] = datetime.now()
+
+
+def iniciar_aquecimento():
+    """
+    Dispara o aquecimento numa thread daemon, uma vez por processo.
+    Retorna True se foi esta chamada que disparou.
+    """
+    global _thread
+    with _lock:
+        if _thread is not None:
+            return False
+        _thread = threading.Thread(target=_executar, name="aquecimento", daemon=True)
+    _thread.start()
+    return True
+
+
+def relatorio_aquecimento():
+    """
+    Etapas já concluídas: {iniciado_em, concluido_em, etapas: [{etapa, ms, detalhes, erro}]}.
+    """
+    with _lock:
+        return {**_relatorio, "etapas": list(_relatorio["etapas"])}
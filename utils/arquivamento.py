@@ -0,0 +1,28 @@
+# ====================================================================
+# ARQUIVO: utils/arquivamento.py
+# Arquivamento automático de produtos zerados e sem venda
+# ====================================================================
+
+from functools import partial
+
+from utils import agendador
+from utils.database import arquivar_produtos, caminho_banco, executar_no_banco
+
+DIAS_SEM_VENDA = 90
+INTERVALO_ARQUIVAMENTO = 24 * 60 * 60  # segundos
+
+_TAREFA = "arquivamento"
+
+
+def iniciar_arquivamento_automatico(dias_sem_venda=DIAS_SEM_VENDA, intervalo=INTERVALO_ARQUIVAMENTO):
+    """
+    Registra o job diário da loja atual no agendador (idempotente por
+    processo). A primeira rodada acontece em segundo plano, sem atrasar a página.
+    """
+    caminho = caminho_banco()
+    agendador.agendar(f"{_TAREFA}:{caminho}", partial(executar_no_banco, caminho, arquivar_produtos, dias_sem_venda),
+                      intervalo)
+
+
+def arquivar_agora(dias_sem_venda=DIAS_SEM_VENDA, usuario=None):
+    return arquivar_produtos(dias_sem_venda, usuario=usuario)
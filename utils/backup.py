@@ -0,0 +1,339 @@
+# ====================================================================
+# ARQUIVO: utils/backup.py
+# Backups online do banco + imagens, sem bloquear as vendas
+# ====================================================================
+#
+# O banco é copiado com a API de backup do sqlite3 em passos de poucas
+# páginas, com uma pausa entre eles: quem está vendendo continua
+# gravando normalmente (se o banco mudar no meio, o SQLite reinicia a
+# cópia sozinho). Cada snapshot fica em backups/<AAAAmmdd-HHMMSS-micro>/
+# com o banco de cada loja comprimido (gzip), o cadastro de lojas
+# (lojas.json) e um manifest.json com checksums SHA-256.
+# As imagens vão para backups/assets/, compartilhado entre snapshots:
+# só arquivos ainda não copiados são transferidos.
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+
+from utils.database import DATABASE, ASSETS_DIR
+from utils.lojas import LOJA_PRINCIPAL, REGISTRO, listar_lojas
+
+BACKUP_DIR = "backups"
+ASSETS_BACKUP_DIR = os.path.join(BACKUP_DIR, "assets")
+MANTER_SNAPSHOTS = 7
+PAGINAS_POR_PASSO = 64
+PAUSA_ENTRE_PASSOS = 0.005  # segundos
+_BLOCO = 1024 * 1024
+
+
+def _sha256_arquivo(caminho):
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(_BLOCO), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def _fotos_referenciadas(conn):
+    rows = conn.execute("""
+        SELECT foto FROM produtos WHERE foto IS NOT NULL AND foto != ''
+        UNION
+        SELECT foto FROM produtos_arquivados WHERE foto IS NOT NULL AND foto != ''
+    """).fetchall()
+    return sorted(r[0] for r in rows)
+
+
+def listar_backups():
+    """
+    Snapshots existentes, do mais recente para o mais antigo.
+    """
+    if not os.path.isdir(BACKUP_DIR):
+        return []
+    nomes = [
+        n for n in os.listdir(BACKUP_DIR)
+        if os.path.isfile(os.path.join(BACKUP_DIR, n, "manifest.json"))
+    ]
+    return sorted(nomes, reverse=True)
+
+
+def ler_manifest(nome):
+    with open(os.path.join(BACKUP_DIR, nome, "manifest.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _bancos_do_manifest(manifest):
+    # snapshots anteriores às lojas só tinham "banco" (a loja principal)
+    return manifest.get("bancos") or {LOJA_PRINCIPAL: {**manifest["banco"], "origem": DATABASE}}
+
+
+def _arquivo_snapshot(codigo):
+    return "estoque.db.gz" if codigo == LOJA_PRINCIPAL else f"loja-{codigo}.db.gz"
+
+
+def _copiar_banco_online(origem, destino, paginas_por_passo, pausa):
+    src = sqlite3.connect(origem)
+    dst = sqlite3.connect(destino)
+    passos = {"n": 0}
+
+    def progresso(status, restantes, total):
+        passos["n"] += 1
+        # o sleep= do sqlite3 só vale quando o passo volta BUSY/LOCKED; a
+        # pausa entre passos, que deixa as vendas gravarem, é esta
+        if restantes and pausa:
+            time.sleep(pausa)
+
+    try:
+        src.backup(dst, pages=paginas_por_passo, progress=progresso, sleep=pausa)
+    finally:
+        dst.close()
+        src.close()
+    return passos["n"]
+
+
+def _criar_pasta_snapshot():
+    # microssegundos no nome e criação exclusiva: dois backups no mesmo
+    # segundo não caem na mesma pasta
+    while True:
+        nome = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        pasta = os.path.join(BACKUP_DIR, nome)
+        try:
+            os.makedirs(pasta)
+            return nome, pasta
+        except FileExistsError:
+            continue
+
+
+def _snapshot_banco(origem, pasta, arquivo, paginas_por_passo, pausa):
+    """
+    Cópia online + checksum + gzip de um banco. Retorna (info, fotos, tempos).
+    """
+    tempos = {}
+    t = time.perf_counter()
+    fd, tmp_db = tempfile.mkstemp(suffix=".db", dir=pasta)
+    os.close(fd)
+    try:
+        passos = _copiar_banco_online(origem, tmp_db, paginas_por_passo, pausa)
+        tempos["copia_banco"] = time.perf_counter() - t
+
+        t = time.perf_counter()
+        db_sha = _sha256_arquivo(tmp_db)
+        db_tamanho = os.path.getsize(tmp_db)
+        with open(tmp_db, "rb") as f_in, gzip.open(os.path.join(pasta, arquivo), "wb", compresslevel=6) as f_out:
+            shutil.copyfileobj(f_in, f_out, _BLOCO)
+        tempos["compressao"] = time.perf_counter() - t
+
+        # imagens referenciadas pelo snapshot (lidas do próprio snapshot)
+        conn = sqlite3.connect(tmp_db)
+        fotos = _fotos_referenciadas(conn)
+        conn.close()
+    finally:
+        os.remove(tmp_db)
+    info = {
+        "arquivo": arquivo,
+        "origem": origem,
+        "sha256": db_sha,
+        "tamanho": db_tamanho,
+        "tamanho_comprimido": os.path.getsize(os.path.join(pasta, arquivo)),
+        "passos_backup": passos,
+    }
+    return info, fotos, tempos
+
+
+def criar_backup(paginas_por_passo=PAGINAS_POR_PASSO, pausa=PAUSA_ENTRE_PASSOS, manter=MANTER_SNAPSHOTS):
+    """
+    Gera um snapshot completo (todas as lojas) e devolve o manifest
+    (com o relatório de tempos).
+    """
+    tempos = {"copia_banco": 0.0, "compressao": 0.0}
+    inicio_total = time.perf_counter()
+    nome, pasta = _criar_pasta_snapshot()
+    os.makedirs(ASSETS_BACKUP_DIR, exist_ok=True)
+
+    # 1. cadastro de lojas e, para cada loja, cópia online do banco + gzip
+    registro = None
+    if os.path.exists(REGISTRO):
+        shutil.copy2(REGISTRO, os.path.join(pasta, "lojas.json"))
+        registro = {"arquivo": "lojas.json", "sha256": _sha256_arquivo(os.path.join(pasta, "lojas.json"))}
+    bancos = {}
+    fotos = set()
+    for loja in listar_lojas():
+        if not os.path.exists(loja["arquivo"]):
+            continue
+        info, fotos_loja, t_loja = _snapshot_banco(loja["arquivo"], pasta, _arquivo_snapshot(loja["codigo"]),
+                                                   paginas_por_passo, pausa)
+        bancos[loja["codigo"]] = info
+        fotos.update(fotos_loja)
+        for k, v in t_loja.items():
+            tempos[k] += v
+
+    # 2. imagens referenciadas por qualquer loja
+    t = time.perf_counter()
+    anteriores = {}
+    backups = [b for b in listar_backups() if b != nome]
+    if backups:
+        anteriores = ler_manifest(backups[0]).get("assets", {})
+    assets = {}
+    novos = faltando = 0
+    bytes_copiados = 0
+    for foto in sorted(fotos):
+        origem = os.path.join(ASSETS_DIR, foto)
+        destino = os.path.join(ASSETS_BACKUP_DIR, foto)
+        if not os.path.isfile(origem):
+            faltando += 1
+            continue
+        st = os.stat(origem)
+        tamanho, mtime = st.st_size, st.st_mtime_ns
+        anterior = anteriores.get(foto)
+        # tamanho e data de modificação: uma foto trocada por outra do mesmo
+        # tamanho é copiada de novo (copy2 preserva a data na cópia)
+        if (anterior and anterior["tamanho"] == tamanho and anterior.get("mtime") == mtime
+                and os.path.isfile(destino)):
+            assets[foto] = anterior
+            continue
+        shutil.copy2(origem, destino)
+        assets[foto] = {"sha256": _sha256_arquivo(destino), "tamanho": tamanho, "mtime": mtime}
+        novos += 1
+        bytes_copiados += tamanho
+    tempos["imagens"] = time.perf_counter() - t
+
+    manifest = {
+        "nome": nome,
+        "criado_em": datetime.now().isoformat(),
+        # "banco" (a loja principal) continua para quem lê o formato antigo
+        "banco": bancos.get(LOJA_PRINCIPAL),
+        "bancos": bancos,
+        "registro": registro,
+        "assets": assets,
+        "assets_novos": novos,
+        "assets_bytes_copiados": bytes_copiados,
+        "assets_faltando": faltando,
+    }
+
+    _gravar_manifest(pasta, manifest)
+
+    # a rotação só enxerga snapshots com manifest, por isso vem depois
+    t = time.perf_counter()
+    manifest["snapshots_removidos"] = rotacionar_backups(manter)
+    tempos["rotacao"] = time.perf_counter() - t
+    tempos["total"] = time.perf_counter() - inicio_total
+    manifest["tempos"] = {k: round(v, 4) for k, v in tempos.items()}
+    _gravar_manifest(pasta, manifest)
+    return manifest
+
+
+def _gravar_manifest(pasta, manifest):
+    tmp = os.path.join(pasta, "manifest.json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, os.path.join(pasta, "manifest.json"))
+
+
+def rotacionar_backups(manter=MANTER_SNAPSHOTS):
+    """
+    Mantém só os `manter` snapshots mais recentes e apaga de backups/assets
+    as imagens que nenhum snapshot restante referencia.
+    """
+    backups = listar_backups()
+    removidos = backups[manter:]
+    for nome in removidos:
+        shutil.rmtree(os.path.join(BACKUP_DIR, nome), ignore_errors=True)
+
+    em_uso = set()
+    for nome in backups[:manter]:
+        em_uso.update(ler_manifest(nome).get("assets", {}))
+    if os.path.isdir(ASSETS_BACKUP_DIR):
+        with os.scandir(ASSETS_BACKUP_DIR) as it:
+            for entry in it:
+                if entry.is_file() and entry.name not in em_uso:
+                    os.remove(entry.path)
+    return removidos
+
+
+def _extrair_banco(nome, arquivo, destino):
+    with gzip.open(os.path.join(BACKUP_DIR, nome, arquivo), "rb") as f_in, open(destino, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out, _BLOCO)
+
+
+def verificar_backup(nome):
+    """
+    Confere checksums dos bancos, do cadastro de lojas e das imagens e
+    roda PRAGMA integrity_check em cada banco.
+    Retorna (ok, lista_de_problemas).
+    """
+    manifest = ler_manifest(nome)
+    problemas = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for codigo, info in _bancos_do_manifest(manifest).items():
+            caminho = os.path.join(tmp, f"{codigo}.db")
+            _extrair_banco(nome, info["arquivo"], caminho)
+            if _sha256_arquivo(caminho) != info["sha256"]:
+                problemas.append(f"Checksum do banco não confere ({codigo})")
+                continue
+            conn = sqlite3.connect(caminho)
+            resultado = conn.execute("PRAGMA integrity_check").fetchone()[0]
+            conn.close()
+            if resultado != "ok":
+                problemas.append(f"integrity_check ({codigo}): {resultado}")
+    registro = manifest.get("registro")
+    if registro:
+        caminho = os.path.join(BACKUP_DIR, nome, registro["arquivo"])
+        if not os.path.isfile(caminho) or _sha256_arquivo(caminho) != registro["sha256"]:
+            problemas.append("Cadastro de lojas ausente ou com checksum diferente")
+    for foto, info in manifest.get("assets", {}).items():
+        caminho = os.path.join(ASSETS_BACKUP_DIR, foto)
+        if not os.path.isfile(caminho):
+            problemas.append(f"Imagem ausente no backup: {foto}")
+        elif _sha256_arquivo(caminho) != info["sha256"]:
+            problemas.append(f"Checksum da imagem não confere: {foto}")
+    return not problemas, problemas
+
+
+def restaurar_backup(nome):
+    """
+    Verifica o snapshot e o restaura: cadastro de lojas e o banco de cada
+    loja, cada um sobre o arquivo de origem (via API de backup, sem trocar
+    o arquivo debaixo de conexões abertas). Imagens ausentes em assets/
+    são copiadas de volta. Levanta ValueError se a verificação falhar.
+    """
+    ok, problemas = verificar_backup(nome)
+    if not ok:
+        raise ValueError("Backup inválido: " + "; ".join(problemas[:5]))
+    manifest = ler_manifest(nome)
+    tempos = {}
+    t = time.perf_counter()
+    if manifest.get("registro"):
+        tmp_registro = REGISTRO + ".tmp"
+        shutil.copy2(os.path.join(BACKUP_DIR, nome, manifest["registro"]["arquivo"]), tmp_registro)
+        os.replace(tmp_registro, REGISTRO)
+    bancos = _bancos_do_manifest(manifest)
+    with tempfile.TemporaryDirectory() as tmp:
+        for codigo, info in bancos.items():
+            caminho = os.path.join(tmp, f"{codigo}.db")
+            _extrair_banco(nome, info["arquivo"], caminho)
+            os.makedirs(os.path.dirname(info["origem"]) or ".", exist_ok=True)
+            src = sqlite3.connect(caminho)
+            dst = sqlite3.connect(info["origem"])
+            try:
+                src.backup(dst)
+            finally:
+                dst.close()
+                src.close()
+    tempos["bancos"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    restauradas = 0
+    for foto in manifest.get("assets", {}):
+        destino = os.path.join(ASSETS_DIR, foto)
+        if not os.path.exists(destino):
+            shutil.copy2(os.path.join(ASSETS_BACKUP_DIR, foto), destino)
+            restauradas += 1
+    tempos["imagens"] = time.perf_counter() - t
+    return {"lojas": sorted(bancos), "imagens_restauradas": restauradas,
+            "tempos": {k: round(v, 4) for k, v in tempos.items()}}
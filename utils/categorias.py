@@ -0,0 +1,155 @@
+# ====================================================================
+# ARQUIVO: utils/categorias.py
+# Índice normalizado para casar marca / estilo / tipo digitados à mão
+# ====================================================================
+#
+# "boticario", "o boticario" e "O Boticário" devem cair na mesma marca.
+# Os índices são montados uma vez na importação: texto sem acento e em
+# minúsculas (busca exata), mapa token -> opções e trigrama -> opções.
+# Uma consulta só pontua as opções que compartilham algum trigrama com
+# o texto, o que leva poucos microssegundos com as listas atuais.
+
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+from utils.database import MARCAS, ESTILOS, TIPOS
+
+_STOPWORDS = {"o", "a", "os", "as", "de", "da", "do", "das", "dos", "e", "para", "com", "em"}
+_RE_NAO_ALFANUM = re.compile(r"[^0-9a-z]+")
+
+SCORE_MINIMO = 0.5
+MARGEM_MINIMA = 0.1
+
+
+def normalizar(texto):
+    """
+    Remove acentos, pontuação e diferenças de maiúsculas/espaços.
+    """
+    texto = unicodedata.normalize("NFKD", str(texto or ""))
+    texto = "".join(c for c in texto if not unicodedata.combining(c)).casefold()
+    return _RE_NAO_ALFANUM.sub(" ", texto).strip()
+
+
+def _tokens(norm):
+    tokens = [t for t in norm.split() if t not in _STOPWORDS]
+    return tokens or norm.split()
+
+
+def _trigramas(norm):
+    base = f"  {' '.join(_tokens(norm))} "
+    return {base[i:i + 3] for i in range(len(base) - 2)}
+
+
+def _similaridade_token(a, b):
+    if a == b:
+        return 1.0
+    prefixo = 0
+    for ca, cb in zip(a, b):
+        if ca != cb:
+            break
+        prefixo += 1
+    return prefixo / max(len(a), len(b)) if prefixo >= 3 else 0.0
+
+
+class IndiceCategorias:
+    def __init__(self, opcoes):
+        self.opcoes = list(opcoes)
+        self._exato = {}
+        self._tokens = []
+        self._trigramas = []
+        self._por_trigrama = defaultdict(list)
+        self._por_token = defaultdict(list)
+        for i, opcao in enumerate(self.opcoes):
+            norm = normalizar(opcao)
+            tokens = _tokens(norm)
+            trigramas = _trigramas(norm)
+            self._exato.setdefault(norm, i)
+            self._exato.setdefault(" ".join(tokens), i)
+            self._tokens.append(tokens)
+            self._trigramas.append(trigramas)
+            for tri in trigramas:
+                self._por_trigrama[tri].append(i)
+            for tok in tokens:
+                self._por_token[tok].append(i)
+
+    def _pontuar(self, i, q_tokens, q_trigramas, compartilhados):
+        dice = 2.0 * compartilhados / (len(q_trigramas) + len(self._trigramas[i]))
+        o_tokens = self._tokens[i]
+        soma = sum(max(_similaridade_token(q, o) for o in o_tokens) for q in q_tokens)
+        # cobertura do texto digitado pesa mais que a da opção, para que
+        # "oui" ainda encontre "Oui-Original-Unique-Individuel"
+        score_tokens = 0.7 * soma / len(q_tokens) + 0.3 * soma / len(o_tokens)
+        return 0.5 * dice + 0.5 * score_tokens
+
+    def best_matches(self, texto, k=3):
+        """
+        As k opções mais parecidas com o texto: lista de (opção, score 0..1).
+        """
+        norm = normalizar(texto)
+        if not norm:
+            return []
+        q_tokens = _tokens(norm)
+        exato = self._exato.get(norm, self._exato.get(" ".join(q_tokens)))
+
+        q_trigramas = _trigramas(norm)
+        compartilhados = Counter()
+        for tri in q_trigramas:
+            compartilhados.update(self._por_trigrama.get(tri, ()))
+        for tok in q_tokens:
+            # garante candidatos com token idêntico mesmo sem trigramas em comum
+            for i in self._por_token.get(tok, ()):
+                compartilhados.setdefault(i, 0)
+
+        pontuados = [
+            (1.0 if i == exato else self._pontuar(i, q_tokens, q_trigramas, n), i)
+            for i, n in compartilhados.items()
+        ]
+        if exato is not None and exato not in compartilhados:
+            pontuados.append((1.0, exato))
+        pontuados.sort(key=lambda x: (-x[0], x[1]))
+        return [(self.opcoes[i], round(score, 3)) for score, i in pontuados[:k]]
+
+    def resolver(self, texto, score_minimo=SCORE_MINIMO, margem=MARGEM_MINIMA):
+        """
+        Opção canônica quando o melhor candidato é exato ou claramente
+        superior ao segundo; senão None (o chamador deve sugerir).
+        """
+        candidatos = self.best_matches(texto, k=2)
+        if not candidatos:
+            return None
+        melhor, score = candidatos[0]
+        if score == 1.0:
+            return melhor
+        segundo = candidatos[1][1] if len(candidatos) > 1 else 0.0
+        if score >= score_minimo and score - segundo >= margem:
+            return melhor
+        return None
+
+
+INDICES = {
+    "marca": IndiceCategorias(MARCAS),
+    "estilo": IndiceCategorias(ESTILOS),
+    "tipo": IndiceCategorias(TIPOS),
+}
+
+
+def best_matches(field, text, k=3):
+    """
+    Sugestões para o campo ("marca", "estilo" ou "tipo").
+    """
+    return INDICES[field].best_matches(text, k)
+
+
+def resolver(field, text):
+    """
+    Valor canônico do campo para o texto digitado, ou None se ambíguo.
+    """
+    return INDICES[field].resolver(text)
+
+
+def sugestoes(field, text, k=3):
+    """
+    Texto pronto para o usuário: "Natura, Avon, Eudora".
+    """
+    return ", ".join(opcao for opcao, _ in best_matches(field, text, k))
@@ -0,0 +1,157 @@
+# ====================================================================
+# ARQUIVO: utils/chat_historico.py
+# Histórico do chatbot: buffer circular em memória + tabela chat_log
+# ====================================================================
+#
+# A sessão guarda só as últimas MAX_EM_MEMORIA mensagens (deque com
+# maxlen), então o custo de renderizar e a memória por sessão ficam
+# constantes. Toda mensagem também entra numa fila de gravação que é
+# descarregada em lote (um executemany/commit) no chat_log; mensagens
+# antigas são lidas de volta página a página sob demanda, até
+# MAX_ANTIGAS por sessão.
+#
+# A fila também é descarregada sem depender de uma nova mensagem: pelo
+# agendador quando fica parada há IDADE_MAXIMA_PENDENTE segundos, quando
+# a sessão termina (o histórico é coletado) e ao encerrar o processo.
+
+import os
+import threading
+import time
+import uuid
+import weakref
+from collections import deque
+from datetime import datetime
+
+from utils import agendador
+from utils.database import add_chat_messages, get_chat_messages, caminho_banco, executar_no_banco
+
+MAX_EM_MEMORIA = 30
+MAX_ANTIGAS = 200
+TAMANHO_LOTE = 10
+IDADE_MAXIMA_PENDENTE = 30  # segundos
+TAMANHO_PAGINA = 20
+
+_lock = threading.Lock()
+_filas = set()  # filas de históricos ainda vivos, para o descarregamento periódico
+
+
+class _Fila:
+    """
+    Mensagens ainda não gravadas de um histórico. Fica fora do
+    HistoricoChat para poder ser descarregada depois que ele é coletado.
+    """
+    __slots__ = ("banco", "mensagens", "desde", "lock", "__weakref__")
+
+    def __init__(self, banco):
+        self.banco = banco  # a loja em que a conversa começou
+        self.mensagens = []
+        self.desde = None
+        self.lock = threading.Lock()
+
+    def adicionar(self, msg):
+        with self.lock:
+            self.mensagens.append(msg)
+            if self.desde is None:
+                self.desde = time.monotonic()
+            return len(self.mensagens), time.monotonic() - self.desde
+
+    def descarregar(self):
+        with self.lock:
+            mensagens, self.mensagens = self.mensagens, []
+            self.desde = None
+        if not mensagens:
+            return 0
+        return executar_no_banco(self.banco, add_chat_messages, mensagens)
+
+    def parada_ha(self):
+        with self.lock:
+            return 0 if self.desde is None else time.monotonic() - self.desde
+
+
+def _encerrar(fila):
+    with _lock:
+        _filas.discard(fila)
+    fila.descarregar()
+
+
+def descarregar_paradas(idade=IDADE_MAXIMA_PENDENTE):
+    """
+    Grava as filas com mensagens pendentes há `idade` segundos ou mais
+    (todas, com idade=0). Retorna quantas mensagens foram gravadas.
+    """
+    with _lock:
+        filas = list(_filas)
+    return sum(f.descarregar() for f in filas if f.mensagens and f.parada_ha() >= idade)
+
+
+class HistoricoChat:
+    def __init__(self, username=None, sessao=None, max_em_memoria=MAX_EM_MEMORIA):
+        self.sessao = sessao or uuid.uuid4().hex
+        self.username = username
+        self.recentes = deque(maxlen=max_em_memoria)
+        self.antigas = []
+        # caminho absoluto: a fila pode ser gravada só na saída do
+        # processo, quando o diretório atual já pode ser outro
+        self._fila = _Fila(os.path.abspath(caminho_banco()))
+        self._seq = 0
+        with _lock:
+            _filas.add(self._fila)
+        # roda quando a sessão é descartada ou, no máximo, ao sair do processo
+        weakref.finalize(self, _encerrar, self._fila)
+        agendador.agendar("chat_historico", descarregar_paradas, IDADE_MAXIMA_PENDENTE)
+
+    def append(self, role, content):
+        self._seq += 1
+        msg = {
+            "sessao": self.sessao,
+            "seq": self._seq,
+            "username": self.username,
+            "role": role,
+            "content": content,
+            "criado_em": datetime.now().isoformat(),
+        }
+        self.recentes.append(msg)
+        pendentes, idade = self._fila.adicionar(msg)
+        # como TAMANHO_LOTE < maxlen, nenhuma mensagem sai do buffer sem
+        # antes ter sido gravada
+        if pendentes >= TAMANHO_LOTE or idade >= IDADE_MAXIMA_PENDENTE:
+            self.flush()
+        return msg
+
+    def flush(self):
+        """
+        Grava as mensagens pendentes no chat_log em um único lote.
+        """
+        return self._fila.descarregar()
+
+    def _primeira_seq_visivel(self):
+        if self.antigas:
+            return self.antigas[0]["seq"]
+        if self.recentes:
+            return self.recentes[0]["seq"]
+        return None
+
+    def tem_anteriores(self):
+        primeira = self._primeira_seq_visivel()
+        return primeira is not None and primeira > 1 and len(self.antigas) < MAX_ANTIGAS
+
+    def carregar_anteriores(self, limite=TAMANHO_PAGINA):
+        """
+        Traz do banco a página anterior à mensagem mais antiga visível,
+        sem passar de MAX_ANTIGAS mensagens antigas em memória.
+        """
+        limite = min(limite, MAX_ANTIGAS - len(self.antigas))
+        if limite <= 0:
+            return 0
+        self.flush()
+        pagina = executar_no_banco(self._fila.banco, get_chat_messages, self.sessao,
+                                   self._primeira_seq_visivel(), limite)
+        self.antigas = pagina + self.antigas
+        return len(pagina)
+
+    def ocultar_anteriores(self):
+        self.antigas = []
+
+    def __iter__(self):
+        yield from self.antigas
+        yield from self.recentes
@@ -0,0 +1,108 @@
+# ====================================================================
+# ARQUIVO: utils/comandos.py
+# Gramática de comandos em lote do chatbot (sem dependência do Streamlit)
+# ====================================================================
+#
+#   vender 12x3, 15x1, 18           -> [(12, 3), (15, 1), (18, 1)]
+#   adicionar "Nome"; 59,90; 10; Natura; Perfumaria; Colônias
+#
+# No `adicionar` os campos são separados por ';' (o preço usa vírgula
+# decimal); um nome entre aspas pode conter ';'. Vários produtos podem ir na mesma mensagem, um por linha.
+# Campos opcionais ao final: validade e código de barras.
+
+import csv
+import re
+
+from utils import categorias
+from utils.database import safe_float, safe_int, safe_date, normalizar_sku
+
+RE_ITEM_VENDA = re.compile(r"^\s*#?(\d+)\s*(?:[x\*]\s*(\d+))?\s*$", re.IGNORECASE)
+RE_SEPARADOR_ITENS = re.compile(r"[,\n]+")
+RE_SEPARADOR_PRODUTOS = re.compile(r"\n+|\s\|\s")
+
+CAMPOS_PRODUTO = ("nome", "preco", "quantidade", "marca", "estilo", "tipo", "data_validade", "sku")
+CAMPOS_OBRIGATORIOS = 6
+
+
+class ErroComando(ValueError):
+    """Erro de sintaxe/validação com mensagem pronta para o usuário."""
+
+
+def parse_itens_venda(texto):
+    """
+    "12x3, 15x1, 18" -> [(12, 3), (15, 1), (18, 1)].
+    IDs repetidos são somados para gerar um único UPDATE por produto.
+    """
+    itens = {}
+    for token in RE_SEPARADOR_ITENS.split(texto):
+        if not token.strip():
+            continue
+        m = RE_ITEM_VENDA.match(token)
+        if not m:
+            raise ErroComando(f"Item inválido: `{token.strip()}`. Use `ID` ou `IDxQTD`.")
+        pid = int(m.group(1))
+        qtd = int(m.group(2)) if m.group(2) else 1
+        if qtd <= 0:
+            raise ErroComando(f"Quantidade inválida para ID {pid}.")
+        itens[pid] = itens.get(pid, 0) + qtd
+    if not itens:
+        raise ErroComando("Nenhum item informado. Ex: `vender 12x3, 15`")
+    return list(itens.items())
+
+
+def parse_produto(linha):
+    """
+    Converte uma linha `"Nome"; preço; qtd; marca; estilo; tipo[; validade[; sku]]`
+    num dict pronto para add_produtos_batch.
+    Marca/estilo/tipo passam pelo índice aproximado de utils.categorias.
+    """
+    # leitor de CSV: respeita as aspas do nome ("Kit; Dia dos Pais")
+    partes = [p.strip() for p in next(csv.reader([linha], delimiter=";", skipinitialspace=True), [])]
+    if len(partes) < CAMPOS_OBRIGATORIOS or len(partes) > len(CAMPOS_PRODUTO):
+        raise ErroComando(
+            "Formato: `adicionar \"Nome\"; preço; quantidade; marca; estilo; tipo[; validade; código]`"
+        )
+    dados = dict(zip(CAMPOS_PRODUTO, partes))
+
+    nome = dados["nome"].strip().strip('"').strip("'").strip()
+    if not nome:
+        raise ErroComando("Nome vazio.")
+    preco = safe_float(dados["preco"], default=-1)
+    if preco <= 0:
+        raise ErroComando(f"Preço inválido para '{nome}': {dados['preco']}")
+    if not dados["quantidade"].lstrip("-").isdigit() or safe_int(dados["quantidade"], -1) < 0:
+        raise ErroComando(f"Quantidade inválida para '{nome}': {dados['quantidade']}")
+
+    produto = {"nome": nome, "preco": preco, "quantidade": safe_int(dados["quantidade"])}
+    for campo in ("marca", "estilo", "tipo"):
+        valor = categorias.resolver(campo, dados[campo])
+        if valor is None:
+            dica = categorias.sugestoes(campo, dados[campo])
+            raise ErroComando(
+                f"{campo.title()} não reconhecido(a) para '{nome}': {dados[campo]}"
+                + (f". Você quis dizer: {dica}?" if dica else "")
+            )
+        produto[campo] = valor
+
+    validade = dados.get("data_validade")
+    if validade:
+        produto["data_validade"] = safe_date(validade)
+        if produto["data_validade"] is None:
+            raise ErroComando(f"Validade inválida para '{nome}': {validade}")
+    produto["sku"] = normalizar_sku(dados.get("sku"))
+    return produto
+
+
+def parse_lote_produtos(texto):
+    """
+    Vários produtos separados por quebra de linha (ou ` | `).
+    Cada linha pode repetir ou não a palavra `adicionar`.
+    """
+    produtos = []
+    for linha in RE_SEPARADOR_PRODUTOS.split(texto):
+        linha = re.sub(r"^\s*adicionar\s+", "", linha, flags=re.IGNORECASE).strip()
+        if linha:
+            produtos.append(parse_produto(linha))
+    if not produtos:
+        raise ErroComando("Nenhum produto informado.")
+    return produtos
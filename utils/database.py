@@ -6,12 +6,28 @@
 import sqlite3
 import os
 import hashlib
+import hmac
+import secrets
 import csv
 import io
-from datetime import datetime
+import json
+import time
+import atexit
+import logging
+import threading
+import unicodedata
+import contextvars
+from collections.abc import Mapping
+from contextlib import contextmanager
+from datetime import datetime, date, timedelta
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
 from reportlab.lib.units import cm
+from openpyxl import load_workbook
+
+from utils import agendador
+
+logger = logging.getLogger(__name__)
 
 # ====================================================================
 # CONFIGURAÇÕES
@@ -21,6 +37,11 @@ DATABASE_DIR = "data"
 ASSETS_DIR = "assets"
 DATABASE = os.path.join(DATABASE_DIR, "estoque.db")
 
+RESERVA_TTL_SEGUNDOS = 10 * 60
+AUDITORIA_LOTE = 50
+AUDITORIA_INTERVALO_SEGUNDOS = 5
+PAPEL_TTL_SEGUNDOS = 60
+
 os.makedirs(DATABASE_DIR, exist_ok=True)
 os.makedirs(ASSETS_DIR, exist_ok=True)
 
@@ -91,10 +112,94 @@ def safe_float(value, default=0.0):
     except:
         return default
 
+_FORMATOS_DATA = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d")
+
+def safe_date(value, default=None):
+    """
+    Converte datas (date, ISO ou dd/mm/aaaa) para texto ISO (AAAA-MM-DD).
+    Valores vazios ou inválidos retornam o default.
+    """
+    if value is None:
+        return default
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    texto = str(value).strip()
+    if not texto:
+        return default
+    # aceita também timestamps ISO completos (AAAA-MM-DDTHH:MM:SS)
+    texto = texto[:10] if len(texto) > 10 and texto[10] in "T " else texto
+    for fmt in _FORMATOS_DATA:
+        try:
+            return datetime.strptime(texto, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return default
+
+def normalizar_sku(value):
+    """
+    Código de barras / SKU sem espaços; vazio vira None.
+    """
+    if value is None:
+        return None
+    texto = str(value).strip()
+    return texto or None
+
+def validar_data_validade(value):
+    """
+    Valida a data de validade recebida pelos formulários.
+    Vazio vira None; formato inválido levanta ValueError.
+    """
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None
+    iso = safe_date(value)
+    if iso is None:
+        raise ValueError(f"Data de validade inválida: {value}")
+    return iso
+
 def hash_password(password: str) -> str:
     return hashlib.sha256(password.encode()).hexdigest()
 
+# Banco da loja em uso. Cada execução de página (e cada thread de
+# trabalho) define o seu; sem definição vale o banco principal.
+_banco_atual = contextvars.ContextVar("banco_atual", default=None)
+
+def caminho_banco():
+    return _banco_atual.get() or DATABASE
+
+def usar_banco(caminho):
+    """
+    Define o banco usado pelas funções deste módulo no contexto atual
+    (a execução da página, no Streamlit).
+    """
+    _banco_atual.set(caminho)
+
+@contextmanager
+def banco(caminho):
+    """
+    Executa o bloco contra outro banco e restaura o anterior no fim.
+    """
+    token = _banco_atual.set(caminho)
+    try:
+        yield
+    finally:
+        _banco_atual.reset(token)
+
+def executar_no_banco(caminho, func, *args):
+    """
+    func(*args) contra o banco indicado (para tarefas em outras threads).
+    """
+    with banco(caminho):
+        return func(*args)
+
 def get_db_connection():
+    conn = sqlite3.connect(caminho_banco())
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def _conexao_usuarios():
+    # contas de acesso valem para todas as lojas: ficam no banco principal
     conn = sqlite3.connect(DATABASE)
     conn.row_factory = sqlite3.Row
     return conn
@@ -119,7 +224,8 @@ def create_tables():
             foto TEXT,
             data_validade TEXT,
             vendido INTEGER DEFAULT 0,
-            data_ultima_venda TEXT
+            data_ultima_venda TEXT,
+            sku TEXT
         )
     """)
 
@@ -140,33 +246,684 @@ def create_tables():
     except sqlite3.IntegrityError:
         pass
 
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS chat_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sessao TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            username TEXT,
+            role TEXT NOT NULL,
+            content TEXT NOT NULL,
+            criado_em TEXT NOT NULL
+        )
+    """)
+    cur.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_chat_log_sessao_seq ON chat_log (sessao, seq)"
+    )
+
+    _ensure_column(cur, "produtos", "sku", "TEXT")
+    cur.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_produtos_sku "
+        "ON produtos (sku) WHERE sku IS NOT NULL"
+    )
+
+    # data de cadastro: é a referência do arquivamento para quem nunca
+    # vendeu. Produtos que já existiam recebem a data da migração (não se
+    # sabe quando entraram), então não são arquivados antes do prazo.
+    if _ensure_column(cur, "produtos", "cadastrado_em", "TEXT"):
+        cur.execute("UPDATE produtos SET cadastrado_em = ?", (datetime.now().isoformat(),))
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_produtos_cadastrado_em AFTER INSERT ON produtos
+        WHEN NEW.cadastrado_em IS NULL
+        BEGIN
+            UPDATE produtos SET cadastrado_em = strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime')
+            WHERE id = NEW.id;
+        END
+    """)
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS produtos_arquivados (
+            id INTEGER PRIMARY KEY,
+            nome TEXT NOT NULL,
+            preco REAL NOT NULL,
+            quantidade INTEGER NOT NULL,
+            arquivado_em TEXT NOT NULL
+        )
+    """)
+    _sincronizar_colunas_arquivo(cur)
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS ajustes_massa (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            criado_em TEXT NOT NULL,
+            usuario TEXT,
+            campo TEXT NOT NULL,
+            operacao TEXT NOT NULL,
+            valor REAL NOT NULL,
+            filtros TEXT,
+            afetados INTEGER NOT NULL DEFAULT 0,
+            desfeito_em TEXT
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS ajustes_massa_itens (
+            ajuste_id INTEGER NOT NULL,
+            produto_id INTEGER NOT NULL,
+            antes REAL,
+            depois REAL,
+            PRIMARY KEY (ajuste_id, produto_id)
+        ) WITHOUT ROWID
+    """)
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS reservas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            produto_id INTEGER NOT NULL,
+            sessao TEXT NOT NULL,
+            quantidade INTEGER NOT NULL,
+            criado_em TEXT NOT NULL,
+            expira_em REAL NOT NULL,
+            UNIQUE (sessao, produto_id)
+        )
+    """)
+    # varredura de expiradas e soma das reservas ativas por produto
+    # (a segunda é coberta pelo índice, sem ler a tabela)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_reservas_expira ON reservas(expira_em)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_reservas_produto ON reservas(produto_id, expira_em, quantidade)")
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS auditoria (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            criado_em TEXT NOT NULL,
+            usuario TEXT,
+            acao TEXT NOT NULL,
+            produto_id INTEGER,
+            detalhes TEXT
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_auditoria_data ON auditoria(criado_em)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_auditoria_usuario ON auditoria(usuario, criado_em)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_auditoria_produto ON auditoria(produto_id, criado_em)")
+    # somente inserção: registros de auditoria não podem ser alterados
+    for evento in ("UPDATE", "DELETE"):
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_auditoria_bloqueia_{evento.lower()}
+            BEFORE {evento} ON auditoria
+            BEGIN
+                SELECT RAISE(ABORT, 'auditoria é somente inserção');
+            END
+        """)
+
+    # inventários (contagem física): cabeçalho + esperado/contado por produto
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS inventarios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            criado_em TEXT NOT NULL,
+            usuario TEXT,
+            observacao TEXT,
+            itens INTEGER NOT NULL,
+            diferenca_unidades INTEGER NOT NULL,
+            diferenca_valor REAL NOT NULL
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS inventarios_itens (
+            inventario_id INTEGER NOT NULL,
+            produto_id INTEGER NOT NULL,
+            esperado INTEGER NOT NULL,
+            contado INTEGER NOT NULL,
+            antes INTEGER NOT NULL,
+            depois INTEGER NOT NULL,
+            PRIMARY KEY (inventario_id, produto_id)
+        ) WITHOUT ROWID
+    """)
+
+    # hashes perceptuais das fotos de assets/ (utils/duplicatas.py); assets/
+    # é compartilhado, então só a tabela do banco principal é usada
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS hash_imagens (
+            arquivo TEXT PRIMARY KEY,
+            tamanho INTEGER NOT NULL,
+            mtime REAL NOT NULL,
+            dhash INTEGER,
+            phash INTEGER,
+            calculado_em TEXT NOT NULL
+        )
+    """)
+
+    # fotografia diária do estoque por categoria (uma linha por dia/dimensão/chave)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS estoque_diario (
+            dia TEXT NOT NULL,
+            dimensao TEXT NOT NULL,
+            chave TEXT NOT NULL,
+            skus INTEGER NOT NULL,
+            unidades INTEGER NOT NULL,
+            valor REAL NOT NULL,
+            registrado_em TEXT NOT NULL,
+            PRIMARY KEY (dimensao, dia, chave)
+        ) WITHOUT ROWID
+    """)
+
+    _criar_versao_dados(cur)
+    _criar_log_mudancas(cur)
+
+    _normalizar_datas_validade(cur)
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_produtos_validade "
+        "ON produtos (data_validade) WHERE data_validade IS NOT NULL"
+    )
+
     conn.commit()
     conn.close()
 
+def _ensure_column(cur, table, column, decl):
+    """
+    Migração: adiciona a coluna se ela ainda não existir na tabela.
+    Retorna True se adicionou.
+    """
+    cols = {r["name"] for r in cur.execute(f"PRAGMA table_info({table})")}
+    if column not in cols:
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+        return True
+    return False
+
+def _criar_versao_dados(cur):
+    """
+    Contador em `meta` incrementado por triggers a cada escrita em produtos.
+    Serve de versão dos dados para caches e ETags, valendo para qualquer
+    caminho de escrita (inclusive UPDATEs em massa e outros processos).
+    """
+    cur.execute("CREATE TABLE IF NOT EXISTS meta (chave TEXT PRIMARY KEY, valor INTEGER NOT NULL)")
+    cur.execute("INSERT OR IGNORE INTO meta (chave, valor) VALUES ('versao_dados', 0)")
+    for evento in ("INSERT", "UPDATE", "DELETE"):
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_produtos_versao_{evento.lower()}
+            AFTER {evento} ON produtos
+            BEGIN
+                UPDATE meta SET valor = valor + 1 WHERE chave = 'versao_dados';
+            END
+        """)
+
+# colunas de produtos com regra própria na sincronização (as demais: vence
+# a alteração mais recente); quantidade vai como delta, a última venda pelo
+# maior valor e a data de cadastro é de cada banco
+_COLUNAS_SEM_LWW = ("id", "quantidade", "vendido", "data_ultima_venda", "cadastrado_em")
+
+# id de um produto cadastrado neste banco: o seguinte ao último criado aqui.
+# Sem o id explícito o AUTOINCREMENT usa MAX(id) + 1, e depois de receber
+# um produto de um terminal (faixa de ids dele, ver sincronizacao.clonar)
+# a loja passaria a cadastrar na faixa do terminal. sqlite_sequence volta
+# à faixa local depois de cada lote aplicado (sincronizacao.aplicar_lote);
+# sem linha ainda (banco novo), o NULL deixa o SQLite escolher.
+_SQL_NOVO_ID = "(SELECT seq + 1 FROM sqlite_sequence WHERE name = 'produtos')"
+
+def _criar_log_mudancas(cur):
+    """
+    Log de mudanças de produtos, numerado por seq, para a sincronização
+    entre cópias do banco (utils/sincronizacao.py). Triggers registram
+    cada escrita: I/R (inclusão/restauração, linha inteira), U (delta de
+    quantidade, colunas alteradas e data da venda), A (arquivado) e D.
+    Mudanças vindas de outro banco são gravadas por quem aplica o lote,
+    com a origem e o horário originais e o nó de quem veio (via);
+    enquanto isso (aplicando=1 em sincronizacao) os triggers não
+    registram nada.
+    """
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS produtos_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            produto_id INTEGER NOT NULL,
+            op TEXT NOT NULL,
+            delta INTEGER NOT NULL DEFAULT 0,
+            campos TEXT,
+            venda TEXT,
+            registrado_em TEXT NOT NULL,
+            origem TEXT,
+            via TEXT
+        )
+    """)
+    # última alteração de cadastro do produto (regra "vence a mais recente")
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_produtos_log_campos "
+        "ON produtos_log (produto_id, registrado_em) WHERE campos IS NOT NULL"
+    )
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS sincronizacao (
+            no TEXT PRIMARY KEY,
+            local INTEGER NOT NULL DEFAULT 0,
+            recebido_ate INTEGER NOT NULL DEFAULT 0,
+            confirmado_ate INTEGER NOT NULL DEFAULT 0,
+            aplicando INTEGER NOT NULL DEFAULT 0,
+            atualizado_em TEXT
+        )
+    """)
+    cur.execute(
+        "INSERT INTO sincronizacao (no, local) SELECT ?, 1 "
+        "WHERE NOT EXISTS (SELECT 1 FROM sincronizacao WHERE local = 1)",
+        (secrets.token_hex(4),)
+    )
+
+    # os triggers listam as colunas: são recriados quando uma migração muda a tabela
+    colunas = [c for c in _colunas_produtos(cur) if c != "id"]
+    cadastro = [c for c in colunas if c not in _COLUNAS_SEM_LWW]
+
+    def objeto(linha, cols):
+        return "json_object(" + ", ".join(f"'{c}', {linha}.{c}" for c in cols) + ")"
+
+    mudou_cadastro = " OR ".join(f"NEW.{c} IS NOT OLD.{c}" for c in cadastro)
+    livre = "NOT EXISTS (SELECT 1 FROM sincronizacao WHERE aplicando = 1)"
+    agora = "strftime('%Y-%m-%dT%H:%M:%fZ', 'now')"
+    triggers = {
+        "trg_produtos_log_insert": f"""CREATE TRIGGER trg_produtos_log_insert AFTER INSERT ON produtos WHEN {livre}
+        BEGIN
+            INSERT INTO produtos_log (produto_id, op, delta, campos, venda, registrado_em)
+            VALUES (NEW.id,
+                    CASE WHEN EXISTS (SELECT 1 FROM produtos_arquivados WHERE id = NEW.id) THEN 'R' ELSE 'I' END,
+                    NEW.quantidade, {objeto("NEW", colunas)}, NEW.data_ultima_venda, {agora});
+        END""",
+        "trg_produtos_log_update": f"""CREATE TRIGGER trg_produtos_log_update AFTER UPDATE ON produtos
+        WHEN {livre} AND (NEW.quantidade IS NOT OLD.quantidade
+                          OR NEW.data_ultima_venda IS NOT OLD.data_ultima_venda OR {mudou_cadastro})
+        BEGIN
+            INSERT INTO produtos_log (produto_id, op, delta, campos, venda, registrado_em)
+            VALUES (NEW.id, 'U', NEW.quantidade - OLD.quantidade,
+                    CASE WHEN {mudou_cadastro} THEN {objeto("NEW", cadastro)} END,
+                    CASE WHEN NEW.data_ultima_venda IS NOT OLD.data_ultima_venda THEN NEW.data_ultima_venda END,
+                    {agora});
+        END""",
+        "trg_produtos_log_delete": f"""CREATE TRIGGER trg_produtos_log_delete AFTER DELETE ON produtos WHEN {livre}
+        BEGIN
+            INSERT INTO produtos_log (produto_id, op, campos, registrado_em)
+            SELECT OLD.id, 'A', json_object('arquivado_em', arquivado_em), {agora}
+            FROM produtos_arquivados WHERE id = OLD.id
+            UNION ALL
+            SELECT OLD.id, 'D', NULL, {agora}
+            WHERE NOT EXISTS (SELECT 1 FROM produtos_arquivados WHERE id = OLD.id);
+        END""",
+    }
+    for nome, sql in triggers.items():
+        atual = cur.execute("SELECT sql FROM sqlite_master WHERE type='trigger' AND name=?", (nome,)).fetchone()
+        if atual is None or atual["sql"] != sql:
+            cur.execute(f"DROP TRIGGER IF EXISTS {nome}")
+            cur.execute(sql)
+
+def get_data_version():
+    """
+    Versão atual dos dados de produtos (muda a cada escrita).
+    """
+    conn = get_db_connection()
+    row = conn.execute("SELECT valor FROM meta WHERE chave='versao_dados'").fetchone()
+    conn.close()
+    return row["valor"] if row else 0
+
+def _colunas_produtos(cur):
+    return [r["name"] for r in cur.execute("PRAGMA table_info(produtos)")]
+
+def _sincronizar_colunas_arquivo(cur):
+    """
+    Migração: produtos_arquivados acompanha as colunas de produtos, assim
+    novas colunas não exigem mexer no arquivamento.
+    """
+    tipos = {r["name"]: r["type"] for r in cur.execute("PRAGMA table_info(produtos)")}
+    for coluna in tipos:
+        _ensure_column(cur, "produtos_arquivados", coluna, tipos[coluna] or "TEXT")
+
+def _normalizar_datas_validade(cur):
+    """
+    Migração: converte datas de validade antigas (texto livre) para ISO.
+    Só toca nas linhas fora do padrão AAAA-MM-DD; inválidas viram NULL.
+    """
+    cur.execute("""
+        SELECT id, data_validade FROM produtos
+        WHERE data_validade IS NOT NULL
+          AND data_validade NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'
+    """)
+    rows = cur.fetchall()
+    if rows:
+        cur.executemany(
+            "UPDATE produtos SET data_validade=? WHERE id=?",
+            [(safe_date(r["data_validade"]), r["id"]) for r in rows]
+        )
+
 create_tables()
 
 # ====================================================================
-# PRODUTOS
+# AUDITORIA
 # ====================================================================
+#
+# Cada escrita registra quem fez o quê (usuário, ação, produto e o diff
+# antes/depois). Os registros vão para um buffer em memória e são
+# gravados em lote (um executemany/commit) quando o buffer enche, a cada
+# AUDITORIA_INTERVALO_SEGUNDOS pelo agendador e ao encerrar o processo,
+# então a escrita auditada não paga um commit a mais.
+
+class _BufferAuditoria:
+    MAXIMO_PENDENTES = 10_000  # se o banco ficar indisponível, não cresce sem limite
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pendentes = []
+        self._agendado = False
+
+    def registrar(self, entrada):
+        with self._lock:
+            self._pendentes.append(entrada)
+            cheio = len(self._pendentes) >= AUDITORIA_LOTE
+            agendar = not self._agendado
+            self._agendado = True
+        if agendar:
+            agendador.agendar("auditoria", self.flush, AUDITORIA_INTERVALO_SEGUNDOS)
+        if cheio:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            lote, self._pendentes = self._pendentes, []
+        if not lote:
+            return 0
+        # cada registro vai para o banco da loja em que a escrita aconteceu
+        por_banco = {}
+        for entrada in lote:
+            por_banco.setdefault(entrada["banco"], []).append(entrada)
+        gravados = 0
+        for caminho, entradas in por_banco.items():
+            try:
+                conn = sqlite3.connect(caminho)
+                try:
+                    conn.executemany("""
+                        INSERT INTO auditoria (criado_em, usuario, acao, produto_id, detalhes)
+                        VALUES (:criado_em, :usuario, :acao, :produto_id, :detalhes)
+                    """, entradas)
+                    conn.commit()
+                finally:
+                    conn.close()
+                gravados += len(entradas)
+            except Exception:
+                logger.exception("Falha ao gravar %s registro(s) de auditoria", len(entradas))
+                with self._lock:
+                    self._pendentes = (entradas + self._pendentes)[-self.MAXIMO_PENDENTES:]
+        return gravados
+
+
+_auditoria = _BufferAuditoria()
+atexit.register(_auditoria.flush)
+
+def _diff(antes, depois):
+    return {k: [antes.get(k), v] for k, v in depois.items() if antes.get(k) != v}
+
+def _auditar(usuario, acao, produto_id=None, antes=None, depois=None, **extra):
+    """
+    Enfileira um registro de auditoria. Com antes e depois guarda só os
+    campos alterados; com um deles só, o registro inteiro.
+    """
+    detalhes = dict(extra)
+    if antes is not None and depois is not None:
+        detalhes["diff"] = _diff(antes, depois)
+    elif antes is not None:
+        detalhes["antes"] = antes
+    elif depois is not None:
+        detalhes["depois"] = depois
+    _auditoria.registrar({
+        # absoluto: o buffer também é gravado na saída do processo
+        "banco": os.path.abspath(caminho_banco()),
+        "criado_em": datetime.now().isoformat(),
+        "usuario": usuario,
+        "acao": acao,
+        "produto_id": produto_id,
+        "detalhes": json.dumps(detalhes, ensure_ascii=False, default=str) if detalhes else None,
+    })
+
+def flush_auditoria():
+    """
+    Grava agora os registros pendentes (ex.: antes de consultar).
+    """
+    return _auditoria.flush()
+
+def get_auditoria(usuario=None, produto_id=None, desde=None, ate=None, acao=None, limite=200):
+    """
+    Registros de auditoria mais recentes primeiro. Filtros por usuário,
+    produto e intervalo de datas usam os índices (usuario|produto_id, criado_em).
+    `desde`/`ate` são datas ou strings ISO; `ate` é inclusivo no dia.
+    """
+    flush_auditoria()
+    sql = "SELECT * FROM auditoria WHERE 1=1"
+    params = []
+    if usuario:
+        sql += " AND usuario = ?"
+        params.append(usuario)
+    if produto_id is not None:
+        sql += " AND produto_id = ?"
+        params.append(produto_id)
+    if desde:
+        sql += " AND criado_em >= ?"
+        params.append(str(desde))
+    if ate:
+        ate = str(ate)
+        if "T" in ate:
+            sql += " AND criado_em <= ?"
+        else:
+            sql += " AND criado_em < ?"
+            ate = (date.fromisoformat(ate) + timedelta(days=1)).isoformat()
+        params.append(ate)
+    if acao:
+        sql += " AND acao = ?"
+        params.append(acao)
+    sql += " ORDER BY criado_em DESC, id DESC LIMIT ?"
+    params.append(limite)
+    conn = get_db_connection()
+    data = []
+    for r in conn.execute(sql, params).fetchall():
+        d = dict(r)
+        d["detalhes"] = json.loads(d["detalhes"]) if d["detalhes"] else {}
+        data.append(d)
+    conn.close()
+    return data
 
-def add_produto(nome, preco, quantidade, marca, estilo, tipo, foto=None, data_validade=None):
+def get_auditoria_usuarios():
+    """
+    Usuários que aparecem na auditoria (para o filtro da área administrativa).
+    """
+    flush_auditoria()
     conn = get_db_connection()
-    conn.execute("""
-        INSERT INTO produtos
-        (nome, preco, quantidade, marca, estilo, tipo, foto, data_validade)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    """, (nome, preco, quantidade, marca, estilo, tipo, foto, data_validade))
-    conn.commit()
+    data = [r[0] for r in conn.execute(
+        "SELECT DISTINCT usuario FROM auditoria WHERE usuario IS NOT NULL ORDER BY usuario"
+    ).fetchall()]
     conn.close()
+    return data
+
+# ====================================================================
+# PRODUTOS
+# ====================================================================
+
+_CAMPOS_PRODUTO = ("id", "nome", "preco", "quantidade", "marca", "estilo", "tipo", "foto",
+                   "data_validade", "vendido", "data_ultima_venda", "sku", "cadastrado_em", "arquivado")
+_CAMPOS_PRODUTO_SET = frozenset(_CAMPOS_PRODUTO)
+
+class Produto(Mapping):
+    """
+    Linha de produto com __slots__ e tipos já convertidos na leitura
+    (preco float; quantidade, vendido e arquivado int), lida por atributo
+    (p.preco) ou como dict somente leitura (p["preco"], p.get("marca"),
+    dict(p)). Como num dict vindo do SELECT, só existem as chaves das
+    colunas consultadas: "arquivado" só aparece com include_archived.
+    """
+    __slots__ = _CAMPOS_PRODUTO
+
+    def __init__(self, id, nome, preco, quantidade, marca, estilo, tipo, foto, data_validade,
+                 vendido, data_ultima_venda, sku, cadastrado_em=None, arquivado=None):
+        self.id = id
+        self.nome = nome
+        self.preco = preco if preco.__class__ is float else safe_float(preco)
+        self.quantidade = quantidade if quantidade.__class__ is int else safe_int(quantidade)
+        self.marca = marca
+        self.estilo = estilo
+        self.tipo = tipo
+        self.foto = foto
+        self.data_validade = data_validade
+        self.vendido = vendido if vendido.__class__ is int else safe_int(vendido)
+        self.data_ultima_venda = data_ultima_venda
+        self.sku = sku
+        self.cadastrado_em = cadastrado_em
+        if arquivado is not None:
+            self.arquivado = int(arquivado)
+
+    def __getitem__(self, chave):
+        if chave in _CAMPOS_PRODUTO_SET:
+            try:
+                return getattr(self, chave)
+            except AttributeError:
+                pass
+        raise KeyError(chave)
+
+    def get(self, chave, default=None):
+        if chave in _CAMPOS_PRODUTO_SET:
+            return getattr(self, chave, default)
+        return default
+
+    def __contains__(self, chave):
+        return chave in _CAMPOS_PRODUTO_SET and hasattr(self, chave)
+
+    def __iter__(self):
+        return (c for c in _CAMPOS_PRODUTO if hasattr(self, c))
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def to_dict(self):
+        return {c: getattr(self, c) for c in self}
+
+    def __repr__(self):
+        return f"Produto({self.to_dict()!r})"
+
+def _fabrica_produtos(description):
+    """
+    row_factory para cursor.description já conhecido: monta Produto
+    direto da tupla quando as colunas são as da tabela (na ordem do
+    CREATE TABLE, com ou sem "arquivado"); colunas diferentes (ex.: uma
+    coluna nova ainda sem campo em Produto) caem em dict comum.
+    """
+    nomes = tuple(d[0] for d in description)
+    if nomes in (_CAMPOS_PRODUTO, _CAMPOS_PRODUTO[:-1]):
+        return lambda cursor, row: Produto(*row)
+    if _CAMPOS_PRODUTO_SET.issuperset(nomes) and _CAMPOS_PRODUTO_SET.difference(nomes) <= {"arquivado"}:
+        return lambda cursor, row: Produto(**dict(zip(nomes, row)))
+    return lambda cursor, row: dict(zip(nomes, row))
+
+def add_produto(nome, preco, quantidade, marca, estilo, tipo, foto=None, data_validade=None, sku=None,
+                usuario=None):
+    data_validade = validar_data_validade(data_validade)
+    valores = {"nome": nome, "preco": preco, "quantidade": quantidade, "marca": marca, "estilo": estilo,
+               "tipo": tipo, "foto": foto, "data_validade": data_validade, "sku": normalizar_sku(sku)}
+    conn = get_db_connection()
+    try:
+        cur = conn.execute(f"""
+            INSERT INTO produtos
+            (id, nome, preco, quantidade, marca, estilo, tipo, foto, data_validade, sku)
+            VALUES ({_SQL_NOVO_ID}, :nome, :preco, :quantidade, :marca, :estilo, :tipo, :foto, :data_validade, :sku)
+        """, valores)
+        conn.commit()
+        _auditar(usuario, "criar", cur.lastrowid, depois=valores)
+        return cur.lastrowid
+    except sqlite3.IntegrityError:
+        raise ValueError(f"Código de barras já cadastrado: {sku}")
+    finally:
+        conn.close()
+
+def add_produtos_batch(produtos, usuario=None):
+    """
+    Insere vários produtos (lista de dicts com as colunas de add_produto)
+    numa única transação. Um item com erro (ex.: código de barras repetido)
+    não impede os demais.
+    Retorna uma lista de dicts {nome, ok, id, erro}.
+    """
+    resultados = []
+    criados = []
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("BEGIN IMMEDIATE")
+        for p in produtos:
+            res = {"nome": p.get("nome"), "ok": False, "id": None, "erro": None}
+            resultados.append(res)
+            try:
+                valores = {
+                    "nome": p["nome"], "preco": p["preco"], "quantidade": p["quantidade"],
+                    "marca": p.get("marca"), "estilo": p.get("estilo"), "tipo": p.get("tipo"),
+                    "foto": p.get("foto"), "data_validade": validar_data_validade(p.get("data_validade")),
+                    "sku": normalizar_sku(p.get("sku")),
+                }
+                cur.execute(f"""
+                    INSERT INTO produtos
+                    (id, nome, preco, quantidade, marca, estilo, tipo, foto, data_validade, sku)
+                    VALUES ({_SQL_NOVO_ID}, :nome, :preco, :quantidade, :marca, :estilo, :tipo, :foto,
+                            :data_validade, :sku)
+                """, valores)
+                res["ok"] = True
+                res["id"] = cur.lastrowid
+                criados.append((cur.lastrowid, valores))
+            except sqlite3.IntegrityError:
+                res["erro"] = f"Código de barras já cadastrado: {p.get('sku')}"
+            except ValueError as e:
+                res["erro"] = str(e)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    for pid, valores in criados:
+        _auditar(usuario, "criar", pid, depois=valores)
+    return resultados
 
-def get_all_produtos(include_sold=True):
+def get_all_produtos(include_sold=True, include_archived=False):
+    """
+    Produtos da tabela principal, como registros Produto. Com
+    include_archived=True também traz os arquivados (zerados e parados),
+    marcados com arquivado=1.
+    """
     conn = get_db_connection()
     cur = conn.cursor()
-    if include_sold:
+    if include_archived:
+        colunas = ", ".join(_colunas_produtos(cur))
+        cur.execute(f"""
+            SELECT {colunas}, 0 AS arquivado FROM produtos
+            UNION ALL
+            SELECT {colunas}, 1 AS arquivado FROM produtos_arquivados
+            ORDER BY nome
+        """)
+    elif include_sold:
         cur.execute("SELECT * FROM produtos ORDER BY nome")
     else:
         cur.execute("SELECT * FROM produtos WHERE quantidade > 0 ORDER BY nome")
-    data = [dict(r) for r in cur.fetchall()]
+    cur.row_factory = _fabrica_produtos(cur.description)
+    data = cur.fetchall()
+    conn.close()
+    return data
+
+def get_produtos_page(after_id=None, limit=50, marca=None, estilo=None, tipo=None,
+                      busca=None, em_estoque=False):
+    """
+    Página de produtos ordenada por ID com paginação por chave (keyset):
+    passe o último ID recebido em `after_id` para obter a próxima página.
+    """
+    sql = "SELECT * FROM produtos WHERE 1=1"
+    params = []
+    if after_id is not None:
+        sql += " AND id > ?"
+        params.append(after_id)
+    for coluna, valor in (("marca", marca), ("estilo", estilo), ("tipo", tipo)):
+        if valor:
+            sql += f" AND {coluna} = ?"
+            params.append(valor)
+    if busca:
+        sql += " AND nome LIKE ?"
+        params.append(f"%{busca}%")
+    if em_estoque:
+        sql += " AND quantidade > 0"
+    sql += " ORDER BY id LIMIT ?"
+    params.append(limit)
+    conn = get_db_connection()
+    data = [dict(r) for r in conn.execute(sql, params).fetchall()]
     conn.close()
     return data
 
@@ -178,70 +935,823 @@ def get_produto_by_id(pid):
     conn.close()
     return dict(row) if row else None
 
-def update_produto(pid, nome, preco, quantidade, marca, estilo, tipo, foto, data_validade):
+def update_produto(pid, nome, preco, quantidade, marca, estilo, tipo, foto, data_validade, sku=None,
+                   usuario=None):
+    """
+    Atualiza todos os campos do produto. O SKU só é alterado quando
+    informado (string vazia remove o código).
+    """
+    valores = {"nome": nome, "preco": preco, "quantidade": quantidade, "marca": marca, "estilo": estilo,
+               "tipo": tipo, "foto": foto, "data_validade": validar_data_validade(data_validade)}
+    if sku is not None:
+        valores["sku"] = normalizar_sku(sku)
+    sql = "UPDATE produtos SET " + ", ".join(f"{k}=:{k}" for k in valores) + " WHERE id=:id"
+    conn = get_db_connection()
+    try:
+        antes = conn.execute("SELECT * FROM produtos WHERE id=?", (pid,)).fetchone()
+        conn.execute(sql, {**valores, "id": pid})
+        conn.commit()
+        if antes:
+            _auditar(usuario, "editar", pid, antes=dict(antes), depois=valores)
+    except sqlite3.IntegrityError:
+        raise ValueError(f"Código de barras já cadastrado: {sku}")
+    finally:
+        conn.close()
+
+def set_produto_foto(pid, foto, usuario=None):
+    """
+    Atualiza só a foto do produto (usado pelo processamento de uploads).
+    """
     conn = get_db_connection()
-    conn.execute("""
-        UPDATE produtos
-        SET nome=?, preco=?, quantidade=?, marca=?, estilo=?, tipo=?, foto=?, data_validade=?
-        WHERE id=?
-    """, (nome, preco, quantidade, marca, estilo, tipo, foto, data_validade, pid))
+    antes = conn.execute("SELECT foto FROM produtos WHERE id=?", (pid,)).fetchone()
+    cur = conn.execute("UPDATE produtos SET foto=? WHERE id=?", (foto, pid))
     conn.commit()
     conn.close()
+    if cur.rowcount == 0:
+        raise ValueError("Produto não encontrado")
+    _auditar(usuario, "foto", pid, antes=dict(antes), depois={"foto": foto})
 
-def delete_produto(pid):
+def substituir_foto(antigas, nova, usuario=None):
+    """
+    Aponta para `nova` os produtos (e arquivados) da loja atual cuja foto
+    está em `antigas`, numa transação. Retorna os IDs de produtos alterados.
+    """
+    antigas = [a for a in antigas if a and a != nova]
+    if not antigas:
+        return []
+    marcadores = ", ".join("?" * len(antigas))
     conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("BEGIN IMMEDIATE")
+        alterados = []
+        for tabela in ("produtos", "produtos_arquivados"):
+            alterados += cur.execute(f"SELECT id, foto FROM {tabela} WHERE foto IN ({marcadores})", antigas).fetchall()
+            cur.execute(f"UPDATE {tabela} SET foto=? WHERE foto IN ({marcadores})", [nova, *antigas])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    for r in alterados:
+        _auditar(usuario, "foto", r["id"], antes={"foto": r["foto"]}, depois={"foto": nova})
+    return [r["id"] for r in alterados]
+
+def delete_produto(pid, usuario=None):
+    conn = get_db_connection()
+    antes = conn.execute("SELECT * FROM produtos WHERE id=?", (pid,)).fetchone()
     conn.execute("DELETE FROM produtos WHERE id=?", (pid,))
     conn.commit()
     conn.close()
-def mark_produto_as_sold(produto_id, quantidade_vendida=1):
+    if antes:
+        _auditar(usuario, "excluir", pid, antes=dict(antes))
+    # a foto fica em assets/: quem chama decide (limpeza_imagens.descartar_foto)
+    return antes["foto"] if antes else None
+
+def mark_produto_as_sold(produto_id, quantidade_vendida=1, usuario=None, sessao=None):
     """
     Marca um produto como vendido e atualiza o estoque.
+    A baixa é o UPDATE condicional de _vender_itens: unidades reservadas
+    por outros caixas não são vendidas e duas vendas simultâneas não
+    perdem baixa. Com `sessao`, as reservas desse caixa para o produto
+    não contam contra a venda e são consumidas por ela.
     """
     conn = get_db_connection()
     cur = conn.cursor()
+    try:
+        cur.execute("BEGIN IMMEDIATE")
+        res = _vender_itens(cur, [(produto_id, quantidade_vendida)], sessao=sessao)[0]
+        if res["ok"] and sessao is not None:
+            cur.execute("UPDATE reservas SET quantidade = quantidade - ? WHERE sessao=? AND produto_id=?",
+                        (quantidade_vendida, sessao, produto_id))
+            cur.execute("DELETE FROM reservas WHERE sessao=? AND produto_id=? AND quantidade <= 0",
+                        (sessao, produto_id))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
 
-    cur.execute("SELECT quantidade FROM produtos WHERE id=?", (produto_id,))
-    row = cur.fetchone()
+    if not res["ok"]:
+        raise ValueError(res["erro"])
+    _auditar_vendas(usuario, [res])
+    return True
 
-    if not row:
+def _vender_itens(cur, itens, sessao=None):
+    """
+    Baixa de estoque item a item dentro de uma transação já aberta.
+    A condição do UPDATE desconta as reservas ativas, menos as da `sessao`
+    que está vendendo (se informada).
+    A auditoria fica com quem chama, depois do commit.
+    """
+    agora = datetime.now().isoformat()
+    resultados = []
+    for produto_id, qtd in itens:
+        res = {"id": produto_id, "quantidade": qtd, "ok": False, "erro": None, "nome": None}
+        resultados.append(res)
+        if qtd <= 0:
+            res["erro"] = "Quantidade inválida"
+            continue
+        cur.execute(f"""
+            UPDATE produtos
+            SET quantidade = quantidade - ?,
+                vendido = 1,
+                data_ultima_venda = ?
+            WHERE id = ? AND quantidade - {_SQL_RESERVADO_OUTROS} >= ?
+        """, (qtd, agora, produto_id, time.time(), sessao, qtd))
+        vendeu = cur.rowcount == 1
+        row = cur.execute("SELECT nome, quantidade FROM produtos WHERE id=?", (produto_id,)).fetchone()
+        if row is None:
+            res["erro"] = "Produto não encontrado"
+            continue
+        res["nome"] = row["nome"]
+        res["estoque_restante"] = row["quantidade"]
+        if vendeu:
+            res["ok"] = True
+        else:
+            res["erro"] = "Estoque insuficiente"
+    return resultados
+
+def _auditar_vendas(usuario, resultados):
+    for r in resultados:
+        if r["ok"]:
+            _auditar(usuario, "venda", r["id"],
+                     antes={"quantidade": r["estoque_restante"] + r["quantidade"]},
+                     depois={"quantidade": r["estoque_restante"]})
+
+def mark_produtos_as_sold_batch(itens, usuario=None):
+    """
+    Vende vários itens [(produto_id, quantidade), ...] numa única transação.
+    Cada item é validado isoladamente: os que não têm estoque suficiente
+    são recusados sem impedir os demais.
+    Retorna uma lista de dicts {id, quantidade, ok, erro, nome}.
+    """
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("BEGIN IMMEDIATE")
+        resultados = _vender_itens(cur, itens)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
         conn.close()
-        raise ValueError("Produto não encontrado")
+    _auditar_vendas(usuario, resultados)
+    return resultados
+
+# ====================================================================
+# RESERVAS DE ESTOQUE (VÁRIOS CAIXAS)
+# ====================================================================
+#
+# Um caixa "segura" unidades enquanto monta a venda; a reserva vence
+# sozinha depois de RESERVA_TTL_SEGUNDOS sem ser renovada. Disponível =
+# estoque - reservas ativas. expira_em é um timestamp Unix (REAL).
+
+# unidades reservadas e ainda válidas de produtos.id; o "?" é o instante atual
+_SQL_RESERVADO = """(SELECT COALESCE(SUM(r.quantidade), 0) FROM reservas r
+                     WHERE r.produto_id = produtos.id AND r.expira_em > ?)"""
+# idem, sem as reservas de uma sessão; o segundo "?" é a sessão (None conta todas)
+_SQL_RESERVADO_OUTROS = """(SELECT COALESCE(SUM(r.quantidade), 0) FROM reservas r
+                            WHERE r.produto_id = produtos.id AND r.expira_em > ? AND r.sessao IS NOT ?)"""
+
+def get_disponiveis(produto_ids=None):
+    """
+    {produto_id: quantidade disponível} numa única consulta
+    (soma das reservas ativas pelo índice idx_reservas_produto).
+    """
+    sql = f"SELECT id, quantidade - {_SQL_RESERVADO} AS disponivel FROM produtos"
+    params = [time.time()]
+    if produto_ids is not None:
+        produto_ids = list(produto_ids)
+        if not produto_ids:
+            return {}
+        sql += f" WHERE id IN ({','.join('?' * len(produto_ids))})"
+        params += produto_ids
+    conn = get_db_connection()
+    data = {r["id"]: r["disponivel"] for r in conn.execute(sql, params).fetchall()}
+    conn.close()
+    return data
 
-    estoque_atual = row["quantidade"]
+def get_reservas(sessao):
+    """
+    Reservas ativas da sessão: [{produto_id, quantidade, expira_em}, ...].
+    """
+    conn = get_db_connection()
+    data = [dict(r) for r in conn.execute(
+        "SELECT produto_id, quantidade, expira_em FROM reservas WHERE sessao=? AND expira_em > ?",
+        (sessao, time.time())
+    ).fetchall()]
+    conn.close()
+    return data
 
-    if estoque_atual < quantidade_vendida:
+def reservar(sessao, produto_id, quantidade, ttl=RESERVA_TTL_SEGUNDOS):
+    """
+    Soma `quantidade` à reserva da sessão para o produto e renova o prazo.
+    Levanta ValueError se não houver unidades disponíveis.
+    Retorna a quantidade total reservada pela sessão.
+    """
+    if quantidade <= 0:
+        raise ValueError("Quantidade inválida")
+    agora = time.time()
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("BEGIN IMMEDIATE")
+        row = cur.execute(f"SELECT nome, quantidade - {_SQL_RESERVADO} AS disponivel FROM produtos WHERE id=?",
+                          (agora, produto_id)).fetchone()
+        if row is None:
+            raise ValueError("Produto não encontrado")
+        if row["disponivel"] < quantidade:
+            raise ValueError(f"Estoque insuficiente para {row['nome']} ({max(row['disponivel'], 0)} un disponíveis)")
+        cur.execute("""
+            INSERT INTO reservas (produto_id, sessao, quantidade, criado_em, expira_em)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (sessao, produto_id) DO UPDATE SET
+                quantidade = CASE WHEN reservas.expira_em > ? THEN reservas.quantidade + excluded.quantidade
+                                  ELSE excluded.quantidade END,
+                expira_em = excluded.expira_em
+        """, (produto_id, sessao, quantidade, datetime.now().isoformat(), agora + ttl, agora))
+        total = cur.execute("SELECT quantidade FROM reservas WHERE sessao=? AND produto_id=?",
+                            (sessao, produto_id)).fetchone()[0]
+        conn.commit()
+        return total
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
         conn.close()
-        raise ValueError("Estoque insuficiente")
 
-    nova_qtd = estoque_atual - quantidade_vendida
+def estender_reservas(sessao, ttl=RESERVA_TTL_SEGUNDOS):
+    """
+    Renova o prazo das reservas ainda ativas da sessão.
+    Reservas já vencidas não voltam: precisam ser refeitas com reservar().
+    """
+    agora = time.time()
+    conn = get_db_connection()
+    cur = conn.execute("UPDATE reservas SET expira_em=? WHERE sessao=? AND expira_em > ?",
+                       (agora + ttl, sessao, agora))
+    conn.commit()
+    n = cur.rowcount
+    conn.close()
+    return n
 
-    cur.execute("""
-        UPDATE produtos
-        SET quantidade = ?,
-            vendido = 1,
-            data_ultima_venda = ?
-        WHERE id = ?
-    """, (
-        nova_qtd,
-        datetime.now().isoformat(),
-        produto_id
-    ))
+def liberar_reservas(sessao, produto_id=None):
+    """
+    Devolve ao estoque disponível as reservas da sessão (ou de um produto).
+    """
+    conn = get_db_connection()
+    if produto_id is None:
+        cur = conn.execute("DELETE FROM reservas WHERE sessao=?", (sessao,))
+    else:
+        cur = conn.execute("DELETE FROM reservas WHERE sessao=? AND produto_id=?", (sessao, produto_id))
+    conn.commit()
+    n = cur.rowcount
+    conn.close()
+    return n
+
+def confirmar_reservas(sessao, usuario=None):
+    """
+    Converte as reservas ativas da sessão em venda numa única transação.
+    As reservas são consumidas antes da baixa, então só as de outras
+    sessões limitam o estoque. Retorna o mesmo formato de
+    mark_produtos_as_sold_batch.
+    """
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("BEGIN IMMEDIATE")
+        itens = cur.execute(
+            "SELECT produto_id, quantidade FROM reservas WHERE sessao=? AND expira_em > ? ORDER BY id",
+            (sessao, time.time())
+        ).fetchall()
+        cur.execute("DELETE FROM reservas WHERE sessao=?", (sessao,))
+        resultados = _vender_itens(cur, [(r["produto_id"], r["quantidade"]) for r in itens])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    _auditar_vendas(usuario, resultados)
+    return resultados
 
+def expirar_reservas():
+    """
+    Apaga as reservas vencidas (range scan em idx_reservas_expira).
+    Retorna quantas foram removidas.
+    """
+    conn = get_db_connection()
+    cur = conn.execute("DELETE FROM reservas WHERE expira_em <= ?", (time.time(),))
     conn.commit()
+    n = cur.rowcount
     conn.close()
-    return True
+    return n
+
 # ====================================================================
-# USUÁRIOS (CORRIGIDO – ERRO RESOLVIDO)
+# AJUSTES EM MASSA (PREÇO / ESTOQUE)
 # ====================================================================
 
-def add_user(username, password, role="staff"):
+# expressão SQL do novo valor para cada operação; "?" é o valor informado
+_OPERACOES_AJUSTE = {
+    ("preco", "percentual"): "MAX(ROUND(preco * (1 + ? / 100.0), 2), 0.01)",
+    ("preco", "somar"): "MAX(ROUND(preco + ?, 2), 0.01)",
+    ("preco", "definir"): "MAX(ROUND(?, 2), 0.01)",
+    ("quantidade", "somar"): "MAX(quantidade + CAST(? AS INTEGER), 0)",
+    ("quantidade", "definir"): "MAX(CAST(? AS INTEGER), 0)",
+}
+
+def _filtro_produtos(marca=None, estilo=None, tipo=None, busca=None):
+    where = ["1=1"]
+    params = []
+    for coluna, valor in (("marca", marca), ("estilo", estilo), ("tipo", tipo)):
+        if valor:
+            where.append(f"{coluna} = ?")
+            params.append(valor)
+    if busca:
+        where.append("nome LIKE ?")
+        params.append(f"%{busca}%")
+    return " AND ".join(where), params
+
+def preview_ajuste_em_massa(campo, operacao, valor, marca=None, estilo=None, tipo=None, busca=None, amostra=10):
+    """
+    Quantos produtos o ajuste atinge, valor em estoque antes/depois e uma
+    amostra com os novos valores — sem gravar nada.
+    """
+    expr = _OPERACOES_AJUSTE[(campo, operacao)]
+    where, params = _filtro_produtos(marca, estilo, tipo, busca)
+    novo_preco = expr if campo == "preco" else "preco"
+    nova_qtd = expr if campo == "quantidade" else "quantidade"
     conn = get_db_connection()
+    totais = conn.execute(f"""
+        SELECT COUNT(*) AS afetados,
+               COALESCE(SUM(preco * quantidade), 0) AS valor_antes,
+               COALESCE(SUM({novo_preco} * {nova_qtd}), 0) AS valor_depois
+        FROM produtos WHERE {where}
+    """, [valor] + params).fetchone()
+    itens = conn.execute(f"""
+        SELECT id, nome, {campo} AS antes, {expr} AS depois
+        FROM produtos WHERE {where} ORDER BY nome LIMIT ?
+    """, [valor] + params + [amostra]).fetchall()
+    conn.close()
+    resultado = dict(totais)
+    resultado["amostra"] = [dict(r) for r in itens]
+    return resultado
+
+def aplicar_ajuste_em_massa(campo, operacao, valor, marca=None, estilo=None, tipo=None, busca=None, usuario=None):
+    """
+    Aplica o ajuste com um único UPDATE baseado em conjunto, na mesma
+    transação em que grava o snapshot (antes/depois) usado para desfazer.
+    Retorna o id do ajuste e a quantidade de produtos afetados.
+    """
+    if (campo, operacao) not in _OPERACOES_AJUSTE:
+        raise ValueError(f"Operação inválida: {campo}/{operacao}")
+    expr = _OPERACOES_AJUSTE[(campo, operacao)]
+    where, params = _filtro_produtos(marca, estilo, tipo, busca)
+    filtros = {"marca": marca, "estilo": estilo, "tipo": tipo, "busca": busca}
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("BEGIN IMMEDIATE")
+        cur.execute("""
+            INSERT INTO ajustes_massa (criado_em, usuario, campo, operacao, valor, filtros)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (datetime.now().isoformat(), usuario, campo, operacao, valor,
+              ", ".join(f"{k}={v}" for k, v in filtros.items() if v) or "todos"))
+        ajuste_id = cur.lastrowid
+        cur.execute(f"""
+            INSERT INTO ajustes_massa_itens (ajuste_id, produto_id, antes, depois)
+            SELECT ?, id, {campo}, {expr} FROM produtos WHERE {where}
+        """, [ajuste_id, valor] + params)
+        cur.execute(f"UPDATE produtos SET {campo} = {expr} WHERE {where}", [valor] + params)
+        afetados = cur.rowcount
+        cur.execute("UPDATE ajustes_massa SET afetados=? WHERE id=?", (afetados, ajuste_id))
+        itens = cur.execute("SELECT produto_id, antes, depois FROM ajustes_massa_itens WHERE ajuste_id=?",
+                            (ajuste_id,)).fetchall()
+        conn.commit()
+        for r in itens:
+            _auditar(usuario, "ajuste_massa", r["produto_id"], antes={campo: r["antes"]},
+                     depois={campo: r["depois"]}, ajuste_id=ajuste_id)
+        return ajuste_id, afetados
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def get_ajustes_em_massa(limite=20):
+    conn = get_db_connection()
+    data = [dict(r) for r in conn.execute(
+        "SELECT * FROM ajustes_massa ORDER BY id DESC LIMIT ?", (limite,)
+    ).fetchall()]
+    conn.close()
+    return data
+
+def desfazer_ajuste_em_massa(ajuste_id, usuario=None):
+    """
+    Desfaz um ajuste em massa a partir do snapshot:
+    - preço volta ao valor anterior onde ainda está com o valor do ajuste
+      (produtos editados depois não são sobrescritos);
+    - estoque recebe o delta inverso, preservando vendas feitas depois.
+    Retorna quantos produtos foram revertidos.
+    """
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("BEGIN IMMEDIATE")
+        ajuste = cur.execute("SELECT * FROM ajustes_massa WHERE id=?", (ajuste_id,)).fetchone()
+        if not ajuste:
+            raise ValueError("Ajuste não encontrado")
+        if ajuste["desfeito_em"]:
+            raise ValueError("Ajuste já foi desfeito")
+        if ajuste["campo"] == "preco":
+            cur.execute("""
+                UPDATE produtos
+                SET preco = (SELECT i.antes FROM ajustes_massa_itens i
+                             WHERE i.ajuste_id = ? AND i.produto_id = produtos.id)
+                WHERE id IN (SELECT i.produto_id FROM ajustes_massa_itens i
+                             WHERE i.ajuste_id = ? AND i.depois = produtos.preco)
+            """, (ajuste_id, ajuste_id))
+        else:
+            cur.execute("""
+                UPDATE produtos
+                SET quantidade = MAX(quantidade - (SELECT CAST(i.depois - i.antes AS INTEGER)
+                                                   FROM ajustes_massa_itens i
+                                                   WHERE i.ajuste_id = ? AND i.produto_id = produtos.id), 0)
+                WHERE id IN (SELECT produto_id FROM ajustes_massa_itens WHERE ajuste_id = ?)
+            """, (ajuste_id, ajuste_id))
+        revertidos = cur.rowcount
+        cur.execute("UPDATE ajustes_massa SET desfeito_em=? WHERE id=?", (datetime.now().isoformat(), ajuste_id))
+        conn.commit()
+        _auditar(usuario, "desfazer_ajuste", ajuste_id=ajuste_id, revertidos=revertidos)
+        return revertidos
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+# ====================================================================
+# INVENTÁRIO (CONTAGEM FÍSICA)
+# ====================================================================
+
+def aplicar_inventario(itens, usuario=None, observacao=None):
+    """
+    Aplica uma contagem [(produto_id, esperado, contado), ...] numa única
+    transação e registra o inventário. `esperado` é o estoque do sistema
+    quando a diferença foi calculada: cada produto recebe contado - esperado
+    (vendas feitas depois da contagem continuam descontadas), sem ficar
+    negativo. Itens sem diferença entram só no registro.
+    Retorna (inventario_id, produtos_ajustados).
+    """
+    itens = [(int(pid), int(esperado), int(contado)) for pid, esperado, contado in itens]
+    if not itens:
+        raise ValueError("Nenhum item contado")
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("BEGIN IMMEDIATE")
+        # json_each: uma consulta só, sem limite de parâmetros para contagens grandes
+        atuais = {r["id"]: (r["quantidade"], r["preco"]) for r in cur.execute(
+            "SELECT id, quantidade, preco FROM produtos WHERE id IN (SELECT value FROM json_each(?))",
+            (json.dumps([pid for pid, _, _ in itens]),),
+        )}
+        faltando = [pid for pid, _, _ in itens if pid not in atuais]
+        if faltando:
+            raise ValueError(f"Produtos não encontrados: {', '.join(map(str, faltando[:10]))}")
+        linhas = []
+        for pid, esperado, contado in itens:
+            antes = atuais[pid][0]
+            linhas.append((pid, esperado, contado, antes, max(0, antes + contado - esperado)))
+        cur.execute("""
+            INSERT INTO inventarios (criado_em, usuario, observacao, itens, diferenca_unidades, diferenca_valor)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (datetime.now().isoformat(), usuario, observacao, len(linhas),
+              sum(d - a for _, _, _, a, d in linhas),
+              sum((d - a) * safe_float(atuais[pid][1]) for pid, _, _, a, d in linhas)))
+        inventario_id = cur.lastrowid
+        cur.executemany("""
+            INSERT INTO inventarios_itens (inventario_id, produto_id, esperado, contado, antes, depois)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, [(inventario_id, *linha) for linha in linhas])
+        ajustes = [(d, pid) for pid, _, _, a, d in linhas if d != a]
+        cur.executemany("UPDATE produtos SET quantidade=? WHERE id=?", ajustes)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    for pid, _, contado, antes, depois in linhas:
+        if depois != antes:
+            _auditar(usuario, "inventario", pid, antes={"quantidade": antes}, depois={"quantidade": depois},
+                     inventario_id=inventario_id, contado=contado)
+    return inventario_id, len(ajustes)
+
+def get_inventarios(limite=20):
+    conn = get_db_connection()
+    data = [dict(r) for r in conn.execute(
+        "SELECT * FROM inventarios ORDER BY id DESC LIMIT ?", (limite,)
+    ).fetchall()]
+    conn.close()
+    return data
+
+def get_inventario_itens(inventario_id):
+    """
+    Itens de um inventário com nome e preço atuais do produto.
+    """
+    conn = get_db_connection()
+    data = [dict(r) for r in conn.execute("""
+        SELECT i.produto_id, p.nome, p.preco, i.esperado, i.contado, i.antes, i.depois
+        FROM inventarios_itens i LEFT JOIN produtos p ON p.id = i.produto_id
+        WHERE i.inventario_id = ?
+        ORDER BY ABS(i.depois - i.antes) * COALESCE(p.preco, 0) DESC
+    """, (inventario_id,)).fetchall()]
+    conn.close()
+    return data
+
+# ====================================================================
+# ARQUIVO MORTO (PRODUTOS ZERADOS E SEM VENDA)
+# ====================================================================
+
+def arquivar_produtos(dias_sem_venda=90, usuario=None):
+    """
+    Move para produtos_arquivados os produtos com quantidade 0 e sem venda
+    há `dias_sem_venda` dias; para os nunca vendidos conta a data de
+    cadastro (ou de restauração). Os IDs são preservados e, como produtos
+    usa AUTOINCREMENT, não são reaproveitados.
+    Retorna quantos produtos foram arquivados.
+    """
+    corte = (datetime.now() - timedelta(days=dias_sem_venda)).isoformat()
+    filtro = "quantidade = 0 AND COALESCE(data_ultima_venda, cadastrado_em, '') < ?"
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("BEGIN IMMEDIATE")
+        colunas = ", ".join(_colunas_produtos(cur))
+        ids = [r[0] for r in cur.execute(f"SELECT id FROM produtos WHERE {filtro}", (corte,)).fetchall()]
+        cur.execute(f"""
+            INSERT INTO produtos_arquivados ({colunas}, arquivado_em)
+            SELECT {colunas}, ? FROM produtos WHERE {filtro}
+        """, (datetime.now().isoformat(), corte))
+        cur.execute(f"DELETE FROM produtos WHERE {filtro}", (corte,))
+        conn.commit()
+        for pid in ids:
+            _auditar(usuario, "arquivar", pid, dias_sem_venda=dias_sem_venda)
+        return len(ids)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def get_produtos_arquivados():
+    conn = get_db_connection()
+    data = [dict(r) for r in conn.execute(
+        "SELECT * FROM produtos_arquivados ORDER BY arquivado_em DESC, nome"
+    ).fetchall()]
+    conn.close()
+    return data
+
+def restaurar_produto(pid, usuario=None):
+    """
+    Devolve um produto arquivado para a tabela principal com o mesmo ID.
+    """
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("BEGIN IMMEDIATE")
+        colunas = ", ".join(_colunas_produtos(cur))
+        cur.execute(f"""
+            INSERT INTO produtos ({colunas})
+            SELECT {colunas} FROM produtos_arquivados WHERE id=?
+        """, (pid,))
+        if cur.rowcount == 0:
+            raise ValueError("Produto arquivado não encontrado")
+        # o prazo do arquivamento recomeça: sem isso um produto zerado e
+        # nunca vendido voltaria ao arquivo na próxima rodada
+        cur.execute("UPDATE produtos SET cadastrado_em = ? WHERE id=?", (datetime.now().isoformat(), pid))
+        cur.execute("DELETE FROM produtos_arquivados WHERE id=?", (pid,))
+        conn.commit()
+        _auditar(usuario, "restaurar", pid)
+        return True
+    except sqlite3.IntegrityError:
+        conn.rollback()
+        raise ValueError("Código de barras do produto já está em uso por outro produto")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+# ====================================================================
+# HISTÓRICO DE ESTOQUE (FOTOGRAFIA DIÁRIA)
+# ====================================================================
+
+DIMENSOES_HISTORICO = ("total", "marca", "estilo", "tipo")
+
+def registrar_estoque_diario(dia=None):
+    """
+    Grava a fotografia do estoque do dia (hoje por padrão): SKUs com
+    estoque, unidades e valor, no total e por marca/estilo/tipo.
+    Idempotente: rodar de novo no mesmo dia só atualiza as linhas do dia
+    (e remove categorias que zeraram desde a rodada anterior).
+    Retorna quantas linhas o dia ficou tendo.
+    """
+    dia = (dia or datetime.now().date()).isoformat()
+    carimbo = datetime.now().isoformat()
+    upsert = """
+        ON CONFLICT (dimensao, dia, chave) DO UPDATE SET
+            skus=excluded.skus, unidades=excluded.unidades,
+            valor=excluded.valor, registrado_em=excluded.registrado_em
+    """
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("BEGIN IMMEDIATE")
+        cur.execute(f"""
+            INSERT INTO estoque_diario (dia, dimensao, chave, skus, unidades, valor, registrado_em)
+            SELECT ?, 'total', '', COUNT(*), COALESCE(SUM(quantidade), 0),
+                   COALESCE(SUM(preco * quantidade), 0), ?
+            FROM produtos WHERE quantidade > 0
+            {upsert}
+        """, (dia, carimbo))
+        for dimensao in DIMENSOES_HISTORICO[1:]:
+            cur.execute(f"""
+                INSERT INTO estoque_diario (dia, dimensao, chave, skus, unidades, valor, registrado_em)
+                SELECT ?, '{dimensao}', COALESCE(NULLIF({dimensao}, ''), '(sem)'), COUNT(*),
+                       SUM(quantidade), SUM(preco * quantidade), ?
+                FROM produtos WHERE quantidade > 0
+                GROUP BY 3
+                {upsert}
+            """, (dia, carimbo))
+        # dimensao IN (...) deixa as duas consultas usarem a chave primária
+        do_dia = f"dimensao IN ({', '.join('?' * len(DIMENSOES_HISTORICO))}) AND dia=?"
+        cur.execute(f"DELETE FROM estoque_diario WHERE {do_dia} AND registrado_em < ?",
+                    (*DIMENSOES_HISTORICO, dia, carimbo))
+        linhas = cur.execute(f"SELECT COUNT(*) FROM estoque_diario WHERE {do_dia}",
+                             (*DIMENSOES_HISTORICO, dia)).fetchone()[0]
+        conn.commit()
+        return linhas
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def get_estoque_diario(dimensao="total", desde=None, ate=None):
+    """
+    Linhas da fotografia diária de uma dimensão, em ordem de dia:
+    [{dia, chave, skus, unidades, valor}, ...]. `desde`/`ate` são datas.
+    """
+    if dimensao not in DIMENSOES_HISTORICO:
+        raise ValueError(f"Dimensão inválida: {dimensao}")
+    sql = "SELECT dia, chave, skus, unidades, valor FROM estoque_diario WHERE dimensao=?"
+    params = [dimensao]
+    if desde:
+        sql += " AND dia >= ?"
+        params.append(desde.isoformat())
+    if ate:
+        sql += " AND dia <= ?"
+        params.append(ate.isoformat())
+    conn = get_db_connection()
+    data = [dict(r) for r in conn.execute(sql + " ORDER BY dia, chave", params).fetchall()]
+    conn.close()
+    return data
+
+# ====================================================================
+# CÓDIGO DE BARRAS / SKU
+# ====================================================================
+
+def get_produto_by_sku(sku):
+    """
+    Busca pontual pelo código de barras (índice único idx_produtos_sku).
+    """
+    sku = normalizar_sku(sku)
+    if sku is None:
+        return None
+    conn = get_db_connection()
+    row = conn.execute("SELECT * FROM produtos WHERE sku=?", (sku,)).fetchone()
+    conn.close()
+    return dict(row) if row else None
+
+def sell_by_sku(sku, quantidade_vendida=1, usuario=None):
+    """
+    Vende pelo código de barras. Levanta ValueError se o código não existe
+    ou se não há estoque.
+    """
+    produto = get_produto_by_sku(sku)
+    if not produto:
+        raise ValueError(f"Código de barras não cadastrado: {sku}")
+    mark_produto_as_sold(produto["id"], quantidade_vendida, usuario=usuario)
+    return produto
+
+# ====================================================================
+# VALIDADE
+# ====================================================================
+
+def get_expiring(days=30, marca=None):
+    """
+    Produtos com estoque cuja validade vence em até `days` dias
+    (inclui os já vencidos), ordenados pela data de validade.
+    Usa o índice idx_produtos_validade.
+    """
+    hoje = date.today()
+    limite = (hoje + timedelta(days=days)).isoformat()
+    sql = """
+        SELECT *, CAST(julianday(data_validade) - julianday(?) AS INTEGER) AS dias_restantes
+        FROM produtos
+        WHERE data_validade IS NOT NULL AND data_validade <= ? AND quantidade > 0
+    """
+    params = [hoje.isoformat(), limite]
+    if marca:
+        sql += " AND marca = ?"
+        params.append(marca)
+    sql += " ORDER BY data_validade, nome"
+    conn = get_db_connection()
+    data = [dict(r) for r in conn.execute(sql, params).fetchall()]
+    conn.close()
+    return data
+
+def get_expiring_totals(days=30, marca=None):
+    """
+    Totais de itens vencidos e a vencer em até `days` dias:
+    quantidade de produtos, unidades e valor em estoque (preço x quantidade).
+    """
+    hoje = date.today().isoformat()
+    limite = (date.today() + timedelta(days=days)).isoformat()
+    sql = """
+        SELECT
+            COALESCE(SUM(data_validade < :hoje), 0) AS vencidos_produtos,
+            COALESCE(SUM(CASE WHEN data_validade < :hoje THEN quantidade END), 0) AS vencidos_unidades,
+            COALESCE(SUM(CASE WHEN data_validade < :hoje THEN preco * quantidade END), 0) AS vencidos_valor,
+            COALESCE(SUM(data_validade >= :hoje), 0) AS a_vencer_produtos,
+            COALESCE(SUM(CASE WHEN data_validade >= :hoje THEN quantidade END), 0) AS a_vencer_unidades,
+            COALESCE(SUM(CASE WHEN data_validade >= :hoje THEN preco * quantidade END), 0) AS a_vencer_valor
+        FROM produtos
+        WHERE data_validade IS NOT NULL AND data_validade <= :limite AND quantidade > 0
+    """
+    params = {"hoje": hoje, "limite": limite}
+    if marca:
+        sql += " AND marca = :marca"
+        params["marca"] = marca
+    conn = get_db_connection()
+    row = conn.execute(sql, params).fetchone()
+    conn.close()
+    return dict(row)
+
+# ====================================================================
+# USUÁRIOS (CORRIGIDO – ERRO RESOLVIDO)
+# ====================================================================
+
+# Papel de cada usuário em memória por PAPEL_TTL_SEGUNDOS: as páginas
+# checam o papel a cada rerun (utils/sessoes.py) sem abrir conexão.
+# Quem altera a tabela users invalida a entrada; o TTL cobre alterações
+# feitas por outro processo. Usuários inexistentes também ficam em cache
+# (None), para um token de conta excluída não consultar o banco a cada rerun.
+_papeis = {}  # username -> (role ou None, expira_em monotonic)
+_papeis_lock = threading.Lock()
+
+def _guardar_papel(username, role):
+    with _papeis_lock:
+        _papeis[username] = (role, time.monotonic() + PAPEL_TTL_SEGUNDOS)
+
+def invalidar_papel(username=None):
+    """Descarta o papel em cache de um usuário (ou de todos, sem argumento)."""
+    with _papeis_lock:
+        if username is None:
+            _papeis.clear()
+        else:
+            _papeis.pop(username, None)
+
+def get_papel(username):
+    """
+    Papel atual do usuário ('admin', 'staff', 'user') ou None se ele não
+    existe, do cache enquanto a entrada não vencer.
+    """
+    with _papeis_lock:
+        em_cache = _papeis.get(username)
+    if em_cache and em_cache[1] > time.monotonic():
+        return em_cache[0]
+    conn = _conexao_usuarios()
+    row = conn.execute("SELECT role FROM users WHERE username=?", (username,)).fetchone()
+    conn.close()
+    role = row["role"] if row else None
+    _guardar_papel(username, role)
+    return role
+
+def add_user(username, password, role="staff", usuario=None):
+    conn = _conexao_usuarios()
     try:
         conn.execute(
             "INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
             (username, hash_password(password), role)
         )
         conn.commit()
+        invalidar_papel(username)
+        _auditar(usuario, "usuario_criar", username=username, role=role)
         return True
     except sqlite3.IntegrityError:
         return False
@@ -249,7 +1759,7 @@ def add_user(username, password, role="staff"):
         conn.close()
 
 def get_user(username):
-    conn = get_db_connection()
+    conn = _conexao_usuarios()
     cur = conn.cursor()
     cur.execute("SELECT * FROM users WHERE username=?", (username,))
     row = cur.fetchone()
@@ -257,40 +1767,115 @@ def get_user(username):
     return dict(row) if row else None
 
 def get_all_users():
-    conn = get_db_connection()
+    conn = _conexao_usuarios()
     cur = conn.cursor()
     cur.execute("SELECT id, username, role FROM users ORDER BY role DESC, username")
     users = [dict(r) for r in cur.fetchall()]
     conn.close()
     return users
 
-def update_user_role(user_id, new_role):
-    conn = get_db_connection()
+def get_users_page(apos=None, limite=20):
+    """
+    Página de usuários em ordem de username, começando depois de `apos`
+    (paginação por chave no índice único de username).
+    Retorna (usuarios [{id, username, role}], proximo) — `proximo` é o
+    `apos` da página seguinte, ou None na última.
+    """
+    sql = "SELECT id, username, role FROM users"
+    params = []
+    if apos is not None:
+        sql += " WHERE username > ?"
+        params.append(apos)
+    sql += " ORDER BY username LIMIT ?"
+    params.append(limite + 1)
+    conn = _conexao_usuarios()
+    users = [dict(r) for r in conn.execute(sql, params).fetchall()]
+    conn.close()
+    if len(users) > limite:
+        return users[:limite], users[limite - 1]["username"]
+    return users, None
+
+def count_users():
+    conn = _conexao_usuarios()
+    total = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+    conn.close()
+    return total
+
+def update_user_role(user_id, new_role, usuario=None):
+    conn = _conexao_usuarios()
+    antes = conn.execute("SELECT username, role FROM users WHERE id=?", (user_id,)).fetchone()
     conn.execute("UPDATE users SET role=? WHERE id=?", (new_role, user_id))
     conn.commit()
     conn.close()
+    if antes:
+        invalidar_papel(antes["username"])
+        _auditar(usuario, "usuario_role", username=antes["username"], role=[antes["role"], new_role])
     return True
 
-def delete_user(user_id):
-    conn = get_db_connection()
+def delete_user(user_id, usuario=None):
+    conn = _conexao_usuarios()
+    antes = conn.execute("SELECT username, role FROM users WHERE id=?", (user_id,)).fetchone()
     conn.execute("DELETE FROM users WHERE id=?", (user_id,))
     conn.commit()
     conn.close()
+    if antes:
+        invalidar_papel(antes["username"])
+        _auditar(usuario, "usuario_excluir", username=antes["username"], role=antes["role"])
     return True
 def check_user_login(username, password):
     """
     Valida login do usuário.
     Retorna o dicionário do usuário se estiver correto, senão None.
+    O papel lido aqui já entra no cache de get_papel.
     """
     user = get_user(username)
     if not user:
         return None
 
-    if user["password"] == hash_password(password):
+    if hmac.compare_digest(user["password"], hash_password(password)):
+        _guardar_papel(username, user["role"])
         return user
 
     return None
 
+# ====================================================================
+# HISTÓRICO DO CHAT
+# ====================================================================
+
+def add_chat_messages(mensagens):
+    """
+    Grava um lote de mensagens do chat com um único executemany/commit.
+    Cada mensagem: dict com sessao, seq, username, role, content, criado_em.
+    """
+    if not mensagens:
+        return 0
+    conn = get_db_connection()
+    conn.executemany("""
+        INSERT OR IGNORE INTO chat_log (sessao, seq, username, role, content, criado_em)
+        VALUES (:sessao, :seq, :username, :role, :content, :criado_em)
+    """, mensagens)
+    conn.commit()
+    conn.close()
+    return len(mensagens)
+
+def get_chat_messages(sessao, antes_de_seq=None, limite=20):
+    """
+    Página de mensagens anteriores a `antes_de_seq` (paginação por chave
+    no índice (sessao, seq)), em ordem cronológica.
+    """
+    sql = "SELECT sessao, seq, username, role, content, criado_em FROM chat_log WHERE sessao=?"
+    params = [sessao]
+    if antes_de_seq is not None:
+        sql += " AND seq < ?"
+        params.append(antes_de_seq)
+    sql += " ORDER BY seq DESC LIMIT ?"
+    params.append(limite)
+    conn = get_db_connection()
+    rows = [dict(r) for r in conn.execute(sql, params).fetchall()]
+    conn.close()
+    rows.reverse()
+    return rows
+
 # ====================================================================
 # CSV
 # ====================================================================
@@ -304,7 +1889,7 @@ def export_produtos_to_csv_content():
     writer.writeheader()
     writer.writerows(produtos)
     return buffer.getvalue()
-def import_produtos_from_csv_buffer(file_buffer):
+def import_produtos_from_csv_buffer(file_buffer, usuario=None):
     """
     Importa produtos a partir de um arquivo CSV enviado (Streamlit upload).
     Retorna a quantidade de registros importados.
@@ -316,6 +1901,7 @@ def import_produtos_from_csv_buffer(file_buffer):
     reader = csv.DictReader(io.StringIO(content), delimiter=";")
 
     count = 0
+    criados = []
     conn.execute("BEGIN")
 
     try:
@@ -323,10 +1909,10 @@ def import_produtos_from_csv_buffer(file_buffer):
             if not r.get("nome"):
                 continue
 
-            cur.execute("""
+            cur.execute(f"""
                 INSERT INTO produtos
-                (nome, preco, quantidade, marca, estilo, tipo, foto, data_validade, vendido, data_ultima_venda)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                (id, nome, preco, quantidade, marca, estilo, tipo, foto, data_validade, vendido, data_ultima_venda, sku)
+                VALUES ({_SQL_NOVO_ID}, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (
                 r.get("nome"),
                 safe_float(r.get("preco")),
@@ -335,13 +1921,17 @@ def import_produtos_from_csv_buffer(file_buffer):
                 r.get("estilo"),
                 r.get("tipo"),
                 r.get("foto"),
-                r.get("data_validade"),
+                safe_date(r.get("data_validade")),
                 safe_int(r.get("vendido")),
-                r.get("data_ultima_venda")
+                r.get("data_ultima_venda"),
+                normalizar_sku(r.get("sku"))
             ))
             count += 1
+            criados.append((cur.lastrowid, r.get("nome")))
 
         conn.commit()
+        for pid, nome in criados:
+            _auditar(usuario, "importar", pid, depois={"nome": nome})
         return count
 
     except Exception as e:
@@ -351,6 +1941,146 @@ def import_produtos_from_csv_buffer(file_buffer):
     finally:
         conn.close()
 
+# ====================================================================
+# XLSX (PLANILHAS DE FORNECEDORES)
+# ====================================================================
+#
+# A planilha é lida em modo read-only (as linhas são geradas sob demanda,
+# sem carregar a pasta inteira) e gravada em lotes de TAMANHO_LOTE_XLSX
+# linhas, um executemany/commit por lote: a memória fica constante e as
+# vendas não esperam a importação inteira terminar.
+
+TAMANHO_LOTE_XLSX = 500
+LINHAS_BUSCA_CABECALHO = 10
+MAX_ERROS_XLSX = 100  # só as primeiras mensagens; o total fica em "recusados"
+
+# cabeçalhos aceitos para cada coluna (comparados sem acento/maiúsculas)
+ALIASES_XLSX = {
+    "nome": ["nome", "produto", "descricao", "descricao do produto", "item"],
+    "preco": ["preco", "valor", "preco unitario", "preco de venda", "valor unitario"],
+    "quantidade": ["quantidade", "qtd", "qtde", "quant", "estoque"],
+    "marca": ["marca", "fabricante"],
+    "estilo": ["estilo", "categoria", "linha"],
+    "tipo": ["tipo"],
+    "data_validade": ["data_validade", "validade", "vencimento", "data de validade"],
+    "sku": ["sku", "ean", "gtin", "codigo de barras", "cod barras", "codigo"],
+    "foto": ["foto", "imagem"],
+}
+
+def _normalizar_cabecalho(texto):
+    texto = unicodedata.normalize("NFKD", str(texto or "")).encode("ascii", "ignore").decode()
+    return " ".join(texto.lower().replace("_", " ").split())
+
+def _mapear_cabecalho(linha, aliases):
+    """
+    {campo: índice da coluna} para uma linha candidata a cabeçalho.
+    """
+    por_alias = {}
+    for campo, nomes in aliases.items():
+        for nome in nomes:
+            por_alias[_normalizar_cabecalho(nome)] = campo
+    mapa = {}
+    for i, celula in enumerate(linha):
+        campo = por_alias.get(_normalizar_cabecalho(celula))
+        if campo and campo not in mapa:
+            mapa[campo] = i
+    return mapa
+
+def _texto_celula(valor):
+    # números inteiros vindos do Excel (ex.: EAN 7891234567890.0) perdem o ".0"
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    if valor is None:
+        return None
+    texto = str(valor).strip()
+    return texto or None
+
+def import_produtos_from_xlsx_buffer(file_buffer, aliases=None, tamanho_lote=TAMANHO_LOTE_XLSX, usuario=None):
+    """
+    Importa produtos da primeira aba de uma planilha .xlsx.
+    O cabeçalho é procurado nas primeiras linhas e as colunas são casadas
+    por nome (ALIASES_XLSX, mais `aliases` extras {campo: [nomes]}).
+    Preço e quantidade seguem safe_float/safe_int. Linhas sem nome são
+    puladas; linhas com código de barras repetido são recusadas sem
+    impedir as demais.
+    Retorna {importados, linhas, recusados, erros: [(linha, mensagem)], colunas}.
+    """
+    todos_aliases = {campo: list(nomes) for campo, nomes in ALIASES_XLSX.items()}
+    for campo, nomes in (aliases or {}).items():
+        todos_aliases.setdefault(campo, []).extend(nomes)
+
+    wb = load_workbook(file_buffer, read_only=True, data_only=True)
+    try:
+        linhas = wb.worksheets[0].iter_rows(values_only=True)
+        mapa = {}
+        numero = 0
+        for numero, linha in enumerate(linhas, start=1):
+            mapa = _mapear_cabecalho(linha, todos_aliases)
+            if "nome" in mapa or numero >= LINHAS_BUSCA_CABECALHO:
+                break
+        if "nome" not in mapa:
+            raise ValueError("Cabeçalho não encontrado: a planilha precisa de uma coluna de nome do produto")
+
+        def celula(linha, campo):
+            i = mapa.get(campo)
+            return linha[i] if i is not None and i < len(linha) else None
+
+        sql = f"""
+            INSERT INTO produtos
+            (id, nome, preco, quantidade, marca, estilo, tipo, foto, data_validade, sku)
+            VALUES ({_SQL_NOVO_ID}, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """
+        resultado = {"importados": 0, "linhas": 0, "recusados": 0, "erros": [], "colunas": sorted(mapa)}
+        conn = get_db_connection()
+        try:
+            def gravar(lote):
+                try:
+                    with conn:
+                        conn.executemany(sql, [valores for _, valores in lote])
+                    resultado["importados"] += len(lote)
+                except sqlite3.IntegrityError:
+                    # lote com SKU repetido: refaz linha a linha para isolar as recusadas
+                    for num, valores in lote:
+                        try:
+                            with conn:
+                                conn.execute(sql, valores)
+                            resultado["importados"] += 1
+                        except sqlite3.IntegrityError:
+                            resultado["recusados"] += 1
+                            if len(resultado["erros"]) < MAX_ERROS_XLSX:
+                                resultado["erros"].append((num, f"Código de barras já cadastrado: {valores[-1]}"))
+
+            lote = []
+            for numero, linha in enumerate(linhas, start=numero + 1):
+                nome = _texto_celula(celula(linha, "nome"))
+                if not nome:
+                    continue
+                resultado["linhas"] += 1
+                lote.append((numero, (
+                    nome,
+                    safe_float(celula(linha, "preco")),
+                    safe_int(celula(linha, "quantidade")),
+                    _texto_celula(celula(linha, "marca")),
+                    _texto_celula(celula(linha, "estilo")),
+                    _texto_celula(celula(linha, "tipo")),
+                    _texto_celula(celula(linha, "foto")),
+                    safe_date(celula(linha, "data_validade")),
+                    normalizar_sku(_texto_celula(celula(linha, "sku"))),
+                )))
+                if len(lote) >= tamanho_lote:
+                    gravar(lote)
+                    lote = []
+            if lote:
+                gravar(lote)
+        finally:
+            conn.close()
+    finally:
+        wb.close()
+
+    _auditar(usuario, "importar_xlsx", importados=resultado["importados"], linhas=resultado["linhas"],
+             recusados=resultado["recusados"])
+    return resultado
+
 # ====================================================================
 # PDF
 # ====================================================================
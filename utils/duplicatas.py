@@ -0,0 +1,255 @@
+# ====================================================================
+# ARQUIVO: utils/duplicatas.py
+# Fotos repetidas em assets/ (hash perceptual) e mesclagem
+# ====================================================================
+#
+# Cada foto ganha dois hashes de 64 bits, calculados uma vez e guardados
+# em hash_imagens (banco principal), com tamanho e mtime do arquivo para
+# recalcular só o que mudou:
+#   dHash: gradiente horizontal de uma miniatura 9x8 em tons de cinza;
+#   pHash: sinais das frequências baixas (DCT 8x8 de uma miniatura 32x32).
+# Duas fotos são consideradas a mesma quando as distâncias de Hamming
+# dos dois hashes ficam no limiar. A busca compara todos os pares em
+# blocos vetorizados no NumPy (XOR + contagem de bits), sem laço Python
+# por par.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from utils.database import ASSETS_DIR, DATABASE, banco, get_db_connection, substituir_foto
+from utils.limpeza_imagens import PROTEGIDOS, descartar_foto
+from utils.lojas import em_todas_as_lojas
+
+EXTENSOES = (".png", ".jpg", ".jpeg", ".webp")
+LIMIAR_PADRAO = 8  # bits diferentes (de 64) em cada hash
+ELEMENTOS_POR_BLOCO = 4_000_000  # pares comparados por vez (~32 MB por matriz)
+
+
+def _matriz_dct(n=32):
+    k = np.arange(n)
+    m = np.cos(np.pi * (2 * k[None, :] + 1) * k[:, None] / (2 * n)) * np.sqrt(2 / n)
+    m[0] /= np.sqrt(2)
+    return m
+
+
+_DCT = _matriz_dct()
+
+
+def _bits_para_int(bits):
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def calcular_hashes(caminho):
+    """
+    (dhash, phash) de um arquivo de imagem, como inteiros sem sinal de 64 bits.
+    """
+    with Image.open(caminho) as im:
+        im.draft("L", (64, 64))  # JPEG: decodifica já reduzido
+        cinza = ImageOps.exif_transpose(im).convert("L")
+    d = np.asarray(cinza.resize((9, 8), Image.LANCZOS), dtype=np.int16)
+    dhash = _bits_para_int((d[:, 1:] > d[:, :-1]).ravel())
+    p = np.asarray(cinza.resize((32, 32), Image.LANCZOS), dtype=np.float64)
+    baixas = (_DCT @ p @ _DCT.T)[:8, :8].ravel()
+    phash = _bits_para_int(baixas > np.median(baixas[1:]))
+    return dhash, phash
+
+
+def _com_sinal(h):
+    # SQLite guarda INTEGER de 64 bits com sinal
+    return h - (1 << 64) if h >= (1 << 63) else h
+
+
+def _hash_arquivo(nome):
+    """
+    Worker (processo separado). Retorna (nome, dhash, phash); hashes None
+    se o arquivo não abre como imagem.
+    """
+    try:
+        d, p = calcular_hashes(os.path.join(ASSETS_DIR, nome))
+        return nome, _com_sinal(d), _com_sinal(p)
+    except Exception:
+        return nome, None, None
+
+
+def _arquivos_assets():
+    arquivos = {}
+    with os.scandir(ASSETS_DIR) as it:
+        for entry in it:
+            if (entry.is_file(follow_symlinks=False) and entry.name.lower().endswith(EXTENSOES)
+                    and entry.name not in PROTEGIDOS and not entry.name.startswith(".")):
+                st = entry.stat()
+                arquivos[entry.name] = (st.st_size, st.st_mtime)
+    return arquivos
+
+
+def indexar_assets(workers=None):
+    """
+    Calcula (em paralelo, num pool de processos) os hashes das fotos novas
+    ou alteradas e remove do índice as que saíram de assets/.
+    Retorna {arquivos, calculados, invalidos, removidos}.
+    """
+    arquivos = _arquivos_assets()
+    with banco(DATABASE):
+        conn = get_db_connection()
+        indexados = {r["arquivo"]: (r["tamanho"], r["mtime"])
+                     for r in conn.execute("SELECT arquivo, tamanho, mtime FROM hash_imagens")}
+        conn.close()
+    pendentes = [n for n, meta in arquivos.items() if indexados.get(n) != meta]
+    removidos = [n for n in indexados if n not in arquivos]
+
+    resultados = []
+    if pendentes:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            resultados = list(pool.map(_hash_arquivo, pendentes, chunksize=8))
+
+    agora = datetime.now().isoformat()
+    with banco(DATABASE):
+        conn = get_db_connection()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany("""
+                INSERT INTO hash_imagens (arquivo, tamanho, mtime, dhash, phash, calculado_em)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (arquivo) DO UPDATE SET tamanho=excluded.tamanho, mtime=excluded.mtime,
+                    dhash=excluded.dhash, phash=excluded.phash, calculado_em=excluded.calculado_em
+            """, [(n, *arquivos[n], d, p, agora) for n, d, p in resultados])
+            conn.executemany("DELETE FROM hash_imagens WHERE arquivo=?", [(n,) for n in removidos])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+    return {
+        "arquivos": len(arquivos),
+        "calculados": len(resultados),
+        "invalidos": sum(1 for _, d, _ in resultados if d is None),
+        "removidos": len(removidos),
+    }
+
+
+# --------------------------------------------------------------------
+# Busca
+# --------------------------------------------------------------------
+
+if hasattr(np, "bitwise_count"):
+    _contar_bits = np.bitwise_count
+else:
+    _BITS_POR_BYTE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _contar_bits(x):
+        return _BITS_POR_BYTE[x.view(np.uint8)].reshape(*x.shape, 8).sum(axis=-1, dtype=np.uint8)
+
+
+def pares_proximos(dhashes, phashes, limiar=LIMIAR_PADRAO):
+    """
+    Pares (i, j), i < j, cujas distâncias de Hamming em dHash e em pHash
+    são ambas <= limiar. Os hashes são arrays uint64 de mesmo tamanho.
+    Cada bloco de linhas é comparado só com as colunas à frente (triângulo
+    superior) no dHash; o pHash é conferido apenas nos candidatos.
+    """
+    n = len(dhashes)
+    bloco = max(1, ELEMENTOS_POR_BLOCO // max(n, 1))
+    pares_i, pares_j = [], []
+    for ini in range(0, n, bloco):
+        fim = min(ini + bloco, n)
+        perto = _contar_bits(dhashes[ini:fim, None] ^ dhashes[None, ini + 1:]) <= limiar
+        i, j = np.nonzero(perto)
+        i += ini
+        j += ini + 1
+        # as colunas começam em ini + 1 para o bloco todo: as linhas de
+        # baixo do bloco também veem a si mesmas e às de cima
+        acima = i < j
+        i, j = i[acima], j[acima]
+        manter = _contar_bits(phashes[i] ^ phashes[j]) <= limiar
+        pares_i.append(i[manter])
+        pares_j.append(j[manter])
+    if not pares_i:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    return np.concatenate(pares_i), np.concatenate(pares_j)
+
+
+def _agrupar(n, pares_i, pares_j):
+    # união-busca: pares encadeados (a~b, b~c) viram um grupo só
+    pai = list(range(n))
+
+    def raiz(x):
+        while pai[x] != x:
+            pai[x] = pai[pai[x]]
+            x = pai[x]
+        return x
+
+    for i, j in zip(pares_i.tolist(), pares_j.tolist()):
+        ri, rj = raiz(i), raiz(j)
+        if ri != rj:
+            pai[rj] = ri
+    grupos = {}
+    for x in range(n):
+        grupos.setdefault(raiz(x), []).append(x)
+    return [g for g in grupos.values() if len(g) > 1]
+
+
+def _produtos_com_foto(arquivos):
+    marcadores = ", ".join("?" * len(arquivos))
+    conn = get_db_connection()
+    rows = conn.execute(f"""
+        SELECT id, nome, foto, 0 AS arquivado FROM produtos WHERE foto IN ({marcadores})
+        UNION ALL
+        SELECT id, nome, foto, 1 AS arquivado FROM produtos_arquivados WHERE foto IN ({marcadores})
+    """, [*arquivos, *arquivos]).fetchall()
+    conn.close()
+    return [dict(r) for r in rows]
+
+
+def encontrar_duplicatas(limiar=LIMIAR_PADRAO):
+    """
+    Grupos de fotos quase idênticas segundo o índice (rode indexar_assets
+    antes). Cada grupo é uma lista de {arquivo, tamanho, produtos}, com os
+    produtos de todas as lojas que usam a foto; os mais usados primeiro.
+    """
+    with banco(DATABASE):
+        conn = get_db_connection()
+        rows = conn.execute(
+            "SELECT arquivo, tamanho, dhash, phash FROM hash_imagens WHERE dhash IS NOT NULL ORDER BY arquivo"
+        ).fetchall()
+        conn.close()
+    if len(rows) < 2:
+        return []
+    dhashes = np.array([r["dhash"] for r in rows], dtype=np.int64).view(np.uint64)
+    phashes = np.array([r["phash"] for r in rows], dtype=np.int64).view(np.uint64)
+    grupos = _agrupar(len(rows), *pares_proximos(dhashes, phashes, limiar))
+    if not grupos:
+        return []
+
+    arquivos = [rows[x]["arquivo"] for g in grupos for x in g]
+    uso = {}
+    for loja, produtos in em_todas_as_lojas(_produtos_com_foto, arquivos):
+        for p in produtos:
+            uso.setdefault(p["foto"], []).append({**p, "loja": loja["codigo"], "nome_loja": loja["nome"]})
+    resultado = []
+    for g in grupos:
+        itens = [{"arquivo": rows[x]["arquivo"], "tamanho": rows[x]["tamanho"],
+                  "produtos": uso.get(rows[x]["arquivo"], [])} for x in g]
+        itens.sort(key=lambda i: (-len(i["produtos"]), i["tamanho"]))
+        resultado.append(itens)
+    resultado.sort(key=lambda g: -sum(i["tamanho"] for i in g[1:]))
+    return resultado
+
+
+def mesclar_duplicatas(manter, arquivos, usuario=None):
+    """
+    Aponta para `manter` todos os produtos (de todas as lojas) que usam
+    alguma das fotos em `arquivos`; as que ficaram sem uso vão para a
+    quarentena da limpeza de imagens. Retorna {produtos, quarentena}.
+    """
+    antigas = [a for a in arquivos if a != manter]
+    if not os.path.isfile(os.path.join(ASSETS_DIR, manter)):
+        raise ValueError(f"Foto não encontrada em assets/: {manter}")
+    alterados = em_todas_as_lojas(partial(substituir_foto, antigas, manter, usuario=usuario))
+    movidas = [a for a in antigas if descartar_foto(a)]
+    return {"produtos": sum(len(ids) for _, ids in alterados), "quarentena": movidas}
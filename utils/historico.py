@@ -0,0 +1,32 @@
+# ====================================================================
+# ARQUIVO: utils/historico.py
+# Fotografia diária do valor do estoque (base dos gráficos históricos)
+# ====================================================================
+#
+# produtos só guarda o estado atual, então o histórico precisa ser
+# gravado enquanto acontece: uma vez por hora o job regrava a linha do
+# dia em estoque_diario (upsert, idempotente). O último registro de cada
+# dia vira a fotografia daquele dia, e os gráficos leem só essas linhas
+# agregadas, independentemente do tamanho do catálogo.
+#
+# O agendador só roda com o app aberto; para não perder dias, também dá
+# para chamar pelo cron:  python -m scripts.foto_estoque
+
+from functools import partial
+
+from utils import agendador
+from utils.database import registrar_estoque_diario, caminho_banco, executar_no_banco
+
+INTERVALO_FOTO = 60 * 60  # segundos
+
+_TAREFA = "estoque_diario"
+
+
+def iniciar_foto_diaria(intervalo=INTERVALO_FOTO):
+    """
+    Registra o job da loja atual no agendador (idempotente por processo).
+    A primeira rodada acontece em segundo plano, sem atrasar a página.
+    """
+    caminho = caminho_banco()
+    agendador.agendar(f"{_TAREFA}:{caminho}", partial(executar_no_banco, caminho, registrar_estoque_diario),
+                      intervalo)
@@ -0,0 +1,310 @@
+# ====================================================================
+# ARQUIVO: utils/imagens.py
+# Normalização das fotos de produtos (WebP compacto, sem metadados)
+# ====================================================================
+#
+# As fotos são quase todas capturas de tela PNG de 100-500 KB. Aqui elas
+# são convertidas para WebP com qualidade ajustada, lado maior limitado
+# e sem EXIF/ICC. O mesmo caminho serve para novos uploads e para a
+# migração em lote dos arquivos existentes (scripts/transcodificar_assets.py).
+
+import io
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from PIL import Image, ImageOps
+
+from utils.database import ASSETS_DIR
+from utils.lojas import listar_lojas
+from utils.limpeza_imagens import fotos_referenciadas
+
+LADO_MAXIMO = 1200
+QUALIDADE = 80
+FORMATO = "WEBP"
+EXTENSAO = ".webp"
+PIXELS_MAXIMOS = 40_000_000  # recusa "bombas" de descompressão
+MINIATURAS_DIR = os.path.join(ASSETS_DIR, ".miniaturas")
+LADO_MINIATURA = 320  # listas mostram as fotos com 120-300 px
+QUALIDADE_MINIATURA = 85
+
+
+class ImagemInvalida(ValueError):
+    pass
+
+
+def normalizar_imagem(dados, lado_maximo=LADO_MAXIMO, qualidade=QUALIDADE):
+    """
+    Valida, decodifica, corrige a orientação, reduz e recodifica uma imagem.
+    `dados` são os bytes originais. Retorna (bytes_webp, (largura, altura)).
+    """
+    try:
+        with Image.open(io.BytesIO(dados)) as im:
+            im.verify()
+        im = Image.open(io.BytesIO(dados))
+        if im.width * im.height > PIXELS_MAXIMOS:
+            raise ImagemInvalida("Imagem grande demais")
+        im = ImageOps.exif_transpose(im)
+        im.thumbnail((lado_maximo, lado_maximo), Image.LANCZOS)
+        if im.mode not in ("RGB", "RGBA"):
+            im = im.convert("RGBA" if "A" in im.getbands() or "transparency" in im.info else "RGB")
+        if im.mode == "RGBA" and im.getextrema()[3][0] == 255:
+            im = im.convert("RGB")  # canal alfa totalmente opaco só ocupa espaço
+        saida = io.BytesIO()
+        # sem exif/icc_profile: metadados não são copiados
+        im.save(saida, FORMATO, quality=qualidade, method=6)
+        return saida.getvalue(), im.size
+    except ImagemInvalida:
+        raise
+    except Exception as e:
+        raise ImagemInvalida("Arquivo de imagem inválido ou corrompido") from e
+
+
+def _reservar_nome(stem, pasta=ASSETS_DIR):
+    """
+    Cria vazio o primeiro nome livre (O_EXCL) e o devolve: dois uploads
+    com o mesmo nome no mesmo segundo, em workers diferentes, não ficam
+    com o mesmo arquivo.
+    """
+    n = 0
+    while True:
+        nome = f"{stem}{EXTENSAO}" if n == 0 else f"{stem}_{n}{EXTENSAO}"
+        try:
+            os.close(os.open(os.path.join(pasta, nome), os.O_WRONLY | os.O_CREAT | os.O_EXCL))
+            return nome
+        except FileExistsError:
+            n += 1
+
+
+def _gravar_atomico(caminho, dados):
+    tmp = caminho + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(dados)
+    os.replace(tmp, caminho)
+
+
+def salvar_foto(dados, nome_original):
+    """
+    Normaliza um upload e grava em assets/ com nome único.
+    Retorna o nome do arquivo gravado (para produtos.foto).
+    """
+    webp, _ = normalizar_imagem(dados)
+    stem = os.path.splitext(os.path.basename(nome_original))[0]
+    nome = _reservar_nome(f"{int(datetime.now().timestamp())}_{stem}")
+    try:
+        _gravar_atomico(os.path.join(ASSETS_DIR, nome), webp)
+    except Exception:
+        os.remove(os.path.join(ASSETS_DIR, nome))
+        raise
+    return nome
+
+
+# --------------------------------------------------------------------
+# Miniaturas para as listas de produtos
+# --------------------------------------------------------------------
+
+# Miniaturas são JPEG: o st.image repassa JPEG/PNG como estão, mas
+# recodifica qualquer outro formato (WebP inclusive) a cada render.
+
+def caminho_miniatura(foto, lado=LADO_MINIATURA):
+    return os.path.join(MINIATURAS_DIR, f"{os.path.basename(foto)}-{lado}.jpg")
+
+
+def _reduzir_para_jpeg(caminho, lado):
+    with Image.open(caminho) as im:
+        im.draft("RGB", (lado, lado))  # JPEG: decodifica já reduzido
+        im = ImageOps.exif_transpose(im)
+        im.thumbnail((lado, lado), Image.LANCZOS)
+        if im.mode in ("RGBA", "LA", "PA") or "transparency" in im.info:
+            im = im.convert("RGBA")
+            fundo = Image.new("RGB", im.size, (255, 255, 255))
+            fundo.paste(im, mask=im.getchannel("A"))
+            im = fundo
+        elif im.mode != "RGB":
+            im = im.convert("RGB")
+        saida = io.BytesIO()
+        im.save(saida, "JPEG", quality=QUALIDADE_MINIATURA, optimize=True)
+        return saida.getvalue()
+
+
+def gerar_miniatura(foto, lado=LADO_MINIATURA):
+    """
+    Grava a miniatura da foto (ou refaz, se a foto é mais nova que ela).
+    Retorna True se gravou; False se já estava em dia ou a foto não existe.
+    """
+    origem = os.path.join(ASSETS_DIR, os.path.basename(foto))
+    destino = caminho_miniatura(foto, lado)
+    try:
+        mtime = os.path.getmtime(origem)
+    except OSError:
+        return False
+    if os.path.exists(destino) and os.path.getmtime(destino) >= mtime:
+        return False
+    dados = _reduzir_para_jpeg(origem, lado)
+    os.makedirs(MINIATURAS_DIR, exist_ok=True)
+    _gravar_atomico(destino, dados)
+    return True
+
+
+def foto_para_exibir(foto, lado=LADO_MINIATURA):
+    """
+    Caminho para mostrar a foto numa lista: a miniatura se já existe e
+    está em dia, senão a foto original (a miniatura nunca é gerada aqui,
+    para não atrasar a página). None se não há foto em assets/.
+    """
+    if not foto:
+        return None
+    origem = os.path.join(ASSETS_DIR, foto)
+    try:
+        mtime = os.path.getmtime(origem)
+    except OSError:
+        return None
+    miniatura = caminho_miniatura(foto, lado)
+    try:
+        if os.path.getmtime(miniatura) >= mtime:
+            return miniatura
+    except OSError:
+        pass
+    return origem
+
+
+def limpar_miniaturas():
+    """
+    Remove as miniaturas cujas fotos saíram de assets/. Retorna quantas.
+    """
+    if not os.path.isdir(MINIATURAS_DIR):
+        return 0
+    removidas = 0
+    with os.scandir(MINIATURAS_DIR) as it:
+        for entry in it:
+            foto = entry.name.rsplit("-", 1)[0]
+            if entry.is_file() and not os.path.exists(os.path.join(ASSETS_DIR, foto)):
+                os.remove(entry.path)
+                removidas += 1
+    return removidas
+
+
+# --------------------------------------------------------------------
+# Migração em lote dos arquivos existentes
+# --------------------------------------------------------------------
+
+def transcodificar_arquivo(nome, novo=None, lado_maximo=LADO_MAXIMO, qualidade=QUALIDADE):
+    """
+    Worker (processo separado): converte um arquivo de assets/.
+    Com `novo` grava o resultado com esse nome; sem ele só mede.
+    Só aproveita o resultado se ele for menor que o original.
+    """
+    caminho = os.path.join(ASSETS_DIR, nome)
+    res = {"original": nome, "novo": None, "bytes_antes": 0, "bytes_depois": 0, "ok": False, "erro": None}
+    try:
+        with open(caminho, "rb") as f:
+            dados = f.read()
+        res["bytes_antes"] = len(dados)
+        if nome.lower().endswith(EXTENSAO):
+            res["erro"] = "já convertido"
+            return res
+        webp, tamanho = normalizar_imagem(dados, lado_maximo, qualidade)
+        if len(webp) >= len(dados):
+            res["erro"] = "resultado não ficou menor"
+            return res
+        res["bytes_depois"] = len(webp)
+        res["ok"] = True
+        if novo:
+            destino = os.path.join(ASSETS_DIR, novo)
+            _gravar_atomico(destino, webp)
+            # verificação: o arquivo gravado precisa abrir com as mesmas dimensões
+            with Image.open(destino) as im:
+                im.load()
+                if im.size != tamanho:
+                    os.remove(destino)
+                    raise ImagemInvalida("verificação falhou após gravar")
+            res["novo"] = novo
+    except FileNotFoundError:
+        res["erro"] = "arquivo ausente"
+        res["ok"] = False
+    except Exception as e:
+        res["erro"] = str(e)
+        res["ok"] = False
+    return res
+
+
+def _fotos_referenciadas():
+    return sorted(fotos_referenciadas())
+
+
+def _reescrever_referencias(mapa):
+    """
+    Troca produtos.foto (e do arquivo morto) numa transação por loja.
+    """
+    for loja in listar_lojas():
+        conn = sqlite3.connect(loja["arquivo"])
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for tabela in ("produtos", "produtos_arquivados"):
+                conn.executemany(f"UPDATE {tabela} SET foto=? WHERE foto=?", [(n, o) for o, n in mapa.items()])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+
+def migrar_assets(aplicar=False, workers=None, remover_originais=False,
+                  lado_maximo=LADO_MAXIMO, qualidade=QUALIDADE):
+    """
+    Converte em paralelo (pool de processos) as fotos referenciadas.
+    Com aplicar=False é só um relatório de tamanhos (nada é gravado).
+    Com aplicar=True grava os .webp, verifica e reescreve as referências
+    numa transação; os originais só são apagados com remover_originais.
+    """
+    fotos = _fotos_referenciadas()
+    # nomes de destino decididos aqui, para workers não disputarem o mesmo
+    # nome ("x.png" e "x.jpeg" -> "x.webp" e "x_1.webp")
+    destinos = []
+    reservados = set()
+    for foto in fotos:
+        novo = None
+        if aplicar and not foto.lower().endswith(EXTENSAO):
+            stem = os.path.splitext(foto)[0]
+            novo, n = f"{stem}{EXTENSAO}", 1
+            while novo in reservados or os.path.exists(os.path.join(ASSETS_DIR, novo)):
+                novo, n = f"{stem}_{n}{EXTENSAO}", n + 1
+            reservados.add(novo)
+        destinos.append(novo)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        resultados = list(pool.map(
+            transcodificar_arquivo, fotos, destinos,
+            [lado_maximo] * len(fotos), [qualidade] * len(fotos),
+            chunksize=8,
+        ))
+
+    mapa = {r["original"]: r["novo"] for r in resultados if r["ok"] and r["novo"]}
+    if aplicar and mapa:
+        try:
+            _reescrever_referencias(mapa)
+        except Exception:
+            for novo in mapa.values():
+                try:
+                    os.remove(os.path.join(ASSETS_DIR, novo))
+                except OSError:
+                    pass
+            raise
+        if remover_originais:
+            for original in mapa:
+                try:
+                    os.remove(os.path.join(ASSETS_DIR, original))
+                except OSError:
+                    pass
+
+    convertidos = [r for r in resultados if r["ok"]]
+    return {
+        "arquivos": len(resultados),
+        "convertidos": len(convertidos),
+        "ignorados": [(r["original"], r["erro"]) for r in resultados if not r["ok"]],
+        "bytes_antes": sum(r["bytes_antes"] for r in convertidos),
+        "bytes_depois": sum(r["bytes_depois"] for r in convertidos),
+        "referencias_atualizadas": len(mapa),
+        "resultados": resultados,
+    }
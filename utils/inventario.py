@@ -0,0 +1,133 @@
+# ====================================================================
+# ARQUIVO: utils/inventario.py
+# Contagem física do estoque: planilha de contagem, diferenças e aplicação
+# ====================================================================
+#
+# A contagem é montada na sessão (leitor, digitação ou arquivo CSV/XLSX)
+# como {produto_id: contado}. As diferenças contra produtos são
+# calculadas de uma vez num DataFrame (merge + colunas vetorizadas) e
+# ordenadas pelo impacto em valor; a aplicação fica em
+# database.aplicar_inventario, numa única transação com o id do
+# inventário.
+
+import io
+import json
+import unicodedata
+
+import pandas as pd
+
+from utils.database import get_db_connection, normalizar_sku
+
+ALIASES_SKU = ("sku", "codigo", "codigo de barras", "ean", "gtin")
+ALIASES_ID = ("id", "produto_id", "id produto")
+ALIASES_CONTADO = ("contado", "contagem", "quantidade", "qtd", "qtde", "estoque")
+
+
+def _normalizar(texto):
+    texto = unicodedata.normalize("NFKD", str(texto)).encode("ascii", "ignore").decode()
+    return " ".join(texto.lower().replace("_", " ").split())
+
+
+def _estoque():
+    conn = get_db_connection()
+    try:
+        return pd.read_sql_query(
+            "SELECT id, nome, sku, marca, preco, quantidade FROM produtos", conn,
+        ).astype({"preco": "float64", "quantidade": "int64"})
+    finally:
+        conn.close()
+
+
+def estoque_atual(produto_ids):
+    """
+    {produto_id: quantidade} do sistema agora, numa consulta. A planilha
+    guarda isso quando o produto é contado pela primeira vez ("esperado"),
+    para que vendas feitas depois da contagem não virem diferença.
+    """
+    conn = get_db_connection()
+    rows = conn.execute(
+        "SELECT id, quantidade FROM produtos WHERE id IN (SELECT value FROM json_each(?))",
+        (json.dumps([int(pid) for pid in produto_ids]),),
+    ).fetchall()
+    conn.close()
+    return {r["id"]: r["quantidade"] for r in rows}
+
+
+def calcular_diferencas(contagens, esperados=None, completa=False, marca=None):
+    """
+    Compara a contagem {produto_id: contado} com o estoque do sistema
+    (ou com `esperados` {produto_id: quantidade na hora da contagem}).
+    Com completa=True, os produtos não contados (da marca, se informada)
+    entram como contado=0. Retorna um DataFrame com id, nome, sku, marca,
+    preco, esperado, contado, diferenca e impacto (diferenca x preço),
+    só com as divergências, da maior para a menor em valor absoluto.
+    """
+    estoque = _estoque().rename(columns={"quantidade": "esperado"})
+    if esperados:
+        estoque["esperado"] = estoque["id"].map(esperados).fillna(estoque["esperado"]).astype("int64")
+    contados = pd.DataFrame(
+        {"id": list(contagens.keys()), "contado": list(contagens.values())},
+    ).astype({"id": "int64", "contado": "int64"})
+    if completa:
+        base = estoque if marca is None else estoque[estoque["marca"] == marca]
+        df = base.merge(contados, on="id", how="left")
+        df["contado"] = df["contado"].fillna(0).astype("int64")
+    else:
+        df = estoque.merge(contados, on="id", how="inner")
+    df["diferenca"] = df["contado"] - df["esperado"]
+    df["impacto"] = df["diferenca"] * df["preco"]
+    df = df[df["diferenca"] != 0]
+    return df.iloc[df["impacto"].abs().argsort()[::-1]].reset_index(drop=True)
+
+
+def resumo_diferencas(df):
+    return {
+        "itens": len(df),
+        "sobras": int(df.loc[df["diferenca"] > 0, "diferenca"].sum()),
+        "faltas": int(-df.loc[df["diferenca"] < 0, "diferenca"].sum()),
+        "impacto": float(df["impacto"].sum()),
+    }
+
+
+def _coluna(colunas, aliases):
+    normalizadas = {_normalizar(c): c for c in colunas}
+    for alias in aliases:
+        if alias in normalizadas:
+            return normalizadas[alias]
+    return None
+
+
+def ler_arquivo_contagem(file_buffer, nome_arquivo):
+    """
+    Lê uma contagem em CSV (; ou ,) ou XLSX com uma coluna de código
+    (sku/código de barras) ou id e uma coluna de quantidade contada.
+    Linhas repetidas do mesmo produto são somadas.
+    Retorna (contagens {produto_id: contado}, nao_encontrados [códigos]).
+    """
+    dados = file_buffer.getvalue()
+    if nome_arquivo.lower().endswith(".xlsx"):
+        df = pd.read_excel(io.BytesIO(dados), dtype=str, engine="openpyxl")
+    else:
+        df = pd.read_csv(io.BytesIO(dados), sep=None, engine="python", dtype=str, encoding="utf-8-sig")
+    col_sku = _coluna(df.columns, ALIASES_SKU)
+    col_id = _coluna(df.columns, ALIASES_ID)
+    col_contado = _coluna(df.columns, ALIASES_CONTADO)
+    if col_contado is None or (col_sku is None and col_id is None):
+        raise ValueError("O arquivo precisa de uma coluna de código (sku/código de barras) ou id "
+                         "e uma de quantidade contada (contado/quantidade)")
+
+    contado = pd.to_numeric(df[col_contado].str.replace(",", "."), errors="coerce")
+    estoque = _estoque()[["id", "sku"]]
+    if col_sku is not None:
+        lidos = pd.DataFrame({"codigo": df[col_sku].map(normalizar_sku), "contado": contado})
+        mapa = estoque.dropna(subset=["sku"]).rename(columns={"sku": "codigo"})
+    else:
+        lidos = pd.DataFrame({"codigo": pd.to_numeric(df[col_id], errors="coerce").astype("Int64"),
+                              "contado": contado})
+        mapa = estoque.assign(codigo=estoque["id"].astype("Int64"))[["codigo", "id"]]
+    lidos = lidos.dropna(subset=["codigo", "contado"])
+    lidos = lidos[lidos["contado"] >= 0].merge(mapa, on="codigo", how="left")
+    nao_encontrados = lidos.loc[lidos["id"].isna(), "codigo"].astype(str).tolist()
+    achados = lidos[lidos["id"].notna()]
+    somados = achados.groupby(achados["id"].astype("int64"))["contado"].sum().round()
+    return {int(pid): int(q) for pid, q in somados.items()}, nao_encontrados
@@ -0,0 +1,249 @@
+# ====================================================================
+# ARQUIVO: utils/limpeza_imagens.py
+# Coleta incremental das fotos que nenhum produto usa mais (assets/)
+# ====================================================================
+#
+# Uma passada monta o conjunto de fotos referenciadas (uma consulta por
+# loja, produtos + arquivo morto) e percorre assets/ com os.scandir. O
+# trabalho é feito em fatias de tempo limitado pelo agendador, que tem
+# uma única thread para todas as tarefas: cada fatia processa o que der
+# em ORCAMENTO_FATIA segundos e continua de onde parou na próxima.
+#
+# Nada é apagado direto: arquivos sem referência vão para
+# assets/.quarentena/ e só são removidos depois de DIAS_QUARENTENA dias
+# (se ninguém voltou a referenciá-los; nesse caso voltam para assets/).
+# Arquivos recentes são ignorados, porque um upload grava a foto antes de
+# ligá-la ao produto.
+
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from utils import agendador
+from utils.database import ASSETS_DIR
+from utils.lojas import listar_lojas
+
+QUARENTENA_DIR = os.path.join(ASSETS_DIR, ".quarentena")
+DIAS_QUARENTENA = 7
+IDADE_MINIMA = 60 * 60  # segundos: fotos mais novas podem estar no meio de um upload
+PROTEGIDOS = {"logo.png"}
+ORCAMENTO_FATIA = 0.2  # segundos por fatia
+INTERVALO_FATIA = 60  # segundos entre fatias
+
+_TAREFA = "limpeza_imagens"
+
+_lock = threading.Lock()
+_passada = None  # passada em andamento: {"referenciadas", "etapa", "iterador", ...}
+_relatorio = {
+    "passadas": 0,
+    "verificados": 0,
+    "quarentena": 0,
+    "bytes_quarentena": 0,
+    "removidos": 0,
+    "bytes_recuperados": 0,
+    "restaurados": 0,
+    "ultima_passada": None,
+    "ultima_fatia": None,
+}
+
+
+def fotos_referenciadas():
+    """
+    Nomes de arquivo usados por algum produto (ativo ou arquivado) de
+    qualquer loja; assets/ é compartilhado entre as lojas.
+    """
+    fotos = set()
+    for loja in listar_lojas():
+        conn = sqlite3.connect(loja["arquivo"])
+        try:
+            rows = conn.execute("""
+                SELECT foto FROM produtos WHERE foto IS NOT NULL AND foto != ''
+                UNION
+                SELECT foto FROM produtos_arquivados WHERE foto IS NOT NULL AND foto != ''
+            """).fetchall()
+        finally:
+            conn.close()
+        fotos.update(r[0] for r in rows)
+    return fotos
+
+
+def _referenciada(nome):
+    for loja in listar_lojas():
+        conn = sqlite3.connect(loja["arquivo"])
+        try:
+            achou = conn.execute("""
+                SELECT 1 FROM produtos WHERE foto=?
+                UNION ALL
+                SELECT 1 FROM produtos_arquivados WHERE foto=?
+                LIMIT 1
+            """, (nome, nome)).fetchone()
+        finally:
+            conn.close()
+        if achou:
+            return True
+    return False
+
+
+def _ignorado(nome):
+    return nome in PROTEGIDOS or nome.startswith(".") or nome.endswith(".tmp")
+
+
+def _mover_para_quarentena(caminho, nome):
+    os.makedirs(QUARENTENA_DIR, exist_ok=True)
+    destino = os.path.join(QUARENTENA_DIR, nome)
+    os.replace(caminho, destino)
+    # o mtime passa a marcar a entrada na quarentena
+    os.utime(destino)
+
+
+def descartar_foto(nome):
+    """
+    Manda para a quarentena uma foto que deixou de ser usada (produto
+    removido ou foto trocada), se nenhum outro produto de nenhuma loja a
+    referencia. Retorna True se o arquivo foi movido.
+    """
+    if not nome or _ignorado(nome) or _referenciada(nome):
+        return False
+    caminho = os.path.join(ASSETS_DIR, nome)
+    try:
+        tamanho = os.path.getsize(caminho)
+        _mover_para_quarentena(caminho, nome)
+    except OSError:
+        return False
+    with _lock:
+        _relatorio["quarentena"] += 1
+        _relatorio["bytes_quarentena"] += tamanho
+    return True
+
+
+def _iniciar_passada():
+    global _passada
+    _passada = {
+        "referenciadas": fotos_referenciadas(),
+        "etapa": "assets",
+        "iterador": os.scandir(ASSETS_DIR),
+        "iniciada_em": datetime.now(),
+        "limite_idade": time.time() - IDADE_MINIMA,
+        "limite_quarentena": time.time() - DIAS_QUARENTENA * 24 * 60 * 60,
+    }
+
+
+def _proxima_etapa():
+    global _passada
+    _passada["iterador"].close()
+    if _passada["etapa"] == "assets" and os.path.isdir(QUARENTENA_DIR):
+        _passada["etapa"] = "quarentena"
+        _passada["iterador"] = os.scandir(QUARENTENA_DIR)
+        return
+    _relatorio["passadas"] += 1
+    _relatorio["ultima_passada"] = datetime.now()
+    _passada = None
+
+
+def _tratar(entry):
+    """
+    Um arquivo da passada: assets/ sem referência vai para a quarentena;
+    na quarentena, o que venceu o prazo é apagado e o que voltou a ser
+    referenciado é devolvido.
+    """
+    if not entry.is_file(follow_symlinks=False) or _ignorado(entry.name):
+        return
+    st = entry.stat(follow_symlinks=False)
+    referenciada = entry.name in _passada["referenciadas"]
+    if _passada["etapa"] == "assets":
+        _relatorio["verificados"] += 1
+        if referenciada or st.st_mtime > _passada["limite_idade"]:
+            return
+        _mover_para_quarentena(entry.path, entry.name)
+        _relatorio["quarentena"] += 1
+        _relatorio["bytes_quarentena"] += st.st_size
+    elif referenciada:
+        destino = os.path.join(ASSETS_DIR, entry.name)
+        if os.path.exists(destino):
+            os.remove(entry.path)  # já existe uma cópia em uso em assets/
+        else:
+            os.replace(entry.path, destino)
+            _relatorio["restaurados"] += 1
+    elif st.st_mtime < _passada["limite_quarentena"]:
+        os.remove(entry.path)
+        _relatorio["removidos"] += 1
+        _relatorio["bytes_recuperados"] += st.st_size
+
+
+def executar_fatia(orcamento=ORCAMENTO_FATIA):
+    """
+    Avança a passada em andamento (ou começa uma nova) por até
+    `orcamento` segundos; com orcamento=None vai até o fim da passada.
+    Se outra fatia já estiver rodando, não faz nada.
+    Retorna uma cópia do relatório acumulado.
+    """
+    if not _lock.acquire(blocking=False):
+        return dict(_relatorio, em_andamento=True)
+    try:
+        fim = None if orcamento is None else time.monotonic() + orcamento
+        if _passada is None:
+            _iniciar_passada()
+        while _passada is not None and (fim is None or time.monotonic() < fim):
+            entry = next(_passada["iterador"], None)
+            if entry is None:
+                _proxima_etapa()
+                if fim is not None:
+                    break  # nova etapa/passada fica para a próxima fatia
+                continue
+            try:
+                _tratar(entry)
+            except OSError:
+                pass  # arquivo sumiu ou está em uso; a próxima passada tenta de novo
+        _relatorio["ultima_fatia"] = datetime.now()
+        return dict(_relatorio, em_andamento=_passada is not None)
+    finally:
+        _lock.release()
+
+
+def limpar_agora():
+    """
+    Faz uma passada completa agora (terminando antes a que estiver em
+    andamento, cujo conjunto de referências pode estar desatualizado).
+    """
+    em_andamento = _passada is not None
+    resultado = executar_fatia(None)
+    if em_andamento:
+        resultado = executar_fatia(None)
+    return resultado
+
+
+def relatorio_limpeza():
+    with _lock:
+        return dict(_relatorio, em_andamento=_passada is not None)
+
+
+def get_quarentena():
+    """
+    Arquivos na quarentena: [{nome, bytes, desde}], mais antigos primeiro.
+    """
+    if not os.path.isdir(QUARENTENA_DIR):
+        return []
+    itens = []
+    with os.scandir(QUARENTENA_DIR) as it:
+        for entry in it:
+            if entry.is_file(follow_symlinks=False):
+                st = entry.stat()
+                itens.append({"nome": entry.name, "bytes": st.st_size,
+                              "desde": datetime.fromtimestamp(st.st_mtime)})
+    return sorted(itens, key=lambda i: i["desde"])
+
+
+def restaurar_da_quarentena(nome):
+    origem = os.path.join(QUARENTENA_DIR, os.path.basename(nome))
+    if not os.path.isfile(origem):
+        raise ValueError("Arquivo não está na quarentena")
+    os.replace(origem, os.path.join(ASSETS_DIR, os.path.basename(nome)))
+
+
+def iniciar_limpeza_imagens(intervalo=INTERVALO_FATIA):
+    """
+    Registra as fatias da coleta no agendador (idempotente por processo).
+    """
+    agendador.agendar(_TAREFA, executar_fatia, intervalo)
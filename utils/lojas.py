@@ -0,0 +1,204 @@
+# ====================================================================
+# ARQUIVO: utils/lojas.py
+# Cadastro de lojas (um banco por loja) e visões entre lojas
+# ====================================================================
+#
+# Cada loja tem o seu arquivo SQLite: a loja principal continua em
+# data/estoque.db e as demais ficam em data/lojas/<codigo>.db. Como são
+# arquivos separados, vendas numa loja nunca esperam o lock de outra.
+# A loja da sessão é escolhida com usar_loja() no início de cada página;
+# as funções de utils/database.py passam a usar o banco dela.
+#
+# As visões consolidadas consultam todos os bancos ao mesmo tempo num
+# pool de threads (uma conexão por loja) e juntam os resultados.
+
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.database import DATABASE, DATABASE_DIR, banco, usar_banco, create_tables, get_db_connection
+
+LOJA_PRINCIPAL = "principal"
+LOJAS_DIR = os.path.join(DATABASE_DIR, "lojas")
+REGISTRO = os.path.join(DATABASE_DIR, "lojas.json")
+
+_lock = threading.Lock()
+_registro = None
+_registro_mtime = None
+_preparadas = set()  # bancos que já passaram por create_tables neste processo
+
+
+def _carregar():
+    global _registro, _registro_mtime
+    mtime = os.path.getmtime(REGISTRO) if os.path.exists(REGISTRO) else None
+    with _lock:
+        if _registro is not None and mtime == _registro_mtime:
+            return _registro
+        lojas = {LOJA_PRINCIPAL: {"codigo": LOJA_PRINCIPAL, "nome": "Loja principal", "arquivo": DATABASE}}
+        if mtime is not None:
+            with open(REGISTRO, encoding="utf-8") as f:
+                for loja in json.load(f):
+                    lojas.setdefault(loja["codigo"], loja)
+        _registro, _registro_mtime = lojas, mtime
+        return lojas
+
+
+def listar_lojas():
+    """
+    Lojas cadastradas, a principal primeiro.
+    """
+    return list(_carregar().values())
+
+
+def get_loja(codigo):
+    return _carregar().get(codigo or LOJA_PRINCIPAL)
+
+
+def criar_loja(codigo, nome):
+    """
+    Registra uma loja nova e cria o banco dela com as mesmas tabelas.
+    """
+    codigo = (codigo or "").strip().lower()
+    if not re.fullmatch(r"[a-z0-9_-]{2,30}", codigo):
+        raise ValueError("Código da loja deve ter 2 a 30 letras minúsculas, números, '-' ou '_'")
+    if not (nome or "").strip():
+        raise ValueError("Informe o nome da loja")
+    if get_loja(codigo):
+        raise ValueError(f"Loja já cadastrada: {codigo}")
+    os.makedirs(LOJAS_DIR, exist_ok=True)
+    loja = {"codigo": codigo, "nome": nome.strip(), "arquivo": os.path.join(LOJAS_DIR, f"{codigo}.db")}
+    with banco(loja["arquivo"]):
+        create_tables()
+    extras = [l for l in listar_lojas() if l["codigo"] != LOJA_PRINCIPAL] + [loja]
+    tmp = REGISTRO + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(extras, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, REGISTRO)
+    return loja
+
+
+def _preparar(loja):
+    """
+    Garante as tabelas atuais no banco da loja (uma vez por processo),
+    para lojas criadas antes de uma tabela nova existir.
+    """
+    if loja["arquivo"] in _preparadas:
+        return
+    with banco(loja["arquivo"]):
+        create_tables()
+    _preparadas.add(loja["arquivo"])
+
+
+def usar_loja(codigo):
+    """
+    Seleciona o banco da loja para o restante da execução da página.
+    Código desconhecido (ou None) cai na loja principal.
+    Retorna o dict da loja em uso.
+    """
+    loja = get_loja(codigo) or get_loja(LOJA_PRINCIPAL)
+    _preparar(loja)
+    usar_banco(loja["arquivo"])
+    return loja
+
+
+# --------------------------------------------------------------------
+# Visões entre lojas
+# --------------------------------------------------------------------
+
+def em_todas_as_lojas(func, *args, workers=None):
+    """
+    Executa func(*args) no banco de cada loja, em paralelo.
+    Retorna [(loja, resultado), ...] na ordem do cadastro.
+    """
+    lojas = listar_lojas()
+
+    def executar(loja):
+        _preparar(loja)
+        with banco(loja["arquivo"]):
+            return func(*args)
+
+    with ThreadPoolExecutor(max_workers=workers or len(lojas), thread_name_prefix="lojas") as pool:
+        return list(zip(lojas, pool.map(executar, lojas)))
+
+
+def _totais_loja():
+    conn = get_db_connection()
+    row = conn.execute("""
+        SELECT COUNT(*) AS produtos,
+               COALESCE(SUM(quantidade > 0), 0) AS com_estoque,
+               COALESCE(SUM(quantidade), 0) AS unidades,
+               COALESCE(SUM(preco * quantidade), 0) AS valor
+        FROM produtos
+    """).fetchone()
+    conn.close()
+    return dict(row)
+
+
+def estoque_consolidado():
+    """
+    Totais por loja e a soma geral: [{loja, nome, produtos, com_estoque,
+    unidades, valor}, ...], com a linha "total" no fim.
+    """
+    linhas = []
+    total = {"loja": "total", "nome": "Todas as lojas", "produtos": 0, "com_estoque": 0, "unidades": 0, "valor": 0.0}
+    for loja, t in em_todas_as_lojas(_totais_loja):
+        linhas.append({"loja": loja["codigo"], "nome": loja["nome"], **t})
+        for k in ("produtos", "com_estoque", "unidades", "valor"):
+            total[k] += t[k]
+    return linhas + [total]
+
+
+def _valor_por(dimensao):
+    conn = get_db_connection()
+    rows = conn.execute(f"""
+        SELECT COALESCE(NULLIF({dimensao}, ''), '(sem)') AS chave,
+               SUM(quantidade) AS unidades, SUM(preco * quantidade) AS valor
+        FROM produtos WHERE quantidade > 0
+        GROUP BY chave
+    """).fetchall()
+    conn.close()
+    return [dict(r) for r in rows]
+
+
+def valor_consolidado(dimensao="marca"):
+    """
+    Valor em estoque por marca/estilo/tipo somando todas as lojas, com a
+    quebra por loja: [{chave, unidades, valor, por_loja: {codigo: valor}}].
+    """
+    if dimensao not in ("marca", "estilo", "tipo"):
+        raise ValueError(f"Dimensão inválida: {dimensao}")
+    juntos = {}
+    for loja, linhas in em_todas_as_lojas(_valor_por, dimensao):
+        for r in linhas:
+            item = juntos.setdefault(r["chave"], {"chave": r["chave"], "unidades": 0, "valor": 0.0, "por_loja": {}})
+            item["unidades"] += r["unidades"]
+            item["valor"] += r["valor"]
+            item["por_loja"][loja["codigo"]] = r["valor"]
+    return sorted(juntos.values(), key=lambda r: r["valor"], reverse=True)
+
+
+def _procurar(termo, limite):
+    conn = get_db_connection()
+    rows = conn.execute("""
+        SELECT id, nome, sku, preco, quantidade FROM produtos
+        WHERE quantidade > 0 AND (sku = ? OR nome LIKE ?)
+        ORDER BY nome LIMIT ?
+    """, (termo, f"%{termo}%", limite)).fetchall()
+    conn.close()
+    return [dict(r) for r in rows]
+
+
+def onde_tem(termo, limite=20):
+    """
+    Em quais lojas há estoque de um produto (código de barras exato ou
+    parte do nome): [{loja, nome_loja, id, nome, sku, preco, quantidade}].
+    """
+    termo = (termo or "").strip()
+    if not termo:
+        return []
+    achados = []
+    for loja, linhas in em_todas_as_lojas(_procurar, termo, limite):
+        achados += [{"loja": loja["codigo"], "nome_loja": loja["nome"], **r} for r in linhas]
+    return achados
@@ -0,0 +1,43 @@
+# ====================================================================
+# ARQUIVO: utils/paineis.py
+# Componentes de tela usados por mais de uma página
+# ====================================================================
+#
+# As páginas ficam em pages/, onde o Streamlit trata todo arquivo como
+# página; o que é compartilhado entre elas mora aqui.
+
+import streamlit as st
+
+from utils.validade import get_resumo_validade
+
+
+def show_validade_panel(format_to_brl, atualizar=False):
+    """
+    Painel recolhível com vencidos / a vencer da loja atual.
+    Com atualizar=True mostra o botão que refaz a varredura na hora.
+    """
+    resumo = get_resumo_validade()
+    if not resumo or resumo["calculado_em"] is None:
+        st.warning("⏳ Validade: resumo indisponível no momento"
+                   + (f" ({resumo['erro']})." if resumo.get("erro") else "."))
+        return
+    titulo = (f"⏳ Validade: {resumo['vencidos_produtos']} vencidos • "
+              f"{resumo['a_vencer_produtos']} vencem em {resumo['dias']} dias")
+    with st.expander(titulo, expanded=bool(resumo["vencidos_produtos"])):
+        colv1, colv2, colv3 = st.columns([2, 2, 1])
+        with colv1:
+            st.metric("Valor vencido", format_to_brl(resumo["vencidos_valor"]),
+                      f"{resumo['vencidos_unidades']} un", delta_color="off")
+        with colv2:
+            st.metric(f"Valor a vencer ({resumo['dias']} dias)", format_to_brl(resumo["a_vencer_valor"]),
+                      f"{resumo['a_vencer_unidades']} un", delta_color="off")
+        if atualizar:
+            with colv3:
+                if st.button("Atualizar", key="refresh_validade"):
+                    get_resumo_validade(forcar=True)
+                    st.rerun()
+        for p in resumo["itens"]:
+            dias = p["dias_restantes"]
+            situacao = f"venceu há {-dias} dias" if dias < 0 else f"vence em {dias} dias"
+            st.write(f"- **{p['nome']}** (ID {p['id']}) • {p['data_validade']} • {situacao} • Qtd: {p['quantidade']}")
+        st.caption(f"Calculado em {resumo['calculado_em'].strftime('%d/%m/%Y %H:%M')}")
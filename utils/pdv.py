@@ -0,0 +1,122 @@
+# ====================================================================
+# ARQUIVO: utils/pdv.py
+# Ponto de venda: catálogo de códigos de barras em memória
+# ====================================================================
+#
+# Leitores USB funcionam como teclado: digitam o código e um Enter.
+# Para responder a leituras seguidas sem ir ao disco, o catálogo
+# SKU -> produto fica num dicionário por processo. Uma conexão dedicada
+# consulta PRAGMA data_version (custo de microssegundos) e só recarrega
+# o dicionário quando outra conexão gravou no banco.
+#
+# Cada item lido é reservado para a sessão do caixa (tabela reservas),
+# então dois caixas não vendem a mesma unidade; a venda consome as
+# reservas numa única transação.
+
+import sqlite3
+import threading
+
+from utils.database import (
+    caminho_banco, normalizar_sku, get_reservas, reservar, estender_reservas, confirmar_reservas,
+)
+
+
+class CatalogoSku:
+    def __init__(self, database):
+        self._database = database
+        self._lock = threading.Lock()
+        self._conn = None
+        self._versao = None
+        self._por_sku = {}
+
+    def _conexao(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self._database, check_same_thread=False)
+        return self._conn
+
+    def _recarregar_se_preciso(self):
+        conn = self._conexao()
+        versao = conn.execute("PRAGMA data_version").fetchone()[0]
+        if versao == self._versao:
+            return
+        rows = conn.execute(
+            "SELECT sku, id, nome, preco, quantidade FROM produtos WHERE sku IS NOT NULL"
+        ).fetchall()
+        self._por_sku = {
+            sku: {"id": pid, "nome": nome, "preco": preco, "quantidade": qtd, "sku": sku}
+            for sku, pid, nome, preco, qtd in rows
+        }
+        self._versao = versao
+
+    def buscar(self, sku):
+        """
+        Resolve um código lido pelo scanner (None se não cadastrado).
+        """
+        sku = normalizar_sku(sku)
+        if sku is None:
+            return None
+        with self._lock:
+            self._recarregar_se_preciso()
+            return self._por_sku.get(sku)
+
+    def __len__(self):
+        with self._lock:
+            self._recarregar_se_preciso()
+            return len(self._por_sku)
+
+
+_catalogos = {}
+_catalogo_lock = threading.Lock()
+
+
+def get_catalogo_sku():
+    """
+    Instância compartilhada do catálogo da loja atual (uma por banco, por processo).
+    """
+    caminho = caminho_banco()
+    with _catalogo_lock:
+        if caminho not in _catalogos:
+            _catalogos[caminho] = CatalogoSku(caminho)
+        return _catalogos[caminho]
+
+
+def parse_leitura(texto):
+    """
+    Interpreta uma leitura do scanner. Aceita o código puro ou
+    "quantidade*código" digitado à mão (ex.: 3*7891234567890).
+    Retorna (sku, quantidade).
+    """
+    texto = (texto or "").strip()
+    if "*" in texto:
+        qtd, sku = texto.split("*", 1)
+        if qtd.strip().isdigit():
+            return normalizar_sku(sku), int(qtd)
+    return normalizar_sku(texto), 1
+
+
+def sincronizar_reservas(sessao, carrinho):
+    """
+    Renova as reservas do carrinho {produto_id: qtd} e refaz as que
+    venceram (ex.: caixa parado além do prazo). Retorna {produto_id: erro}
+    dos itens que não puderam ser reservados de novo.
+    """
+    estender_reservas(sessao)
+    ativas = {r["produto_id"]: r["quantidade"] for r in get_reservas(sessao)}
+    falhas = {}
+    for pid, qtd in carrinho.items():
+        faltando = qtd - ativas.get(pid, 0)
+        if faltando > 0:
+            try:
+                reservar(sessao, pid, faltando)
+            except ValueError as e:
+                falhas[pid] = str(e)
+    return falhas
+
+
+def finalizar_venda(sessao, carrinho, usuario=None):
+    """
+    Grava de uma vez as vendas acumuladas no carrinho {produto_id: qtd},
+    consumindo as reservas da sessão.
+    """
+    sincronizar_reservas(sessao, carrinho)
+    return confirmar_reservas(sessao, usuario=usuario)
@@ -0,0 +1,23 @@
+# ====================================================================
+# ARQUIVO: utils/reservas.py
+# Limpeza periódica das reservas de estoque vencidas
+# ====================================================================
+
+from functools import partial
+
+from utils import agendador
+from utils.database import expirar_reservas, caminho_banco, executar_no_banco
+
+INTERVALO_EXPIRACAO = 60  # segundos
+
+_TAREFA = "reservas"
+
+
+def iniciar_expiracao_reservas(intervalo=INTERVALO_EXPIRACAO):
+    """
+    Registra a limpeza da loja atual no agendador (idempotente por
+    processo). Reservas vencidas já são ignoradas nas consultas; a
+    limpeza só mantém a tabela pequena.
+    """
+    caminho = caminho_banco()
+    agendador.agendar(f"{_TAREFA}:{caminho}", partial(executar_no_banco, caminho, expirar_reservas), intervalo)
@@ -0,0 +1,111 @@
+# ====================================================================
+# ARQUIVO: utils/sessoes.py
+# Sessões de login assinadas e checagem de papel nas páginas
+# ====================================================================
+#
+# As páginas confiavam só nos flags logged_in/role do st.session_state:
+# um usuário rebaixado ou excluído continuava com o papel antigo até
+# sair. O login agora emite um token assinado (HMAC-SHA256 sobre usuário
+# e validade) guardado na sessão; a cada rerun, sessao_valida() confere a
+# assinatura (só CPU) e pega o papel atual em database.get_papel, que fica
+# em memória e é invalidado por update_user_role/delete_user. Recarregar
+# páginas não consulta a tabela users enquanto o cache não vence.
+#
+# A chave vem de ESTOQUE_SESSAO_CHAVE ou, sem ela, de um arquivo gerado
+# na primeira vez em data/, para valer entre reinícios do processo.
+
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+
+from utils.database import DATABASE_DIR, get_papel
+
+SESSAO_VALIDADE_SEGUNDOS = 12 * 60 * 60
+ARQUIVO_CHAVE = os.path.join(DATABASE_DIR, ".sessao_chave")
+
+_lock = threading.Lock()
+_chave = None
+
+
+def _obter_chave():
+    global _chave
+    with _lock:
+        if _chave is None:
+            do_ambiente = os.environ.get("ESTOQUE_SESSAO_CHAVE")
+            if do_ambiente:
+                _chave = do_ambiente.encode()
+            elif os.path.exists(ARQUIVO_CHAVE):
+                with open(ARQUIVO_CHAVE, "rb") as f:
+                    _chave = f.read()
+            else:
+                _chave = secrets.token_bytes(32)
+                fd = os.open(ARQUIVO_CHAVE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                with os.fdopen(fd, "wb") as f:
+                    f.write(_chave)
+        return _chave
+
+
+def _assinar(carga):
+    return hmac.new(_obter_chave(), carga, hashlib.sha256).hexdigest()
+
+
+def emitir_token(username, validade=SESSAO_VALIDADE_SEGUNDOS):
+    """Token 'carga.assinatura', com a carga = base64(expira_em:username)."""
+    carga = base64.urlsafe_b64encode(f"{int(time.time() + validade)}:{username}".encode())
+    return f"{carga.decode()}.{_assinar(carga)}"
+
+
+def validar_token(token):
+    """Username do token, ou None se a assinatura não confere ou ele venceu."""
+    if not token or "." not in token:
+        return None
+    carga, assinatura = token.rsplit(".", 1)
+    if not hmac.compare_digest(assinatura, _assinar(carga.encode())):
+        return None
+    try:
+        expira_em, username = base64.urlsafe_b64decode(carga).decode().split(":", 1)
+        if int(expira_em) < time.time():
+            return None
+    except ValueError:
+        return None
+    return username
+
+
+def iniciar_sessao(estado, user):
+    """
+    Marca a sessão (st.session_state) como logada para `user` (dict com
+    username e role, como o de check_user_login).
+    """
+    estado["sessao"] = emitir_token(user["username"])
+    estado["logged_in"] = True
+    estado["username"] = user["username"]
+    estado["role"] = user["role"]
+
+
+def encerrar_sessao(estado):
+    estado["sessao"] = None
+    estado["logged_in"] = False
+    estado["username"] = None
+    estado["role"] = "guest"
+
+
+def sessao_valida(estado, papel=None):
+    """
+    True se a sessão tem um token válido de um usuário que ainda existe
+    (e, com `papel`, se o papel atual dele é esse). Atualiza estado["role"]
+    com o papel atual; se o token venceu ou a conta foi excluída, encerra
+    a sessão.
+    """
+    username = validar_token(estado.get("sessao"))
+    role = get_papel(username) if username and username == estado.get("username") else None
+    if role is None:
+        if estado.get("logged_in"):
+            encerrar_sessao(estado)
+        return False
+    if estado.get("role") != role:
+        estado["role"] = role
+    return papel is None or role == papel
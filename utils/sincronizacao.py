@@ -0,0 +1,377 @@
+# ====================================================================
+# ARQUIVO: utils/sincronizacao.py
+# Sincronização por lotes de mudanças entre cópias do banco (terminais)
+# ====================================================================
+#
+# Um terminal que precisa vender sem internet trabalha numa cópia do
+# banco da loja, feita com clonar(). Cada banco registra as escritas em
+# produtos no produtos_log (triggers em database.py), numerado por seq.
+# Sincronizar é trocar lotes: exportar_lote() junta as mudanças depois do
+# último seq confirmado pelo outro lado num JSON comprimido (gzip), e
+# aplicar_lote() aplica tudo numa transação e guarda até onde recebeu.
+# O custo depende do número de mudanças, não do tamanho do catálogo.
+#
+# Regras de conflito:
+#   - quantidade viaja como delta (vendas -1, entradas +n) e os deltas
+#     são somados: vendas feitas nos dois lados ao mesmo tempo valem
+#     todas, em qualquer ordem. Se o estoque ficar negativo (vendeu-se
+#     mais do que havia somando os caixas), o lote aplica assim mesmo e
+#     avisa nos conflitos, para uma contagem;
+#   - data da última venda: vale a maior;
+#   - cadastro (nome, preço, marca, foto, ...): vence a alteração mais
+#     recente (horário UTC de quem alterou; empate pelo nome do nó);
+#   - exclusão vence alterações; arquivamento só se o estoque local for 0.
+#
+# A topologia é em estrela (ou árvore, sem ciclos): cada terminal
+# sincroniza com o banco da loja, que repassa aos demais o que recebeu;
+# nada volta para o nó de quem chegou (coluna via do log).
+# Cada clone recebe uma faixa própria de ids para produtos cadastrados
+# nele, para não colidir com os do banco da loja; produtos que chegam de
+# outro nó não movem o contador de ids local (sqlite_sequence).
+
+import gzip
+import json
+import os
+import re
+import sqlite3
+import time
+from datetime import datetime
+
+from utils.backup import PAGINAS_POR_PASSO, PAUSA_ENTRE_PASSOS, _copiar_banco_online
+from utils.database import banco, caminho_banco, create_tables, _auditar, _COLUNAS_SEM_LWW
+
+FORMATO = 1
+BLOCO_IDS = 10_000_000  # ids de produto reservados para cada clone
+NIVEL_GZIP = 6
+
+
+def _conectar(caminho):
+    conn = sqlite3.connect(caminho)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _no_local(conn):
+    return conn.execute("SELECT no FROM sincronizacao WHERE local = 1").fetchone()["no"]
+
+
+def _ultimo_seq(conn):
+    row = conn.execute("SELECT MAX(seq) FROM produtos_log").fetchone()
+    return row[0] or 0
+
+
+def clonar(destino, nome, origem=None, primeiro_id=None):
+    """
+    Copia o banco `origem` (o da loja em uso, por padrão) para `destino`
+    como um novo nó de sincronização chamado `nome`, sem parar as vendas.
+    Os dois bancos passam a se conhecer: o próximo lote de cada lado
+    começa exatamente onde a cópia parou.
+    Retorna {no, origem, seq, primeiro_id}.
+    """
+    origem = origem or caminho_banco()
+    nome = (nome or "").strip().lower()
+    if not re.fullmatch(r"[a-z0-9_-]{2,30}", nome):
+        raise ValueError("Nome do nó deve ter 2 a 30 letras minúsculas, números, '-' ou '_'")
+    if os.path.exists(destino):
+        raise ValueError(f"Arquivo já existe: {destino}")
+    with banco(origem):
+        create_tables()
+
+    src = _conectar(origem)
+    try:
+        if src.execute("SELECT 1 FROM sincronizacao WHERE no = ?", (nome,)).fetchone():
+            raise ValueError(f"Nó já cadastrado: {nome}")
+        _copiar_banco_online(origem, destino, PAGINAS_POR_PASSO, PAUSA_ENTRE_PASSOS)
+
+        # o seq que a cópia contém: mudanças posteriores na origem vão no primeiro lote
+        dst = _conectar(destino)
+        try:
+            seq = _ultimo_seq(dst)
+            no_origem = _no_local(dst)
+            src.execute("BEGIN IMMEDIATE")
+            src.execute("""
+                INSERT INTO sincronizacao (no, recebido_ate, confirmado_ate, atualizado_em)
+                VALUES (?, ?, ?, ?)
+            """, (nome, seq, seq, datetime.now().isoformat()))
+            clones = src.execute("SELECT COUNT(*) FROM sincronizacao WHERE local = 0").fetchone()[0]
+            src.commit()
+
+            primeiro_id = primeiro_id or clones * BLOCO_IDS
+            dst.execute("BEGIN IMMEDIATE")
+            dst.execute("DELETE FROM sincronizacao")
+            dst.execute("INSERT INTO sincronizacao (no, local) VALUES (?, 1)", (nome,))
+            dst.execute("""
+                INSERT INTO sincronizacao (no, recebido_ate, confirmado_ate, atualizado_em)
+                VALUES (?, ?, ?, ?)
+            """, (no_origem, seq, seq, datetime.now().isoformat()))
+            dst.execute("UPDATE produtos_log SET origem = COALESCE(origem, ?), via = ?", (no_origem, no_origem))
+            dst.execute("DELETE FROM reservas")
+            dst.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'produtos'", (primeiro_id - 1,))
+            dst.execute("""
+                INSERT INTO sqlite_sequence (name, seq)
+                SELECT 'produtos', ? WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'produtos')
+            """, (primeiro_id - 1,))
+            dst.commit()
+        finally:
+            dst.close()
+    finally:
+        src.close()
+    return {"no": nome, "origem": no_origem, "seq": seq, "primeiro_id": primeiro_id}
+
+
+# --------------------------------------------------------------------
+# Lotes
+# --------------------------------------------------------------------
+
+def exportar_lote(destino, caminho=None, desde=None):
+    """
+    Lote (bytes, JSON comprimido) com as mudanças do banco `caminho`
+    para o nó `destino`: tudo depois de `desde` (padrão: o último seq que
+    o destino confirmou ter recebido), menos o que chegou aqui por ele.
+    """
+    conn = _conectar(caminho or caminho_banco())
+    try:
+        conn.execute("BEGIN")  # leitura consistente entre o log e o seq final
+        local = _no_local(conn)
+        par = conn.execute("SELECT recebido_ate, confirmado_ate FROM sincronizacao WHERE no = ? AND local = 0",
+                           (destino,)).fetchone()
+        if par is None:
+            raise ValueError(f"Nó desconhecido neste banco: {destino}")
+        desde = par["confirmado_ate"] if desde is None else desde
+        rows = conn.execute("""
+            SELECT seq, produto_id, op, delta, campos, venda, registrado_em, COALESCE(origem, ?)
+            FROM produtos_log
+            WHERE seq > ? AND (via IS NULL OR via != ?)
+            ORDER BY seq
+        """, (local, desde, destino)).fetchall()
+        ate = max(_ultimo_seq(conn), desde)
+        conn.rollback()
+    finally:
+        conn.close()
+    lote = {
+        "formato": FORMATO,
+        "origem": local,
+        "destino": destino,
+        "desde": desde,
+        "ate": ate,
+        "confirmado": par["recebido_ate"],
+        "mudancas": [[r[0], r[1], r[2], r[3], json.loads(r[4]) if r[4] else None, r[5], r[6], r[7]] for r in rows],
+    }
+    return gzip.compress(json.dumps(lote, separators=(",", ":"), ensure_ascii=False).encode(), NIVEL_GZIP)
+
+
+def ler_lote(dados):
+    lote = json.loads(gzip.decompress(dados))
+    if lote.get("formato") != FORMATO:
+        raise ValueError(f"Formato de lote não suportado: {lote.get('formato')}")
+    return lote
+
+
+def _colunas(conn):
+    return [r["name"] for r in conn.execute("PRAGMA table_info(produtos)")]
+
+
+def _cadastro_vence(conn, produto_id, registrado_em, no, local):
+    ultimo = conn.execute("""
+        SELECT registrado_em, COALESCE(origem, ?) AS no FROM produtos_log
+        WHERE produto_id = ? AND campos IS NOT NULL
+        ORDER BY registrado_em DESC LIMIT 1
+    """, (local, produto_id)).fetchone()
+    return ultimo is None or (registrado_em, no) > (ultimo["registrado_em"], ultimo["no"])
+
+
+def _inserir(conn, produto_id, campos, colunas, conflitos):
+    campos = {k: v for k, v in campos.items() if k in colunas and k != "id"}
+    conn.execute("DELETE FROM produtos_arquivados WHERE id = ?", (produto_id,))
+    sql = (f"INSERT INTO produtos (id, {', '.join(campos)}) "
+           f"VALUES (?, {', '.join('?' * len(campos))})")
+    try:
+        conn.execute(sql, (produto_id, *campos.values()))
+    except sqlite3.IntegrityError:
+        # código de barras já usado por outro produto deste banco
+        conflitos.append(f"produto {produto_id}: código de barras {campos.get('sku')} já em uso; gravado sem código")
+        campos["sku"] = None
+        conn.execute(sql, (produto_id, *campos.values()))
+
+
+def _aplicar_mudanca(conn, mudanca, local, via, colunas, conflitos):
+    """
+    Aplica uma mudança do lote e a registra no log deste banco (com a
+    origem e o horário originais e o nó `via` de quem veio o lote).
+    Retorna False se nada foi aplicado.
+    """
+    _, pid, op, delta, campos, venda, registrado_em, no = mudanca
+    atual = conn.execute("SELECT quantidade FROM produtos WHERE id = ?", (pid,)).fetchone()
+    aplicado_delta, aplicado_campos = 0, None
+
+    if op in ("I", "R") and atual is None:
+        _inserir(conn, pid, campos, colunas, conflitos)
+        aplicado_delta, aplicado_campos = campos.get("quantidade", 0), campos
+    elif op in ("I", "R", "U"):
+        if atual is None:
+            conflitos.append(f"produto {pid}: alteração de {no} para produto que não existe aqui")
+            return False
+        if op == "I":
+            conflitos.append(f"produto {pid}: cadastrado em {no} e aqui com o mesmo id")
+        sets, params = [], []
+        if op == "U" and delta:
+            sets.append("quantidade = quantidade + ?")
+            params.append(delta)
+            aplicado_delta = delta
+        if venda:
+            sets.append("vendido = 1, data_ultima_venda = MAX(COALESCE(data_ultima_venda, ''), ?)")
+            params.append(venda)
+        if campos and _cadastro_vence(conn, pid, registrado_em, no, local):
+            aplicado_campos = {k: v for k, v in campos.items() if k in colunas and k not in _COLUNAS_SEM_LWW}
+            sets += [f"{k} = ?" for k in aplicado_campos]
+            params += list(aplicado_campos.values())
+        if sets:
+            try:
+                conn.execute(f"UPDATE produtos SET {', '.join(sets)} WHERE id = ?", (*params, pid))
+            except sqlite3.IntegrityError:
+                conflitos.append(f"produto {pid}: código de barras {aplicado_campos.get('sku')} já em uso; mantido o atual")
+                aplicado_campos.pop("sku", None)
+                return _aplicar_mudanca(conn, [None, pid, op, delta, aplicado_campos, venda, registrado_em, no],
+                                        local, via, colunas, conflitos)
+        if aplicado_delta and atual["quantidade"] + aplicado_delta < 0:
+            conflitos.append(f"produto {pid}: estoque negativo ({atual['quantidade'] + aplicado_delta}) "
+                             f"após vendas em mais de um caixa; confira a contagem")
+    elif op == "A":
+        if atual is None:
+            return False
+        if atual["quantidade"] != 0:
+            conflitos.append(f"produto {pid}: arquivado em {no}, mas aqui tem {atual['quantidade']} un; mantido")
+            return False
+        cols = ", ".join(colunas)
+        conn.execute(f"""
+            INSERT OR REPLACE INTO produtos_arquivados ({cols}, arquivado_em)
+            SELECT {cols}, ? FROM produtos WHERE id = ?
+        """, ((campos or {}).get("arquivado_em") or datetime.now().isoformat(), pid))
+        conn.execute("DELETE FROM produtos WHERE id = ?", (pid,))
+        aplicado_campos = campos
+    elif op == "D":
+        conn.execute("DELETE FROM produtos WHERE id = ?", (pid,))
+        conn.execute("DELETE FROM produtos_arquivados WHERE id = ?", (pid,))
+    else:
+        raise ValueError(f"Operação desconhecida no lote: {op}")
+
+    conn.execute("""
+        INSERT INTO produtos_log (produto_id, op, delta, campos, venda, registrado_em, origem, via)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, (pid, op, aplicado_delta,
+          json.dumps(aplicado_campos, ensure_ascii=False) if aplicado_campos else None,
+          venda, registrado_em, no, via))
+    return True
+
+
+def aplicar_lote(dados, caminho=None, usuario=None):
+    """
+    Aplica um lote exportado por outro nó, numa única transação. Mudanças
+    já recebidas (seq <= recebido_ate) são puladas, então reaplicar o
+    mesmo lote não faz nada; um lote que começa depois do que já foi
+    recebido é recusado (faltaria um pedaço).
+    Retorna {origem, mudancas, aplicadas, repetidas, conflitos, recebido_ate}.
+    """
+    lote = ler_lote(dados) if isinstance(dados, bytes) else dados
+    caminho = caminho or caminho_banco()
+    conn = _conectar(caminho)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        local = _no_local(conn)
+        if lote["destino"] != local:
+            raise ValueError(f"Lote destinado a '{lote['destino']}', mas este banco é '{local}'")
+        par = conn.execute("SELECT recebido_ate FROM sincronizacao WHERE no = ? AND local = 0",
+                           (lote["origem"],)).fetchone()
+        if par is None:
+            raise ValueError(f"Nó desconhecido neste banco: {lote['origem']} (crie os terminais com clonar)")
+        if lote["desde"] > par["recebido_ate"]:
+            raise ValueError(f"Lote começa no seq {lote['desde']}, mas só foi recebido até "
+                             f"{par['recebido_ate']}; exporte de novo a partir daí")
+
+        colunas = _colunas(conn)
+        # ids vindos de outro nó sobem o sqlite_sequence para a faixa dele;
+        # volta ao fim para a loja e cada terminal continuarem na própria
+        ultimo_id = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'produtos'").fetchone()
+        conflitos = []
+        aplicadas = repetidas = 0
+        conn.execute("UPDATE sincronizacao SET aplicando = 1 WHERE local = 1")
+        for mudanca in lote["mudancas"]:
+            if mudanca[0] <= par["recebido_ate"]:
+                repetidas += 1
+            elif _aplicar_mudanca(conn, mudanca, local, lote["origem"], colunas, conflitos):
+                aplicadas += 1
+        conn.execute("UPDATE sincronizacao SET aplicando = 0 WHERE local = 1")
+        conn.execute("DELETE FROM sqlite_sequence WHERE name = 'produtos'")
+        conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('produtos', ?)",
+                     (ultimo_id[0] if ultimo_id else 0,))
+        conn.execute("""
+            UPDATE sincronizacao
+            SET recebido_ate = MAX(recebido_ate, ?), confirmado_ate = MAX(confirmado_ate, ?), atualizado_em = ?
+            WHERE no = ?
+        """, (lote["ate"], lote["confirmado"], datetime.now().isoformat(), lote["origem"]))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    if aplicadas:
+        with banco(caminho):
+            _auditar(usuario, "sincronizacao", origem=lote["origem"], desde=lote["desde"], ate=lote["ate"],
+                     aplicadas=aplicadas, conflitos=len(conflitos))
+    return {"origem": lote["origem"], "mudancas": len(lote["mudancas"]), "aplicadas": aplicadas,
+            "repetidas": repetidas, "conflitos": conflitos, "recebido_ate": max(lote["ate"], par["recebido_ate"])}
+
+
+def sincronizar(caminho_a, caminho_b, usuario=None):
+    """
+    Troca lotes nos dois sentidos entre dois bancos acessíveis daqui
+    (ex.: o do terminal e o da loja, quando a rede volta).
+    Retorna {a_para_b, b_para_a, bytes, tempos}.
+    """
+    tempos = {}
+    inicio = time.perf_counter()
+    conn = _conectar(caminho_a)
+    no_a = _no_local(conn)
+    conn.close()
+    conn = _conectar(caminho_b)
+    no_b = _no_local(conn)
+    conn.close()
+
+    lote_ab = exportar_lote(no_b, caminho_a)
+    tempos["exportar_a"] = time.perf_counter() - inicio
+    marca = time.perf_counter()
+    a_para_b = aplicar_lote(lote_ab, caminho_b, usuario)
+    tempos["aplicar_b"] = time.perf_counter() - marca
+    marca = time.perf_counter()
+    lote_ba = exportar_lote(no_a, caminho_b)
+    tempos["exportar_b"] = time.perf_counter() - marca
+    marca = time.perf_counter()
+    b_para_a = aplicar_lote(lote_ba, caminho_a, usuario)
+    tempos["aplicar_a"] = time.perf_counter() - marca
+    # devolve a b a confirmação do que a recebeu (e o que a mudou nesse meio tempo)
+    aplicar_lote(exportar_lote(no_b, caminho_a), caminho_b, usuario)
+    tempos["total"] = time.perf_counter() - inicio
+    return {"a_para_b": a_para_b, "b_para_a": b_para_a,
+            "bytes": {"a_para_b": len(lote_ab), "b_para_a": len(lote_ba)}, "tempos": tempos}
+
+
+def situacao(caminho=None):
+    """
+    Nó deste banco e, para cada nó conhecido, até onde cada lado recebeu
+    e quantas mudanças daqui ainda não foram confirmadas por ele.
+    """
+    conn = _conectar(caminho or caminho_banco())
+    try:
+        local = _no_local(conn)
+        pares = []
+        for r in conn.execute("SELECT * FROM sincronizacao WHERE local = 0 ORDER BY no").fetchall():
+            pendentes = conn.execute(
+                "SELECT COUNT(*) FROM produtos_log WHERE seq > ? AND (via IS NULL OR via != ?)",
+                (r["confirmado_ate"], r["no"]),
+            ).fetchone()[0]
+            pares.append({"no": r["no"], "recebido_ate": r["recebido_ate"], "confirmado_ate": r["confirmado_ate"],
+                          "pendentes": pendentes, "atualizado_em": r["atualizado_em"]})
+        return {"no": local, "seq": _ultimo_seq(conn), "pares": pares}
+    finally:
+        conn.close()
@@ -0,0 +1,108 @@
+# ====================================================================
+# ARQUIVO: utils/uploads.py
+# Processamento das fotos enviadas fora da thread do formulário
+# ====================================================================
+#
+# O formulário só copia os bytes do upload e entrega o trabalho pesado
+# (validar, decodificar, reduzir, gravar o WebP e ligar a foto ao
+# produto) a um pool pequeno de threads. O resultado de cada tarefa fica
+# registrado por sessão, porque threads não podem mexer no
+# st.session_state; a página consulta o registro a cada rerun.
+
+import os
+import threading
+import logging
+import uuid
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.database import ASSETS_DIR, set_produto_foto
+from utils.imagens import salvar_foto, gerar_miniatura
+from utils.limpeza_imagens import descartar_foto
+
+logger = logging.getLogger(__name__)
+
+WORKERS = 2
+
+_pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="uploads")
+_lock = threading.Lock()
+_tarefas = {}  # sessao -> {tarefa_id: dict}
+
+
+def _registrar(sessao, tarefa):
+    with _lock:
+        _tarefas.setdefault(sessao, {})[tarefa["id"]] = tarefa
+
+
+def _atualizar(tarefa, **campos):
+    with _lock:
+        tarefa.update(campos)
+
+
+def _processar(tarefa, dados, foto_anterior):
+    try:
+        nome = salvar_foto(dados, tarefa["arquivo"])
+        try:
+            set_produto_foto(tarefa["produto_id"], nome, usuario=tarefa["usuario"])
+        except Exception:
+            os.remove(os.path.join(ASSETS_DIR, nome))
+            raise
+        try:
+            gerar_miniatura(nome)
+        except Exception:
+            logger.warning("Miniatura não gerada para %s", nome, exc_info=True)
+        if foto_anterior and foto_anterior != nome:
+            # só sai de assets/ se nenhum outro produto usar a mesma foto
+            descartar_foto(foto_anterior)
+        _atualizar(tarefa, status="ok", foto=nome)
+    except ValueError as e:
+        # imagem inválida ou produto removido: erro do usuário, não do sistema
+        logger.warning("Foto recusada para o produto %s: %s", tarefa["produto_id"], e)
+        _atualizar(tarefa, status="erro", erro=str(e))
+    except Exception as e:
+        logger.exception("Falha ao processar foto do produto %s", tarefa["produto_id"])
+        _atualizar(tarefa, status="erro", erro=str(e))
+
+
+def enviar_foto(sessao, produto_id, dados, nome_arquivo, foto_anterior=None, usuario=None):
+    """
+    Agenda o processamento de uma foto e retorna imediatamente.
+    `dados` são os bytes do upload (ex.: UploadedFile.getvalue()).
+    A foto anterior só é apagada depois que a nova foi ligada ao produto.
+    """
+    tarefa = {
+        "id": uuid.uuid4().hex,
+        "produto_id": produto_id,
+        "arquivo": nome_arquivo,
+        "usuario": usuario,
+        "status": "processando",
+        "foto": None,
+        "erro": None,
+    }
+    _registrar(sessao, tarefa)
+    # o worker herda o contexto da página (inclusive o banco da loja)
+    _pool.submit(contextvars.copy_context().run, _processar, tarefa, dados, foto_anterior)
+    return tarefa["id"]
+
+
+def produtos_em_processamento(sessao):
+    """
+    IDs de produtos com foto ainda sendo processada nesta sessão.
+    """
+    with _lock:
+        return {t["produto_id"] for t in _tarefas.get(sessao, {}).values() if t["status"] == "processando"}
+
+
+def consumir_concluidas(sessao):
+    """
+    Remove e devolve as tarefas terminadas (ok ou erro) da sessão,
+    para a página avisar o usuário uma única vez.
+    """
+    with _lock:
+        tarefas = _tarefas.get(sessao, {})
+        concluidas = [t for t in tarefas.values() if t["status"] != "processando"]
+        for t in concluidas:
+            del tarefas[t["id"]]
+        if not tarefas:
+            _tarefas.pop(sessao, None)
+        return [dict(t) for t in concluidas]
@@ -0,0 +1,72 @@
+# ====================================================================
+# ARQUIVO: utils/validade.py
+# Varredura periódica de produtos vencidos / perto do vencimento
+# ====================================================================
+
+from datetime import datetime
+from functools import partial
+
+from utils import agendador
+from utils.database import get_expiring, get_expiring_totals, caminho_banco, executar_no_banco
+
+PRAZO_ALERTA_DIAS = 30
+INTERVALO_VARREDURA = 15 * 60  # segundos
+LIMITE_ITENS_PAINEL = 20
+
+_TAREFA = "validade"
+
+
+def calcular_resumo_validade(dias=PRAZO_ALERTA_DIAS):
+    """
+    Calcula totais de vencidos / a vencer e os primeiros itens da lista.
+    Ambas as consultas usam o índice de data_validade.
+    """
+    resumo = get_expiring_totals(dias)
+    resumo["dias"] = dias
+    resumo["itens"] = get_expiring(dias)[:LIMITE_ITENS_PAINEL]
+    resumo["calculado_em"] = datetime.now()
+    return resumo
+
+
+def resumo_vazio(dias=PRAZO_ALERTA_DIAS, erro=None):
+    """
+    Resumo zerado, no mesmo formato de calcular_resumo_validade, para
+    quando a varredura ainda não produziu resultado (ex.: falhou).
+    """
+    return {
+        "vencidos_produtos": 0, "vencidos_unidades": 0, "vencidos_valor": 0,
+        "a_vencer_produtos": 0, "a_vencer_unidades": 0, "a_vencer_valor": 0,
+        "dias": dias, "itens": [], "calculado_em": None, "erro": erro,
+    }
+
+
+def _tarefa():
+    # uma varredura por loja (banco)
+    return f"{_TAREFA}:{caminho_banco()}"
+
+
+def iniciar_varredura_validade(intervalo=INTERVALO_VARREDURA):
+    """
+    Registra a varredura da loja atual no agendador (idempotente por processo).
+    """
+    agendador.agendar(_tarefa(), partial(executar_no_banco, caminho_banco(), calcular_resumo_validade),
+                      intervalo, executar_agora=True)
+
+
+def get_resumo_validade(forcar=False):
+    """
+    Resumo em cache calculado pela varredura em segundo plano.
+    Com forcar=True recalcula na hora (ex.: botão "Atualizar").
+    Se a varredura nunca terminou bem, devolve resumo_vazio() com o erro.
+    """
+    iniciar_varredura_validade()
+    if forcar:
+        resumo = agendador.executar_agora(_tarefa())
+    else:
+        resumo = agendador.ultimo_resultado(_tarefa())
+        if resumo is None:
+            resumo = agendador.executar_agora(_tarefa())
+    if resumo is None:
+        erro = agendador.ultimo_erro(_tarefa())
+        return resumo_vazio(erro=str(erro) if erro else None)
+    return resumo